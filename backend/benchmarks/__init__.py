@@ -0,0 +1 @@
+"""ai_analyzer ve e-posta yardımcıları için mikro benchmark paketi (python -m benchmarks.run)."""
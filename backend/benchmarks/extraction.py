@@ -0,0 +1,131 @@
+"""
+extract_text_from_pdf benchmark'ı (sentetik derlem üzerinde).
+
+Her PDF için çıkarma süresi ve sayfa yöntemleri (text/ocr/skipped) ölçülür;
+ground-truth alanlarının çıkarılan metinde bulunma oranı alan doğruluğu
+olarak raporlanır. Sonuçlar belge türüne göre ve toplamda verilir.
+
+Kullanım (backend dizininde):
+    python -m benchmarks.pdf_corpus --out /tmp/ize-corpus --count 40
+    python -m benchmarks.extraction --corpus /tmp/ize-corpus --output extraction.json
+"""
+import argparse
+import json
+import re
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+from fastapi import HTTPException
+
+from services.pdf_processor import extract_text_from_pdf
+
+# Metinde aranan ground-truth alanları
+SCORED_FIELDS = ("ize_no", "vin", "plate", "warranty_start_date", "repair_date", "repair_km", "request_type")
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[\s.,\-/]+", "", text).upper()
+
+
+def field_variants(name: str, value: Any) -> List[str]:
+    """Alan değerinin belgede yazılabileceği biçimler (karşılaştırma _compact ile yapılır)."""
+    if name.endswith("_date"):
+        year, month, day = str(value).split("-")
+        return [f"{year}{month}{day}", f"{day}{month}{year}"]
+    return [str(value)]
+
+
+def score_fields(text: str, truth: Dict[str, Any]) -> Dict[str, bool]:
+    compact = _compact(text)
+    return {
+        name: any(_compact(variant) in compact for variant in field_variants(name, truth[name]))
+        for name in SCORED_FIELDS
+    }
+
+
+def _summarize(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    seconds = sum(doc["seconds"] for doc in docs)
+    modes: Counter = Counter()
+    mode_ms: Counter = Counter()
+    for doc in docs:
+        modes.update(doc["page_modes"])
+        mode_ms.update(doc["page_mode_ms"])
+    processed = sum(modes.values())
+    scored = [hit for doc in docs for hit in doc["fields"].values()]
+    total_ms = sum(mode_ms.values())
+    return {
+        "documents": len(docs),
+        "failed_documents": sum(1 for doc in docs if doc["error"]),
+        "pages": sum(doc["pages"] for doc in docs),
+        "pages_processed": processed,
+        "seconds": round(seconds, 3),
+        "pages_per_sec": round(processed / seconds, 2) if seconds else None,
+        "page_modes": dict(modes),
+        "ocr_page_share": round((modes["ocr"] + modes["ocr_failed"]) / processed, 3) if processed else None,
+        "ocr_time_share": round((mode_ms["ocr"] + mode_ms["ocr_failed"]) / total_ms, 3) if total_ms else None,
+        "field_accuracy": round(sum(scored) / len(scored), 3) if scored else None,
+    }
+
+
+def run_extraction(corpus: Path) -> Dict[str, Any]:
+    docs = []
+    for truth_path in sorted(corpus.glob("*.json")):
+        truth = json.loads(truth_path.read_text())
+        content = (corpus / truth["file"]).read_bytes()
+        page_modes: Counter = Counter()
+        page_mode_ms: Counter = Counter()
+
+        def on_page(page: int, mode: str, chars: int, duration_ms: float) -> None:
+            page_modes[mode] += 1
+            page_mode_ms[mode] += duration_ms
+
+        started = time.perf_counter()
+        error = None
+        try:
+            text = extract_text_from_pdf(content, on_page=on_page)
+        except HTTPException as exc:
+            text, error = "", str(exc.detail)
+        seconds = time.perf_counter() - started
+
+        docs.append({
+            "file": truth["file"],
+            "kind": truth["kind"],
+            "pages": truth["pages"],
+            "seconds": seconds,
+            "page_modes": page_modes,
+            "page_mode_ms": page_mode_ms,
+            "fields": score_fields(text, truth),
+            "error": error,
+        })
+        hits = sum(docs[-1]["fields"].values())
+        print(f"{truth['file']:<28}{truth['pages']:>5} s. {seconds:>8.2f} sn  alan {hits}/{len(SCORED_FIELDS)}"
+              + (f"  HATA: {error}" if error else ""))
+
+    by_kind = defaultdict(list)
+    for doc in docs:
+        by_kind[doc["kind"]].append(doc)
+    field_hits = {name: round(sum(doc["fields"][name] for doc in docs) / len(docs), 3) for name in SCORED_FIELDS} if docs else {}
+    return {
+        "total": _summarize(docs),
+        "by_kind": {kind: _summarize(items) for kind, items in sorted(by_kind.items())},
+        "field_hit_rate": field_hits,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="extract_text_from_pdf benchmark'ı")
+    parser.add_argument("--corpus", type=Path, required=True, help="benchmarks.pdf_corpus çıktısı")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    report = run_extraction(args.corpus)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
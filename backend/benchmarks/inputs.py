@@ -0,0 +1,94 @@
+"""Benchmark'lar için deterministik sentetik girdiler."""
+import random
+from typing import Any, Dict, List
+
+_WORDS = [
+    "engine", "brake", "gearbox", "turbo", "injector", "sensor", "valve", "pump", "cable", "harness",
+    "motor", "fren", "şanzıman", "arıza", "değişim", "kontrol", "yazılım", "güncelleme", "Fahrgestell",
+    "Rechnung", "Leistungsdatum", "Werkstattrechnung", "complaint", "failure", "operation", "position",
+    "warranty", "garanti", "powertrain", "mhdv", "lcv", "kaçak", "yağ", "soğutma", "radyatör", "debriyaj",
+]
+_KEYED_LINES = [
+    "IZE No: IZE{n:08d}",
+    "VIN / Fahrgestell: WMA06XZZ7KP{n:06d}",
+    "Plaka / Plate: 34 ABC {n3:03d}",
+    "Leistungsdatum: 2024-03-{d:02d}  km: {km}",
+    "Complaint: engine warning lamp on, {word}",
+    "Failure: {word} {word2} defective",
+    "Operation {n3:03d}: replaced {word} and {word2}",
+    "Position {n3:03d} RT-{n:05d} {word}",
+]
+
+
+def pdf_text(size_bytes: int, seed: int = 1) -> str:
+    """Yaklaşık size_bytes boyutunda, anahtar kelimeli ve dolgu satırları karışık PDF metni."""
+    rng = random.Random(seed)
+    lines: List[str] = []
+    total = 0
+    while total < size_bytes:
+        if rng.random() < 0.25:
+            line = rng.choice(_KEYED_LINES).format(
+                n=rng.randint(0, 10**6), n3=rng.randint(0, 999), d=rng.randint(1, 28),
+                km=rng.randint(10000, 900000), word=rng.choice(_WORDS), word2=rng.choice(_WORDS),
+            )
+        else:
+            line = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 14)))
+        lines.append(line)
+        total += len(line.encode("utf-8")) + 1
+    return "\n".join(lines)
+
+
+def warranty_rules(count: int, seed: int = 2) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "rule_version": f"v{idx // 100}.{idx % 100}",
+            "rule_text": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(20, 80)))
+            + rng.choice([" 12 ay garanti", " 24 ay powertrain", " mhdv 36 ay", ""]),
+            "keywords": rng.sample(_WORDS, 6),
+        }
+        for idx in range(count)
+    ]
+
+
+def contract_rules(count: int, seed: int = 3) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "package_name": f"Paket {idx + 1}",
+            "items": rng.sample(_WORDS, 8),
+            "keywords": rng.sample(_WORDS, 4),
+            "created_at": f"2024-01-{1 + idx % 28:02d}T00:00:00+00:00",
+        }
+        for idx in range(count)
+    ]
+
+
+def analysis_payload(text_bytes: int, seed: int = 4) -> Dict[str, Any]:
+    """Alan metinleri toplamda yaklaşık text_bytes olan analiz sonucu (e-posta ve politika için)."""
+    rng = random.Random(seed)
+    item_count = max(text_bytes // 200, 1)
+
+    def sentence(length: int) -> str:
+        return " ".join(rng.choice(_WORDS) for _ in range(length))
+
+    return {
+        "ize_no": "IZE12345678",
+        "company": "Örnek Lojistik Taşımacılık A.Ş.",
+        "plate": "34 ABC 123",
+        "vin": "WMA06XZZ7KP123456",
+        "warranty_start_date": "2023-01-10",
+        "repair_date": "2024-03-05",
+        "repair_km": 85000,
+        "is_within_2_year_warranty": False,
+        "warranty_decision": "OUT_OF_COVERAGE",
+        "decision_rationale": [f"Original: {sentence(10)} | TR: {sentence(10)}" for _ in range(3)],
+        "failure_complaint": sentence(20),
+        "failure_cause": sentence(20),
+        "operations_performed": [f"Original: {sentence(12)} | TR: {sentence(12)}" for _ in range(item_count)],
+        "parts_replaced": [
+            {"partName": sentence(3), "description": sentence(8), "qty": 1}
+            for _ in range(max(item_count // 4, 1))
+        ],
+        "repair_process_summary": f"Original: {sentence(40)} | TR: {sentence(40)}",
+    }
@@ -0,0 +1,287 @@
+"""
+Çıkarma (extraction) benchmark'ları için sentetik IZE PDF derlemi üreticisi.
+
+Müşteri PDF'leri paylaşılamadığından sabit test seti bu modülle üretilir:
+- native_de / native_tr: metin katmanlı Almanca / Türkçe servis faturaları,
+- scanned: rasterleştirilmiş sayfalar (gürültü, eğiklik, kaşe, JPEG),
+- mixed: metin sayfaları ile taranmış ekler,
+- binder: 1-200 sayfalık dosyalar (fatura + ek sayfalar + taramalar).
+
+Her PDF'in yanına alan değerlerini ve sayfa türlerini içeren <ad>.json
+ground-truth dosyası yazılır. Aynı seed her zaman aynı derlemi üretir.
+
+Kullanım (backend dizininde):
+    python -m benchmarks.pdf_corpus --out /tmp/ize-corpus --count 40 --seed 1
+"""
+import argparse
+import io
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+KINDS = ("native_de", "native_tr", "scanned", "mixed", "binder")
+MAX_BINDER_PAGES = 200
+SCAN_DPI = 100
+PAGE_WIDTH, PAGE_HEIGHT = A4
+
+# Türkçe karakterler için TTF font; yoksa Helvetica (ş/ğ/ı eksik çizilir)
+FONT_PATHS = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+)
+
+COMPANIES = [
+    "Anadolu Lojistik Taşımacılık A.Ş.", "Ege Soğuk Zincir Nakliyat Ltd. Şti.", "Spedition Müller GmbH",
+    "Transporte Weber & Söhne KG", "Marmara Frigo Lojistik A.Ş.", "Karadeniz Tır İşletmeleri",
+]
+PARTS = [
+    ("EGR valve", "EGR-Ventil", "EGR valfi"), ("Turbocharger", "Turbolader", "Turbo şarj"),
+    ("Injector", "Einspritzdüse", "Enjektör"), ("NOx sensor", "NOx-Sensor", "NOx sensörü"),
+    ("Water pump", "Wasserpumpe", "Su pompası"), ("Clutch disc", "Kupplungsscheibe", "Debriyaj balatası"),
+    ("AdBlue pump", "AdBlue-Pumpe", "AdBlue pompası"), ("Alternator", "Lichtmaschine", "Alternatör"),
+]
+COMPLAINTS = {
+    "de": ["Motorkontrollleuchte leuchtet, Leistungsverlust", "Kühlmittelverlust am Motor", "Geräusch aus dem Getriebe"],
+    "tr": ["Motor arıza lambası yanıyor, güç kaybı", "Motordan soğutma sıvısı kaçağı", "Şanzımandan ses geliyor"],
+}
+CAUSES = {
+    "de": ["Bauteil intern defekt", "Dichtung undicht", "Lagerschaden festgestellt"],
+    "tr": ["Parça dahili arızalı", "Conta kaçırıyor", "Rulman hasarı tespit edildi"],
+}
+FILLER = {
+    "de": "Die Arbeiten wurden gemäß Herstellervorgaben durchgeführt und dokumentiert. Fahrzeug geprüft.",
+    "tr": "Çalışmalar üretici talimatlarına uygun olarak yapılmış ve kayıt altına alınmıştır. Araç kontrol edildi.",
+}
+LABELS = {
+    "de": {
+        "title": "WERKSTATTRECHNUNG / IZE", "ize": "IZE-Nr.", "company": "Kunde", "vin": "Fahrgestell-Nr. (VIN)",
+        "plate": "Kennzeichen", "start": "Zulassung / Garantiebeginn", "repair": "Leistungsdatum",
+        "km": "Kilometerstand", "type": "Auftragsart", "complaint": "Beanstandung", "cause": "Ursache",
+        "positions": "Positionen", "stamp": "GEPRÜFT",
+    },
+    "tr": {
+        "title": "SERVİS FATURASI / IZE", "ize": "IZE No", "company": "Müşteri", "vin": "Şasi No (VIN)",
+        "plate": "Plaka", "start": "Garanti Başlangıç", "repair": "Onarım Tarihi",
+        "km": "Kilometre", "type": "Talep Türü", "complaint": "Şikayet", "cause": "Arıza Nedeni",
+        "positions": "Kalemler", "stamp": "ONAYLANDI",
+    },
+}
+_VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+
+
+def _font_path() -> Optional[str]:
+    return next((path for path in FONT_PATHS if Path(path).exists()), None)
+
+
+def _pdf_font() -> str:
+    path = _font_path()
+    if not path:
+        return "Helvetica"
+    if "CorpusSans" not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont("CorpusSans", path))
+    return "CorpusSans"
+
+
+def _image_font(size: int):
+    path = _font_path()
+    return ImageFont.truetype(path, size) if path else ImageFont.load_default()
+
+
+def _format_date(value: date, language: str) -> str:
+    return value.strftime("%d.%m.%Y") if language == "de" else value.isoformat()
+
+
+def _format_km(value: int) -> str:
+    return f"{value:,}".replace(",", ".") + " km"
+
+
+def make_ground_truth(rng: random.Random, language: str) -> Dict[str, Any]:
+    """Bir dosyanın alan değerleri (PDF bunlardan çizilir)."""
+    start = date(2020, 1, 1) + timedelta(days=rng.randint(0, 1500))
+    repair = start + timedelta(days=rng.randint(30, 1400))
+    lang_idx = 1 if language == "de" else 2
+    parts = rng.sample(PARTS, rng.randint(1, 3))
+    return {
+        "ize_no": f"IZE{rng.randint(10**7, 10**8 - 1)}",
+        "company": rng.choice(COMPANIES),
+        "vin": "VF6" + "".join(rng.choice(_VIN_CHARS) for _ in range(14)),
+        "plate": f"{rng.randint(1, 81):02d} {''.join(rng.choice('ABCDEFGHKLMNPRSTUVYZ') for _ in range(rng.randint(1, 3)))} {rng.randint(10, 9999)}",
+        "warranty_start_date": start.isoformat(),
+        "repair_date": repair.isoformat(),
+        "repair_km": rng.randint(5, 950) * 1000 + rng.randint(0, 999),
+        "request_type": rng.choice(["WARRANTY SUPPORT", "BREAKDOWN ASSISTANCE"]),
+        "failure_complaint": rng.choice(COMPLAINTS[language]),
+        "failure_cause": rng.choice(CAUSES[language]),
+        "parts_replaced": [
+            {"partName": part[lang_idx], "rt_number": f"RT-{rng.randint(10000, 99999)}", "qty": rng.randint(1, 4)}
+            for part in parts
+        ],
+    }
+
+
+def _invoice_lines(truth: Dict[str, Any], language: str) -> List[str]:
+    labels = LABELS[language]
+    start = date.fromisoformat(truth["warranty_start_date"])
+    repair = date.fromisoformat(truth["repair_date"])
+    lines = [
+        labels["title"],
+        "",
+        f"{labels['ize']}: {truth['ize_no']}",
+        f"{labels['company']}: {truth['company']}",
+        f"{labels['vin']}: {truth['vin']}",
+        f"{labels['plate']}: {truth['plate']}",
+        f"{labels['start']}: {_format_date(start, language)}",
+        f"{labels['repair']}: {_format_date(repair, language)}",
+        f"{labels['km']}: {_format_km(truth['repair_km'])}",
+        f"{labels['type']}: {truth['request_type']}",
+        "",
+        f"{labels['complaint']}: {truth['failure_complaint']}",
+        f"{labels['cause']}: {truth['failure_cause']}",
+        "",
+        f"{labels['positions']}:",
+    ]
+    for idx, part in enumerate(truth["parts_replaced"], 1):
+        lines.append(f"  {idx:02d}  {part['rt_number']}  {part['partName']}  x{part['qty']}")
+    lines += ["", FILLER[language]]
+    return lines
+
+
+def _filler_lines(rng: random.Random, language: str, page: int) -> List[str]:
+    count = rng.randint(15, 35)
+    return [f"Anlage / Ek {page}"] + [
+        f"{rng.randint(100, 999)}  {FILLER[language][: rng.randint(30, len(FILLER[language]))]}" for _ in range(count)
+    ]
+
+
+def _draw_text_page(pdf: canvas.Canvas, lines: List[str], font: str) -> None:
+    y = PAGE_HEIGHT - 60
+    for idx, line in enumerate(lines):
+        pdf.setFont(font, 14 if idx == 0 else 10)
+        pdf.drawString(50, y, line)
+        y -= 20 if idx == 0 else 15
+        if y < 50:
+            break
+    pdf.showPage()
+
+
+def _scan_image(lines: List[str], rng: random.Random, stamp: str) -> Image.Image:
+    """Metni taranmış sayfa gibi rasterleştirir: gürültü, eğiklik, kaşe, bulanıklık."""
+    width, height = int(PAGE_WIDTH / 72 * SCAN_DPI), int(PAGE_HEIGHT / 72 * SCAN_DPI)
+    image = Image.new("RGB", (width, height), (250, 249, 245))
+    draw = ImageDraw.Draw(image)
+    font = _image_font(int(SCAN_DPI * 0.15))
+    y = int(SCAN_DPI * 0.8)
+    for line in lines:
+        draw.text((int(SCAN_DPI * 0.7) + rng.randint(-2, 2), y), line, fill=(25, 25, 30), font=font)
+        y += int(SCAN_DPI * 0.22)
+        if y > height - SCAN_DPI:
+            break
+
+    # Kaşe
+    cx, cy, radius = rng.randint(width // 2, width - 150), rng.randint(height // 2, height - 150), int(SCAN_DPI * 0.6)
+    draw.ellipse((cx - radius, cy - radius, cx + radius, cy + radius), outline=(180, 30, 40), width=4)
+    draw.text((cx - radius + 12, cy - 10), stamp, fill=(180, 30, 40), font=font)
+
+    # Tarayıcı gürültüsü
+    for _ in range(width * height // 400):
+        shade = rng.randint(120, 220)
+        draw.point((rng.randrange(width), rng.randrange(height)), fill=(shade, shade, shade))
+
+    image = image.rotate(rng.uniform(-2.5, 2.5), resample=Image.BICUBIC, expand=False, fillcolor=(250, 249, 245))
+    return image.filter(ImageFilter.GaussianBlur(radius=rng.uniform(0.2, 0.7)))
+
+
+def _draw_scan_page(pdf: canvas.Canvas, image: Image.Image, rng: random.Random) -> None:
+    buffer = io.BytesIO()
+    image.convert("L").save(buffer, format="JPEG", quality=rng.randint(45, 80))
+    buffer.seek(0)
+    pdf.drawImage(ImageReader(buffer), 0, 0, width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    pdf.showPage()
+
+
+def _binder_pages(rng: random.Random) -> int:
+    # Çoğu dosya kısa; az sayıda çok uzun klasör
+    return min(int(rng.paretovariate(0.9)) + 1, MAX_BINDER_PAGES)
+
+
+def build_document(kind: str, index: int, seed: int) -> Tuple[bytes, Dict[str, Any]]:
+    """Tek bir IZE PDF'i ve ground-truth kaydını üretir."""
+    rng = random.Random(f"{seed}:{kind}:{index}")
+    language = "tr" if kind == "native_tr" else "de" if kind == "native_de" else rng.choice(["de", "tr"])
+    truth = make_ground_truth(rng, language)
+    invoice = _invoice_lines(truth, language)
+    stamp = LABELS[language]["stamp"]
+
+    if kind in ("native_de", "native_tr"):
+        plan = ["text"] + ["text"] * rng.randint(0, 2)
+    elif kind == "scanned":
+        plan = ["scan"] * rng.randint(1, 3)
+    elif kind == "mixed":
+        plan = ["text"] + [rng.choice(["text", "scan"]) for _ in range(rng.randint(1, 4))] + ["scan"]
+    else:
+        total = max(_binder_pages(rng), 2)
+        plan = [rng.choice(["text", "scan"])] + ["scan" if rng.random() < 0.2 else "text" for _ in range(total - 1)]
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font = _pdf_font()
+    for page, page_kind in enumerate(plan, 1):
+        lines = invoice if page == 1 else _filler_lines(rng, language, page)
+        if page_kind == "text":
+            _draw_text_page(pdf, lines, font)
+        else:
+            _draw_scan_page(pdf, _scan_image(lines, rng, stamp), rng)
+    pdf.save()
+
+    truth.update({
+        "kind": kind,
+        "language": language,
+        "pages": len(plan),
+        "page_kinds": plan,
+        # Alanlar yalnızca ilk sayfadadır; ilk sayfa taranmışsa OCR gerekir
+        "fields_on_scan": plan[0] == "scan",
+    })
+    return buffer.getvalue(), truth
+
+
+def generate_corpus(out_dir: Path, count: int, seed: int = 1, kinds: Tuple[str, ...] = KINDS) -> List[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for index in range(count):
+        kind = kinds[index % len(kinds)]
+        content, truth = build_document(kind, index, seed)
+        name = f"{index:04d}_{kind}"
+        (out_dir / f"{name}.pdf").write_bytes(content)
+        (out_dir / f"{name}.json").write_text(json.dumps({"file": f"{name}.pdf", **truth}, ensure_ascii=False, indent=2))
+        written.append(out_dir / f"{name}.pdf")
+    return written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sentetik IZE PDF derlemi üretir")
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--count", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--kinds", default=",".join(KINDS), help=f"Virgülle ayrılmış: {', '.join(KINDS)}")
+    args = parser.parse_args()
+
+    kinds = tuple(kind.strip() for kind in args.kinds.split(",") if kind.strip())
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        parser.error(f"Bilinmeyen tür: {', '.join(sorted(unknown))}")
+    files = generate_corpus(args.out, args.count, args.seed, kinds)
+    print(f"{len(files)} PDF yazıldı: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Mikro benchmark çalıştırıcısı ve regresyon kapısı.
+
+Her durum için ops/sn (en iyi tekrar) ve tek çağrının tepe bellek ayırımı
+(tracemalloc) ölçülür. Sonuçlar makineler arası karşılaştırılabilsin diye
+sabit bir saf Python kalibrasyon iş yüküne bölünerek normalize edilir.
+Kayıtlı baseline'a göre ops/sn --max-regression yüzdesinden fazla düşer
+veya bellek --max-alloc-regression yüzdesinden fazla artarsa çıkış kodu 1'dir.
+
+Kullanım (backend dizininde):
+    python -m benchmarks.run                      # baseline ile karşılaştır
+    python -m benchmarks.run --quick -k email     # büyük girdileri atla, filtrele
+    python -m benchmarks.run --update-baseline    # baseline.json'u yeniden yaz
+"""
+import argparse
+import gc
+import json
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+MIN_RUN_SECONDS = 0.1
+REPEATS = 5
+# Bu boyutun altındaki bellek farkları gürültü sayılır
+ALLOC_NOISE_BYTES = 64 * 1024
+
+
+def _calibration_workload() -> None:
+    words = [f"kelime{idx % 97}" for idx in range(2000)]
+    sorted(words, key=len)
+    " ".join(words).lower().split()
+    sum(len(word) for word in words if "5" in word)
+
+
+def measure_ops(func: Callable[[], object], min_seconds: float = MIN_RUN_SECONDS, repeats: int = REPEATS) -> float:
+    """Döngü sayısını min_seconds'a ulaşana kadar ikiye katlar; en iyi tekrarın ops/sn değerini döndürür."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            break
+        loops *= 2
+
+    best = elapsed
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, time.perf_counter() - started)
+    return loops / best if best > 0 else float("inf")
+
+
+def measure_alloc(func: Callable[[], object]) -> Dict[str, int]:
+    """Tek çağrının tepe ve kalıcı bellek ayırımı (bayt)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {"peak_bytes": peak - before, "retained_bytes": current - before}
+
+
+def run_suite(pattern: Optional[str] = None, quick: bool = False) -> Dict[str, Any]:
+    from benchmarks.suite import build_suite
+
+    calibration = measure_ops(_calibration_workload)
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in build_suite():
+        if quick and case.heavy:
+            continue
+        if pattern and not re.search(pattern, case.name):
+            continue
+        func = case.setup()
+        func()  # ısınma (lru_cache, lazy import vb.)
+        ops = measure_ops(func)
+        results[case.name] = {
+            "ops_per_sec": round(ops, 3),
+            "normalized": round(ops / calibration, 6),
+            **measure_alloc(func),
+        }
+        print(f"{case.name:<48}{ops:>14.1f} ops/s{results[case.name]['peak_bytes'] / 1024:>12.1f} KB peak")
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "calibration_ops_per_sec": round(calibration, 3),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    max_regression: float,
+    max_alloc_regression: float,
+) -> List[str]:
+    """Baseline'a göre eşiği aşan regresyonları açıklamalarıyla döndürür."""
+    failures = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        slowdown = (base["normalized"] - result["normalized"]) / base["normalized"] * 100
+        if slowdown > max_regression:
+            failures.append(f"{name}: normalize ops/sn %{slowdown:.1f} düştü (eşik %{max_regression:g})")
+
+        growth_bytes = result["peak_bytes"] - base["peak_bytes"]
+        if growth_bytes > ALLOC_NOISE_BYTES and base["peak_bytes"] > 0:
+            growth = growth_bytes / base["peak_bytes"] * 100
+            if growth > max_alloc_regression:
+                failures.append(f"{name}: tepe bellek %{growth:.1f} arttı (eşik %{max_alloc_regression:g})")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ai_analyzer / e-posta mikro benchmark'ları")
+    parser.add_argument("-k", dest="pattern", help="Durum adı için regex filtresi")
+    parser.add_argument("--quick", action="store_true", help="1MB metin ve 10000 kurallı durumları atla")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=25.0, help="İzin verilen ops/sn düşüşü (%%)")
+    parser.add_argument("--max-alloc-regression", type=float, default=50.0, help="İzin verilen tepe bellek artışı (%%)")
+    parser.add_argument("--output", type=Path, help="Sonuçları JSON olarak yaz")
+    args = parser.parse_args()
+
+    current = run_suite(args.pattern, args.quick)
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    if args.update_baseline:
+        if args.pattern or args.quick:
+            # Kısmi çalıştırma mevcut baseline'daki diğer durumları korur
+            existing = json.loads(args.baseline.read_text()) if args.baseline.exists() else {"results": {}}
+            current["results"] = {**existing.get("results", {}), **current["results"]}
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Baseline güncellendi: {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"Baseline bulunamadı: {args.baseline} (--update-baseline ile oluşturun)")
+        return
+    failures = compare(
+        json.loads(args.baseline.read_text()), current, args.max_regression, args.max_alloc_regression
+    )
+    for failure in failures:
+        print(f"REGRESYON: {failure}")
+    if failures:
+        sys.exit(1)
+    print("Regresyon yok.")
+
+
+if __name__ == "__main__":
+    main()
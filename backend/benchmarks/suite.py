@@ -0,0 +1,92 @@
+"""Benchmark edilen yardımcılar ve girdi boyutları."""
+from dataclasses import dataclass
+from typing import Callable, List
+
+from benchmarks.inputs import analysis_payload, contract_rules, pdf_text, warranty_rules
+from services.ai_analyzer import (
+    MAX_INPUT_TOKENS_BUDGET,
+    MAX_RULES_CHARS,
+    _build_messages,
+    _enforce_contract_policy,
+    _prioritize_pdf_lines,
+    _select_relevant_rules,
+)
+from services.email import generate_email_body, generate_email_subject
+
+KB = 1024
+TEXT_SIZES = [("1KB", KB), ("10KB", 10 * KB), ("100KB", 100 * KB), ("1MB", 1024 * KB)]
+RULE_COUNTS = [10, 100, 1000, 10000]
+# --quick ile atlanan en büyük girdiler
+HEAVY_LABELS = {"1MB", "10000"}
+
+
+@dataclass
+class BenchCase:
+    name: str
+    # Girdileri hazırlayıp ölçülecek argümansız fonksiyonu döndürür (hazırlık ölçülmez)
+    setup: Callable[[], Callable[[], object]]
+    heavy: bool = False
+
+
+def _prioritize(size: int) -> Callable[[], object]:
+    text = pdf_text(size)
+    return lambda: _prioritize_pdf_lines(text)
+
+
+def _prioritize_tokens(size: int) -> Callable[[], object]:
+    text = pdf_text(size)
+    return lambda: _prioritize_pdf_lines(text, max_tokens=MAX_INPUT_TOKENS_BUDGET)
+
+
+def _select_rules(count: int) -> Callable[[], object]:
+    rules, text = warranty_rules(count), pdf_text(10 * KB)
+    return lambda: _select_relevant_rules(rules, text)
+
+
+def _messages(size: int, count: int, token_budget: bool) -> Callable[[], object]:
+    rules, contracts, text = warranty_rules(count), contract_rules(8), pdf_text(size)
+    budget = MAX_INPUT_TOKENS_BUDGET if token_budget else None
+    return lambda: _build_messages(rules, contracts, text, MAX_RULES_CHARS, token_budget=budget)
+
+
+def _policy(size: int) -> Callable[[], object]:
+    payload, text = analysis_payload(2 * KB), pdf_text(size)
+    return lambda: _enforce_contract_policy(payload, text)
+
+
+def _email_body(size: int, language: str) -> Callable[[], object]:
+    payload = analysis_payload(size)
+    return lambda: generate_email_body(payload, language)
+
+
+def _email_subject() -> Callable[[], object]:
+    payload = analysis_payload(KB)
+    return lambda: generate_email_subject(payload, "tr")
+
+
+def build_suite() -> List[BenchCase]:
+    cases: List[BenchCase] = []
+    for label, size in TEXT_SIZES:
+        heavy = label in HEAVY_LABELS
+        cases.append(BenchCase(f"prioritize_pdf_lines[{label}]", lambda size=size: _prioritize(size), heavy))
+        cases.append(BenchCase(f"prioritize_pdf_lines_tokens[{label}]", lambda size=size: _prioritize_tokens(size), heavy))
+        cases.append(BenchCase(f"enforce_contract_policy[{label}]", lambda size=size: _policy(size), heavy))
+        for language in ("tr", "en"):
+            cases.append(BenchCase(
+                f"generate_email_body_{language}[{label}]",
+                lambda size=size, language=language: _email_body(size, language),
+                heavy,
+            ))
+    for count in RULE_COUNTS:
+        heavy = str(count) in HEAVY_LABELS
+        cases.append(BenchCase(f"select_relevant_rules[{count}]", lambda count=count: _select_rules(count), heavy))
+    for label, size, count in (("1KB", KB, 10), ("100KB", 100 * KB, 1000), ("1MB", 1024 * KB, 10000)):
+        heavy = label in HEAVY_LABELS
+        cases.append(BenchCase(
+            f"build_messages[{label},{count}]", lambda size=size, count=count: _messages(size, count, False), heavy
+        ))
+        cases.append(BenchCase(
+            f"build_messages_tokens[{label},{count}]", lambda size=size, count=count: _messages(size, count, True), heavy
+        ))
+    cases.append(BenchCase("generate_email_subject", _email_subject))
+    return cases
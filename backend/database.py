@@ -8,10 +8,12 @@
 #db = client[DB_NAME]
 
 import os
+from datetime import timezone
 from motor.motor_asyncio import AsyncIOMotorClient
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://mongodb:27017")
 DB_NAME = os.getenv("DB_NAME", "ize_database")
 
-client = AsyncIOMotorClient(MONGO_URL)
+# BSON date alanları UTC'li datetime olarak okunur
+client = AsyncIOMotorClient(MONGO_URL, tz_aware=True, tzinfo=timezone.utc)
 db = client[DB_NAME]
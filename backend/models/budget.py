@@ -0,0 +1,47 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Literal, Optional
+from datetime import datetime, timezone
+import uuid
+
+
+BUDGET_SCOPE_USER = "user"
+BUDGET_SCOPE_BRANCH = "branch"
+BUDGET_SCOPE_PROVIDER = "provider"
+# scope_id bu değerse limit her kullanıcı/şube için ayrı ayrı uygulanır
+BUDGET_SCOPE_ANY = "*"
+
+BudgetScope = Literal["user", "branch", "provider"]
+BudgetPeriod = Literal["daily", "monthly"]
+# Bütçe dolunca: ucuz modele düş (degrade) veya dönem sonuna kadar kuyrukta beklet (queue)
+BudgetAction = Literal["degrade", "queue"]
+
+
+class LLMBudgetLimit(BaseModel):
+    """Kullanıcı, şube veya sağlayıcı bazında günlük/aylık LLM token ve maliyet limiti"""
+    model_config = ConfigDict(extra="ignore")
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    scope: BudgetScope
+    scope_id: str = BUDGET_SCOPE_ANY  # kullanıcı id, şube adı, sağlayıcı adı veya "*"
+    period: BudgetPeriod = "daily"
+    max_tokens: Optional[int] = None
+    max_cost_usd: Optional[float] = None
+    on_exhausted: BudgetAction = "degrade"  # sağlayıcı limitlerinde sağlayıcı atlanır
+    is_active: bool = True
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class LLMBudgetLimitCreate(BaseModel):
+    scope: BudgetScope
+    scope_id: str = BUDGET_SCOPE_ANY
+    period: BudgetPeriod = "daily"
+    max_tokens: Optional[int] = Field(default=None, ge=0)
+    max_cost_usd: Optional[float] = Field(default=None, ge=0)
+    on_exhausted: BudgetAction = "degrade"
+
+
+class LLMBudgetLimitUpdate(BaseModel):
+    max_tokens: Optional[int] = Field(default=None, ge=0)
+    max_cost_usd: Optional[float] = Field(default=None, ge=0)
+    on_exhausted: Optional[BudgetAction] = None
+    is_active: Optional[bool] = None
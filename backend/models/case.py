@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 from datetime import datetime, timezone
 import uuid
 
@@ -11,6 +11,69 @@ class PartReplaced(BaseModel):
     qty: int = 1
 
 
+class AIPartReplaced(BaseModel):
+    """AI çıktısındaki değiştirilen parça"""
+    partName: str
+    description: str = ""
+    qty: int = 1
+
+
+class AIAnalysisOutput(BaseModel):
+    """LLM'den beklenen yapılandırılmış analiz çıktısı (JSON şeması bu modelden üretilir)"""
+    model_config = ConfigDict(extra="ignore")
+
+    ize_no: str
+    company: str
+    plate: str
+    vin: str
+    warranty_start_date: Optional[str] = Field(description="YYYY-MM-DD veya null")
+    repair_date: Optional[str] = Field(description="YYYY-MM-DD veya null")
+    vehicle_age_months: int
+    repair_km: int
+    request_type: str = Field(description="WARRANTY SUPPORT veya BREAKDOWN ASSISTANCE")
+    is_within_2_year_warranty: bool
+    warranty_decision: Literal["COVERED", "OUT_OF_COVERAGE", "ADDITIONAL_INFO_REQUIRED"]
+    decision_rationale: List[str]
+    has_active_contract: bool
+    contract_package_name: Optional[str]
+    contract_decision: Literal["CONTRACT_COVERED", "NO_CONTRACT_COVERAGE"]
+    contract_covered_parts: List[str]
+    failure_complaint: str
+    failure_cause: str
+    operations_performed: List[str]
+    parts_replaced: List[AIPartReplaced]
+    repair_process_summary: str
+    confidence: float = Field(description="Analiz güven skoru (0-1)")
+
+
+class AIPageGroupNotes(BaseModel):
+    """Uzun belgelerde bir sayfa grubundan çıkarılan ara bulgular (map adımı)"""
+    model_config = ConfigDict(extra="ignore")
+
+    ize_no: Optional[str]
+    company: Optional[str]
+    plate: Optional[str]
+    vin: Optional[str]
+    warranty_start_date: Optional[str] = Field(description="YYYY-MM-DD veya null")
+    repair_date: Optional[str] = Field(description="YYYY-MM-DD veya null")
+    repair_km: Optional[int]
+    request_type: Optional[str]
+    failure_complaint: Optional[str]
+    failure_cause: Optional[str]
+    operations_performed: List[str]
+    parts_replaced: List[AIPartReplaced]
+    contract_mentions: List[str] = Field(description="Kontrat / garanti uzatma paketi ifadeleri")
+    damage_evidence: List[str] = Field(description="Hasar, kaza, kullanıcı hatası belirtileri")
+    other_facts: List[str] = Field(description="Karar için önemli diğer kısa bulgular")
+
+
+class AITranslationBatch(BaseModel):
+    """Çeviri belleğinde bulunmayan ifadelerin toplu çevirisi"""
+    model_config = ConfigDict(extra="ignore")
+
+    translations: List[str] = Field(description="İfadelerin aynı sıradaki Türkçe çevirileri")
+
+
 class IZECase(BaseModel):
     """IZE Case analiz sonuç modeli"""
     model_config = ConfigDict(extra="ignore")
@@ -51,6 +114,7 @@ class IZECase(BaseModel):
     
     pdf_file_name: str
     pdf_storage_name: Optional[str] = None
+    pdf_sha256: Optional[str] = None
     extracted_text: str
 
     ai_provider: Optional[str] = None
@@ -58,7 +122,13 @@ class IZECase(BaseModel):
     ai_prompt_tokens: int = 0
     ai_completion_tokens: int = 0
     ai_total_tokens: int = 0
+    ai_cached_prompt_tokens: int = 0  # Sağlayıcı prompt önbelleğinden okunan giriş tokenları
     ai_estimated_cost_usd: Optional[float] = None
+    ai_repaired_fields: List[str] = []  # Yarım kalan yanıtta yeniden istenen alanlar
+    # Model yönlendirme kararı: zorluk puanı, denemeler, gecikme ve maliyetler
+    ai_route: Optional[Dict[str, Any]] = None
+    # Aynı talebin daha önce gönderilmiş olabileceği case'ler (claim_fingerprints)
+    duplicate_candidates: List[Dict[str, Any]] = []
     
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     binder_version_used: str = "default"
@@ -79,3 +149,27 @@ class IZECaseResponse(BaseModel):
     branch: str = ""
     is_archived: bool = False
     created_at: datetime
+
+
+class CaseSearchResult(IZECaseResponse):
+    """Arama sonucu; score yalnızca metin ve bulanık aramada dolar"""
+    plate: str = ""
+    vin: str = ""
+    score: Optional[float] = None
+
+
+class CaseSearchResponse(BaseModel):
+    items: List[CaseSearchResult]
+    next_cursor: Optional[str] = None
+    mode: str
+
+
+class CaseBulkRequest(BaseModel):
+    """Filtreye uyan case'lere toplu işlem; en az bir filtre verilmelidir"""
+    action: Literal["archive", "unarchive", "delete"]
+    ids: Optional[List[str]] = Field(default=None, max_length=5000)
+    branch: Optional[str] = None
+    year: Optional[int] = None
+    month: Optional[int] = Field(default=None, ge=1, le=12)
+    warranty_decision: Optional[str] = None
+    dry_run: bool = False  # Yalnızca eşleşen case sayısını döndürür
@@ -0,0 +1,74 @@
+from pydantic import BaseModel, Field, ConfigDict
+from typing import List, Optional
+from datetime import datetime, timezone
+import uuid
+
+
+# Job durumları
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_FAILED = "failed"
+
+
+class AnalysisJob(BaseModel):
+    """Arka planda çalışan IZE analiz işi modeli"""
+    model_config = ConfigDict(extra="ignore")
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    branch: str = ""
+    status: str = JOB_STATUS_QUEUED  # queued / running / completed / failed
+
+    pdf_file_name: str
+    pdf_storage_name: str
+    batch_id: Optional[str] = None
+
+    # Sonuç case'inin id'si önceden belirlenir; worker yeniden denese de tek case oluşur
+    case_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    error: Optional[str] = None
+    error_status_code: Optional[int] = None
+    # Aşama olayları (SSE ile izlenir); LLM token parçaları kaydedilmez
+    progress_events: List[dict] = []
+    # LLM bütçesi dolan job bu zamana kadar kiralanmaz
+    not_before: Optional[datetime] = None
+    # Kredi kuyruğa alınırken ayrıldı; job kalıcı olarak başarısız olursa iade edilir
+    credit_reserved: bool = False
+
+    attempts: int = 0
+    max_attempts: int = 3
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+class AnalysisJobResponse(BaseModel):
+    """Job durum sorgusu response modeli"""
+    id: str
+    status: str
+    pdf_file_name: str
+    branch: str = ""
+    case_id: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    not_before: Optional[datetime] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+class AnalysisBatch(BaseModel):
+    """Toplu (ZIP / çoklu dosya) analiz yüklemesi modeli"""
+    model_config = ConfigDict(extra="ignore")
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    branch: str = ""
+    job_ids: List[str] = []
+    skipped_files: List[str] = []
+    total_files: int = 0
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
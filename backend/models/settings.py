@@ -34,6 +34,7 @@ class EmailSettings(BaseModel):
     smtp_port: int = 587
     smtp_user: str = "info@visupanel.com"
     smtp_password: str = ""
+    smtp_starttls: bool = True
     sender_name: str = "IZE Case Resolver"
     sender_email: str = "info@visupanel.com"
     email_enabled: bool = True
@@ -46,6 +47,7 @@ class EmailSettingsUpdate(BaseModel):
     smtp_port: Optional[int] = None
     smtp_user: Optional[str] = None
     smtp_password: Optional[str] = None
+    smtp_starttls: Optional[bool] = None
     sender_name: Optional[str] = None
     sender_email: Optional[str] = None
     email_enabled: Optional[bool] = None
@@ -0,0 +1,46 @@
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+from datetime import datetime
+
+
+class VehicleTimelineEntry(BaseModel):
+    """Araç geçmişindeki tek bir IZE case'i"""
+    model_config = ConfigDict(extra="ignore")
+
+    case_id: str
+    ize_no: str = ""
+    created_at: datetime
+    repair_date: Optional[str] = None
+    repair_km: int = 0
+    km_since_previous: Optional[int] = None  # Bir önceki onarımdan bu yana yapılan km
+    warranty_decision: str = ""
+    branch: str = ""
+    failure_complaint: str = ""
+    parts: List[str] = []
+
+
+class RepeatedPart(BaseModel):
+    part_name: str
+    count: int
+    case_ids: List[str]
+
+
+class VehicleSummary(BaseModel):
+    """Araç listesi satırı (timeline olmadan)"""
+    model_config = ConfigDict(extra="ignore")
+
+    key: str  # VIN:<normalize VIN> veya PLATE:<normalize plaka>
+    vin: str = ""
+    plates: List[str] = []
+    companies: List[str] = []
+    case_count: int = 0
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
+    latest_km: int = 0
+    km_covered: int = 0  # İlk ve son onarım arasındaki km farkı
+    repeated_parts: List[RepeatedPart] = []
+    has_repeat_failure: bool = False
+
+
+class Vehicle(VehicleSummary):
+    timeline: List[VehicleTimelineEntry] = []
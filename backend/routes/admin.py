@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timezone
 import os
@@ -12,6 +13,14 @@ from models.user import (
 from models.settings import APISettings, APISettingsUpdate, EmailSettings, EmailSettingsUpdate
 from services.auth import get_password_hash
 from services.email import test_smtp_connection
+from services.llm_providers import configured_keys, provider_for_key_name, provider_health_snapshot
+from services.loop_monitor import loop_monitor
+from services.db_indexes import ensure_indexes, index_report
+from services.timestamps import date_range, day_bucket
+from services.case_export import EXPORT_FORMATS, export_cases, parse_columns
+from services.claim_fingerprints import remove_fingerprints
+from services.pdf_storage import collect_unreferenced_pdfs, release_pdfs, storage_stats
+from services.vehicle_history import remove_cases as remove_vehicle_cases
 from routes.auth import get_admin_user
 from database import db
 from pymongo.errors import DuplicateKeyError
@@ -55,8 +64,8 @@ async def get_analytics(admin: dict = Depends(get_admin_user)):
     
     # Son 7 gündeki analizler
     from datetime import timedelta
-    week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-    recent_cases = await db.ize_cases.count_documents({"created_at": {"$gte": week_ago}})
+    week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+    recent_cases = await db.ize_cases.count_documents(date_range("created_at", gte=week_ago))
     
     # Toplam analiz sayısı (tüm kullanıcıların total_analyses toplamı)
     pipeline = [
@@ -108,8 +117,8 @@ async def get_ai_analytics(
         "other",
     ]
 
-    start_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    base_match = {"created_at": {"$gte": start_date}}
+    start_date = datetime.now(timezone.utc) - timedelta(days=days)
+    base_match = date_range("created_at", gte=start_date)
 
     if provider and provider != "all":
         base_match["ai_provider"] = provider
@@ -142,7 +151,7 @@ async def get_ai_analytics(
         {"$match": base_match},
         {
             "$group": {
-                "_id": {"$substr": ["$created_at", 0, 10]},
+                "_id": day_bucket("created_at"),
                 "queries": {"$sum": 1},
                 "tokens": {"$sum": {"$ifNull": ["$ai_total_tokens", 0]}},
                 "cost_usd": {"$sum": {"$ifNull": ["$ai_estimated_cost_usd", 0]}},
@@ -153,13 +162,15 @@ async def get_ai_analytics(
     trend_raw = await db.ize_cases.aggregate(trend_pipeline).to_list(400)
 
     api_settings = await db.api_settings.find_one({"id": "api_settings"}, {"_id": 0}) or {}
+    configured_labels = [label for _, label, _ in configured_keys(api_settings)]
     configured = {
-        "openai": bool(api_settings.get("openai_key")),
-        "google_gemini": bool(api_settings.get("google_key")),
-        "emergent": bool(api_settings.get("emergent_key")),
-        "anthropic_claude": bool(api_settings.get("anthropic_key")),
-        "other": bool(api_settings.get("other_keys")),
+        item: any(label == item or label.startswith(f"{item}:") for label in configured_labels)
+        for item in providers
     }
+    # Hiçbir sağlayıcıyla eşleşmeyen other_keys girdileri
+    configured["other"] = any(
+        provider_for_key_name(name)[0] is None for name in (api_settings.get("other_keys") or {})
+    )
 
     totals = {
         "queries": sum(item["total_queries"] for item in provider_cards.values()),
@@ -173,9 +184,11 @@ async def get_ai_analytics(
         "totals": totals,
         "providers": provider_cards,
         "configured": configured,
+        # Bu süreçteki uç nokta gecikme/rate limit durumu
+        "provider_health": provider_health_snapshot(),
         "trend": [
             {
-                "date": item["_id"],
+                "date": item["_id"].strftime("%Y-%m-%d"),
                 "queries": item.get("queries", 0),
                 "tokens": item.get("tokens", 0),
                 "cost_usd": round(item.get("cost_usd", 0), 6),
@@ -185,6 +198,44 @@ async def get_ai_analytics(
     }
 
 
+@router.get("/runtime-metrics")
+async def get_runtime_metrics(reset: bool = False, admin: dict = Depends(get_admin_user)):
+    """Bu API sürecinin event loop gecikmesi ve sağlayıcı sağlığı (reset=true sayaçları sıfırlar)"""
+    snapshot = {
+        "pid": os.getpid(),
+        "event_loop_lag_ms": loop_monitor.snapshot(),
+        "provider_health": provider_health_snapshot(),
+    }
+    if reset:
+        loop_monitor.reset()
+    return snapshot
+
+
+@router.get("/db-indexes")
+async def get_db_indexes(admin: dict = Depends(get_admin_user)):
+    """Index durumu (eksik/farklı/kayıt dışı) ve $indexStats kullanım sayıları"""
+    return await index_report()
+
+
+@router.post("/db-indexes/sync")
+async def sync_db_indexes(fix_drift: bool = False, admin: dict = Depends(get_admin_user)):
+    """Eksik index'leri oluşturur; fix_drift=true ise tanımdan farklı olanları yeniden kurar"""
+    return await ensure_indexes(fix_drift=fix_drift)
+
+
+@router.get("/pdf-storage")
+async def get_pdf_storage_stats(admin: dict = Depends(get_admin_user)):
+    """PDF deposu: tekil dosya, case referansı ve tekilleştirmeyle kazanılan alan"""
+    return await storage_stats()
+
+
+@router.post("/pdf-storage/gc")
+async def collect_pdf_storage(admin: dict = Depends(get_admin_user)):
+    """Hiçbir case'in kullanmadığı, bekleme süresi dolmuş PDF'leri siler"""
+    removed = await collect_unreferenced_pdfs()
+    return {"message": "Referanssız PDF'ler temizlendi", "removed": removed}
+
+
 def build_system_log_query(level: Optional[str], event_type: Optional[str], search: Optional[str]):
     query = {}
     if level:
@@ -267,8 +318,8 @@ async def get_system_logs_summary(admin: dict = Depends(get_admin_user)):
     security_count = await db.system_logs.count_documents({"event_type": "security_alert"})
 
     from datetime import timedelta
-    day_ago = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-    recent_24h = await db.system_logs.count_documents({"created_at": {"$gte": day_ago}})
+    day_ago = datetime.now(timezone.utc) - timedelta(hours=24)
+    recent_24h = await db.system_logs.count_documents(date_range("created_at", gte=day_ago))
 
     top_paths = await db.system_logs.aggregate([
         {"$group": {"_id": "$path", "count": {"$sum": 1}}},
@@ -347,8 +398,6 @@ async def create_user(user_data: UserCreate, admin: dict = Depends(get_admin_use
     )
     
     user_dict = user.model_dump()
-    user_dict['created_at'] = user_dict['created_at'].isoformat()
-    
     try:
         await db.users.insert_one(user_dict)
     except DuplicateKeyError as exc:
@@ -516,15 +565,7 @@ async def update_api_settings(settings_update: APISettingsUpdate, admin: dict =
 
 # ==================== CASE MANAGEMENT ====================
 
-@router.get("/cases")
-async def get_all_cases_admin(
-    branch: Optional[str] = None,
-    archived: Optional[bool] = None,
-    year: Optional[int] = None,
-    month: Optional[int] = None,
-    admin: dict = Depends(get_admin_user)
-):
-    """Tüm case'leri listele (Sadece admin)"""
+def _admin_case_query(branch: Optional[str], archived: Optional[bool], year: Optional[int], month: Optional[int]) -> dict:
     query = {}
     
     if branch:
@@ -535,22 +576,83 @@ async def get_all_cases_admin(
         query["year"] = year
     if month:
         query["month"] = month
+    return query
+
+
+@router.get("/cases")
+async def get_all_cases_admin(
+    branch: Optional[str] = None,
+    archived: Optional[bool] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Tüm case'leri listele (Sadece admin)"""
+    query = _admin_case_query(branch, archived, year, month)
     
-    cases = await db.ize_cases.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    
-    for case in cases:
-        if isinstance(case.get('created_at'), str):
-            case['created_at'] = datetime.fromisoformat(case['created_at'])
-    
+    cases = await db.ize_cases.find(
+        query, {"_id": 0, "search_keys": 0, "search_trigrams": 0}
+    ).sort("created_at", -1).to_list(1000)
     return cases
 
 
+@router.get("/cases/export")
+async def export_cases_admin(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson|xlsx)$"),
+    columns: Optional[str] = Query(None, description="Virgülle ayrılmış kolonlar; boşsa varsayılan kolonlar"),
+    branch: Optional[str] = None,
+    archived: Optional[bool] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Case'leri CSV / NDJSON / XLSX olarak akış halinde dışa aktarır (Sadece admin)"""
+    selected = parse_columns(columns)
+    query = _admin_case_query(branch, archived, year, month)
+    file_name = f"ize_cases_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M')}.{export_format}"
+    return StreamingResponse(
+        export_cases(query, selected, export_format),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
+@router.get("/cases/duplicates")
+async def get_duplicate_cases(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=250),
+    admin: dict = Depends(get_admin_user)
+):
+    """Kayıt anında olası mükerrer talep olarak işaretlenen case'ler"""
+    query = {"duplicate_candidates.0": {"$exists": True}}
+    projection = {
+        "_id": 0, "id": 1, "ize_no": 1, "case_title": 1, "company": 1, "plate": 1, "vin": 1,
+        "branch": 1, "repair_date": 1, "repair_km": 1, "created_at": 1, "duplicate_candidates": 1,
+    }
+    skip = (page - 1) * page_size
+    total = await db.ize_cases.count_documents(query)
+    cases = await db.ize_cases.find(query, projection).sort("created_at", -1).skip(skip).limit(page_size).to_list(page_size)
+    return {
+        "items": cases,
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "total_pages": max((total + page_size - 1) // page_size, 1),
+        }
+    }
+
+
 @router.delete("/cases/{case_id}")
 async def admin_delete_case(case_id: str, admin: dict = Depends(get_admin_user)):
     """Case'i sil (Sadece admin)"""
-    result = await db.ize_cases.delete_one({"id": case_id})
-    if result.deleted_count == 0:
+    case = await db.ize_cases.find_one_and_delete({"id": case_id}, {"_id": 0, "pdf_storage_name": 1})
+    if case is None:
         raise HTTPException(status_code=404, detail="Case bulunamadı")
+    await remove_vehicle_cases([case_id])
+    await remove_fingerprints([case_id])
+    if case.get("pdf_storage_name"):
+        await release_pdfs([case["pdf_storage_name"]])
     return {"message": "Case silindi", "id": case_id}
 
 
@@ -563,7 +665,7 @@ async def admin_archive_case(case_id: str, admin: dict = Depends(get_admin_user)
         raise HTTPException(status_code=404, detail="Case bulunamadı")
     
     new_status = not case.get('is_archived', False)
-    archived_at = datetime.now(timezone.utc).isoformat() if new_status else None
+    archived_at = datetime.now(timezone.utc) if new_status else None
     
     await db.ize_cases.update_one(
         {"id": case_id},
@@ -596,6 +698,7 @@ async def get_email_settings(admin: dict = Depends(get_admin_user)):
             "smtp_user": "info@visupanel.com",
             "smtp_password": None,
             "smtp_password_masked": None,
+            "smtp_starttls": True,
             "sender_name": "IZE Case Resolver",
             "sender_email": "info@visupanel.com",
             "email_enabled": True
@@ -609,6 +712,7 @@ async def get_email_settings(admin: dict = Depends(get_admin_user)):
         "smtp_user": settings.get("smtp_user", "info@visupanel.com"),
         "smtp_password": settings.get("smtp_password"),
         "smtp_password_masked": mask_password(settings.get("smtp_password") or ""),
+        "smtp_starttls": settings.get("smtp_starttls", True),
         "sender_name": settings.get("sender_name", "IZE Case Resolver"),
         "sender_email": settings.get("sender_email", "info@visupanel.com"),
         "email_enabled": settings.get("email_enabled", True),
@@ -630,6 +734,7 @@ async def update_email_settings(settings_update: EmailSettingsUpdate, admin: dic
             "smtp_port": 587,
             "smtp_user": "info@visupanel.com",
             "smtp_password": None,
+            "smtp_starttls": True,
             "sender_name": "IZE Case Resolver",
             "sender_email": "info@visupanel.com",
             "email_enabled": True
@@ -85,7 +85,6 @@ async def register(user_data: UserCreate):
     )
     
     user_dict = user.model_dump()
-    user_dict['created_at'] = user_dict['created_at'].isoformat()
     user_dict['verification_token'] = verification_token
     user_dict['verification_expires'] = verification_expires
     
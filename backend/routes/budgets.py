@@ -0,0 +1,69 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from database import db
+from models.budget import LLMBudgetLimit, LLMBudgetLimitCreate, LLMBudgetLimitUpdate
+from routes.auth import get_admin_user
+from services.budget_governor import get_budget_status, invalidate_limits_cache
+
+router = APIRouter(prefix="/admin/llm-budgets", tags=["LLM Budgets"])
+
+
+@router.post("", response_model=LLMBudgetLimit)
+async def create_budget_limit(limit: LLMBudgetLimitCreate, admin: dict = Depends(get_admin_user)):
+    """Kullanıcı/şube/sağlayıcı için günlük veya aylık LLM bütçe limiti ekler"""
+    if limit.max_tokens is None and limit.max_cost_usd is None:
+        raise HTTPException(status_code=400, detail="Token veya maliyet limitinden en az biri girilmelidir")
+
+    limit_obj = LLMBudgetLimit(**limit.model_dump())
+    doc = limit_obj.model_dump()
+    doc["created_at"] = doc["created_at"].isoformat()
+    await db.llm_budget_limits.insert_one(doc)
+    invalidate_limits_cache()
+    return limit_obj
+
+
+@router.get("", response_model=List[LLMBudgetLimit])
+async def get_budget_limits(admin: dict = Depends(get_admin_user)):
+    limits = await db.llm_budget_limits.find({}, {"_id": 0}).sort("created_at", 1).to_list(1000)
+
+    for limit in limits:
+        if isinstance(limit.get("created_at"), str):
+            limit["created_at"] = datetime.fromisoformat(limit["created_at"])
+
+    return limits
+
+
+@router.get("/usage")
+async def get_budget_usage(
+    period: Optional[str] = Query(None, pattern="^(daily|monthly)$"),
+    admin: dict = Depends(get_admin_user)
+):
+    """Güncel dönem harcama sayaçlarını ve limit durumlarını döndürür"""
+    return {"counters": await get_budget_status(period)}
+
+
+@router.put("/{limit_id}")
+async def update_budget_limit(limit_id: str, limit_update: LLMBudgetLimitUpdate, admin: dict = Depends(get_admin_user)):
+    limit = await db.llm_budget_limits.find_one({"id": limit_id})
+    if not limit:
+        raise HTTPException(status_code=404, detail="Bütçe limiti bulunamadı")
+
+    update_data = limit_update.model_dump(exclude_unset=True)
+    if update_data:
+        await db.llm_budget_limits.update_one({"id": limit_id}, {"$set": update_data})
+        invalidate_limits_cache()
+
+    updated_limit = await db.llm_budget_limits.find_one({"id": limit_id}, {"_id": 0})
+    return {"message": "Bütçe limiti güncellendi", "limit": updated_limit}
+
+
+@router.delete("/{limit_id}")
+async def delete_budget_limit(limit_id: str, admin: dict = Depends(get_admin_user)):
+    result = await db.llm_budget_limits.delete_one({"id": limit_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Bütçe limiti bulunamadı")
+    invalidate_limits_cache()
+    return {"message": "Bütçe limiti silindi"}
@@ -1,229 +1,323 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Header, Query, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timezone
-from pathlib import Path
+import asyncio
 import logging
-import uuid
-from models.case import IZECase, IZECaseResponse
-from models.user import BRANCHES
-from services.pdf_processor import extract_text_from_pdf
-from services.ai_analyzer import analyze_ize_with_ai
-from services.email import send_analysis_email, generate_email_subject, generate_email_body
+from models.case import IZECase, IZECaseResponse, CaseBulkRequest, CaseSearchResponse
+from models.job import AnalysisJobResponse, JOB_STATUS_COMPLETED
+from services.case_analysis import (
+    ensure_analysis_credits, refund_analysis_credits, reserve_analysis_credits, run_case_analysis
+)
+from services.analysis_jobs import enqueue_analysis_job, get_analysis_job
+from services.budget_governor import BudgetExhausted
+from services.pagination import KEYSET_SORT, keyset_query, split_page
+from services.case_bulk import run_bulk_operation
+from services.case_search import SEARCH_MODES, search_cases
+from services.timestamps import date_range, to_datetime
+from services.claim_fingerprints import remove_fingerprints
+from services.pdf_storage import register_upload, release_pdfs, resolve_pdf_path, store_uploaded_pdf
+from services.vehicle_history import remove_cases as remove_vehicle_cases
+from services.analysis_batches import create_analysis_batch, get_batch_progress
+from services.analysis_progress import (
+    ProgressReporter, get_channel_owner, has_channel, stream_channel, stream_job_events
+)
 from routes.auth import get_current_active_user
 from database import db
 
 router = APIRouter(prefix="/cases", tags=["Cases"])
 logger = logging.getLogger(__name__)
 
-PDF_UPLOAD_DIR = Path(__file__).parent.parent / "uploads" / "ize_pdfs"
-PDF_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+CASES_PAGE_DEFAULT = 50
+CASES_PAGE_MAX = 500
+CASE_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "case_title": 1, "ize_no": 1, "company": 1,
+    "warranty_decision": 1, "branch": 1, "is_archived": 1, "created_at": 1,
+}
+
+
+def _case_filters(current_user: dict, branch: Optional[str], archived: Optional[bool]) -> dict:
+    # Admin tüm case'leri görebilir, user sadece kendisininkini
+    query = {} if current_user['role'] == 'admin' else {"user_id": current_user['id']}
+    if branch:
+        query["branch"] = branch
+    if archived is not None:
+        query["is_archived"] = archived
+    return query
+
+
+def _ensure_pdf_upload(file: UploadFile) -> None:
+    if not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Sadece PDF dosyası yükleyebilirsiniz")
+
+
+def _event_stream_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _resume_after(after: int, last_event_id: Optional[str]) -> int:
+    # Tarayıcı EventSource yeniden bağlanırken Last-Event-ID gönderir
+    if last_event_id and last_event_id.isdigit():
+        return max(after, int(last_event_id))
+    return after
+
 
 @router.post("/analyze", response_model=IZECase)
 async def analyze_ize_pdf(
     file: UploadFile = File(...), 
     branch: Optional[str] = None,
+    progress_id: Optional[str] = None,
     current_user: dict = Depends(get_current_active_user)
 ):
-    """IZE PDF dosyasını analiz eder (Authentication gerekli)"""
+    """IZE PDF dosyasını analiz eder (Authentication gerekli)
+
+    progress_id verilirse ilerleme /cases/progress/{progress_id} üzerinden izlenebilir.
+    LLM bütçesi dolmuşsa analiz kuyruğa ertelenir ve 202 ile job bilgisi döner.
+    """
     
     # Kredi kontrolü (Admin ve sınırsız kredi olanlar muaf)
-    has_unlimited = current_user.get('has_unlimited_credits', False)
-    is_admin = current_user['role'] == 'admin'
-    
-    if not is_admin and not has_unlimited:
-        if current_user.get('free_analyses_remaining', 0) <= 0:
-            raise HTTPException(
-                status_code=403, 
-                detail="Analiz krediniz bitti. Lütfen kredi satın alın veya yönetici ile iletişime geçin."
-            )
-    
-    if not file.filename.endswith('.pdf'):
-        raise HTTPException(status_code=400, detail="Sadece PDF dosyası yükleyebilirsiniz")
-    
-    # Şube kontrolü - veritabanından şubeleri al
-    user_branch = branch or current_user.get('branch', '')
-    # Şube validasyonunu kaldırdık - dinamik şubeler kullanılıyor
-    
+    ensure_analysis_credits(current_user)
+    _ensure_pdf_upload(file)
+
+    progress = None
+    if progress_id:
+        if has_channel(progress_id):
+            raise HTTPException(status_code=409, detail="Bu ilerleme kimliği zaten kullanılıyor")
+        progress = ProgressReporter(progress_id, current_user['id'])
+
+    try:
+        return await _analyze_upload(file, branch, current_user, progress)
+    except HTTPException as exc:
+        if progress:
+            progress.fail_if_open(str(exc.detail), exc.status_code)
+        raise
+    except BaseException as exc:
+        # İstek iptali (istemci bağlantısı koptu, kapanış) CancelledError'dır; kanal açık kalmasın
+        if progress:
+            progress.fail_if_open(str(exc) or "Analiz iptal edildi")
+        raise
+
+
+async def _analyze_upload(
+    file: UploadFile,
+    branch: Optional[str],
+    current_user: dict,
+    progress: Optional[ProgressReporter],
+):
     # PDF'i oku
     pdf_content = await file.read()
+    pdf_storage_name = await asyncio.to_thread(store_uploaded_pdf, pdf_content)
+    await register_upload(pdf_storage_name)
+    if progress:
+        progress.emit("upload_stored", file_name=file.filename, size_bytes=len(pdf_content))
 
-    pdf_storage_name = f"{uuid.uuid4().hex}.pdf"
-    pdf_storage_path = PDF_UPLOAD_DIR / pdf_storage_name
-    with open(pdf_storage_path, "wb") as pdf_handle:
-        pdf_handle.write(pdf_content)
-    
-    # Metni çıkar
-    logger.info(f"PDF okunuyor: {file.filename} (User: {current_user['email']})")
-    extracted_text = extract_text_from_pdf(pdf_content)
-    
-    if not extracted_text or len(extracted_text) < 50:
-        raise HTTPException(status_code=400, detail="PDF'den yeterli metin çıkarılamadı")
-    
-    # Garanti kurallarını al
-    warranty_rules = await db.warranty_rules.find(
-        {"is_active": True},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(1000)
-    
-    if not warranty_rules:
-        logger.warning("Garanti kuralı bulunamadı, varsayılan kurallar kullanılıyor")
-        warranty_rules = [{
-            'rule_version': "1.0",
-            'rule_text': "2 yıl içindeki araçlar garanti kapsamındadır. Üretim hatalarından kaynaklanan arızalar garanti kapsamındadır.",
-            'keywords': ["garanti", "warranty", "2 yıl", "üretim hatası"]
-        }]
-
-    contract_rules = await db.contract_rules.find(
-        {"is_active": True},
-        {"_id": 0}
-    ).sort("created_at", 1).to_list(1000)  
-    
-    # AI ile analiz et
-    logger.info("AI analizi başlatılıyor...")
-    
-    # Panel'deki API ayarlarını al
-    api_settings = await db.api_settings.find_one({"id": "api_settings"}, {"_id": 0})
-    
-    analysis_result = await analyze_ize_with_ai(extracted_text, warranty_rules, contract_rules, api_settings)
-    ai_meta = analysis_result.pop("_ai_meta", {})
-    analysis_result["email_subject"] = generate_email_subject(analysis_result, "tr")
-    analysis_result["email_body"] = generate_email_body(analysis_result, "tr")
-    
-    # IZE Case oluştur
-    case_title = f"{analysis_result.get('ize_no', 'N/A')} - {analysis_result.get('company', 'N/A')} - {analysis_result.get('plate', 'N/A')}"
-    
-    # Tarihten ay ve yıl çıkar
-    created_at = datetime.now(timezone.utc)
-    
-    ize_case = IZECase(
-        user_id=current_user['id'],
-        branch=user_branch,
-        case_title=case_title,
-        ize_no=analysis_result.get('ize_no', 'N/A'),
-        company=analysis_result.get('company', 'N/A'),
-        plate=analysis_result.get('plate', 'N/A'),
-        vin=analysis_result.get('vin', 'N/A'),
-        warranty_start_date=analysis_result.get('warranty_start_date'),
-        repair_date=analysis_result.get('repair_date'),
-        vehicle_age_months=analysis_result.get('vehicle_age_months', 0),
-        repair_km=analysis_result.get('repair_km', 0),
-        request_type=analysis_result.get('request_type', 'WARRANTY SUPPORT'),
-        is_within_2_year_warranty=analysis_result.get('is_within_2_year_warranty', False),
-        warranty_decision=analysis_result.get('warranty_decision', 'ADDITIONAL_INFO_REQUIRED'),
-        decision_rationale=analysis_result.get('decision_rationale', []),
-        has_active_contract=analysis_result.get('has_active_contract', False),
-        contract_package_name=analysis_result.get('contract_package_name'),
-        contract_decision=analysis_result.get('contract_decision', 'NO_CONTRACT_COVERAGE'),
-        contract_covered_parts=analysis_result.get('contract_covered_parts', []),
-        failure_complaint=analysis_result.get('failure_complaint', ''),
-        failure_cause=analysis_result.get('failure_cause', ''),
-        operations_performed=analysis_result.get('operations_performed', []),
-        parts_replaced=analysis_result.get('parts_replaced', []),
-        repair_process_summary=analysis_result.get('repair_process_summary', ''),
-        email_subject=analysis_result.get('email_subject', ''),
-        email_body=analysis_result.get('email_body', ''),
-        pdf_file_name=file.filename,
-        pdf_storage_name=pdf_storage_name,
-        extracted_text=extracted_text[:2000],
-        ai_provider=ai_meta.get('provider'),
-        ai_model=ai_meta.get('model'),
-        ai_prompt_tokens=ai_meta.get('prompt_tokens', 0),
-        ai_completion_tokens=ai_meta.get('completion_tokens', 0),
-        ai_total_tokens=ai_meta.get('total_tokens', 0),
-        ai_estimated_cost_usd=ai_meta.get('estimated_cost_usd'),
-        binder_version_used=warranty_rules[0].get('rule_version', 'default') if warranty_rules else "default",
-        month=created_at.month,
-        year=created_at.year
-    )
-    
-    # Veritabanına kaydet
-    doc = ize_case.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    
-    await db.ize_cases.insert_one(doc)
-    logger.info(f"IZE Case kaydedildi: {ize_case.id}")
-    
-    # Krediyi azalt (Admin hariç)
-    if current_user['role'] != 'admin':
-        await db.users.update_one(
-            {"id": current_user['id']},
-            {
-                "$inc": {
-                    "free_analyses_remaining": -1,
-                    "total_analyses": 1
-                }
-            }
-        )
-        logger.info(f"Kullanıcı kredisi güncellendi: {current_user['email']}")
-    
-    # E-posta gönder (arka planda)
+    # Kredi analizden önce atomik olarak ayrılır; eşzamanlı istekler bakiyeyi aşamaz
+    reserved = await reserve_analysis_credits(current_user)
     try:
-        email_result = await send_analysis_email(
-            to_email=current_user['email'],
-            case_data=analysis_result,
-            attachment_bytes=pdf_content,
-            attachment_filename=file.filename,
-            language="tr"
+        ize_case = await run_case_analysis(
+            current_user=current_user,
+            pdf_content=pdf_content,
+            pdf_file_name=file.filename,
+            pdf_storage_name=pdf_storage_name,
+            branch=branch,
+            progress=progress,
+            credit_reserved=reserved > 0,
         )
-        if email_result.get("success"):
-            # E-posta sayacını artır
-            await db.users.update_one(
-                {"id": current_user['id']},
-                {"$inc": {"emails_sent": 1}}
-            )
-            logger.info(f"E-posta gönderildi: {current_user['email']}")
-        else:
-            logger.warning(f"E-posta gönderilemedi: {email_result.get('message')}")
-    except Exception as e:
-        logger.warning(f"E-posta gönderim hatası: {str(e)}")
-    
+        reserved = 0
+    except BudgetExhausted as exc:
+        job = await enqueue_analysis_job(
+            current_user, file.filename, pdf_storage_name, branch,
+            not_before=exc.retry_at, credit_reserved=reserved > 0,
+        )
+        # Ayrılan kredi ertelenen job'a devredildi
+        reserved = 0
+        if progress:
+            progress.emit("budget_deferred", job_id=job.id, retry_at=exc.retry_at.isoformat())
+        return JSONResponse(
+            status_code=202,
+            content={
+                "detail": exc.detail,
+                "retry_at": exc.retry_at.isoformat(),
+                "job": AnalysisJobResponse(**job.model_dump()).model_dump(mode="json"),
+            },
+        )
+    finally:
+        # Case oluşmadan biten analizin kredisi iade edilir
+        await refund_analysis_credits(current_user['id'], reserved)
+
+    if progress:
+        progress.emit("completed", case_id=ize_case.id, timings=progress.timings)
     return ize_case
 
 
+@router.get("/progress/{progress_id}")
+async def stream_analysis_progress(
+    progress_id: str,
+    after: int = 0,
+    last_event_id: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Senkron analizin ilerleme olaylarını Server-Sent Events olarak akıtır"""
+    owner_id = get_channel_owner(progress_id)
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="İlerleme kaydı bulunamadı")
+
+    if current_user['role'] != 'admin' and owner_id != current_user['id']:
+        raise HTTPException(status_code=403, detail="Bu analizi izleme yetkiniz yok")
+
+    return _event_stream_response(stream_channel(progress_id, _resume_after(after, last_event_id)))
+
+
+@router.post("/analyze/jobs", response_model=AnalysisJobResponse, status_code=202)
+async def enqueue_ize_analysis(
+    file: UploadFile = File(...),
+    branch: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """IZE PDF'ini arka plan analiz kuyruğuna ekler, job id ile hemen döner"""
+    ensure_analysis_credits(current_user)
+    _ensure_pdf_upload(file)
+
+    pdf_content = await file.read()
+    pdf_storage_name = await asyncio.to_thread(store_uploaded_pdf, pdf_content)
+    await register_upload(pdf_storage_name)
+
+    # Kredi kuyruğa alırken ayrılır; job kalıcı olarak başarısız olursa worker iade eder
+    reserved = await reserve_analysis_credits(current_user)
+    try:
+        job = await enqueue_analysis_job(
+            current_user, file.filename, pdf_storage_name, branch, credit_reserved=reserved > 0
+        )
+    except Exception:
+        await refund_analysis_credits(current_user['id'], reserved)
+        raise
+    return AnalysisJobResponse(**job.model_dump())
+
+
+@router.post("/analyze/bulk", status_code=202)
+async def enqueue_bulk_analysis(
+    files: List[UploadFile] = File(...),
+    branch: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """ZIP arşivi veya çoklu PDF yüklemesini toplu analiz kuyruğuna ekler"""
+    batch = await create_analysis_batch(current_user, files, branch)
+    return {
+        "batch_id": batch.id,
+        "total_files": batch.total_files,
+        "job_ids": batch.job_ids,
+        "skipped_files": batch.skipped_files,
+    }
+
+
+@router.get("/batches/{batch_id}")
+async def get_bulk_analysis_status(batch_id: str, current_user: dict = Depends(get_current_active_user)):
+    """Toplu analizin dosya bazında ilerlemesini ve özetini döndürür"""
+    batch = await db.analysis_batches.find_one({"id": batch_id}, {"_id": 0})
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Toplu analiz bulunamadı")
+
+    if current_user['role'] != 'admin' and batch.get('user_id') != current_user['id']:
+        raise HTTPException(status_code=403, detail="Bu toplu analizi görme yetkiniz yok")
+
+    return await get_batch_progress(batch)
+
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job_status(job_id: str, current_user: dict = Depends(get_current_active_user)):
+    """Analiz job'ının durumunu, tamamlandıysa case sonucunu döndürür"""
+    job = await get_analysis_job(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job bulunamadı")
+
+    if current_user['role'] != 'admin' and job.get('user_id') != current_user['id']:
+        raise HTTPException(status_code=403, detail="Bu job'ı görme yetkiniz yok")
+
+    response = AnalysisJobResponse(**job).model_dump()
+    response["case"] = None
+    if job.get("status") == JOB_STATUS_COMPLETED:
+        case = await db.ize_cases.find_one({"id": job["case_id"]}, {"_id": 0})
+        if case:
+            response["case"] = IZECase(**case).model_dump()
+    else:
+        response["case_id"] = None
+
+    return response
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_analysis_job_events(
+    job_id: str,
+    after: int = 0,
+    last_event_id: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Analiz job'ının ilerleme olaylarını Server-Sent Events olarak akıtır"""
+    job = await db.analysis_jobs.find_one({"id": job_id}, {"_id": 0, "user_id": 1})
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job bulunamadı")
+
+    if current_user['role'] != 'admin' and job.get('user_id') != current_user['id']:
+        raise HTTPException(status_code=403, detail="Bu job'ı görme yetkiniz yok")
+
+    return _event_stream_response(stream_job_events(job_id, _resume_after(after, last_event_id)))
+
+
 @router.get("", response_model=List[IZECaseResponse])
 async def get_cases(
+    response: Response,
     branch: Optional[str] = None,
     archived: Optional[bool] = None,
+    limit: int = Query(CASES_PAGE_DEFAULT, ge=1, le=CASES_PAGE_MAX),
+    cursor: Optional[str] = None,
     current_user: dict = Depends(get_current_active_user)
 ):
-    """IZE analiz sonuçlarını getirir (Kullanıcıya göre filtrelenir)"""
-    # Admin tüm case'leri görebilir, user sadece kendisininkini
-    if current_user['role'] == 'admin':
-        query = {}
-    else:
-        query = {"user_id": current_user['id']}
-    
-    # Şube filtresi
-    if branch:
-        query["branch"] = branch
-    
-    # Arşiv filtresi
-    if archived is not None:
-        query["is_archived"] = archived
-    
-    cases = await db.ize_cases.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    
-    for case in cases:
-        if isinstance(case.get('created_at'), str):
-            case['created_at'] = datetime.fromisoformat(case['created_at'])
-    
-    # Sadece özet bilgileri döndür
-    response = [
-        IZECaseResponse(
-            id=case['id'],
-            case_title=case['case_title'],
-            ize_no=case['ize_no'],
-            company=case['company'],
-            warranty_decision=case['warranty_decision'],
-            branch=case.get('branch', ''),
-            is_archived=case.get('is_archived', False),
-            created_at=case['created_at']
-        )
-        for case in cases
-    ]
-    
-    return response
+    """IZE analiz sonuçlarını sayfa sayfa getirir (Kullanıcıya göre filtrelenir)
+
+    Sonraki sayfanın imleci X-Next-Cursor başlığında döner; cursor parametresiyle istenir.
+    """
+    query = _case_filters(current_user, branch, archived)
+    
+    # Sadece özet alanları çekilir (extracted_text, email_body vb. taşınmaz)
+    docs = await db.ize_cases.find(
+        keyset_query(query, cursor), CASE_SUMMARY_PROJECTION
+    ).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    cases, next_cursor = split_page(docs, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return [IZECaseResponse(**case) for case in cases]
+
+
+@router.get("/search", response_model=CaseSearchResponse)
+async def search_cases_endpoint(
+    q: str = Query(..., min_length=2, max_length=200),
+    mode: str = Query("auto", pattern=f"^({'|'.join(SEARCH_MODES)})$"),
+    branch: Optional[str] = None,
+    archived: Optional[bool] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = Query(CASES_PAGE_DEFAULT, ge=1, le=CASES_PAGE_MAX),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """IZE no, VIN, plaka (tam/önek/bulanık) veya firma ve arıza metninde arama
+
+    mode=auto kimlik benzeri ifadelerde önek, diğerlerinde metin araması yapar.
+    """
+    query = _case_filters(current_user, branch, archived)
+    if date_from or date_to:
+        created = date_range("created_at", gte=to_datetime(date_from), lt=to_datetime(date_to))
+        query = {"$and": [query, created]} if query else created
+    projection = {**CASE_SUMMARY_PROJECTION, "plate": 1, "vin": 1}
+    return await search_cases(q, query, projection, mode=mode, limit=limit, cursor=cursor)
 
 
 @router.get("/{case_id}", response_model=IZECase)
@@ -238,9 +332,6 @@ async def get_case_by_id(case_id: str, current_user: dict = Depends(get_current_
     if current_user['role'] != 'admin' and case.get('user_id') != current_user['id']:
         raise HTTPException(status_code=403, detail="Bu case'i görme yetkiniz yok")
     
-    if isinstance(case.get('created_at'), str):
-        case['created_at'] = datetime.fromisoformat(case['created_at'])
-    
     return IZECase(**case)
 
 @router.get("/{case_id}/pdf")
@@ -258,8 +349,8 @@ async def get_case_pdf(case_id: str, current_user: dict = Depends(get_current_ac
     if not pdf_storage_name:
         raise HTTPException(status_code=404, detail="Bu case için PDF dosyası bulunamadı")
 
-    pdf_path = (PDF_UPLOAD_DIR / pdf_storage_name).resolve()
-    if not pdf_path.exists() or pdf_path.parent != PDF_UPLOAD_DIR.resolve():
+    pdf_path = resolve_pdf_path(pdf_storage_name)
+    if pdf_path is None or not pdf_path.exists():
         raise HTTPException(status_code=404, detail="PDF dosyası sistemde bulunamadı")
 
     return FileResponse(
@@ -271,6 +362,12 @@ async def get_case_pdf(case_id: str, current_user: dict = Depends(get_current_ac
 
 
 
+@router.post("/bulk")
+async def bulk_case_operation(request: CaseBulkRequest, current_user: dict = Depends(get_current_active_user)):
+    """Filtreye uyan case'leri toplu arşivler, arşivden çıkarır veya siler"""
+    return await run_bulk_operation(current_user, request)
+
+
 @router.delete("/{case_id}")
 async def delete_case(case_id: str, current_user: dict = Depends(get_current_active_user)):
     """IZE case'ini siler"""
@@ -286,6 +383,10 @@ async def delete_case(case_id: str, current_user: dict = Depends(get_current_act
     result = await db.ize_cases.delete_one({"id": case_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Case bulunamadı")
+    await remove_vehicle_cases([case_id])
+    await remove_fingerprints([case_id])
+    if case.get("pdf_storage_name"):
+        await release_pdfs([case["pdf_storage_name"]])
     return {"message": "Case silindi", "id": case_id}
 
 
@@ -302,7 +403,7 @@ async def archive_case(case_id: str, current_user: dict = Depends(get_current_ac
         raise HTTPException(status_code=403, detail="Bu case'i arşivleme yetkiniz yok")
     
     new_status = not case.get('is_archived', False)
-    archived_at = datetime.now(timezone.utc).isoformat() if new_status else None
+    archived_at = datetime.now(timezone.utc) if new_status else None
     
     await db.ize_cases.update_one(
         {"id": case_id},
@@ -1,4 +1,3 @@
-from datetime import datetime
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -23,7 +22,6 @@ async def create_contract_rule(rule: ContractRuleCreate, admin: dict = Depends(g
     )
 
     doc = rule_obj.model_dump()
-    doc["created_at"] = doc["created_at"].isoformat()
     await db.contract_rules.insert_one(doc)
     return rule_obj
 
@@ -33,10 +31,6 @@ async def get_contract_rules(active_only: bool = False):
     query = {"is_active": True} if active_only else {}
     rules = await db.contract_rules.find(query, {"_id": 0}).sort("created_at", 1).to_list(1000)
 
-    for rule in rules:
-        if isinstance(rule.get("created_at"), str):
-            rule["created_at"] = datetime.fromisoformat(rule["created_at"])
-
     return rules
 
 
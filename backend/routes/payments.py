@@ -283,8 +283,8 @@ async def create_stripe_checkout(
             "stripe_session_id": session.session_id,
             "credits_to_add": package.get("credits", package.get("credits_per_month", 0)),
             "metadata": metadata,
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
         }
         
         await db.payment_transactions.insert_one(transaction)
@@ -417,8 +417,8 @@ async def create_iyzico_checkout(
                 "iyzico_token": result.get("token"),
                 "checkout_form_content": result.get("checkoutFormContent")
             },
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
         }
         
         await db.payment_transactions.insert_one(transaction)
@@ -475,8 +475,8 @@ async def iyzico_callback(
                     "$set": {
                         "status": PaymentStatus.COMPLETED.value,
                         "iyzico_payment_id": result.get("paymentId"),
-                        "updated_at": datetime.now(timezone.utc).isoformat(),
-                        "completed_at": datetime.now(timezone.utc).isoformat()
+                        "updated_at": datetime.now(timezone.utc),
+                        "completed_at": datetime.now(timezone.utc)
                     }
                 }
             )
@@ -499,7 +499,7 @@ async def iyzico_callback(
                     "$set": {
                         "status": PaymentStatus.FAILED.value,
                         "error_message": result.get("errorMessage", "Ödeme başarısız"),
-                        "updated_at": datetime.now(timezone.utc).isoformat()
+                        "updated_at": datetime.now(timezone.utc)
                     }
                 }
             )
@@ -564,8 +564,8 @@ async def create_bank_transfer(
             "metadata": {
                 "bank_account_id": transfer_data.bank_account_id
             },
-            "created_at": datetime.now(timezone.utc).isoformat(),
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc),
+            "updated_at": datetime.now(timezone.utc)
         }
         
         await db.payment_transactions.insert_one(transaction)
@@ -628,8 +628,8 @@ async def get_payment_status(
                             {
                                 "$set": {
                                     "status": PaymentStatus.COMPLETED.value,
-                                    "updated_at": datetime.now(timezone.utc).isoformat(),
-                                    "completed_at": datetime.now(timezone.utc).isoformat()
+                                    "updated_at": datetime.now(timezone.utc),
+                                    "completed_at": datetime.now(timezone.utc)
                                 }
                             }
                         )
@@ -660,7 +660,7 @@ async def get_payment_status(
                             {
                                 "$set": {
                                     "status": PaymentStatus.CANCELLED.value,
-                                    "updated_at": datetime.now(timezone.utc).isoformat()
+                                    "updated_at": datetime.now(timezone.utc)
                                 }
                             }
                         )
@@ -743,8 +743,8 @@ async def approve_bank_transfer(
         {
             "$set": {
                 "status": PaymentStatus.COMPLETED.value,
-                "updated_at": datetime.now(timezone.utc).isoformat(),
-                "completed_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc),
+                "completed_at": datetime.now(timezone.utc)
             }
         }
     )
@@ -783,7 +783,7 @@ async def reject_bank_transfer(
             "$set": {
                 "status": PaymentStatus.FAILED.value,
                 "error_message": reason,
-                "updated_at": datetime.now(timezone.utc).isoformat()
+                "updated_at": datetime.now(timezone.utc)
             }
         }
     )
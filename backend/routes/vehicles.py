@@ -0,0 +1,89 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from database import db
+from models.vehicle import Vehicle, VehicleSummary
+from routes.auth import get_admin_user
+from services.case_search import normalize_key
+from services.vehicle_history import rebuild_vehicle_history, vehicle_key
+
+router = APIRouter(prefix="/vehicles", tags=["Vehicles"])
+
+SUMMARY_PROJECTION = {"_id": 0, "timeline": 0, "revision": 0}
+
+
+@router.get("")
+async def get_vehicles(
+    repeat_only: bool = False,
+    company: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=250),
+    admin: dict = Depends(get_admin_user)
+):
+    """Araçları son IZE tarihine göre listeler (repeat_only=true: tekrar eden parça arızası olanlar)"""
+    query = {}
+    if repeat_only:
+        query["has_repeat_failure"] = True
+    if company:
+        query["companies"] = company
+
+    skip = (page - 1) * page_size
+    total = await db.vehicles.count_documents(query)
+    vehicles = await db.vehicles.find(query, SUMMARY_PROJECTION).sort("last_seen_at", -1).skip(skip).limit(page_size).to_list(page_size)
+
+    return {
+        "items": [VehicleSummary(**vehicle) for vehicle in vehicles],
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "total_pages": max((total + page_size - 1) // page_size, 1),
+        }
+    }
+
+
+@router.get("/lookup", response_model=Vehicle)
+async def lookup_vehicle(
+    vin: Optional[str] = None,
+    plate: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """VIN veya plakaya göre araç geçmişi"""
+    key = vehicle_key({"vin": vin, "plate": plate})
+    if not key:
+        raise HTTPException(status_code=400, detail="VIN veya plaka girilmelidir")
+
+    vehicle = await db.vehicles.find_one({"key": key}, {"_id": 0})
+    # Plakası bilinen ama VIN ile kayıtlı araç
+    plate_key = normalize_key(plate)
+    if not vehicle and plate_key:
+        vehicle = await db.vehicles.find_one({"plates": plate_key}, {"_id": 0}, sort=[("last_seen_at", -1)])
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Araç bulunamadı")
+    return vehicle
+
+
+@router.get("/by-case/{case_id}", response_model=Vehicle)
+async def get_vehicle_by_case(case_id: str, admin: dict = Depends(get_admin_user)):
+    """Case'in ait olduğu aracın geçmişi"""
+    vehicle = await db.vehicles.find_one({"timeline.case_id": case_id}, {"_id": 0})
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Araç bulunamadı")
+    return vehicle
+
+
+@router.post("/rebuild")
+async def rebuild_vehicles(admin: dict = Depends(get_admin_user)):
+    """vehicles koleksiyonunu tüm case'lerden yeniden kurar"""
+    processed = await rebuild_vehicle_history()
+    return {"message": "Araç geçmişi yeniden kuruldu", "cases": processed}
+
+
+@router.get("/{key}", response_model=Vehicle)
+async def get_vehicle(key: str, admin: dict = Depends(get_admin_user)):
+    """Araç geçmişi: timeline, km ilerlemesi ve tekrar eden parçalar"""
+    vehicle = await db.vehicles.find_one({"key": key}, {"_id": 0})
+    if not vehicle:
+        raise HTTPException(status_code=404, detail="Araç bulunamadı")
+    return vehicle
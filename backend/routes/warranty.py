@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response
 from typing import List, Optional
-from datetime import datetime, timezone
 from models.warranty import (
     WarrantyRule,
     WarrantyRuleCreate,
@@ -51,7 +50,6 @@ async def create_warranty_rule(rule: WarrantyRuleCreate, admin: dict = Depends(g
     rule_obj = WarrantyRule(**rule_dict, source_type="manual")
     
     doc = rule_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     
     await db.warranty_rules.insert_one(doc)
     return rule_obj
@@ -74,8 +72,6 @@ async def upload_warranty_text(rule: WarrantyRuleTextCreate, admin: dict = Depen
     )
 
     doc = rule_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-
     await db.warranty_rules.insert_one(doc)
     return rule_obj
 
@@ -114,7 +110,6 @@ async def upload_warranty_pdf(
     )
     
     doc = rule_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     doc['pdf_binary'] = base64.b64encode(file_bytes).decode('utf-8')
 
     
@@ -134,8 +129,6 @@ async def get_warranty_rules(active_only: bool = False):
     rules = await db.warranty_rules.find(query, {"_id": 0, "pdf_binary": 0}).sort("created_at", -1).to_list(1000)
     
     for rule in rules:
-        if isinstance(rule.get('created_at'), str):
-            rule['created_at'] = datetime.fromisoformat(rule['created_at'])
         # Eski kayıtlar için varsayılan değerler
         if 'source_type' not in rule:
             rule['source_type'] = 'manual'
@@ -153,9 +146,6 @@ async def get_warranty_rule(rule_id: str):
     if not rule:
         raise HTTPException(status_code=404, detail="Kural bulunamadı")
     
-    if isinstance(rule.get('created_at'), str):
-        rule['created_at'] = datetime.fromisoformat(rule['created_at'])
-    
     # Eski kayıtlar için varsayılan değerler
     if 'source_type' not in rule:
         rule['source_type'] = 'manual'
@@ -57,8 +57,8 @@ async def stripe_webhook(request: Request):
                         {
                             "$set": {
                                 "status": PaymentStatus.COMPLETED.value,
-                                "updated_at": datetime.now(timezone.utc).isoformat(),
-                                "completed_at": datetime.now(timezone.utc).isoformat()
+                                "updated_at": datetime.now(timezone.utc),
+                                "completed_at": datetime.now(timezone.utc)
                             }
                         }
                     )
@@ -89,7 +89,7 @@ async def stripe_webhook(request: Request):
                     "$set": {
                         "status": PaymentStatus.CANCELLED.value,
                         "error_message": "Session expired",
-                        "updated_at": datetime.now(timezone.utc).isoformat()
+                        "updated_at": datetime.now(timezone.utc)
                     }
                 }
             )
@@ -131,8 +131,8 @@ async def iyzico_webhook(request: Request):
                         "$set": {
                             "status": PaymentStatus.COMPLETED.value,
                             "iyzico_payment_id": payment_id,
-                            "updated_at": datetime.now(timezone.utc).isoformat(),
-                            "completed_at": datetime.now(timezone.utc).isoformat()
+                            "updated_at": datetime.now(timezone.utc),
+                            "completed_at": datetime.now(timezone.utc)
                         }
                     }
                 )
@@ -161,7 +161,7 @@ async def iyzico_webhook(request: Request):
                     "$set": {
                         "status": PaymentStatus.FAILED.value,
                         "error_message": body.get("errorMessage", "Payment failed"),
-                        "updated_at": datetime.now(timezone.utc).isoformat()
+                        "updated_at": datetime.now(timezone.utc)
                     }
                 }
             )
@@ -7,7 +7,6 @@ import logging
 from pathlib import Path
 from datetime import datetime, timezone
 import time
-from services.auth import get_password_hash
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -22,6 +21,15 @@ logger = logging.getLogger(__name__)
 
 # Import database
 from database import client, db
+from services.analysis_jobs import worker_pool
+from services.loop_monitor import loop_monitor
+from services.translation_memory import start_backfill_if_empty as start_translation_backfill
+from services.db_indexes import start_index_build
+from services.case_search import start_search_backfill
+from services.vehicle_history import start_backfill_if_empty as start_vehicle_backfill
+from services.claim_fingerprints import start_backfill_if_empty as start_fingerprint_backfill
+from services.pdf_storage import start_pdf_gc
+from services.auth import get_password_hash
 
 # Import routes
 from routes.auth import router as auth_router
@@ -33,6 +41,8 @@ from routes.site_settings import router as site_settings_router
 from routes.payments import router as payments_router
 from routes.webhooks import router as webhooks_router
 from routes.settings import router as settings_router
+from routes.budgets import router as budgets_router
+from routes.vehicles import router as vehicles_router
 
 # Create the main app
 app = FastAPI(
@@ -51,6 +61,8 @@ app.include_router(site_settings_router, prefix="/api")
 app.include_router(payments_router, prefix="/api")
 app.include_router(webhooks_router, prefix="/api")
 app.include_router(settings_router, prefix="/api")
+app.include_router(budgets_router, prefix="/api")
+app.include_router(vehicles_router, prefix="/api")
 
 async def write_system_log(entry: dict):
     """Sistem loglarını MongoDB'ye yazar."""
@@ -95,7 +107,7 @@ async def request_monitoring_middleware(request: Request, call_next):
         duration_ms = round((time.perf_counter() - start) * 1000, 2)
         await write_system_log(
             {
-                "created_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": datetime.now(timezone.utc),
                 "level": "ERROR",
                 "event_type": "unhandled_exception",
                 "path": request.url.path,
@@ -135,7 +147,7 @@ async def request_monitoring_middleware(request: Request, call_next):
     if should_store:
         await write_system_log(
             {
-                "created_at": datetime.now(timezone.utc).isoformat(),
+                "created_at": datetime.now(timezone.utc),
                 "level": level,
                 "event_type": event_type,
                 "path": request.url.path,
@@ -172,11 +184,15 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Sayfalı listelerde sonraki sayfanın imleci
+    expose_headers=["X-Next-Cursor", "Content-Disposition"],
 )
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await worker_pool.stop()
+    await loop_monitor.stop()
     client.close()
 
 
@@ -184,8 +200,27 @@ async def shutdown_db_client():
 @app.on_event("startup")
 async def startup_tasks():
     """Uygulama başlangıcında temel DB hazırlıklarını yapar."""
-    await db.users.create_index("email", unique=True)
-    await db.users.create_index("id", unique=True)
+    # Tüm koleksiyon index'leri services/db_indexes.py kaydından arka planda kurulur
+    start_index_build()
+
+    # Arama alanı olmayan eski case'ler
+    start_search_backfill()
+
+    # Araç geçmişi (vehicles) boşsa geçmiş case'lerden kurulur
+    start_vehicle_backfill()
+
+    # Mükerrer talep tespiti için claim parmak izleri
+    start_fingerprint_backfill()
+
+    # Hiçbir case'in kullanmadığı PDF'ler (silinen case'ler, başarısız analizler)
+    start_pdf_gc()
+
+    # Çeviri belleği boşsa geçmiş case'lerden arka planda doldurulur
+    start_translation_backfill()
+
+    # Analiz job worker'ları (ANALYSIS_WORKERS=0 ise ayrı worker.py süreci kullanılır)
+    worker_pool.start()
+    loop_monitor.start()
 
     bootstrap_email = os.environ.get("BOOTSTRAP_ADMIN_EMAIL", "").strip().lower()
     bootstrap_password = os.environ.get("BOOTSTRAP_ADMIN_PASSWORD", "").strip()
@@ -194,8 +229,6 @@ async def startup_tasks():
     if not bootstrap_email or not bootstrap_password:
         return
 
-    now_iso = datetime.now(timezone.utc).isoformat()
-
     await db.users.update_one(
         {"email": bootstrap_email},
         {
@@ -213,7 +246,7 @@ async def startup_tasks():
                 "total_analyses": 0,
                 "emails_sent": 0,
                 "hashed_password": get_password_hash(bootstrap_password),
-                "created_at": now_iso,
+                "created_at": datetime.now(timezone.utc),
             }
         },
         upsert=True,
@@ -1,12 +1,31 @@
-import os
 import json
 import logging
-from typing import Dict, List, Any, Tuple
+import time
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Set, Tuple
 from datetime import datetime
 
-import httpx
 from fastapi import HTTPException
-from openai import AsyncOpenAI, RateLimitError
+
+from services.analysis_progress import ProgressReporter, emit as emit_progress
+from services.document_map_reduce import map_document, needs_map_reduce
+from services.llm_providers import build_provider_endpoints, is_rate_limit_error, order_endpoints
+from services.translation_memory import apply_translation_memory
+from services.model_router import (
+    RouteDecision,
+    TIER_FAST,
+    TIER_FULL,
+    escalation_reason,
+    estimate_cost_usd,
+    model_for,
+    route_document,
+)
+from services.structured_output import parse_analysis_output
+from services.token_counter import (
+    count_chat_tokens,
+    count_tokens,
+    fit_blocks_to_tokens,
+    truncate_to_tokens,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,10 +35,20 @@ MAX_RULES_CHARS = 900
 MAX_RULE_COUNT = 3
 MAX_RULE_SINGLE_CHARS = 300
 MAX_INPUT_TOKENS_BUDGET = 3000
+FALLBACK_INPUT_TOKENS_BUDGET = 2000
+MIN_INPUT_TOKENS_BUDGET = 1300
+# Token bütçesinden kural ve kontrat bölümlerine ayrılabilecek en yüksek pay; kalan PDF'e gider
+RULES_TOKEN_SHARE = 0.25
+CONTRACT_TOKEN_SHARE = 0.25
+MAX_CONTRACT_PACKAGES = 5
+MAX_CONTRACT_CHARS = 800
+TRIM_MARKER = "\n[... KIRPILDI ...]"
 PRIMARY_MAX_COMPLETION_TOKENS = 700
 FALLBACK_MAX_COMPLETION_TOKENS = 400
-GEMINI_MODEL = "gemini-1.5-flash"
-OPENAI_MODEL = "gpt-4o"
+# Yarım kalan yanıtta eksik alanların yeniden istenme tur sayısı
+MAX_FIELD_REPAIR_ROUNDS = 2
+
+OnDelta = Optional[Callable[[str], None]]
 
 
 def _attach_ai_meta(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str, Any]:
@@ -28,32 +57,25 @@ def _attach_ai_meta(payload: Dict[str, Any], meta: Dict[str, Any]) -> Dict[str,
     enriched["_ai_meta"] = meta
     return enriched
 
-def _estimate_tokens(text: str) -> int:
-    """Güvenli tarafta kalacak şekilde kaba token tahmini."""
-    if not text:
-        return 0
-    # Daha konservatif yaklaşım: 1 token ~= 2.7 karakter
-    return max(1, int(len(text) / 2.7))
-
 
 def _trim_text(text: str, max_chars: int) -> str:
     if len(text) <= max_chars:
         return text
-    return text[:max_chars] + "\n[... KIRPILDI ...]"
+    return text[:max_chars] + TRIM_MARKER
 
 
-def _clean_json_response_text(response_text: str) -> str:
-    response_text = response_text.strip()
-    if response_text.startswith("```json"):
-        response_text = response_text[7:]
-    if response_text.startswith("```"):
-        response_text = response_text[3:]
-    if response_text.endswith("```"):
-        response_text = response_text[:-3]
-    return response_text.strip()
-
-
-def _prioritize_pdf_lines(pdf_text: str, max_chars: int = MAX_PROMPT_CHARS) -> str:
+def _prioritize_pdf_lines(
+    pdf_text: str,
+    max_chars: Optional[int] = MAX_PROMPT_CHARS,
+    max_tokens: Optional[int] = None,
+    provider: str = "openai",
+) -> str:
+    """
+    PDF satırlarını önem skoruna göre seçer.
+
+    max_chars ve/veya max_tokens verilebilir; ikisi birlikte verilirse her iki
+    limit de korunur.
+    """
     normalized_text = pdf_text.replace("\r", "")
     lines = [line.strip() for line in normalized_text.split("\n") if line.strip()]
 
@@ -72,32 +94,51 @@ def _prioritize_pdf_lines(pdf_text: str, max_chars: int = MAX_PROMPT_CHARS) -> s
             score += 1
         return score
 
+    def line_tokens(line: str) -> int:
+        # Satır + ayraç (\n) maliyeti
+        return count_tokens(line, provider) + 1 if max_tokens is not None else 0
+
+    def fits(line: str) -> bool:
+        if max_chars is not None and total_chars + len(line) + 1 > max_chars:
+            return False
+        if max_tokens is not None and total_tokens + line_tokens(line) > max_tokens:
+            return False
+        return True
+
+    def mostly_full() -> bool:
+        if max_chars is not None and total_chars >= int(max_chars * 0.85):
+            return True
+        return max_tokens is not None and total_tokens >= int(max_tokens * 0.85)
+
     scored_lines = sorted(lines, key=score_line, reverse=True)
 
     selected: List[str] = []
     selected_set = set()
     total_chars = 0
+    total_tokens = 0
 
     for line in scored_lines:
-        line_len = len(line) + 1
-        if total_chars + line_len > max_chars:
+        if not fits(line):
             continue
         selected.append(line)
         selected_set.add(line)
-        total_chars += line_len
-        if total_chars >= int(max_chars * 0.85):
+        total_chars += len(line) + 1
+        total_tokens += line_tokens(line)
+        if mostly_full():
             break
 
     for line in lines:
-        line_len = len(line) + 1
-        if total_chars + line_len > max_chars:
+        if not fits(line):
             break
         if line not in selected_set:
             selected.append(line)
             selected_set.add(line)
-            total_chars += line_len
+            total_chars += len(line) + 1
+            total_tokens += line_tokens(line)
 
     compact_text = "\n".join(selected)
+    if max_chars is None:
+        return compact_text
     return _trim_text(compact_text, max_chars)
 
 
@@ -183,319 +224,418 @@ def _enforce_contract_policy(payload: Dict[str, Any], pdf_text: str) -> Dict[str
     return normalized
 
 
-def _build_messages(
-    warranty_rules: List[Dict[str, Any]],
-    contract_rules: List[Dict[str, Any]],
-    pdf_text: str,
-    rules_limit: int,
-    pdf_limit: int,
-) -> Tuple[str, str]:
-    selected_rules = _select_relevant_rules(warranty_rules, pdf_text)
-    rules_text = "\n\n".join([
-        f"Versiyon: {rule['rule_version']}\nKural: {rule['rule_text']}\nAnahtar: {', '.join(rule['keywords'])}"
-        for rule in selected_rules
-    ])
-    rules_text = _trim_text(rules_text, rules_limit)
+SYSTEM_MESSAGE = (
+    "Renault Trucks IZE analiz asistanısın. "
+    "Sadece geçerli JSON döndür. "
+    "Tarih formatı YYYY-MM-DD olsun. "
+    "Garanti kararı yalnızca COVERED, OUT_OF_COVERAGE veya ADDITIONAL_INFO_REQUIRED olsun."
+)
 
-    ordered_contract_rules = _sort_contract_rules(contract_rules)
-    contract_text = "\n\n".join([
-        f"Sıra: {idx + 1}\nPaket: {rule.get('package_name', 'N/A')}\nMaddeler: {'; '.join(rule.get('items', []))}\nAnahtar: {', '.join(rule.get('keywords', []))}"
-        for idx, rule in enumerate(ordered_contract_rules[:5])
-    ])
-    contract_text = _trim_text(contract_text, 800)
 
-    
-    compact_pdf_text = _prioritize_pdf_lines(pdf_text, pdf_limit)
+# Tüm isteklerde bayt bayt aynı kalan statik bölüm. Sağlayıcı tarafı prompt
+# önbelleğinin (OpenAI otomatik prefix cache, Gemini implicit cache) isabet
+# edebilmesi için prompt bununla başlar; belgeye göre değişen kurallar ve PDF
+# en sona eklenir.
+STATIC_INSTRUCTIONS = """IZE ANALİZ
 
-    system_message = (
-        "Renault Trucks IZE analiz asistanısın. "
-        "Sadece geçerli JSON döndür. "
-        "Tarih formatı YYYY-MM-DD olsun. "
-        "Garanti kararı yalnızca COVERED, OUT_OF_COVERAGE veya ADDITIONAL_INFO_REQUIRED olsun."
-    )
+JSON şeması API tarafından zorunlu tutulur (tarihler YYYY-MM-DD veya null).
+confidence: çıkarılan alanlara ve karara güvenin (0-1); belge belirsiz/eksikse düşük ver.
 
-    prompt = f"""
-IZE ANALİZ
+DİL KURALI:
+- failure_complaint, failure_cause, operations_performed, parts_replaced.partName, parts_replaced.description
+  alanlarını belgedeki ORİJİNAL dilde yaz, çevirme (Türkçe karşılıklar sistem tarafından eklenir).
+- decision_rationale ve repair_process_summary alanlarını Türkçe yaz.
 
-KURALLAR:
-{rules_text}
+KONTRAT KARAR KURALI:
+- Kontrat paketleri küçükten büyüğe sıralıdır (Sıra 1 en küçük paket).
+- Araç 2 yıl garantiyi aşıyorsa, sadece ilgili paketin maddeleriyle eşleşen parçaları kontrata dahil et.
+- Eğer hasar, darbe, kaza, kullanıcı hatası gibi durumlar varsa kontrat geçersizdir: has_active_contract=false ve contract_decision=NO_CONTRACT_COVERAGE.
+- Eşleşen parça adlarını contract_covered_parts içine ekle.
+
+Sadece JSON ver.
+"""
 
+
+def _render_prompt(rules_text: str, contract_text: str, compact_pdf_text: str) -> str:
+    # Sıra: statik talimatlar -> kontrat paketleri (nadiren değişir) -> seçilen kurallar -> PDF
+    return f"""{STATIC_INSTRUCTIONS}
 KONTRAT PAKETLERİ (garanti uzatımı):
 {contract_text}
 
+KURALLAR:
+{rules_text}
+
 PDF ÖZETİ:
 {compact_pdf_text}
+"""
 
-JSON şeması:
-{{
-  "ize_no": "",
-  "company": "",
-  "plate": "",
-  "vin": "",
-  "warranty_start_date": "YYYY-MM-DD veya null",
-  "repair_date": "YYYY-MM-DD veya null",
-  "vehicle_age_months": 0,
-  "repair_km": 0,
-  "request_type": "WARRANTY SUPPORT veya BREAKDOWN ASSISTANCE",
-  "is_within_2_year_warranty": false,
-  "warranty_decision": "COVERED|OUT_OF_COVERAGE|ADDITIONAL_INFO_REQUIRED",
-  "decision_rationale": [""],
-  "has_active_contract": false,
-  "contract_package_name": "string veya null",
-  "contract_decision": "CONTRACT_COVERED|NO_CONTRACT_COVERAGE",
-  "contract_covered_parts": [""],
-  "failure_complaint": "",
-  "failure_cause": "",
-  "operations_performed": [""],
-  "parts_replaced": [{{"partName":"", "description":"", "qty":1}}],
-  "repair_process_summary": "",
-  "email_subject": "",
-  "email_body": ""
-}}
-
-ÖNEMLİ BİL-DİL KURALI:
-- Metin alanlarında (decision_rationale, failure_complaint, failure_cause, operations_performed, parts_replaced.partName, parts_replaced.description, repair_process_summary)
-  mümkünse hem orijinal dili hem Türkçe çeviriyi TEK string içinde ver.
-- Zorunlu format: "Original: <orijinal metin> | TR: <türkçe çeviri>"
-- Orijinal metin zaten Türkçeyse yine aynı formatı kullan ve TR kısmına aynı metni yaz.
 
+def _format_rule_blocks(selected_rules: List[Dict[str, Any]]) -> List[str]:
+    return [
+        f"Versiyon: {rule['rule_version']}\nKural: {rule['rule_text']}\nAnahtar: {', '.join(rule['keywords'])}"
+        for rule in selected_rules
+    ]
 
-Sadece JSON ver.
 
-KONTRAT KARAR KURALI:
-- Kontrat paketleri küçükten büyüğe sıralıdır (Sıra 1 en küçük paket).
-- Araç 2 yıl garantiyi aşıyorsa, sadece ilgili paketin maddeleriyle eşleşen parçaları kontrata dahil et.
-- Eğer hasar, darbe, kaza, kullanıcı hatası gibi durumlar varsa kontrat geçersizdir: has_active_contract=false ve contract_decision=NO_CONTRACT_COVERAGE.
-- Eşleşen parça adlarını contract_covered_parts içine ekle.
-"""
+def _format_contract_blocks(contract_rules: List[Dict[str, Any]]) -> List[str]:
+    ordered_contract_rules = _sort_contract_rules(contract_rules)
+    return [
+        f"Sıra: {idx + 1}\nPaket: {rule.get('package_name', 'N/A')}\nMaddeler: {'; '.join(rule.get('items', []))}\nAnahtar: {', '.join(rule.get('keywords', []))}"
+        for idx, rule in enumerate(ordered_contract_rules[:MAX_CONTRACT_PACKAGES])
+    ]
+
+
+def _build_messages(
+    warranty_rules: List[Dict[str, Any]],
+    contract_rules: List[Dict[str, Any]],
+    pdf_text: str,
+    rules_limit: int,
+    pdf_limit: Optional[int] = MAX_PROMPT_CHARS,
+    token_budget: Optional[int] = None,
+    provider: str = "openai",
+) -> Tuple[str, str]:
+    """
+    Analiz için system mesajı ve promptu üretir.
+
+    token_budget verilirse prompt bölüm bölüm bütçeye göre doldurulur:
+    önce kontrat paketleri, sonra ilgili kurallar, kalan bütçe öncelikli PDF
+    satırlarıyla. Verilmezse yalnızca karakter limitleri uygulanır.
+    """
+    selected_rules = _select_relevant_rules(warranty_rules, pdf_text)
+    rule_blocks = _format_rule_blocks(selected_rules)
+    contract_blocks = _format_contract_blocks(contract_rules)
+    system_message = SYSTEM_MESSAGE
+
+    # Kontrat bölümü kurallardan önce ve belgeden bağımsız bütçeyle doldurulur;
+    # böylece aynı bütçe kademesindeki tüm isteklerde prefix aynı kalır.
+    if token_budget is None:
+        rules_text = _trim_text("\n\n".join(rule_blocks), rules_limit)
+        contract_text = _trim_text("\n\n".join(contract_blocks), MAX_CONTRACT_CHARS)
+        compact_pdf_text = _prioritize_pdf_lines(pdf_text, pdf_limit)
+        return system_message, _render_prompt(rules_text, contract_text, compact_pdf_text)
+
+    available = token_budget - count_chat_tokens(system_message, _render_prompt("", "", ""), provider)
+
+    contract_text = "\n\n".join(fit_blocks_to_tokens(
+        contract_blocks, int(available * CONTRACT_TOKEN_SHARE), provider, separator="\n\n", max_chars=MAX_CONTRACT_CHARS
+    ))
+    available -= count_tokens(contract_text, provider)
+
+    rules_text = "\n\n".join(fit_blocks_to_tokens(
+        rule_blocks, int(available * RULES_TOKEN_SHARE), provider, separator="\n\n", max_chars=rules_limit
+    ))
+    available -= count_tokens(rules_text, provider)
+
+    compact_pdf_text = _prioritize_pdf_lines(pdf_text, pdf_limit, max_tokens=max(available, 0), provider=provider)
+    prompt = _render_prompt(rules_text, contract_text, compact_pdf_text)
+
+    # Bölüm birleşimlerindeki küçük sapmaları PDF bölümünden kırparak kapat
+    overflow = count_chat_tokens(system_message, prompt, provider) - token_budget
+    if overflow > 0 and compact_pdf_text:
+        compact_pdf_text = truncate_to_tokens(
+            compact_pdf_text,
+            count_tokens(compact_pdf_text, provider) - overflow,
+            provider,
+            suffix=TRIM_MARKER,
+        )
+        prompt = _render_prompt(rules_text, contract_text, compact_pdf_text)
 
     return system_message, prompt
 
 
-async def _analyze_with_gemini(
-    system_message: str,
-    prompt: str,
-    google_api_key: str,
-    max_output_tokens: int,
-) -> Dict[str, Any]:
-    """Gemini REST API ile JSON analiz sonucu üret."""
-    endpoint = (
-        f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
-        f"?key={google_api_key}"
-    )
-
-    payload = {
-        "contents": [
-            {
-                "role": "user",
-                "parts": [
-                    {"text": f"{system_message}\n\n{prompt}"}
-                ],
-            }
-        ],
-        "generationConfig": {
-            "temperature": 0.1,
-            "maxOutputTokens": max_output_tokens,
-            "responseMimeType": "application/json",
-        },
-    }
+def _render_missing_fields_prompt(prompt: str, partial: Dict[str, Any], missing: List[str]) -> str:
+    return f"""{prompt}
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(endpoint, json=payload)
+ÖNCEKİ YANIT YARIM KALDI. Tamamlanan alanlar:
+{json.dumps(partial, ensure_ascii=False)}
 
-    if response.status_code >= 400:
-        raise HTTPException(
-            status_code=response.status_code,
-            detail=f"Gemini API hatası: {response.text[:400]}"
-        )
+SADECE şu alanları içeren JSON ver: {", ".join(missing)}
+"""
 
-    data = response.json()
-    candidates = data.get("candidates", [])
-    if not candidates:
-        raise HTTPException(status_code=500, detail="Gemini yanıtı boş döndü")
 
-    parts = candidates[0].get("content", {}).get("parts", [])
-    text = "\n".join([part.get("text", "") for part in parts if part.get("text")]).strip()
-    if not text:
-        raise HTTPException(status_code=500, detail="Gemini metin yanıtı üretmedi")
+async def _complete_structured_analysis(
+    call: Callable[..., Awaitable[Tuple[str, Dict[str, int]]]],
+    system_message: str,
+    prompt: str,
+    max_tokens: int,
+    on_delta: OnDelta = None,
+    progress: Optional[ProgressReporter] = None,
+) -> Tuple[Dict[str, Any], Dict[str, int], List[str], List[str]]:
+    """
+    Analizi ister; yanıt yarım/geçersiz kaldıysa yalnızca eksik alanları yeniden ister.
+
+    Dönüş: (payload, toplam usage, onarılan alanlar, hâlâ eksik alanlar).
+    """
+    text, usage = await call(system_message, prompt, max_tokens, on_delta, None)
+    payload, missing = parse_analysis_output(text)
+    if not payload:
+        raise ValueError("AI yanıtından hiçbir alan ayrıştırılamadı")
+
+    repaired_fields: List[str] = []
+    rounds = 0
+    while missing and rounds < MAX_FIELD_REPAIR_ROUNDS:
+        rounds += 1
+        logger.warning("AI yanıtı eksik, alanlar yeniden isteniyor (tur %s): %s", rounds, ", ".join(missing))
+        emit_progress(progress, "llm_repair_started", round=rounds, fields=missing)
+
+        repair_prompt = _render_missing_fields_prompt(prompt, payload, missing)
+        text, extra_usage = await call(system_message, repair_prompt, max_tokens, None, missing)
+        usage = {key: usage.get(key, 0) + extra_usage.get(key, 0) for key in usage}
+
+        try:
+            patch, still_missing = parse_analysis_output(text, missing)
+        except ValueError:
+            continue
+        payload.update(patch)
+        repaired_fields.extend(patch)
+        missing = still_missing
 
-    clean_text = _clean_json_response_text(text)
-    return json.loads(clean_text)
+    if missing:
+        # Kalan alanlar case oluşturulurken varsayılan değerlerle doldurulur
+        logger.warning("AI yanıtında eksik alanlar kaldı: %s", ", ".join(missing))
 
+    return payload, usage, repaired_fields, missing
 
-async def analyze_ize_with_ai(pdf_text: str, warranty_rules: List[Dict[str, Any]], contract_rules: List[Dict[str, Any]] = None, db_settings: Dict[str, Any] = None) -> Dict[str, Any]:
-    """IZE dosyasını OpenAI (öncelikli) veya Gemini (fallback/alternatif) ile analiz eder."""
-    try:
-        openai_key = db_settings.get("openai_key") if db_settings else None
-        google_key = db_settings.get("google_key") if db_settings else None
 
-        if not openai_key:
-            openai_key = os.environ.get("OPENAI_API_KEY", "")
-        if not google_key:
-            google_key = os.environ.get("GOOGLE_API_KEY", "")
+async def _run_routed_analysis(
+    provider: str,
+    call: Callable[..., Awaitable[Tuple[str, Dict[str, int]]]],
+    route: RouteDecision,
+    system_message: str,
+    prompt: str,
+    max_tokens: int,
+    approx_input_tokens: int,
+    on_delta: OnDelta = None,
+    progress: Optional[ProgressReporter] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Yönlendirilen katmanın modeliyle analiz eder; hızlı model yetersizse tam modele yükseltir.
+
+    Dönüş: (payload, _ai_meta). Denemelerin gecikme ve maliyetleri route'a eklenir.
+    """
+    tier = route.tier
+    prompt_total = completion_total = cached_total = 0
+    cost_total: Optional[float] = 0.0
+    repaired_total: List[str] = []
+
+    while True:
+        model = model_for(provider, tier)
+        started = time.perf_counter()
+        payload, usage, repaired_fields, missing = await _complete_structured_analysis(
+            lambda *args: call(*args, model=model), system_message, prompt, max_tokens, on_delta, progress
+        )
+        prompt_tokens = usage.get("prompt_tokens") or approx_input_tokens
+        completion_tokens = usage.get("completion_tokens") or max_tokens
+        cached_tokens = usage.get("cached_prompt_tokens", 0)
+        cost = estimate_cost_usd(model, prompt_tokens, completion_tokens, cached_tokens)
+
+        prompt_total += prompt_tokens
+        completion_total += completion_tokens
+        cached_total += cached_tokens
+        cost_total = None if cost is None or cost_total is None else round(cost_total + cost, 6)
+        repaired_total.extend(repaired_fields)
+
+        attempt = {
+            "provider": provider,
+            "tier": tier,
+            "model": model,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "cost_usd": cost,
+            "confidence": payload.get("confidence"),
+            "missing_fields": missing,
+        }
+        route.attempts.append(attempt)
+
+        reason = escalation_reason(payload, missing) if tier == TIER_FAST and not route.budget_degraded else None
+        if reason is None:
+            break
+
+        attempt["escalation_reason"] = reason
+        logger.info("Hızlı model yetersiz (%s), tam modele yükseltiliyor: %s", reason, model_for(provider, TIER_FULL))
+        emit_progress(progress, "model_escalated", provider=provider, from_model=model,
+                      to_model=model_for(provider, TIER_FULL), reason=reason)
+        tier = TIER_FULL
+
+    meta = {
+        "provider": provider,
+        "model": model,
+        "prompt_tokens": prompt_total,
+        "completion_tokens": completion_total,
+        "total_tokens": prompt_total + completion_total,
+        "cached_prompt_tokens": cached_total,
+        "estimated_cost_usd": cost_total,
+        "repaired_fields": repaired_total,
+        "route": route.to_dict(),
+    }
+    return payload, meta
+
+
+def _with_call_stats(meta: Dict[str, Any], name: str, stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Yardımcı çağrıların (map, çeviri) token ve maliyetlerini son analiz metriklerine ekler."""
+    if not stats:
+        return meta
+    enriched = dict(meta)
+    extra_cost: Optional[float] = 0.0
+    for call in stats["calls"]:
+        prompt_tokens = call.get("prompt_tokens", 0)
+        completion_tokens = call.get("completion_tokens", 0)
+        cached_tokens = call.get("cached_prompt_tokens", 0)
+        enriched["prompt_tokens"] += prompt_tokens
+        enriched["completion_tokens"] += completion_tokens
+        enriched["cached_prompt_tokens"] = enriched.get("cached_prompt_tokens", 0) + cached_tokens
+        if call.get("model"):
+            cost = estimate_cost_usd(call["model"], prompt_tokens, completion_tokens, cached_tokens)
+            extra_cost = None if cost is None or extra_cost is None else extra_cost + cost
+    enriched["total_tokens"] = enriched["prompt_tokens"] + enriched["completion_tokens"]
+    if enriched.get("estimated_cost_usd") is not None and extra_cost is not None:
+        enriched["estimated_cost_usd"] = round(enriched["estimated_cost_usd"] + extra_cost, 6)
+    # Case üzerinde route bilgisiyle birlikte saklanır
+    enriched["route"] = {**(enriched.get("route") or {}), name: stats}
+    return enriched
 
-        if not openai_key and not google_key:
-            raise HTTPException(status_code=500, detail="OpenAI veya Google API anahtarı bulunamadı")
 
-        openai_client = AsyncOpenAI(api_key=openai_key) if openai_key else None
+async def analyze_ize_with_ai(
+    pdf_text: str,
+    warranty_rules: List[Dict[str, Any]],
+    contract_rules: List[Dict[str, Any]] = None,
+    db_settings: Dict[str, Any] = None,
+    progress: Optional[ProgressReporter] = None,
+    degraded: bool = False,
+    excluded_providers: Optional[Set[str]] = None,
+) -> Dict[str, Any]:
+    """
+    IZE dosyasını tanımlı tüm LLM sağlayıcıları arasında yük dengeleyerek analiz eder.
+
+    Sağlayıcılar (OpenAI, Gemini, Anthropic, Emergent ve other_keys) ağırlık ve
+    gecikmeye göre sıralanır; bir uç nokta başarısız olursa sıradakine geçilir.
+    progress verilirse deneme/sağlayıcı değişimi olayları yayınlanır ve LLM
+    yanıtı akışlı alınarak parçalar anlık iletilir. degraded ise (bütçe dolu)
+    yalnızca hızlı model kullanılır; excluded_providers atlanır.
+    """
+    on_delta = progress.delta if progress else None
+    try:
+        endpoints = [
+            endpoint for endpoint in build_provider_endpoints(db_settings)
+            if endpoint.provider not in (excluded_providers or set())
+        ]
+        if not endpoints:
+            raise HTTPException(status_code=500, detail="Tanımlı bir AI sağlayıcı API anahtarı bulunamadı")
 
         attempts = [
-            (MAX_RULES_CHARS, MAX_PROMPT_CHARS, PRIMARY_MAX_COMPLETION_TOKENS),
-            (500, 1800, FALLBACK_MAX_COMPLETION_TOKENS),
-            (300, 1100, 250),
+            (MAX_RULES_CHARS, MAX_INPUT_TOKENS_BUDGET, PRIMARY_MAX_COMPLETION_TOKENS),
+            (500, FALLBACK_INPUT_TOKENS_BUDGET, FALLBACK_MAX_COMPLETION_TOKENS),
+            (300, MIN_INPUT_TOKENS_BUDGET, 250),
         ]
+        ordered = order_endpoints(endpoints)
+        # Bütçe ilk denenecek uç noktanın sayacına göre hesaplanır
+        budget_provider = ordered[0].tokenizer
+
+        route = route_document(pdf_text)
+        if degraded:
+            route.tier = TIER_FAST
+            route.budget_degraded = True
+        logger.info(
+            "Model yönlendirme: katman=%s zorluk=%s özellikler=%s sağlayıcı sırası=%s",
+            route.tier, route.score, route.features, [endpoint.label for endpoint in ordered],
+        )
+
+        # Uzun belgede sayfa grupları önce paralel özetlenir, analiz özet üzerinden yapılır
+        prompt_pdf_text = pdf_text
+        map_stats = None
+        if needs_map_reduce(pdf_text, budget_provider):
+            map_calls = [
+                (endpoint.provider, endpoint.call, model_for(endpoint.provider, TIER_FAST))
+                for endpoint in ordered
+            ]
+            emit_progress(progress, "map_started")
+            prompt_pdf_text, map_stats = await map_document(
+                pdf_text,
+                map_calls,
+                budget_provider,
+                on_group_done=(lambda **group: emit_progress(progress, "map_group_completed", **group)),
+            )
+            emit_progress(progress, "map_completed", groups=map_stats["groups"], failed_groups=map_stats["failed_groups"])
 
         last_error = None
 
-        for idx, (rules_limit, pdf_limit, completion_tokens) in enumerate(attempts, 1):
+        for idx, (rules_limit, input_budget, completion_tokens) in enumerate(attempts, 1):
             system_message, prompt = _build_messages(
                 warranty_rules=warranty_rules,
                 contract_rules=contract_rules or [],
-                pdf_text=pdf_text,
+                pdf_text=prompt_pdf_text,
                 rules_limit=rules_limit,
-                pdf_limit=pdf_limit,
+                pdf_limit=None,
+                token_budget=input_budget,
+                provider=budget_provider,
             )
 
-            approx_input_tokens = _estimate_tokens(system_message) + _estimate_tokens(prompt)
-
-            if approx_input_tokens > MAX_INPUT_TOKENS_BUDGET:
-                # Sert kesme: token bütçesi aşılıyorsa promptu daha da kıs
-                force_chars = max(600, int(len(prompt) * 0.55))
-                prompt = _trim_text(prompt, force_chars)
-                approx_input_tokens = _estimate_tokens(system_message) + _estimate_tokens(prompt)
-
-            logger.info(
-                "AI deneme=%s input_tokens~%s max_completion=%s rules_limit=%s pdf_limit=%s provider=%s",
-                idx,
-                approx_input_tokens,
-                completion_tokens,
-                rules_limit,
-                pdf_limit,
-                "openai" if openai_client else "gemini",
-            )
+            input_tokens_by_tokenizer: Dict[str, int] = {}
+            previous = None
+            fallback_reason = None
 
-            # OpenAI öncelikli, 429/limit durumunda Gemini fallback
-            if openai_client:
-                try:
-                    response = await openai_client.chat.completions.create(
-                        model=OPENAI_MODEL,
-                        messages=[
-                            {"role": "system", "content": system_message},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.1,
-                        max_tokens=completion_tokens,
+            # Sağlık durumu denemeler arasında değişmiş olabilir; sıra her turda yenilenir
+            for endpoint in (ordered if idx == 1 else order_endpoints(endpoints)):
+                if endpoint.tokenizer not in input_tokens_by_tokenizer:
+                    input_tokens_by_tokenizer[endpoint.tokenizer] = count_chat_tokens(
+                        system_message, prompt, endpoint.tokenizer
                     )
-
-                    response_text = response.choices[0].message.content.strip()
-                    clean_text = _clean_json_response_text(response_text)
-                    usage = getattr(response, "usage", None)
-                    prompt_tokens = getattr(usage, "prompt_tokens", approx_input_tokens) if usage else approx_input_tokens
-                    completion_used = getattr(usage, "completion_tokens", completion_tokens) if usage else completion_tokens
-                    total_tokens = getattr(usage, "total_tokens", prompt_tokens + completion_used) if usage else (prompt_tokens + completion_used)
-                    parsed_payload = _enforce_contract_policy(json.loads(clean_text), pdf_text)
-                    return _attach_ai_meta(
-                        parsed_payload,
-                        {
-                            "provider": "openai",
-                            "model": OPENAI_MODEL,
-                            "prompt_tokens": int(prompt_tokens or 0),
-                            "completion_tokens": int(completion_used or 0),
-                            "total_tokens": int(total_tokens or 0),
-                            "estimated_cost_usd": round((int(prompt_tokens or 0) * 0.000005) + (int(completion_used or 0) * 0.000015), 6),
-                        },
+                approx_input_tokens = input_tokens_by_tokenizer[endpoint.tokenizer]
+
+                logger.info(
+                    "AI deneme=%s input_tokens=%s budget=%s max_completion=%s rules_limit=%s provider=%s",
+                    idx,
+                    approx_input_tokens,
+                    input_budget,
+                    completion_tokens,
+                    rules_limit,
+                    endpoint.label,
+                )
+                if previous is None:
+                    emit_progress(
+                        progress, "llm_attempt_started", attempt=idx, provider=endpoint.provider,
+                        endpoint=endpoint.label, model=model_for(endpoint.provider, route.tier),
+                        input_tokens=approx_input_tokens, max_completion_tokens=completion_tokens,
+                    )
+                else:
+                    logger.info("%s başarısız (%s), %s deneniyor", previous.label, fallback_reason, endpoint.label)
+                    emit_progress(
+                        progress, "provider_switched", attempt=idx, from_provider=previous.provider,
+                        to_provider=endpoint.provider, endpoint=endpoint.label,
+                        model=model_for(endpoint.provider, route.tier), reason=fallback_reason,
                     )
 
-                except RateLimitError as e:
-                    last_error = e
-                    logger.warning("OpenAI rate limit deneme %s başarısız: %s", idx, str(e))
-                    if google_key:
-                        try:
-                            logger.info("Gemini fallback deneniyor (OpenAI rate limit)")
-                            result = await _analyze_with_gemini(
-                                system_message=system_message,
-                                prompt=prompt,
-                                google_api_key=google_key,
-                                max_output_tokens=completion_tokens,
-                            )
-                            parsed_payload = _enforce_contract_policy(result, pdf_text)
-                            return _attach_ai_meta(
-                                parsed_payload,
-                                {
-                                    "provider": "google_gemini",
-                                    "model": GEMINI_MODEL,
-                                    "prompt_tokens": int(approx_input_tokens),
-                                    "completion_tokens": int(completion_tokens),
-                                    "total_tokens": int(approx_input_tokens + completion_tokens),
-                                    "estimated_cost_usd": None,
-                                },
-                            )
-                        except Exception as ge:
-                            last_error = ge
-                            logger.warning("Gemini fallback başarısız: %s", str(ge))
-                    continue
-                except Exception as e:
-                    last_error = e
-                    logger.warning("OpenAI deneme %s başarısız: %s", idx, str(e))
-                    if google_key:
-                        try:
-                            logger.info("Gemini fallback deneniyor (OpenAI genel hata)")
-                            result = await _analyze_with_gemini(
-                                system_message=system_message,
-                                prompt=prompt,
-                                google_api_key=google_key,
-                                max_output_tokens=completion_tokens,
-                            )
-                            parsed_payload = _enforce_contract_policy(result, pdf_text)
-                            return _attach_ai_meta(
-                                parsed_payload,
-                                {
-                                    "provider": "google_gemini",
-                                    "model": GEMINI_MODEL,
-                                    "prompt_tokens": int(approx_input_tokens),
-                                    "completion_tokens": int(completion_tokens),
-                                    "total_tokens": int(approx_input_tokens + completion_tokens),
-                                    "estimated_cost_usd": None,
-                                },
-                            )
-                        except Exception as ge:
-                            last_error = ge
-                            logger.warning("Gemini fallback başarısız: %s", str(ge))
-                    continue
-
-            # OpenAI yoksa doğrudan Gemini
-            if google_key:
                 try:
-                    result = await _analyze_with_gemini(
-                        system_message=system_message,
-                        prompt=prompt,
-                        google_api_key=google_key,
-                        max_output_tokens=completion_tokens,
+                    result, meta = await _run_routed_analysis(
+                        endpoint.provider, endpoint.call, route, system_message, prompt,
+                        completion_tokens, approx_input_tokens, on_delta, progress,
                     )
+                    meta["provider_endpoint"] = endpoint.label
                     parsed_payload = _enforce_contract_policy(result, pdf_text)
-                    return _attach_ai_meta(
-                        parsed_payload,
-                        {
-                            "provider": "google_gemini",
-                            "model": GEMINI_MODEL,
-                            "prompt_tokens": int(approx_input_tokens),
-                            "completion_tokens": int(completion_tokens),
-                            "total_tokens": int(approx_input_tokens + completion_tokens),
-                            "estimated_cost_usd": None,
-                        },
+                    # Model yalnızca orijinal metni döndürür; TR kısmı çeviri belleğinden gelir
+                    translation_stats = await apply_translation_memory(
+                        parsed_payload, endpoint.call, model_for(endpoint.provider, TIER_FAST)
                     )
-                except Exception as ge:
-                    last_error = ge
-                    logger.warning("Gemini deneme %s başarısız: %s", idx, str(ge))
-                    continue
+                    emit_progress(progress, "translation_completed", hits=translation_stats["hits"],
+                                  translated=translation_stats["translated"])
+                    meta = _with_call_stats(meta, "map_reduce", map_stats)
+                    meta = _with_call_stats(meta, "translation_memory", translation_stats)
+                    return _attach_ai_meta(parsed_payload, meta)
+                except Exception as e:
+                    last_error = e
+                    fallback_reason = "rate_limit" if is_rate_limit_error(e) else "error"
+                    logger.warning("%s deneme %s başarısız: %s", endpoint.label, idx, str(e))
+                    previous = endpoint
 
         logger.error("Tüm AI denemeleri başarısız: %s", str(last_error))
         raise HTTPException(
             status_code=429,
-            detail="OpenAI/Gemini token veya istek limiti aşıldı. Lütfen tekrar deneyin."
+            detail="AI sağlayıcılarının token veya istek limiti aşıldı. Lütfen tekrar deneyin."
         )
 
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         logger.error("JSON parse hatası: %s", str(e))
         raise HTTPException(status_code=500, detail=f"AI yanıtı işlenemedi: {str(e)}")
     except HTTPException:
@@ -0,0 +1,202 @@
+"""
+Toplu IZE analizi: ZIP arşivi veya çoklu PDF yüklemesini job kuyruğuna dağıtır.
+
+Dosyalar belleğe alınmadan diske akıtılır, kredi tüm parti için tek seferde
+ayrılır ve her PDF için bir analiz job'ı oluşturulur. Eşzamanlılık
+worker havuzu ve OCR/LLM semaforlarıyla sınırlanır.
+"""
+import asyncio
+import logging
+import os
+import zipfile
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import BinaryIO, Callable, List, Optional
+
+from fastapi import HTTPException, UploadFile
+
+from database import db
+from models.job import (
+    AnalysisBatch,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_FAILED,
+)
+from services.analysis_jobs import enqueue_analysis_job
+from services.case_analysis import refund_analysis_credits, reserve_analysis_credits
+from services.pdf_storage import register_upload, store_pdf_stream
+
+logger = logging.getLogger(__name__)
+
+MAX_BULK_FILES = int(os.environ.get("MAX_BULK_ANALYSIS_FILES", "200"))
+MAX_BULK_MEMBER_BYTES = 50 * 1024 * 1024  # ZIP içindeki tek PDF için açılmış boyut sınırı
+
+
+@dataclass
+class _PendingPdf:
+    file_name: str
+    open_stream: Callable[[], BinaryIO]
+
+
+def _is_zip_upload(upload: UploadFile) -> bool:
+    return (upload.filename or "").lower().endswith(".zip")
+
+
+def _zip_pdf_members(archive: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    members = []
+    for info in archive.infolist():
+        name = PurePosixPath(info.filename)
+        if info.is_dir() or "__MACOSX" in name.parts or name.name.startswith("."):
+            continue
+        if name.suffix.lower() != ".pdf":
+            continue
+        if info.file_size > MAX_BULK_MEMBER_BYTES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"ZIP içindeki dosya çok büyük: {name.name}"
+            )
+        members.append(info)
+    return members
+
+
+def _collect_pending_pdfs(uploads: List[UploadFile], skipped: List[str]) -> List[_PendingPdf]:
+    """Yüklemelerden analiz edilecek PDF'leri (henüz diske yazmadan) listeler."""
+    pending: List[_PendingPdf] = []
+
+    for upload in uploads:
+        file_name = upload.filename or "dosya"
+        if _is_zip_upload(upload):
+            try:
+                archive = zipfile.ZipFile(upload.file)
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Geçersiz ZIP dosyası: {file_name}")
+            for info in _zip_pdf_members(archive):
+                pending.append(_PendingPdf(
+                    file_name=PurePosixPath(info.filename).name,
+                    open_stream=lambda archive=archive, info=info: archive.open(info),
+                ))
+        elif file_name.lower().endswith(".pdf"):
+            pending.append(_PendingPdf(file_name=file_name, open_stream=lambda upload=upload: upload.file))
+        else:
+            skipped.append(file_name)
+
+    return pending
+
+
+def _store_pending_pdf(item: _PendingPdf) -> str:
+    source = item.open_stream()
+    try:
+        return store_pdf_stream(source)
+    finally:
+        # UploadFile akışı FastAPI tarafından kapatılır; ZIP üyesini biz kapatırız
+        if isinstance(source, zipfile.ZipExtFile):
+            source.close()
+
+
+async def create_analysis_batch(
+    user: dict,
+    uploads: List[UploadFile],
+    branch: Optional[str] = None,
+) -> AnalysisBatch:
+    """Yüklemeleri depolar ve her PDF için analiz job'ı oluşturur."""
+    skipped: List[str] = []
+    pending = await asyncio.to_thread(_collect_pending_pdfs, uploads, skipped)
+
+    if not pending:
+        raise HTTPException(status_code=400, detail="Yüklemede analiz edilecek PDF bulunamadı")
+    if len(pending) > MAX_BULK_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tek seferde en fazla {MAX_BULK_FILES} PDF yükleyebilirsiniz"
+        )
+
+    # Kredi tüm parti için tek koşullu $inc ile ayrılır; başarısız job'ların kredisini worker iade eder
+    reserved = await reserve_analysis_credits(user, len(pending))
+
+    batch = AnalysisBatch(
+        user_id=user['id'],
+        branch=branch or user.get('branch', ''),
+        skipped_files=skipped,
+        total_files=len(pending),
+    )
+
+    try:
+        for item in pending:
+            pdf_storage_name = await asyncio.to_thread(_store_pending_pdf, item)
+            await register_upload(pdf_storage_name)
+            job = await enqueue_analysis_job(
+                user, item.file_name, pdf_storage_name, batch.branch,
+                batch_id=batch.id, credit_reserved=reserved > 0,
+            )
+            batch.job_ids.append(job.id)
+    except BaseException:
+        # Kuyruğa alınamayan dosyaların kredisi iade edilir
+        if reserved:
+            await refund_analysis_credits(user['id'], reserved - len(batch.job_ids))
+        raise
+
+    doc = batch.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    await db.analysis_batches.insert_one(doc)
+
+    logger.info(f"Toplu analiz oluşturuldu: {batch.id} ({batch.total_files} PDF, User: {user.get('email')})")
+    return batch
+
+
+async def get_batch_progress(batch: dict) -> dict:
+    """Partideki her dosyanın durumunu ve parti özetini döndürür."""
+    jobs = await db.analysis_jobs.find(
+        {"batch_id": batch['id']},
+        {"_id": 0, "id": 1, "pdf_file_name": 1, "status": 1, "case_id": 1, "error": 1,
+         "attempts": 1, "started_at": 1, "completed_at": 1}
+    ).sort("created_at", 1).to_list(MAX_BULK_FILES)
+
+    status_counts = {
+        JOB_STATUS_QUEUED: 0,
+        JOB_STATUS_RUNNING: 0,
+        JOB_STATUS_COMPLETED: 0,
+        JOB_STATUS_FAILED: 0,
+    }
+    for job in jobs:
+        status_counts[job.get('status', JOB_STATUS_QUEUED)] = status_counts.get(job.get('status'), 0) + 1
+
+    completed_case_ids = [job['case_id'] for job in jobs if job.get('status') == JOB_STATUS_COMPLETED]
+    decision_stats = {}
+    if completed_case_ids:
+        decisions = await db.ize_cases.aggregate([
+            {"$match": {"id": {"$in": completed_case_ids}}},
+            {"$group": {"_id": "$warranty_decision", "count": {"$sum": 1}}},
+        ]).to_list(10)
+        decision_stats = {item["_id"]: item["count"] for item in decisions}
+
+    files = []
+    for job in jobs:
+        files.append({
+            "job_id": job['id'],
+            "file_name": job.get('pdf_file_name'),
+            "status": job.get('status'),
+            "case_id": job.get('case_id') if job.get('status') == JOB_STATUS_COMPLETED else None,
+            "error": job.get('error') if job.get('status') == JOB_STATUS_FAILED else None,
+            "attempts": job.get('attempts', 0),
+            "started_at": job.get('started_at'),
+            "completed_at": job.get('completed_at'),
+        })
+
+    finished = status_counts[JOB_STATUS_COMPLETED] + status_counts[JOB_STATUS_FAILED]
+    total = batch.get('total_files', len(jobs))
+    return {
+        "id": batch['id'],
+        "branch": batch.get('branch', ''),
+        "created_at": batch.get('created_at'),
+        "total_files": total,
+        "skipped_files": batch.get('skipped_files', []),
+        "summary": {
+            **status_counts,
+            "finished": finished,
+            "progress_percent": round(finished * 100 / total, 1) if total else 100.0,
+            "is_done": finished >= total,
+            "decisions": decision_stats,
+        },
+        "files": files,
+    }
@@ -0,0 +1,189 @@
+"""
+Aynı PDF'in eşzamanlı analizlerini birleştirme (single-flight).
+
+Çift tıklama veya aynı şubeden aynı IZE dosyasının aynı anda yüklenmesi
+durumunda OCR ve LLM yalnızca bir kez çalışır. Anahtar PDF'in SHA-256
+özeti ile şube (şube yoksa kullanıcı) birleşimidir. Dönen case liderin
+kaydıdır; başka kullanıcılar için kendi case kopyasını kaydetmek ve krediyi
+düşmek çağıranın işidir (bkz. case_analysis.run_case_analysis).
+
+Süreç içinde sonraki çağıranlar çalışan analizin future'ına bağlanır.
+Süreçler/worker'lar arası koordinasyon `analysis_locks` koleksiyonundaki
+kiralık (lease) kayıtla yapılır: kirayı alan analiz eder, diğerleri kayıt
+tamamlanınca aynı case'i döndürür. Lider çökerse kira dolar ve bekleyenlerden
+biri analizi devralır.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from models.case import IZECase
+
+logger = logging.getLogger(__name__)
+
+COALESCE_LEASE_SECONDS = int(os.environ.get("ANALYSIS_COALESCE_LEASE_SECONDS", "180"))
+# Tamamlanan analizin aynı anahtar için yeniden kullanılacağı süre (çift tıklama penceresi)
+COALESCE_REUSE_SECONDS = int(os.environ.get("ANALYSIS_COALESCE_REUSE_SECONDS", "60"))
+COALESCE_POLL_SECONDS = 1.0
+
+LOCK_STATUS_RUNNING = "running"
+LOCK_STATUS_COMPLETED = "completed"
+
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def pdf_fingerprint(pdf_content: bytes) -> str:
+    """PDF içeriğinin SHA-256 özeti."""
+    return hashlib.sha256(pdf_content).hexdigest()
+
+
+def coalesce_key(user: dict, branch: Optional[str], pdf_sha256: str) -> str:
+    """Birleştirme anahtarı: aynı şubedeki (şube yoksa aynı kullanıcının) aynı PDF'i."""
+    scope = f"branch:{branch}" if branch else f"user:{user['id']}"
+    return f"{scope}:{pdf_sha256}"
+
+
+async def run_coalesced(
+    key: str,
+    case_id: str,
+    analyze: Callable[[], Awaitable[IZECase]],
+) -> Tuple[IZECase, bool]:
+    """
+    Aynı anahtarlı analizleri tek çalıştırmada birleştirir.
+
+    Dönüş: (case, lider_mi). Lider olmayan çağıranlar analiz etmez ve kredi
+    düşmemelidir.
+    """
+    running = _inflight.get(key)
+    while running is not None:
+        logger.info(f"Analiz birleştirildi (süreç içi): {key}")
+        try:
+            ize_case, _ = await asyncio.shield(running)
+            return ize_case, False
+        except asyncio.CancelledError:
+            # Lider iptal edildiyse analizi bu çağıran üstlenir
+            if not running.cancelled():
+                raise
+        running = _inflight.get(key)
+
+    future = asyncio.get_running_loop().create_future()
+    # Bekleyen yoksa future'daki hata "retrieved" sayılsın
+    future.add_done_callback(lambda done: done.cancelled() or done.exception())
+    _inflight[key] = future
+    try:
+        result = await _run_with_lock(key, case_id, analyze)
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+async def _acquire_lock(key: str, token: str, case_id: str) -> Tuple[bool, Optional[dict]]:
+    """Kirayı almaya çalışır; alınamazsa mevcut kilit kaydını döndürür."""
+    now = _now()
+    lock = {
+        "key": key,
+        "token": token,
+        "status": LOCK_STATUS_RUNNING,
+        "case_id": case_id,
+        "lease_expires_at": (now + timedelta(seconds=COALESCE_LEASE_SECONDS)).isoformat(),
+        "reuse_until": None,
+        # TTL indeksi için BSON tarih; süresi dolan kilitler Mongo tarafından silinir
+        "expires_at": now + timedelta(seconds=COALESCE_LEASE_SECONDS),
+        "created_at": now.isoformat(),
+    }
+    try:
+        await db.analysis_locks.insert_one(dict(lock))
+        return True, None
+    except DuplicateKeyError:
+        pass
+
+    now_iso = now.isoformat()
+    previous = await db.analysis_locks.find_one_and_update(
+        {
+            "key": key,
+            "$or": [
+                {"status": LOCK_STATUS_RUNNING, "lease_expires_at": {"$lt": now_iso}},
+                {"status": LOCK_STATUS_COMPLETED, "reuse_until": {"$lt": now_iso}},
+            ],
+        },
+        {"$set": lock},
+    )
+    if previous is not None:
+        return True, None
+    return False, await db.analysis_locks.find_one({"key": key}, {"_id": 0})
+
+
+async def _keep_lock_alive(key: str, token: str) -> None:
+    while True:
+        await asyncio.sleep(max(COALESCE_LEASE_SECONDS / 3, 1))
+        now = _now()
+        await db.analysis_locks.update_one(
+            {"key": key, "token": token, "status": LOCK_STATUS_RUNNING},
+            {"$set": {
+                "lease_expires_at": (now + timedelta(seconds=COALESCE_LEASE_SECONDS)).isoformat(),
+                "expires_at": now + timedelta(seconds=COALESCE_LEASE_SECONDS),
+            }},
+        )
+
+
+async def _run_with_lock(
+    key: str,
+    case_id: str,
+    analyze: Callable[[], Awaitable[IZECase]],
+) -> Tuple[IZECase, bool]:
+    token = uuid.uuid4().hex
+    while True:
+        acquired, lock = await _acquire_lock(key, token, case_id)
+
+        if acquired:
+            renew_task = asyncio.create_task(_keep_lock_alive(key, token))
+            try:
+                ize_case = await analyze()
+            except BaseException:
+                # Bekleyen diğer süreçler analizi kendileri denesin
+                await db.analysis_locks.delete_one({"key": key, "token": token})
+                raise
+            finally:
+                renew_task.cancel()
+
+            reuse_until = _now() + timedelta(seconds=COALESCE_REUSE_SECONDS)
+            await db.analysis_locks.update_one(
+                {"key": key, "token": token},
+                {"$set": {
+                    "status": LOCK_STATUS_COMPLETED,
+                    "case_id": ize_case.id,
+                    "reuse_until": reuse_until.isoformat(),
+                    "expires_at": reuse_until,
+                }},
+            )
+            return ize_case, True
+
+        if lock and lock.get("status") == LOCK_STATUS_COMPLETED:
+            case_doc = await db.ize_cases.find_one({"id": lock["case_id"]}, {"_id": 0})
+            if case_doc:
+                logger.info(f"Analiz birleştirildi (kilit): {key} -> {lock['case_id']}")
+                return IZECase(**case_doc), False
+            # Sonuç case'i silinmiş; kilidi bırak ve yeniden analiz et
+            await db.analysis_locks.delete_one({"key": key, "token": lock.get("token")})
+            continue
+
+        if lock is not None:
+            await asyncio.sleep(COALESCE_POLL_SECONDS)
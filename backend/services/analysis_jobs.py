@@ -0,0 +1,335 @@
+"""
+Mongo üzerinde kiralama (lease) tabanlı IZE analiz job kuyruğu.
+
+Route PDF'i diske yazıp job kaydı oluşturur ve hemen döner. Worker'lar
+`analysis_jobs` koleksiyonundan job'ları atomik olarak kiralar, süre dolmadan
+kirayı yeniler ve bitince sonucu yazar. Çöken bir worker'ın job'ı kira süresi
+dolunca başka bir worker tarafından yeniden alınır.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from database import db
+from services.analysis_progress import ProgressReporter
+from services.budget_governor import BudgetExhausted
+from models.job import (
+    AnalysisJob,
+    JOB_STATUS_QUEUED,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_FAILED,
+)
+from services.case_analysis import (
+    run_case_analysis,
+    reserve_analysis_credits,
+    refund_analysis_credits,
+    ANALYSIS_OCR_CONCURRENCY,
+    ANALYSIS_LLM_CONCURRENCY,
+)
+from services.pdf_storage import read_stored_pdf
+
+logger = logging.getLogger(__name__)
+
+JOB_LEASE_SECONDS = int(os.environ.get("ANALYSIS_JOB_LEASE_SECONDS", "120"))
+JOB_POLL_INTERVAL_SECONDS = float(os.environ.get("ANALYSIS_JOB_POLL_INTERVAL", "2"))
+# Varsayılan worker sayısı OCR ve LLM aşamalarını aynı anda doyuracak kadardır
+ANALYSIS_WORKER_COUNT = int(
+    os.environ.get("ANALYSIS_WORKERS", str(ANALYSIS_OCR_CONCURRENCY + ANALYSIS_LLM_CONCURRENCY))
+)
+
+# Aynı süreçteki worker'ları yeni job eklendiğinde hemen uyandırmak için
+_job_available = asyncio.Event()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_deadline() -> str:
+    return (_now() + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+
+
+async def enqueue_analysis_job(
+    user: dict,
+    pdf_file_name: str,
+    pdf_storage_name: str,
+    branch: Optional[str] = None,
+    batch_id: Optional[str] = None,
+    not_before: Optional[datetime] = None,
+    credit_reserved: bool = False,
+) -> AnalysisJob:
+    """Yeni bir analiz job'ı kuyruğa ekler (not_before verilirse o zamana kadar beklemede).
+
+    credit_reserved: kullanıcının kredisi reserve_analysis_credits ile ayrıldı.
+    """
+    job = AnalysisJob(
+        user_id=user['id'],
+        branch=branch or user.get('branch', ''),
+        pdf_file_name=pdf_file_name,
+        pdf_storage_name=pdf_storage_name,
+        batch_id=batch_id,
+        not_before=not_before,
+        credit_reserved=credit_reserved,
+    )
+
+    doc = job.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    doc['updated_at'] = doc['updated_at'].isoformat()
+    if doc['not_before']:
+        doc['not_before'] = doc['not_before'].isoformat()
+
+    await db.analysis_jobs.insert_one(doc)
+    _job_available.set()
+    logger.info(f"Analiz job'ı kuyruğa eklendi: {job.id} (User: {user.get('email')})")
+    return job
+
+
+async def get_analysis_job(job_id: str) -> Optional[dict]:
+    return await db.analysis_jobs.find_one({"id": job_id}, {"_id": 0})
+
+
+async def claim_next_job(worker_id: str) -> Optional[dict]:
+    """Bekleyen veya kirası dolmuş en eski job'ı atomik olarak kiralar."""
+    now_iso = _now().isoformat()
+    return await db.analysis_jobs.find_one_and_update(
+        {
+            "$and": [
+                {"$or": [
+                    {"status": JOB_STATUS_QUEUED},
+                    {"status": JOB_STATUS_RUNNING, "lease_expires_at": {"$lt": now_iso}},
+                ]},
+                # Bütçe nedeniyle ertelenen job'lar zamanı gelene kadar alınmaz
+                {"$or": [{"not_before": None}, {"not_before": {"$lte": now_iso}}]},
+            ]
+        },
+        {
+            "$set": {
+                "status": JOB_STATUS_RUNNING,
+                "lease_owner": worker_id,
+                "lease_expires_at": _lease_deadline(),
+                "started_at": now_iso,
+                "updated_at": now_iso,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def _renew_lease(job_id: str, worker_id: str) -> bool:
+    result = await db.analysis_jobs.update_one(
+        {"id": job_id, "lease_owner": worker_id, "status": JOB_STATUS_RUNNING},
+        {"$set": {"lease_expires_at": _lease_deadline(), "updated_at": _now().isoformat()}},
+    )
+    return result.modified_count == 1
+
+
+async def _finish_job(job_id: str, worker_id: str, update: dict) -> None:
+    now_iso = _now().isoformat()
+    update = {**update, "updated_at": now_iso, "completed_at": now_iso, "lease_expires_at": None}
+    await db.analysis_jobs.update_one(
+        {"id": job_id, "lease_owner": worker_id},
+        {"$set": update},
+    )
+
+
+async def _keep_lease_alive(job_id: str, worker_id: str) -> None:
+    while True:
+        await asyncio.sleep(max(JOB_LEASE_SECONDS / 3, 1))
+        if not await _renew_lease(job_id, worker_id):
+            logger.warning(f"Job kirası yenilenemedi: {job_id} (worker: {worker_id})")
+            return
+
+
+async def process_job(job: dict, worker_id: str) -> None:
+    """Kiralanan tek bir job'ı çalıştırır ve sonucunu kaydeder."""
+    job_id = job['id']
+
+    if job.get('attempts', 0) > job.get('max_attempts', 3):
+        await _finish_job(job_id, worker_id, {
+            "status": JOB_STATUS_FAILED,
+            "error": "Maksimum deneme sayısı aşıldı",
+        })
+        await _refund_job_credit(job)
+        return
+
+    # Önceki deneme case'i kaydedip job'ı kapatamadan çökmüşse tekrar analiz etme
+    existing_case = await db.ize_cases.find_one({"id": job['case_id']}, {"_id": 0, "id": 1})
+    if existing_case:
+        await _finish_job(job_id, worker_id, {"status": JOB_STATUS_COMPLETED, "error": None})
+        return
+
+    previous_seq = max((event.get("seq", 0) for event in job.get("progress_events", [])), default=0)
+    progress = ProgressReporter(job_id, job['user_id'], persist_job_id=job_id, start_seq=previous_seq)
+    progress.emit("job_started", attempt=job.get('attempts', 0), worker=worker_id)
+
+    lease_task = asyncio.create_task(_keep_lease_alive(job_id, worker_id))
+    try:
+        user = await db.users.find_one({"id": job['user_id']}, {"_id": 0})
+        if not user or not user.get("is_active"):
+            raise HTTPException(status_code=400, detail="Kullanıcı bulunamadı veya pasif durumda")
+        if not job.get('credit_reserved') and await reserve_analysis_credits(user):
+            # Krediyi ayırmadan kuyruğa alınmış job: OCR/LLM'den önce ayrılır, yetmezse 403 ile biter
+            await db.analysis_jobs.update_one({"id": job_id}, {"$set": {"credit_reserved": True}})
+            job['credit_reserved'] = True
+
+        pdf_content = await asyncio.to_thread(read_stored_pdf, job['pdf_storage_name'])
+        ize_case = await run_case_analysis(
+            current_user=user,
+            pdf_content=pdf_content,
+            pdf_file_name=job['pdf_file_name'],
+            pdf_storage_name=job['pdf_storage_name'],
+            branch=job.get('branch'),
+            case_id=job['case_id'],
+            progress=progress,
+            credit_reserved=job.get('credit_reserved', False),
+        )
+        # Eşzamanlı aynı PDF birleştirildiyse case başka bir analizden gelir
+        await _finish_job(job_id, worker_id, {"status": JOB_STATUS_COMPLETED, "error": None, "case_id": ize_case.id})
+        progress.emit("completed", case_id=ize_case.id, timings=progress.timings)
+        logger.info(f"Analiz job'ı tamamlandı: {job_id}")
+    except BudgetExhausted as exc:
+        # Bütçe dönemi sıfırlanınca tekrar denenir; deneme hakkı harcanmaz
+        progress.emit("budget_deferred", retry_at=exc.retry_at.isoformat(), reason=exc.reason)
+        await _defer_job(job_id, worker_id, exc.retry_at, str(exc.detail))
+        logger.info(f"Analiz job'ı bütçe nedeniyle ertelendi: {job_id} -> {exc.retry_at.isoformat()}")
+    except HTTPException as exc:
+        # İstemci kaynaklı hatalar (ör. okunamayan PDF) tekrar denenmez
+        retryable = exc.status_code == 429 or exc.status_code >= 500
+        if retryable and job.get('attempts', 0) < job.get('max_attempts', 3):
+            progress.emit("retry_scheduled", error=str(exc.detail), status_code=exc.status_code)
+            await _release_for_retry(job_id, worker_id, str(exc.detail))
+        else:
+            await _finish_job(job_id, worker_id, {
+                "status": JOB_STATUS_FAILED,
+                "error": str(exc.detail),
+                "error_status_code": exc.status_code,
+            })
+            await _refund_job_credit(job)
+            progress.emit("failed", error=str(exc.detail), status_code=exc.status_code)
+        logger.warning(f"Analiz job'ı başarısız: {job_id} - {exc.detail}")
+    except Exception as exc:
+        if job.get('attempts', 0) < job.get('max_attempts', 3):
+            progress.emit("retry_scheduled", error=str(exc), status_code=500)
+            await _release_for_retry(job_id, worker_id, str(exc))
+        else:
+            await _finish_job(job_id, worker_id, {
+                "status": JOB_STATUS_FAILED,
+                "error": str(exc),
+                "error_status_code": 500,
+            })
+            await _refund_job_credit(job)
+            progress.emit("failed", error=str(exc), status_code=500)
+        logger.exception(f"Analiz job'ı beklenmeyen hata: {job_id}")
+    finally:
+        lease_task.cancel()
+
+
+async def _refund_job_credit(job: dict) -> None:
+    """Kalıcı olarak başarısız olan job'ın ayrılmış kredisini bir kez iade eder."""
+    try:
+        if await db.ize_cases.find_one({"id": job['case_id']}, {"_id": 1}):
+            # Case kaydedildi; kredi kullanıldı
+            return
+        result = await db.analysis_jobs.update_one(
+            {"id": job['id'], "credit_reserved": True},
+            {"$set": {"credit_reserved": False}},
+        )
+        if result.modified_count:
+            await refund_analysis_credits(job['user_id'])
+            logger.info(f"Başarısız job'ın kredisi iade edildi: {job['id']}")
+    except Exception as exc:
+        logger.error(f"Job kredisi iade edilemedi: {job['id']} - {exc}")
+
+
+async def _release_for_retry(job_id: str, worker_id: str, error: str) -> None:
+    await db.analysis_jobs.update_one(
+        {"id": job_id, "lease_owner": worker_id},
+        {"$set": {
+            "status": JOB_STATUS_QUEUED,
+            "error": error,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "updated_at": _now().isoformat(),
+        }},
+    )
+    _job_available.set()
+
+
+async def _defer_job(job_id: str, worker_id: str, not_before: datetime, reason: str) -> None:
+    await db.analysis_jobs.update_one(
+        {"id": job_id, "lease_owner": worker_id},
+        {
+            "$set": {
+                "status": JOB_STATUS_QUEUED,
+                "error": reason,
+                "not_before": not_before.isoformat(),
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "updated_at": _now().isoformat(),
+            },
+            "$inc": {"attempts": -1},
+        },
+    )
+
+
+class AnalysisWorkerPool:
+    """Kuyruktaki analiz job'larını işleyen asyncio worker havuzu."""
+
+    def __init__(self, worker_count: int = ANALYSIS_WORKER_COUNT):
+        self.worker_count = worker_count
+        self.instance_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def _worker_loop(self, worker_id: str) -> None:
+        while not self._stopping:
+            try:
+                job = await claim_next_job(worker_id)
+            except Exception as exc:
+                logger.error(f"Job kiralanamadı ({worker_id}): {exc}")
+                job = None
+
+            if job is None:
+                _job_available.clear()
+                try:
+                    await asyncio.wait_for(_job_available.wait(), timeout=JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await process_job(job, worker_id)
+
+    def start(self) -> None:
+        if self._tasks or self.worker_count <= 0:
+            return
+        self._stopping = False
+        for idx in range(self.worker_count):
+            worker_id = f"{self.instance_id}-w{idx + 1}"
+            self._tasks.append(asyncio.create_task(self._worker_loop(worker_id)))
+        logger.info(f"Analiz worker havuzu başlatıldı: {self.worker_count} worker ({self.instance_id})")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def run_forever(self) -> None:
+        """Ayrı worker sürecinde havuzu çalıştırır."""
+        self.start()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+worker_pool = AnalysisWorkerPool()
@@ -0,0 +1,245 @@
+"""
+Analiz ilerleme olayları (Server-Sent Events için).
+
+Analiz hattı bir ProgressReporter üzerinden aşama olayları yayınlar: PDF
+saklandı, sayfa çıkarıldı/OCR yapıldı, LLM denemesi başladı, sağlayıcı
+değişti, case kaydedildi, e-posta kuyruğa alındı. Olaylar süreç içindeki
+kanallara dağıtılır; job'lar için aşama olayları ayrıca Mongo'daki job
+kaydına yazılır, böylece başka bir süreçteki worker'ın ilerlemesi de
+izlenebilir. LLM token parçaları (llm_delta) yalnızca süreç içinde yayınlanır.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Kalıcı olarak job kaydında tutulacak en fazla olay sayısı
+MAX_PERSISTED_EVENTS = 200
+# Tamamlanan kanalın geç bağlanan istemciler için bellekte tutulma süresi
+CHANNEL_RETENTION_SECONDS = 120
+SSE_HEARTBEAT_SECONDS = 15
+
+TERMINAL_STAGES = {"completed", "failed"}
+TRANSIENT_STAGES = {"llm_delta"}
+# Job yeniden kuyruğa alındığında veya bütçe nedeniyle ertelendiğinde kanal kapanır;
+# sonraki deneme başka süreçte olabilir
+DETACH_STAGES = {"retry_scheduled", "budget_deferred"}
+
+
+class _Channel:
+    def __init__(self, channel_id: str, user_id: Optional[str]):
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.history: List[dict] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.closed = False
+
+
+_channels: Dict[str, _Channel] = {}
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> None:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+def get_channel_owner(channel_id: str) -> Optional[str]:
+    channel = _channels.get(channel_id)
+    return channel.user_id if channel else None
+
+
+def has_channel(channel_id: str) -> bool:
+    return channel_id in _channels
+
+
+class ProgressReporter:
+    """Bir analiz çalışmasının ilerleme olaylarını yayınlar."""
+
+    def __init__(
+        self,
+        channel_id: str,
+        user_id: Optional[str] = None,
+        persist_job_id: Optional[str] = None,
+        start_seq: int = 0,
+    ):
+        self.channel_id = channel_id
+        self.persist_job_id = persist_job_id
+        self._started = time.perf_counter()
+        self._last_stage_at = self._started
+        # Yeniden denenen job'larda sıra numarası önceki denemenin devamıdır
+        self._seq = start_seq
+        self._loop = asyncio.get_running_loop()
+        self.timings: Dict[str, float] = {}
+
+        self._channel = _channels.get(channel_id)
+        if self._channel is None or self._channel.closed:
+            self._channel = _Channel(channel_id, user_id)
+            _channels[channel_id] = self._channel
+
+    def emit(self, stage: str, **data) -> None:
+        """Aşama olayı yayınlar (event loop thread'inden çağrılmalı)."""
+        now = time.perf_counter()
+        self._seq += 1
+        event = {
+            "seq": self._seq,
+            "stage": stage,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "elapsed_ms": round((now - self._started) * 1000, 1),
+            **data,
+        }
+        if stage not in TRANSIENT_STAGES:
+            event["since_previous_ms"] = round((now - self._last_stage_at) * 1000, 1)
+            self._last_stage_at = now
+        self._publish(event)
+
+    def fail_if_open(self, error: str, status_code: int = 500) -> None:
+        """Kanal kapanmadıysa 'failed' yayınlar; iptal gibi beklenmedik çıkışlarda kanal sızmaz."""
+        if not self._channel.closed:
+            self.emit("failed", error=error, status_code=status_code)
+
+    def emit_threadsafe(self, stage: str, **data) -> None:
+        """Worker thread'lerinden (ör. PDF çıkarma) güvenli olay yayını."""
+        self._loop.call_soon_threadsafe(lambda: self.emit(stage, **data))
+
+    def delta(self, text: str) -> None:
+        """LLM'in ürettiği yanıt parçasını yayınlar."""
+        if text:
+            self.emit("llm_delta", text=text)
+
+    def record_timing(self, name: str, started_at: float) -> None:
+        """Ana aşama sürelerini (ms) raporlama için biriktirir."""
+        self.timings[name] = round((time.perf_counter() - started_at) * 1000, 1)
+
+    def _publish(self, event: dict) -> None:
+        channel = self._channel
+        if event["stage"] not in TRANSIENT_STAGES:
+            channel.history.append(event)
+            if self.persist_job_id:
+                _spawn(_persist_event(self.persist_job_id, event))
+
+        for queue in list(channel.subscribers):
+            queue.put_nowait(event)
+
+        if event["stage"] in TERMINAL_STAGES:
+            channel.closed = True
+            self._loop.call_later(CHANNEL_RETENTION_SECONDS, _drop_channel, self.channel_id, channel)
+        elif event["stage"] in DETACH_STAGES:
+            channel.closed = True
+            _drop_channel(self.channel_id, channel)
+
+
+def _drop_channel(channel_id: str, channel: _Channel) -> None:
+    if _channels.get(channel_id) is channel:
+        del _channels[channel_id]
+
+
+async def _persist_event(job_id: str, event: dict) -> None:
+    try:
+        await db.analysis_jobs.update_one(
+            {"id": job_id},
+            {"$push": {"progress_events": {"$each": [event], "$slice": -MAX_PERSISTED_EVENTS}}},
+        )
+    except Exception as exc:
+        logger.warning(f"İlerleme olayı kaydedilemedi ({job_id}): {exc}")
+
+
+def emit(reporter: Optional[ProgressReporter], stage: str, **data) -> None:
+    """Reporter varsa olay yayınlar; ilerleme takibi isteğe bağlıdır."""
+    if reporter is not None:
+        reporter.emit(stage, **data)
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['stage']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def _iter_channel(channel: _Channel, after_seq: int) -> AsyncIterator[Optional[dict]]:
+    """Kanal geçmişini ve yeni olayları sırayla döndürür; None heartbeat demektir."""
+    queue: asyncio.Queue = asyncio.Queue()
+    channel.subscribers.add(queue)
+    try:
+        last_seq = after_seq
+        for event in list(channel.history):
+            if event["seq"] > last_seq:
+                last_seq = event["seq"]
+                yield event
+                if event["stage"] in TERMINAL_STAGES or event["stage"] in DETACH_STAGES:
+                    return
+
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if event["seq"] <= last_seq:
+                continue
+            last_seq = event["seq"]
+            yield event
+            if event["stage"] in TERMINAL_STAGES or event["stage"] in DETACH_STAGES:
+                return
+    finally:
+        channel.subscribers.discard(queue)
+
+
+async def stream_channel(channel_id: str, after_seq: int = 0) -> AsyncIterator[str]:
+    """Süreç içindeki kanalın geçmişini ve yeni olaylarını SSE olarak akıtır."""
+    channel = _channels.get(channel_id)
+    if channel is None:
+        return
+    async for event in _iter_channel(channel, after_seq):
+        yield format_sse(event) if event else ": keep-alive\n\n"
+
+
+async def stream_job_events(job_id: str, after_seq: int = 0, poll_interval: float = 1.0) -> AsyncIterator[str]:
+    """
+    Job olaylarını SSE olarak akıtır.
+
+    Job bu süreçte çalışıyorsa canlı kanala (LLM token parçaları dahil)
+    bağlanır; değilse Mongo'daki kayıtlı aşama olaylarını yoklar.
+    """
+    last_seq = after_seq
+    idle_seconds = 0.0
+    while True:
+        channel = _channels.get(job_id)
+        if channel is not None:
+            async for event in _iter_channel(channel, last_seq):
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["stage"] not in TRANSIENT_STAGES:
+                    last_seq = event["seq"]
+                yield format_sse(event)
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+            continue
+
+        job = await db.analysis_jobs.find_one({"id": job_id}, {"_id": 0, "progress_events": 1, "status": 1})
+        if not job:
+            return
+
+        events = sorted(job.get("progress_events", []), key=lambda item: item.get("seq", 0))
+        for event in events:
+            if event.get("seq", 0) > last_seq:
+                last_seq = event["seq"]
+                idle_seconds = 0.0
+                yield format_sse(event)
+                if event.get("stage") in TERMINAL_STAGES:
+                    return
+
+        if job.get("status") in TERMINAL_STAGES:
+            return
+
+        await asyncio.sleep(poll_interval)
+        idle_seconds += poll_interval
+        if idle_seconds >= SSE_HEARTBEAT_SECONDS:
+            idle_seconds = 0.0
+            yield ": keep-alive\n\n"
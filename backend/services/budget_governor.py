@@ -0,0 +1,258 @@
+"""
+LLM token / maliyet bütçesi yönetimi.
+
+Limitler (`llm_budget_limits`) kullanıcı, şube veya sağlayıcı bazında günlük
+ya da aylık token ve USD tavanı tanımlar. Harcama her analizden sonra
+`llm_budget_usage` koleksiyonundaki dönem sayaçlarına tek bulk_write ile
+atomik `$inc` olarak yazılır.
+
+Analiz LLM çağrısından önce kontrol edilir:
+- kullanıcı/şube bütçesi dolmuşsa limitin on_exhausted değerine göre analiz
+  ucuz modele düşürülür (degrade) ya da dönem sonuna ertelenir (queue),
+- sağlayıcı bütçesi dolmuşsa o sağlayıcı atlanır; hiçbiri kalmazsa ertelenir.
+
+Limitler ve sayaçlar kısa süre süreç belleğinde tutulur; her analizde Mongo
+sorgusu yapılmaz. Eşzamanlı analizler limiti bir analiz kadar aşabilir
+(yumuşak limit).
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from database import db
+from models.budget import (
+    BUDGET_SCOPE_ANY,
+    BUDGET_SCOPE_BRANCH,
+    BUDGET_SCOPE_PROVIDER,
+    BUDGET_SCOPE_USER,
+)
+
+logger = logging.getLogger(__name__)
+
+BUDGET_ACTION_ALLOW = "allow"
+BUDGET_ACTION_DEGRADE = "degrade"
+BUDGET_ACTION_QUEUE = "queue"
+
+LIMITS_CACHE_SECONDS = 30
+USAGE_CACHE_SECONDS = 5
+# Sayaçlar dönem bitiminden bu kadar sonra TTL ile silinir
+USAGE_RETENTION_DAYS = 40
+
+PERIODS = ("daily", "monthly")
+
+_limits_cache: Tuple[float, List[dict]] = (0.0, [])
+_usage_cache: Dict[str, Tuple[float, Dict[str, float]]] = {}
+
+
+class BudgetExhausted(HTTPException):
+    """Bütçe dolduğu için analiz retry_at zamanına ertelenmelidir."""
+
+    def __init__(self, retry_at: datetime, reason: str):
+        self.retry_at = retry_at
+        self.reason = reason
+        super().__init__(
+            status_code=429,
+            detail=f"LLM bütçesi doldu ({reason}). Analiz {retry_at.isoformat()} sonrasına ertelendi.",
+            headers={"Retry-After": str(max(int((retry_at - _now()).total_seconds()), 1))},
+        )
+
+
+@dataclass
+class BudgetDecision:
+    action: str = BUDGET_ACTION_ALLOW
+    exhausted: List[str] = field(default_factory=list)
+    excluded_providers: Set[str] = field(default_factory=set)
+    retry_at: Optional[datetime] = None
+
+    @property
+    def degraded(self) -> bool:
+        return self.action == BUDGET_ACTION_DEGRADE
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def period_key(period: str, moment: Optional[datetime] = None) -> str:
+    moment = moment or _now()
+    return moment.strftime("%Y-%m-%d") if period == "daily" else moment.strftime("%Y-%m")
+
+
+def period_end(period: str, moment: Optional[datetime] = None) -> datetime:
+    """Dönemin bittiği (sayacın sıfırlandığı) UTC zamanı."""
+    moment = moment or _now()
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "daily":
+        return start + timedelta(days=1)
+    start = start.replace(day=1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def usage_key(scope: str, scope_id: str, period: str, moment: Optional[datetime] = None) -> str:
+    return f"{scope}:{scope_id}:{period}:{period_key(period, moment)}"
+
+
+def invalidate_limits_cache() -> None:
+    global _limits_cache
+    _limits_cache = (0.0, [])
+
+
+async def _active_limits() -> List[dict]:
+    global _limits_cache
+    fetched_at, limits = _limits_cache
+    if time.monotonic() - fetched_at < LIMITS_CACHE_SECONDS:
+        return limits
+    limits = await db.llm_budget_limits.find({"is_active": True}, {"_id": 0}).to_list(1000)
+    _limits_cache = (time.monotonic(), limits)
+    return limits
+
+
+def _subjects(limit: dict, user: dict, branch: Optional[str], providers: Iterable[str]) -> List[str]:
+    """Limitin bu analizde uygulandığı kapsam kimlikleri."""
+    scope, scope_id = limit["scope"], limit.get("scope_id", BUDGET_SCOPE_ANY)
+    if scope == BUDGET_SCOPE_USER:
+        candidates = [user["id"]]
+    elif scope == BUDGET_SCOPE_BRANCH:
+        candidates = [branch] if branch else []
+    else:
+        candidates = list(providers)
+    return [candidate for candidate in candidates if scope_id in (BUDGET_SCOPE_ANY, candidate)]
+
+
+async def _usage_for(keys: List[str]) -> Dict[str, Dict[str, float]]:
+    now = time.monotonic()
+    result = {key: _usage_cache[key][1] for key in keys if key in _usage_cache and now - _usage_cache[key][0] < USAGE_CACHE_SECONDS}
+    missing = [key for key in keys if key not in result]
+    if missing:
+        docs = await db.llm_budget_usage.find(
+            {"key": {"$in": missing}}, {"_id": 0, "key": 1, "tokens": 1, "cost_usd": 1}
+        ).to_list(len(missing))
+        fetched = {doc["key"]: {"tokens": doc.get("tokens", 0), "cost_usd": doc.get("cost_usd", 0.0)} for doc in docs}
+        for key in missing:
+            usage = fetched.get(key, {"tokens": 0, "cost_usd": 0.0})
+            _usage_cache[key] = (now, usage)
+            result[key] = usage
+    return result
+
+
+def _is_exhausted(limit: dict, usage: Dict[str, float]) -> bool:
+    if limit.get("max_tokens") is not None and usage["tokens"] >= limit["max_tokens"]:
+        return True
+    if limit.get("max_cost_usd") is not None and usage["cost_usd"] >= limit["max_cost_usd"]:
+        return True
+    return False
+
+
+async def check_budget(user: dict, branch: Optional[str], providers: Iterable[str]) -> BudgetDecision:
+    """
+    LLM çağrısından önce bütçeleri kontrol eder.
+
+    Dönen karar analizin normal mi, ucuz modelle mi yapılacağını ve hangi
+    sağlayıcıların atlanacağını belirtir; ertelenmesi gerekiyorsa
+    BudgetExhausted fırlatır.
+    """
+    providers = list(providers)
+    limits = await _active_limits()
+    if not limits:
+        return BudgetDecision()
+
+    applicable = [(limit, subject) for limit in limits for subject in _subjects(limit, user, branch, providers)]
+    usage = await _usage_for(sorted({usage_key(limit["scope"], subject, limit["period"]) for limit, subject in applicable}))
+
+    decision = BudgetDecision()
+    queue_until: Optional[datetime] = None
+    for limit, subject in applicable:
+        if not _is_exhausted(limit, usage[usage_key(limit["scope"], subject, limit["period"])]):
+            continue
+        label = f"{limit['scope']}:{subject}:{limit['period']}"
+        decision.exhausted.append(label)
+        if limit["scope"] == BUDGET_SCOPE_PROVIDER:
+            decision.excluded_providers.add(subject)
+            continue
+        if limit.get("on_exhausted") == BUDGET_ACTION_QUEUE:
+            reset_at = period_end(limit["period"])
+            queue_until = max(queue_until, reset_at) if queue_until else reset_at
+        else:
+            decision.action = BUDGET_ACTION_DEGRADE
+
+    if queue_until is None and providers and decision.excluded_providers >= set(providers):
+        # Bütçesi kalan sağlayıcı yok; en erken sıfırlanan sağlayıcı dönemine ertelenir
+        queue_until = min(
+            period_end(limit["period"]) for limit, subject in applicable if subject in decision.excluded_providers
+            and limit["scope"] == BUDGET_SCOPE_PROVIDER
+        )
+    if queue_until is not None:
+        raise BudgetExhausted(queue_until, ", ".join(decision.exhausted))
+
+    if decision.exhausted:
+        logger.info(f"LLM bütçesi dolu: {', '.join(decision.exhausted)} -> {decision.action}")
+    return decision
+
+
+async def record_usage(
+    user: dict,
+    branch: Optional[str],
+    provider: Optional[str],
+    tokens: int,
+    cost_usd: Optional[float],
+) -> None:
+    """Analiz harcamasını tüm kapsam ve dönem sayaçlarına atomik olarak ekler."""
+    moment = _now()
+    subjects = [(BUDGET_SCOPE_USER, user["id"])]
+    if branch:
+        subjects.append((BUDGET_SCOPE_BRANCH, branch))
+    if provider:
+        subjects.append((BUDGET_SCOPE_PROVIDER, provider))
+
+    cost = float(cost_usd or 0.0)
+    now_iso = moment.isoformat()
+    operations = []
+    for scope, scope_id in subjects:
+        for period in PERIODS:
+            key = usage_key(scope, scope_id, period, moment)
+            operations.append(UpdateOne(
+                {"key": key},
+                {
+                    "$inc": {"tokens": tokens, "cost_usd": cost, "analyses": 1},
+                    "$set": {"updated_at": now_iso},
+                    "$setOnInsert": {
+                        "scope": scope,
+                        "scope_id": scope_id,
+                        "period": period,
+                        "period_key": period_key(period, moment),
+                        # TTL indeksi için BSON tarih
+                        "expires_at": period_end(period, moment) + timedelta(days=USAGE_RETENTION_DAYS),
+                    },
+                },
+                upsert=True,
+            ))
+            # Önbellekteki sayaç da güncellenir; sonraki kontrol Mongo'ya gitmeden görür
+            cached = _usage_cache.get(key)
+            if cached:
+                cached[1]["tokens"] += tokens
+                cached[1]["cost_usd"] += cost
+    await db.llm_budget_usage.bulk_write(operations, ordered=False)
+
+
+async def get_budget_status(period: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Admin paneli için aktif dönem sayaçlarını limitleriyle birlikte döndürür."""
+    limits = await db.llm_budget_limits.find({"is_active": True}, {"_id": 0}).to_list(1000)
+    query: Dict[str, Any] = {"period_key": {"$in": [period_key(item) for item in PERIODS]}}
+    if period:
+        query["period"] = period
+    counters = await db.llm_budget_usage.find(query, {"_id": 0, "expires_at": 0}).sort("cost_usd", -1).to_list(1000)
+
+    for counter in counters:
+        counter["limits"] = [
+            {**limit, "exhausted": _is_exhausted(limit, counter)}
+            for limit in limits
+            if limit["scope"] == counter["scope"] and limit["period"] == counter["period"]
+            and limit.get("scope_id", BUDGET_SCOPE_ANY) in (BUDGET_SCOPE_ANY, counter["scope_id"])
+        ]
+        counter["resets_at"] = period_end(counter["period"]).isoformat()
+    return counters
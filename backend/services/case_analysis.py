@@ -0,0 +1,410 @@
+"""
+IZE PDF analiz hattı: metin çıkarma, AI analizi, case kaydı, kredi ve e-posta.
+
+Hem senkron /cases/analyze endpoint'i hem de arka plan job worker'ları bu
+modülü kullanır.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+from fastapi import HTTPException
+
+from database import db
+from models.case import IZECase
+from services.ai_analyzer import analyze_ize_with_ai
+from services.analysis_coalescing import coalesce_key, pdf_fingerprint, run_coalesced
+from services.analysis_progress import ProgressReporter, emit as emit_progress
+from services.budget_governor import check_budget, record_usage
+from services.case_search import search_fields
+from services.claim_fingerprints import build_fingerprint, find_duplicate_candidates, store_fingerprint
+from services.email import send_analysis_email, generate_email_subject, generate_email_body
+from services.llm_providers import configured_keys
+from services.pdf_processor import extract_text_from_pdf
+from services.pdf_storage import acquire_pdf, content_hash, release_pdfs
+from services.vehicle_history import record_case as record_vehicle_case
+
+logger = logging.getLogger(__name__)
+
+
+# Süreç başına eşzamanlı OCR/metin çıkarma ve LLM çağrısı sınırları
+ANALYSIS_OCR_CONCURRENCY = int(os.environ.get("ANALYSIS_OCR_CONCURRENCY", "2"))
+ANALYSIS_LLM_CONCURRENCY = int(os.environ.get("ANALYSIS_LLM_CONCURRENCY", "4"))
+_extraction_slots = asyncio.Semaphore(max(ANALYSIS_OCR_CONCURRENCY, 1))
+_llm_slots = asyncio.Semaphore(max(ANALYSIS_LLM_CONCURRENCY, 1))
+
+DEFAULT_WARRANTY_RULES = [{
+    'rule_version': "1.0",
+    'rule_text': "2 yıl içindeki araçlar garanti kapsamındadır. Üretim hatalarından kaynaklanan arızalar garanti kapsamındadır.",
+    'keywords': ["garanti", "warranty", "2 yıl", "üretim hatası"]
+}]
+
+# Arka planda gönderilen e-posta görevleri (GC tarafından toplanmasınlar diye)
+_email_tasks: Set[asyncio.Task] = set()
+
+
+def has_unlimited_analyses(user: dict) -> bool:
+    """Admin ve sınırsız kredili kullanıcılar kredi kontrolünden muaftır."""
+    return user.get('role') == 'admin' or user.get('has_unlimited_credits', False)
+
+
+def _credits_exhausted() -> HTTPException:
+    return HTTPException(
+        status_code=403,
+        detail="Analiz krediniz bitti. Lütfen kredi satın alın veya yönetici ile iletişime geçin."
+    )
+
+
+def ensure_analysis_credits(user: dict, count: int = 1) -> None:
+    """Kullanıcının count adet analiz için yeterli kredisi yoksa 403 fırlatır."""
+    if has_unlimited_analyses(user):
+        return
+    if user.get('free_analyses_remaining', 0) < count:
+        raise _credits_exhausted()
+
+
+async def reserve_analysis_credits(user: dict, count: int = 1) -> int:
+    """count adet krediyi atomik olarak ayırır ve ayrılan sayıyı döndürür; yetmezse 403."""
+    if has_unlimited_analyses(user):
+        return 0
+    result = await db.users.update_one(
+        {"id": user['id'], "free_analyses_remaining": {"$gte": count}},
+        {"$inc": {"free_analyses_remaining": -count}},
+    )
+    if result.modified_count == 0:
+        raise _credits_exhausted()
+    return count
+
+
+async def refund_analysis_credits(user_id: str, count: int = 1) -> None:
+    """Kullanılmayan ayrılmış kredileri iade eder."""
+    if count > 0:
+        await db.users.update_one({"id": user_id}, {"$inc": {"free_analyses_remaining": count}})
+
+
+async def run_case_analysis(
+    current_user: dict,
+    pdf_content: bytes,
+    pdf_file_name: str,
+    pdf_storage_name: str,
+    branch: Optional[str] = None,
+    case_id: Optional[str] = None,
+    progress: Optional[ProgressReporter] = None,
+    credit_reserved: bool = False,
+) -> IZECase:
+    """
+    PDF'i analiz eder, case'i kaydeder, krediyi düşer ve e-postayı kuyruğa alır.
+
+    credit_reserved ise kredi reserve_analysis_credits ile önceden ayrılmıştır;
+    case kaydında yeniden düşülmez, case oluşmazsa iadesi çağıranın işidir.
+
+    Aynı PDF için eşzamanlı çağrılar birleştirilir ve LLM analizi bir kez
+    yapılır. Aynı kullanıcının tekrar eden çağrıları aynı case'i alır ve
+    kredi düşmez; şubedeki başka bir kullanıcıya sonucun kendi case_id'si ve
+    user_id'siyle bir kopyası kaydedilir, krediden bir analiz düşer ve
+    e-postası gönderilir.
+    """
+    user_branch = branch or current_user.get('branch', '')
+    case_id = case_id or str(uuid.uuid4())
+    pdf_sha256 = pdf_fingerprint(pdf_content)
+
+    ize_case, is_leader = await run_coalesced(
+        coalesce_key(current_user, user_branch, pdf_sha256),
+        case_id,
+        lambda: _analyze_and_store(
+            current_user, pdf_content, pdf_file_name, pdf_storage_name,
+            user_branch, case_id, pdf_sha256, progress, credit_reserved,
+        ),
+    )
+    if not is_leader:
+        logger.info(f"Eşzamanlı aynı PDF analizi birleştirildi: {ize_case.id} (User: {current_user['email']})")
+        if ize_case.user_id != current_user['id']:
+            ize_case = await _store_follower_copy(
+                current_user, ize_case, pdf_content, pdf_file_name, pdf_storage_name,
+                user_branch, case_id, progress, credit_reserved,
+            )
+        elif credit_reserved:
+            # Aynı kullanıcının tekrar eden çağrısı ücretlendirilmez
+            await refund_analysis_credits(current_user['id'])
+        emit_progress(progress, "coalesced", case_id=ize_case.id)
+    return ize_case
+
+
+async def _store_follower_copy(
+    current_user: dict,
+    leader_case: IZECase,
+    pdf_content: bytes,
+    pdf_file_name: str,
+    pdf_storage_name: str,
+    user_branch: str,
+    case_id: str,
+    progress: Optional[ProgressReporter] = None,
+    credit_reserved: bool = False,
+) -> IZECase:
+    """Başka kullanıcının analiz sonucunu bu kullanıcının case'i olarak kaydeder."""
+    created_at = datetime.now(timezone.utc)
+    ize_case = leader_case.model_copy(update={
+        "id": case_id,
+        "user_id": current_user['id'],
+        "branch": user_branch,
+        "pdf_file_name": pdf_file_name,
+        "pdf_storage_name": pdf_storage_name,
+        "duplicate_candidates": [],
+        "is_archived": False,
+        "archived_at": None,
+        "created_at": created_at,
+        "month": created_at.month,
+        "year": created_at.year,
+    })
+    # LLM maliyeti lidere yazıldı; bütçe sayaçları tekrar artırılmaz
+    return await _store_case(
+        current_user, ize_case, ize_case.model_dump(), pdf_content, progress,
+        record_llm_usage=False, credit_reserved=credit_reserved,
+    )
+
+
+async def _analyze_and_store(
+    current_user: dict,
+    pdf_content: bytes,
+    pdf_file_name: str,
+    pdf_storage_name: str,
+    user_branch: str,
+    case_id: str,
+    pdf_sha256: str,
+    progress: Optional[ProgressReporter] = None,
+    credit_reserved: bool = False,
+) -> IZECase:
+
+    # Panel'deki API ayarlarını al
+    api_settings = await db.api_settings.find_one({"id": "api_settings"}, {"_id": 0})
+
+    # Bütçe OCR ve LLM'den önce kontrol edilir; ertelenecekse BudgetExhausted fırlar
+    budget = await check_budget(
+        current_user, user_branch, {provider for provider, _, _ in configured_keys(api_settings)}
+    )
+    if budget.exhausted:
+        emit_progress(progress, "budget_limited", action=budget.action, exhausted=budget.exhausted)
+
+    # Metni çıkar (CPU/OCR ağırlıklı; event loop'u bloklamaması için thread'de)
+    logger.info(f"PDF okunuyor: {pdf_file_name} (User: {current_user['email']})")
+    on_page = None
+    if progress:
+        on_page = lambda **page: progress.emit_threadsafe("page_extracted", **page)
+    async with _extraction_slots:
+        emit_progress(progress, "extraction_started", file_name=pdf_file_name)
+        extraction_started = time.perf_counter()
+        extracted_text = await asyncio.to_thread(extract_text_from_pdf, pdf_content, on_page)
+    if progress:
+        progress.record_timing("extraction_ms", extraction_started)
+
+    if not extracted_text or len(extracted_text) < 50:
+        raise HTTPException(status_code=400, detail="PDF'den yeterli metin çıkarılamadı")
+    emit_progress(progress, "extraction_completed", chars=len(extracted_text))
+
+    # Garanti kurallarını al
+    warranty_rules = await db.warranty_rules.find(
+        {"is_active": True},
+        {"_id": 0}
+    ).sort("created_at", -1).to_list(1000)
+
+    if not warranty_rules:
+        logger.warning("Garanti kuralı bulunamadı, varsayılan kurallar kullanılıyor")
+        warranty_rules = DEFAULT_WARRANTY_RULES
+
+    contract_rules = await db.contract_rules.find(
+        {"is_active": True},
+        {"_id": 0}
+    ).sort("created_at", 1).to_list(1000)
+
+    # AI ile analiz et
+    logger.info("AI analizi başlatılıyor...")
+
+    async with _llm_slots:
+        llm_started = time.perf_counter()
+        analysis_result = await analyze_ize_with_ai(
+            extracted_text, warranty_rules, contract_rules, api_settings, progress=progress,
+            degraded=budget.degraded, excluded_providers=budget.excluded_providers,
+        )
+    ai_meta = analysis_result.pop("_ai_meta", {})
+    if progress:
+        progress.record_timing("llm_ms", llm_started)
+    emit_progress(
+        progress, "llm_completed",
+        provider=ai_meta.get('provider'), model=ai_meta.get('model'),
+        total_tokens=ai_meta.get('total_tokens', 0),
+    )
+    analysis_result["email_subject"] = generate_email_subject(analysis_result, "tr")
+    analysis_result["email_body"] = generate_email_body(analysis_result, "tr")
+
+    # IZE Case oluştur
+    case_title = f"{analysis_result.get('ize_no', 'N/A')} - {analysis_result.get('company', 'N/A')} - {analysis_result.get('plate', 'N/A')}"
+
+    # Tarihten ay ve yıl çıkar
+    created_at = datetime.now(timezone.utc)
+
+    ize_case = IZECase(
+        id=case_id,
+        user_id=current_user['id'],
+        branch=user_branch,
+        case_title=case_title,
+        ize_no=analysis_result.get('ize_no', 'N/A'),
+        company=analysis_result.get('company', 'N/A'),
+        plate=analysis_result.get('plate', 'N/A'),
+        vin=analysis_result.get('vin', 'N/A'),
+        warranty_start_date=analysis_result.get('warranty_start_date'),
+        repair_date=analysis_result.get('repair_date'),
+        vehicle_age_months=analysis_result.get('vehicle_age_months', 0),
+        repair_km=analysis_result.get('repair_km', 0),
+        request_type=analysis_result.get('request_type', 'WARRANTY SUPPORT'),
+        is_within_2_year_warranty=analysis_result.get('is_within_2_year_warranty', False),
+        warranty_decision=analysis_result.get('warranty_decision', 'ADDITIONAL_INFO_REQUIRED'),
+        decision_rationale=analysis_result.get('decision_rationale', []),
+        has_active_contract=analysis_result.get('has_active_contract', False),
+        contract_package_name=analysis_result.get('contract_package_name'),
+        contract_decision=analysis_result.get('contract_decision', 'NO_CONTRACT_COVERAGE'),
+        contract_covered_parts=analysis_result.get('contract_covered_parts', []),
+        failure_complaint=analysis_result.get('failure_complaint', ''),
+        failure_cause=analysis_result.get('failure_cause', ''),
+        operations_performed=analysis_result.get('operations_performed', []),
+        parts_replaced=analysis_result.get('parts_replaced', []),
+        repair_process_summary=analysis_result.get('repair_process_summary', ''),
+        email_subject=analysis_result.get('email_subject', ''),
+        email_body=analysis_result.get('email_body', ''),
+        pdf_file_name=pdf_file_name,
+        pdf_storage_name=pdf_storage_name,
+        pdf_sha256=pdf_sha256,
+        extracted_text=extracted_text[:2000],
+        ai_provider=ai_meta.get('provider'),
+        ai_model=ai_meta.get('model'),
+        ai_prompt_tokens=ai_meta.get('prompt_tokens', 0),
+        ai_completion_tokens=ai_meta.get('completion_tokens', 0),
+        ai_total_tokens=ai_meta.get('total_tokens', 0),
+        ai_cached_prompt_tokens=ai_meta.get('cached_prompt_tokens', 0),
+        ai_estimated_cost_usd=ai_meta.get('estimated_cost_usd'),
+        ai_repaired_fields=ai_meta.get('repaired_fields', []),
+        ai_route=ai_meta.get('route'),
+        binder_version_used=warranty_rules[0].get('rule_version', 'default') if warranty_rules else "default",
+        month=created_at.month,
+        year=created_at.year
+    )
+
+    return await _store_case(
+        current_user, ize_case, analysis_result, pdf_content, progress, credit_reserved=credit_reserved
+    )
+
+
+async def _store_case(
+    current_user: dict,
+    ize_case: IZECase,
+    email_data: dict,
+    pdf_content: bytes,
+    progress: Optional[ProgressReporter] = None,
+    record_llm_usage: bool = True,
+    credit_reserved: bool = False,
+) -> IZECase:
+    """Case'i kaydeder; parmak izi, bütçe, araç geçmişi, kredi ve e-postayı işler."""
+    # Veritabanına kaydet
+    doc = ize_case.model_dump()
+    doc.update(search_fields(doc))
+
+    fingerprint = build_fingerprint(doc)
+    try:
+        doc["duplicate_candidates"] = await find_duplicate_candidates(fingerprint)
+    except Exception as e:
+        logger.warning(f"Mükerrer talep kontrolü yapılamadı: {str(e)}")
+    if doc["duplicate_candidates"]:
+        ize_case.duplicate_candidates = doc["duplicate_candidates"]
+        logger.info(f"Olası mükerrer talep: {ize_case.ize_no} -> {[c['ize_no'] for c in doc['duplicate_candidates']]}")
+        emit_progress(progress, "duplicate_suspected", candidates=doc["duplicate_candidates"])
+
+    # Referans kayıttan önce alınır ki GC kayıt sırasında dosyayı silmesin; kayıt başarısız olursa geri bırakılır
+    await acquire_pdf(ize_case.pdf_storage_name, len(pdf_content))
+    try:
+        await db.ize_cases.insert_one(doc)
+    except Exception:
+        # Eski düz adlar sayılmaz (acquire_pdf onlar için işlem yapmaz); dosyayı job hâlâ kullanır
+        if content_hash(ize_case.pdf_storage_name):
+            await release_pdfs([ize_case.pdf_storage_name])
+        raise
+    logger.info(f"IZE Case kaydedildi: {ize_case.id}")
+    emit_progress(progress, "case_saved", case_id=ize_case.id)
+
+    try:
+        await store_fingerprint(fingerprint)
+    except Exception as e:
+        logger.warning(f"Claim parmak izi kaydedilemedi: {str(e)}")
+
+    if record_llm_usage:
+        try:
+            await record_usage(
+                current_user, ize_case.branch, ize_case.ai_provider,
+                ize_case.ai_total_tokens, ize_case.ai_estimated_cost_usd,
+            )
+        except Exception as e:
+            logger.warning(f"LLM bütçe sayaçları güncellenemedi: {str(e)}")
+
+    try:
+        await record_vehicle_case(doc)
+    except Exception as e:
+        logger.warning(f"Araç geçmişi güncellenemedi: {str(e)}")
+
+    # Krediyi azalt (Admin hariç); önceden ayrıldıysa yalnızca analiz sayacı artar
+    if credit_reserved:
+        await db.users.update_one({"id": current_user['id']}, {"$inc": {"total_analyses": 1}})
+    elif current_user['role'] != 'admin':
+        await db.users.update_one(
+            {"id": current_user['id']},
+            {
+                "$inc": {
+                    "free_analyses_remaining": -1,
+                    "total_analyses": 1
+                }
+            }
+        )
+        logger.info(f"Kullanıcı kredisi güncellendi: {current_user['email']}")
+
+    # E-posta SMTP gecikmesi yanıtı bekletmesin diye arka planda gönderilir
+    email_task = asyncio.create_task(_send_case_email(
+        current_user, email_data, pdf_content, ize_case.pdf_file_name, progress
+    ))
+    _email_tasks.add(email_task)
+    email_task.add_done_callback(_email_tasks.discard)
+    emit_progress(progress, "email_queued", to=current_user['email'])
+
+    return ize_case
+
+
+async def _send_case_email(
+    current_user: dict,
+    analysis_result: dict,
+    pdf_content: bytes,
+    pdf_file_name: str,
+    progress: Optional[ProgressReporter] = None,
+) -> None:
+    """Analiz sonucunu kullanıcıya e-postayla gönderir ve sayacı artırır."""
+    try:
+        email_result = await send_analysis_email(
+            to_email=current_user['email'],
+            case_data=analysis_result,
+            attachment_bytes=pdf_content,
+            attachment_filename=pdf_file_name,
+            language="tr"
+        )
+        if email_result.get("success"):
+            # E-posta sayacını artır
+            await db.users.update_one(
+                {"id": current_user['id']},
+                {"$inc": {"emails_sent": 1}}
+            )
+            logger.info(f"E-posta gönderildi: {current_user['email']}")
+            emit_progress(progress, "email_sent")
+        else:
+            logger.warning(f"E-posta gönderilemedi: {email_result.get('message')}")
+            emit_progress(progress, "email_failed", message=email_result.get('message'))
+    except Exception as e:
+        logger.warning(f"E-posta gönderim hatası: {str(e)}")
+        emit_progress(progress, "email_failed", message=str(e))
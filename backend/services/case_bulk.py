@@ -0,0 +1,107 @@
+"""
+Filtreye göre toplu case işlemleri (arşivle / arşivden çıkar / sil).
+
+Eşleşen case'ler BULK_BATCH_SIZE'lık gruplar halinde işlenir: her grupta
+id'ler okunur; arşivlemede tek bir update_many çalışır, silmede her case
+find_one_and_delete ile silinir. İşlenen case'ler filtreden düştüğü için
+(arşiv durumu değişti veya silindi) döngü bir sonraki grubu aynı sorguyla
+alır. Silmede yalnızca bu işlemin sildiği case'lerin PDF referansları, araç
+geçmişi ve claim parmak izleri grup bazında temizlenir.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from fastapi import HTTPException
+
+from database import db
+from models.case import CaseBulkRequest
+from services.claim_fingerprints import remove_fingerprints
+from services.pdf_storage import release_pdfs
+from services.vehicle_history import remove_cases as remove_vehicle_cases
+
+logger = logging.getLogger(__name__)
+
+BULK_BATCH_SIZE = 500
+
+
+def bulk_query(current_user: dict, request: CaseBulkRequest) -> Dict[str, Any]:
+    """İstekteki filtrelerden sorgu; user yalnızca kendi case'lerini etkileyebilir."""
+    filters = {
+        name: value for name, value in (
+            ("branch", request.branch),
+            ("year", request.year),
+            ("month", request.month),
+            ("warranty_decision", request.warranty_decision),
+        ) if value is not None
+    }
+    if request.ids is not None:
+        filters["id"] = {"$in": request.ids}
+    if not filters:
+        raise HTTPException(status_code=400, detail="Toplu işlem için en az bir filtre girilmelidir")
+
+    query = {} if current_user['role'] == 'admin' else {"user_id": current_user['id']}
+    query.update(filters)
+    if request.action == "archive":
+        query["is_archived"] = {"$ne": True}
+    elif request.action == "unarchive":
+        query["is_archived"] = True
+    return query
+
+
+async def run_bulk_operation(current_user: dict, request: CaseBulkRequest) -> Dict[str, Any]:
+    """Toplu işlemi gruplar halinde çalıştırır ve özetini döndürür."""
+    query = bulk_query(current_user, request)
+    started = time.perf_counter()
+    summary = {
+        "action": request.action,
+        "dry_run": request.dry_run,
+        "matched": await db.ize_cases.count_documents(query),
+        "processed": 0,
+        "pdfs_removed": 0,
+        "batches": 0,
+    }
+    if request.dry_run:
+        return summary
+
+    while True:
+        batch = await db.ize_cases.find(
+            query, {"_id": 0, "id": 1}
+        ).limit(BULK_BATCH_SIZE).to_list(BULK_BATCH_SIZE)
+        if not batch:
+            break
+        case_ids = [case["id"] for case in batch]
+
+        if request.action == "delete":
+            # Case başına silinir: yalnızca bu çağrının sildiği case'lerin PDF referansı düşülür;
+            # eşzamanlı başka bir silme aynı case'i önce silerse referans iki kez düşmez
+            deleted = []
+            for case_id in case_ids:
+                case = await db.ize_cases.find_one_and_delete(
+                    {**query, "id": case_id}, {"_id": 0, "id": 1, "pdf_storage_name": 1}
+                )
+                if case is not None:
+                    deleted.append(case)
+            deleted_ids = [case["id"] for case in deleted]
+            summary["processed"] += len(deleted)
+            await remove_vehicle_cases(deleted_ids)
+            await remove_fingerprints(deleted_ids)
+            pdf_names = [case["pdf_storage_name"] for case in deleted if case.get("pdf_storage_name")]
+            summary["pdfs_removed"] += await release_pdfs(pdf_names)
+        else:
+            archived = request.action == "archive"
+            # Arada başka bir istekle değişen case'ler tekrar filtreden geçirilir
+            result = await db.ize_cases.update_many(
+                {**query, "id": {"$in": case_ids}},
+                {"$set": {"is_archived": archived, "archived_at": datetime.now(timezone.utc) if archived else None}},
+            )
+            summary["processed"] += result.modified_count
+        summary["batches"] += 1
+
+    summary["duration_ms"] = round((time.perf_counter() - started) * 1000)
+    logger.info(
+        f"Toplu case işlemi: {request.action} {summary['processed']}/{summary['matched']} "
+        f"({current_user['email']}, {summary['batches']} grup)"
+    )
+    return summary
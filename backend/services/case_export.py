@@ -0,0 +1,218 @@
+"""
+Case'lerin CSV / NDJSON / XLSX olarak akış halinde dışa aktarımı.
+
+Mongo cursor'ı EXPORT_BATCH_SIZE'lık gruplar halinde okunur; her grup
+seçilen kolonlara göre satırlara çevrilip tek parça olarak gönderilir.
+Bellekte aynı anda yalnızca bir grup bulunur.
+
+XLSX ek bağımlılık olmadan yazılır: zip arşivi seek edilemeyen bir tampona
+açılır, sayfa XML'i satır satır sıkıştırılır ve tampon her gruptan sonra
+boşaltılır.
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from fastapi import HTTPException
+
+from database import db
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+# Dışa aktarılabilen kolonlar (ize_cases alan adları); arama/parmak izi alanları hariç
+EXPORT_COLUMNS = [
+    "id", "ize_no", "case_title", "company", "plate", "vin", "branch", "user_id",
+    "warranty_start_date", "repair_date", "vehicle_age_months", "repair_km", "request_type",
+    "is_within_2_year_warranty", "warranty_decision", "decision_rationale",
+    "has_active_contract", "contract_package_name", "contract_decision", "contract_covered_parts",
+    "failure_complaint", "failure_cause", "operations_performed", "parts_replaced",
+    "repair_process_summary", "attachments", "pdf_file_name", "binder_version_used",
+    "ai_provider", "ai_model", "ai_total_tokens", "ai_estimated_cost_usd",
+    "is_archived", "archived_at", "created_at",
+]
+DEFAULT_EXPORT_COLUMNS = [
+    "ize_no", "case_title", "company", "plate", "vin", "branch", "repair_date", "repair_km",
+    "warranty_decision", "contract_decision", "failure_complaint", "parts_replaced", "created_at",
+]
+
+# Elektronik tabloda formül olarak çalıştırılan başlangıç karakterleri (CSV formül enjeksiyonu)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# XML 1.0'da yazılamayan kontrol karakterleri (PDF metninden gelebilir)
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_STATIC_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="IZE Cases" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def parse_columns(columns: Optional[str]) -> List[str]:
+    """"ize_no,vin,..." -> kolon listesi; boşsa varsayılan kolonlar."""
+    if not columns:
+        return list(DEFAULT_EXPORT_COLUMNS)
+    selected = list(dict.fromkeys(name.strip() for name in columns.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in EXPORT_COLUMNS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Geçersiz kolon: {', '.join(unknown) or columns}")
+    return selected
+
+
+def cell_text(value: Any) -> str:
+    """CSV / XLSX hücresi için düz metin."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return "; ".join(_item_text(item) for item in value)
+    return str(value)
+
+
+def csv_cell(value: Any) -> str:
+    """CSV hücresi; PDF'ten gelen ve formül gibi başlayan metin ' ile kaçırılır."""
+    text = cell_text(value)
+    if not isinstance(value, (int, float)) and text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def _item_text(item: Any) -> str:
+    if isinstance(item, dict):
+        # parts_replaced: "Parça adı (x2)"
+        name = item.get("part_name") or item.get("description") or json.dumps(item, ensure_ascii=False)
+        qty = item.get("qty")
+        return f"{name} (x{qty})" if qty and qty != 1 else str(name)
+    return cell_text(item)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def _case_batches(query: Dict[str, Any], columns: List[str]) -> AsyncIterator[List[Dict[str, Any]]]:
+    projection = {"_id": 0, **{name: 1 for name in columns}}
+    cursor = db.ize_cases.find(query, projection).sort("created_at", -1).batch_size(EXPORT_BATCH_SIZE)
+    batch: List[Dict[str, Any]] = []
+    async for case_doc in cursor:
+        batch.append(case_doc)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _csv_chunks(query: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # BOM: Excel UTF-8 CSV'deki Türkçe karakterleri doğru açar
+    yield b"\xef\xbb\xbf" + buffer.getvalue().encode("utf-8")
+    async for batch in _case_batches(query, columns):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([csv_cell(case_doc.get(name)) for name in columns] for case_doc in batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _ndjson_chunks(query: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    async for batch in _case_batches(query, columns):
+        lines = (
+            json.dumps({name: case_doc.get(name) for name in columns}, ensure_ascii=False, default=_json_default)
+            for case_doc in batch
+        )
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Seek edilemeyen yazma hedefi; zipfile veri tanımlayıcılarıyla yazar."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _xlsx_cell(value: Any) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = _XML_ILLEGAL.sub("", cell_text(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values: List[Any]) -> str:
+    return "<row>" + "".join(_xlsx_cell(value) for value in values) + "</row>"
+
+
+async def _xlsx_chunks(query: Dict[str, Any], columns: List[str]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + _xlsx_row(columns)
+            ).encode("utf-8"))
+            async for batch in _case_batches(query, columns):
+                rows = "".join(_xlsx_row([case_doc.get(name) for name in columns]) for case_doc in batch)
+                sheet.write(rows.encode("utf-8"))
+                yield sink.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield sink.drain()
+
+
+def export_cases(query: Dict[str, Any], columns: List[str], export_format: str) -> AsyncIterator[bytes]:
+    """Seçilen formatta dosya parçalarını üreten async iterator."""
+    writers = {"csv": _csv_chunks, "ndjson": _ndjson_chunks, "xlsx": _xlsx_chunks}
+    return writers[export_format](query, columns)
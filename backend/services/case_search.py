@@ -0,0 +1,187 @@
+"""
+Case arama: IZE no / VIN / plaka için normalize anahtarlar ve serbest metin.
+
+Her case kaydında search_keys (boşluk ve işaretleri atılmış, büyük harfli
+IZE no, VIN ve plaka) ile bu anahtarların trigramları (search_trigrams)
+tutulur. Tam ve önek eşleşmesi search_keys index'i üzerinden anchored regex
+ile, bulanık eşleşme trigram örtüşmesiyle, firma ve arıza metinleri ise
+Mongo text index'i ile aranır.
+"""
+import asyncio
+import logging
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+
+from database import db
+from services.pagination import KEYSET_SORT, encode_offset_cursor, decode_offset_cursor, keyset_query, split_page
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("auto", "exact", "prefix", "fuzzy", "text")
+# Anahtarı oluşturulan alanlar
+SEARCH_KEY_FIELDS = ("ize_no", "vin", "plate")
+# Text index'e giren alanlar ve ağırlıkları
+SEARCH_TEXT_WEIGHTS = {
+    "company": 5,
+    "case_title": 3,
+    "failure_complaint": 2,
+    "failure_cause": 2,
+    "repair_process_summary": 1,
+}
+FUZZY_CANDIDATES = int(os.environ.get("CASE_SEARCH_FUZZY_CANDIDATES", "500"))
+FUZZY_MIN_SIMILARITY = float(os.environ.get("CASE_SEARCH_FUZZY_MIN_SIMILARITY", "0.3"))
+SEARCH_BACKFILL_BATCH_SIZE = 500
+
+_IDENTIFIER = re.compile(r"^[\w\s.\-/]+$")
+_backfill_task: Optional[asyncio.Task] = None
+
+
+def normalize_key(value: Any) -> str:
+    """'VF6 12-345', 'vf612345' -> 'VF612345'; Türkçe karakterler ASCII karşılığına indirilir."""
+    text = str(value or "").replace("ı", "i")
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Za-z0-9]", "", text).upper()
+
+
+def trigrams(key: str) -> Set[str]:
+    if len(key) < 3:
+        return {key} if key else set()
+    return {key[idx:idx + 3] for idx in range(len(key) - 2)}
+
+
+def similarity(query_grams: Set[str], key: str) -> float:
+    """Trigram Jaccard benzerliği."""
+    key_grams = trigrams(key)
+    union = query_grams | key_grams
+    return len(query_grams & key_grams) / len(union) if union else 0.0
+
+
+def search_fields(case_doc: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Case kaydına yazılan arama alanları."""
+    keys = []
+    for name in SEARCH_KEY_FIELDS:
+        key = normalize_key(case_doc.get(name))
+        if key and key not in keys:
+            keys.append(key)
+    grams = sorted(set().union(*(trigrams(key) for key in keys))) if keys else []
+    return {"search_keys": keys, "search_trigrams": grams}
+
+
+def resolve_mode(q: str, mode: str) -> str:
+    """auto: kimlik benzeri tek ifade önek, birden fazla kelime metin araması."""
+    if mode != "auto":
+        return mode
+    stripped = q.strip()
+    if _IDENTIFIER.match(stripped) and len(stripped.split()) == 1 and any(ch.isdigit() for ch in stripped):
+        return "prefix"
+    return "text"
+
+
+def _combine(base: Dict[str, Any], condition: Dict[str, Any]) -> Dict[str, Any]:
+    return {"$and": [base, condition]} if base else condition
+
+
+async def _keyset_search(query: Dict[str, Any], projection: Dict[str, Any], limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    docs = await db.ize_cases.find(
+        keyset_query(query, cursor), projection
+    ).sort(KEYSET_SORT).limit(limit + 1).to_list(limit + 1)
+    return split_page(docs, limit)
+
+
+async def _text_search(q: str, filters: Dict[str, Any], projection: Dict[str, Any], limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    offset = decode_offset_cursor(cursor)
+    query = {"$text": {"$search": q}, **filters}
+    docs = await db.ize_cases.find(
+        query, {**projection, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"}), ("created_at", -1)]).skip(offset).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_offset_cursor(offset + limit) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+async def _fuzzy_search(key: str, filters: Dict[str, Any], projection: Dict[str, Any], limit: int, cursor: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    offset = decode_offset_cursor(cursor)
+    query_grams = trigrams(key)
+    if not query_grams:
+        return [], None
+    # Ortak trigram sayısına göre ilk FUZZY_CANDIDATES aday DB'de seçilir, benzerlik burada hesaplanır
+    pipeline = [
+        {"$match": _combine(filters, {"search_trigrams": {"$in": sorted(query_grams)}})},
+        {"$addFields": {"_overlap": {"$size": {"$setIntersection": ["$search_trigrams", sorted(query_grams)]}}}},
+        {"$sort": {"_overlap": -1, "created_at": -1}},
+        {"$limit": FUZZY_CANDIDATES},
+        {"$project": {**projection, "search_keys": 1}},
+    ]
+    candidates = await db.ize_cases.aggregate(pipeline).to_list(FUZZY_CANDIDATES)
+    scored = []
+    for doc in candidates:
+        score = max((similarity(query_grams, candidate) for candidate in doc.pop("search_keys", None) or []), default=0.0)
+        if score >= FUZZY_MIN_SIMILARITY:
+            doc["score"] = round(score, 3)
+            scored.append(doc)
+    scored.sort(key=lambda doc: doc["score"], reverse=True)
+    page = scored[offset:offset + limit]
+    next_cursor = encode_offset_cursor(offset + limit) if len(scored) > offset + limit else None
+    return page, next_cursor
+
+
+async def search_cases(
+    q: str,
+    filters: Dict[str, Any],
+    projection: Dict[str, Any],
+    mode: str = "auto",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Arama sonuç sayfası: {"items", "next_cursor", "mode"}."""
+    resolved = resolve_mode(q, mode)
+    key = normalize_key(q)
+
+    if resolved == "text":
+        items, next_cursor = await _text_search(q, filters, projection, limit, cursor)
+    elif resolved == "fuzzy":
+        items, next_cursor = await _fuzzy_search(key, filters, projection, limit, cursor)
+    else:
+        condition = {"search_keys": key} if resolved == "exact" else {"search_keys": {"$regex": f"^{re.escape(key)}"}}
+        items, next_cursor = await _keyset_search(_combine(filters, condition), projection, limit, cursor)
+        # auto modunda önek eşleşmesi yoksa yazım hatası olabilir; bulanık aramaya düşülür
+        if mode == "auto" and not items and not cursor:
+            resolved = "fuzzy"
+            items, next_cursor = await _fuzzy_search(key, filters, projection, limit, None)
+
+    return {"items": items, "next_cursor": next_cursor, "mode": resolved}
+
+
+async def backfill_search_fields() -> int:
+    """search_keys alanı olmayan eski case'lere arama alanlarını yazar; güncellenen kayıt sayısı."""
+    projection = {"_id": 1, **{name: 1 for name in SEARCH_KEY_FIELDS}}
+    cursor = db.ize_cases.find({"search_keys": {"$exists": False}}, projection).batch_size(SEARCH_BACKFILL_BATCH_SIZE)
+    operations: List[UpdateOne] = []
+    updated = 0
+    async for case_doc in cursor:
+        operations.append(UpdateOne({"_id": case_doc["_id"]}, {"$set": search_fields(case_doc)}))
+        if len(operations) >= SEARCH_BACKFILL_BATCH_SIZE:
+            updated += (await db.ize_cases.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        updated += (await db.ize_cases.bulk_write(operations, ordered=False)).modified_count
+    if updated:
+        logger.info(f"Case arama alanları dolduruldu: {updated} kayıt")
+    return updated
+
+
+async def _backfill_safely() -> None:
+    try:
+        await backfill_search_fields()
+    except Exception as exc:
+        logger.error(f"Case arama alanları doldurulamadı: {exc}")
+
+
+def start_search_backfill() -> None:
+    """Arama alanı eksik case'leri arka planda tamamlar."""
+    global _backfill_task
+    if _backfill_task is None or _backfill_task.done():
+        _backfill_task = asyncio.create_task(_backfill_safely())
@@ -0,0 +1,227 @@
+"""
+Mükerrer garanti talebi tespiti (claim parmak izleri).
+
+Her case için claim_fingerprints koleksiyonuna bir kayıt yazılır:
+- signature: araç anahtarı + onarım tarihi + km aralığı + değiştirilen
+  parça kümesinin SHA-256'sı; aynı talep tekrar gönderildiğinde birebir
+  eşleşir.
+- minhash / lsh_bands: parça ve operasyon ifadelerinden MinHash imzası ve
+  LSH bant anahtarları. Bant anahtarları aynı araç veya aynı onarım
+  tarihi + km aralığıyla sınırlandırılır; böylece aday sorgusu yalnızca
+  ilgili küçük kovaları okur ve maliyet koleksiyon boyutuyla büyümez.
+
+Yeni analiz kaydedilmeden önce find_duplicate_candidates() çağrılır;
+eşleşmeler case'in duplicate_candidates alanına yazılır.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pymongo import UpdateOne
+
+from database import db
+from services.case_search import normalize_key
+from services.vehicle_history import vehicle_key
+
+logger = logging.getLogger(__name__)
+
+MINHASH_PERMUTATIONS = 32
+LSH_BANDS = 8
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+KM_BUCKET_SIZE = int(os.environ.get("DUPLICATE_KM_BUCKET", "1000"))
+DUPLICATE_MIN_SIMILARITY = float(os.environ.get("DUPLICATE_MIN_SIMILARITY", "0.6"))
+MAX_DUPLICATE_CANDIDATES = 5
+# Kova başına okunacak en fazla aday (ör. aynı gün aynı km'de çok sayıda boş kayıt)
+MAX_BUCKET_READ = 200
+FINGERPRINT_BACKFILL = os.environ.get("CLAIM_FINGERPRINT_BACKFILL", "true").lower() == "true"
+FINGERPRINT_BATCH_SIZE = 500
+CASE_PROJECTION = {
+    "_id": 0, "id": 1, "ize_no": 1, "vin": 1, "plate": 1, "branch": 1, "user_id": 1,
+    "repair_date": 1, "repair_km": 1, "parts_replaced": 1, "operations_performed": 1,
+}
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+# Sabit tohumlu permütasyonlar: imzalar süreçler ve yeniden başlatmalar arasında aynı kalır
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+_WORD = re.compile(r"[A-Za-z0-9]{4,}")
+
+_backfill_task: Optional[asyncio.Task] = None
+
+
+def _part_keys(case_doc: Dict[str, Any]) -> List[str]:
+    keys = set()
+    for part in case_doc.get("parts_replaced") or []:
+        name = part.get("part_name") if isinstance(part, dict) else part
+        key = normalize_key(name)
+        if key:
+            keys.add(key)
+    return sorted(keys)
+
+
+def claim_shingles(case_doc: Dict[str, Any]) -> Set[str]:
+    """Parça anahtarları ve operasyon kelimelerinden oluşan küme."""
+    shingles = {f"P:{key}" for key in _part_keys(case_doc)}
+    for operation in case_doc.get("operations_performed") or []:
+        words = (normalize_key(word) for word in str(operation or "").split())
+        shingles.update(f"O:{word}" for word in words if _WORD.fullmatch(word))
+    return shingles
+
+
+def _base_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(shingles: Iterable[str]) -> List[int]:
+    hashes = [_base_hash(value) for value in shingles]
+    if not hashes:
+        return []
+    return [min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in _PERMUTATIONS]
+
+
+def estimate_similarity(left: List[int], right: List[int]) -> float:
+    """İki MinHash imzasından Jaccard benzerliği tahmini."""
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+def km_bucket(repair_km: Any) -> Optional[int]:
+    try:
+        km = int(repair_km or 0)
+    except (TypeError, ValueError):
+        return None
+    return km // KM_BUCKET_SIZE if km > 0 else None
+
+
+def claim_signature(case_doc: Dict[str, Any]) -> Optional[str]:
+    """Araç + onarım tarihi + km aralığı + parça kümesi; araç veya parça yoksa None."""
+    vehicle = vehicle_key(case_doc)
+    parts = _part_keys(case_doc)
+    if not vehicle or not parts:
+        return None
+    raw = "|".join([vehicle, str(case_doc.get("repair_date") or ""), str(km_bucket(case_doc.get("repair_km"))), ",".join(parts)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def lsh_bands(signature: List[int], scopes: List[str]) -> List[str]:
+    """Her kapsam (araç / tarih+km) için LSH bant anahtarları."""
+    if not signature:
+        return []
+    bands = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode("ascii"), digest_size=8).hexdigest()
+        bands.extend(f"{scope}|{band}:{digest}" for scope in scopes)
+    return bands
+
+
+def build_fingerprint(case_doc: Dict[str, Any]) -> Dict[str, Any]:
+    vehicle = vehicle_key(case_doc)
+    bucket = km_bucket(case_doc.get("repair_km"))
+    scopes = []
+    if vehicle:
+        scopes.append(vehicle)
+    # VIN/plaka yanlış okunmuş yeniden taramalar tarih + km ile yakalanır
+    if case_doc.get("repair_date") and bucket is not None:
+        scopes.append(f"D:{case_doc['repair_date']}|{bucket}")
+    signature = minhash(claim_shingles(case_doc))
+    return {
+        "case_id": case_doc["id"],
+        "ize_no": case_doc.get("ize_no") or "",
+        "branch": case_doc.get("branch") or "",
+        "user_id": case_doc.get("user_id"),
+        "vehicle_key": vehicle,
+        "repair_date": case_doc.get("repair_date"),
+        "km_bucket": bucket,
+        "signature": claim_signature(case_doc),
+        "minhash": signature,
+        "lsh_bands": lsh_bands(signature, scopes),
+    }
+
+
+async def find_duplicate_candidates(fingerprint: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Birebir aynı imzalı veya LSH kovası ortak ve benzer talepler (en benzer önce)."""
+    projection = {"_id": 0, "case_id": 1, "ize_no": 1, "branch": 1, "signature": 1, "minhash": 1,
+                  "vehicle_key": 1, "repair_date": 1, "km_bucket": 1}
+    other_cases = {"case_id": {"$ne": fingerprint["case_id"]}}
+    candidates: Dict[str, Dict[str, Any]] = {}
+    if fingerprint["signature"]:
+        # Birebir eşleşmeler kendi indeksli sorgusuyla okunur; LSH okuma sınırı bunları kesmez
+        exact_query = {"signature": fingerprint["signature"], **other_cases}
+        async for candidate in db.claim_fingerprints.find(exact_query, projection).limit(MAX_DUPLICATE_CANDIDATES):
+            candidates[candidate["case_id"]] = candidate
+    if fingerprint["lsh_bands"]:
+        lsh_query = {"lsh_bands": {"$in": fingerprint["lsh_bands"]}, **other_cases}
+        async for candidate in db.claim_fingerprints.find(lsh_query, projection).limit(MAX_BUCKET_READ):
+            candidates.setdefault(candidate["case_id"], candidate)
+
+    matches = []
+    for candidate in candidates.values():
+        exact = bool(fingerprint["signature"]) and candidate.get("signature") == fingerprint["signature"]
+        similarity = 1.0 if exact else estimate_similarity(fingerprint["minhash"], candidate.get("minhash") or [])
+        if not exact and similarity < DUPLICATE_MIN_SIMILARITY:
+            continue
+        reasons = [name for name, same in (
+            ("same_vehicle", fingerprint["vehicle_key"] and candidate.get("vehicle_key") == fingerprint["vehicle_key"]),
+            ("same_repair_date", fingerprint["repair_date"] and candidate.get("repair_date") == fingerprint["repair_date"]),
+            ("same_km_range", fingerprint["km_bucket"] is not None and candidate.get("km_bucket") == fingerprint["km_bucket"]),
+        ) if same]
+        matches.append({
+            "case_id": candidate["case_id"],
+            "ize_no": candidate.get("ize_no", ""),
+            "branch": candidate.get("branch", ""),
+            "similarity": round(similarity, 3),
+            "exact": exact,
+            "reasons": reasons,
+        })
+    matches.sort(key=lambda item: (item["exact"], item["similarity"]), reverse=True)
+    return matches[:MAX_DUPLICATE_CANDIDATES]
+
+
+async def store_fingerprint(fingerprint: Dict[str, Any]) -> None:
+    await db.claim_fingerprints.update_one(
+        {"case_id": fingerprint["case_id"]}, {"$set": fingerprint}, upsert=True
+    )
+
+
+async def remove_fingerprints(case_ids: List[str]) -> None:
+    if case_ids:
+        await db.claim_fingerprints.delete_many({"case_id": {"$in": case_ids}})
+
+
+async def backfill_fingerprints() -> int:
+    """Parmak izi olmayan geçmiş case'ler için kayıt oluşturur (mükerrer işaretlemesi yapılmaz)."""
+    operations: List[UpdateOne] = []
+    written = 0
+    async for case_doc in db.ize_cases.find({}, CASE_PROJECTION).batch_size(FINGERPRINT_BATCH_SIZE):
+        fingerprint = build_fingerprint(case_doc)
+        operations.append(UpdateOne({"case_id": fingerprint["case_id"]}, {"$set": fingerprint}, upsert=True))
+        if len(operations) >= FINGERPRINT_BATCH_SIZE:
+            await db.claim_fingerprints.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        await db.claim_fingerprints.bulk_write(operations, ordered=False)
+        written += len(operations)
+    logger.info(f"Claim parmak izleri oluşturuldu: {written} case")
+    return written
+
+
+async def _backfill_if_empty() -> None:
+    try:
+        if await db.claim_fingerprints.find_one({}, {"_id": 1}) is None and await db.ize_cases.find_one({}, {"_id": 1}):
+            await backfill_fingerprints()
+    except Exception as exc:
+        logger.error(f"Claim parmak izleri oluşturulamadı: {exc}")
+
+
+def start_backfill_if_empty() -> None:
+    """claim_fingerprints boşsa geçmiş case'lerden arka planda doldurur."""
+    global _backfill_task
+    if FINGERPRINT_BACKFILL and _backfill_task is None:
+        _backfill_task = asyncio.create_task(_backfill_if_empty())
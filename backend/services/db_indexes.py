@@ -0,0 +1,261 @@
+"""
+Koleksiyon index'lerinin tek yerden (bildirimsel) yönetimi.
+
+INDEX_REGISTRY sıcak sorguların ihtiyaç duyduğu index'leri tanımlar.
+ensure_indexes() eksik olanları oluşturur, aynı adla farklı tanıma sahip
+index'leri (drift) raporlar ve DB_INDEX_FIX_DRIFT=true ise yeniden kurar.
+Kayıtlı olmayan index'lere dokunulmaz; yalnızca raporda "unmanaged" görünür.
+"""
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from database import db
+from services.case_search import SEARCH_TEXT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+DB_INDEX_FIX_DRIFT = os.environ.get("DB_INDEX_FIX_DRIFT", "false").lower() == "true"
+# Karşılaştırmada dikkate alınan index seçenekleri
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+_build_task: Optional[asyncio.Task] = None
+_last_result: Dict[str, Any] = {}
+
+
+@dataclass
+class IndexSpec:
+    keys: List[Tuple[str, Any]]
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        # Verilmediyse MongoDB'nin varsayılan index adı (ör. created_at_-1_id_-1)
+        return self.options.get("name") or "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    @property
+    def text_fields(self) -> Set[str]:
+        return {key for key, direction in self.keys if direction == TEXT}
+
+    def model(self) -> IndexModel:
+        options = {key: value for key, value in self.options.items() if key != "name"}
+        return IndexModel(self.keys, name=self.name, background=True, **options)
+
+
+def _idx(*keys: Any, **options: Any) -> IndexSpec:
+    """_idx("email", unique=True) veya _idx(("user_id", 1), ("created_at", -1))"""
+    return IndexSpec([(key, ASCENDING) if isinstance(key, str) else tuple(key) for key in keys], options)
+
+
+INDEX_REGISTRY: Dict[str, List[IndexSpec]] = {
+    "users": [
+        _idx("email", unique=True),
+        _idx("id", unique=True),
+        _idx("verification_token", sparse=True),
+        _idx(("created_at", DESCENDING)),
+    ],
+    "ize_cases": [
+        _idx("id", unique=True),
+        _idx(("created_at", DESCENDING), ("id", DESCENDING)),
+        _idx("user_id", ("created_at", DESCENDING), ("id", DESCENDING)),
+        _idx("branch", ("created_at", DESCENDING)),
+        _idx("is_archived", ("created_at", DESCENDING)),
+        _idx("year", "month", ("created_at", DESCENDING)),
+        _idx("warranty_decision"),
+        _idx("search_keys"),
+        _idx("search_trigrams"),
+        # Yalnızca mükerrer şüphesi olan case'ler (admin mükerrer listesi)
+        _idx(("created_at", DESCENDING), name="duplicate_suspects",
+             partialFilterExpression={"duplicate_candidates.0": {"$exists": True}}),
+        _idx(*((name, TEXT) for name in SEARCH_TEXT_WEIGHTS), name="case_search_text",
+             weights=SEARCH_TEXT_WEIGHTS, default_language="none"),
+    ],
+    "vehicles": [
+        _idx("key", unique=True),
+        _idx(("last_seen_at", DESCENDING)),
+        _idx("has_repeat_failure", ("last_seen_at", DESCENDING)),
+        _idx("timeline.case_id"),
+        _idx("plates"),
+        _idx("companies"),
+    ],
+    "claim_fingerprints": [
+        _idx("case_id", unique=True),
+        _idx("signature", sparse=True),
+        _idx("lsh_bands"),
+    ],
+    "payment_transactions": [
+        _idx("id", unique=True),
+        _idx("stripe_session_id", sparse=True),
+        _idx("iyzico_conversation_id", sparse=True),
+        _idx("user_id", ("created_at", DESCENDING)),
+        _idx("status", ("created_at", DESCENDING)),
+        _idx("payment_method"),
+    ],
+    "system_logs": [
+        _idx(("created_at", DESCENDING)),
+        _idx("level", ("created_at", DESCENDING)),
+        _idx("event_type", ("created_at", DESCENDING)),
+    ],
+    "warranty_rules": [
+        _idx("id", unique=True),
+        _idx("is_active", ("created_at", DESCENDING)),
+    ],
+    "contract_rules": [
+        _idx("id", unique=True),
+        _idx("is_active", "created_at"),
+    ],
+    "invoices": [
+        _idx("id", unique=True),
+        _idx("transaction_id"),
+        _idx("status", ("created_at", DESCENDING)),
+    ],
+    "analysis_jobs": [
+        _idx("id", unique=True),
+        _idx("status", "created_at"),
+        _idx("batch_id", "created_at"),
+        _idx("pdf_storage_name", "status"),
+    ],
+    "pdf_blobs": [
+        _idx("name", unique=True),
+        _idx("refs", "last_uploaded_at"),
+    ],
+    "analysis_batches": [_idx("id", unique=True)],
+    "analysis_locks": [
+        _idx("key", unique=True),
+        _idx("expires_at", expireAfterSeconds=0),
+    ],
+    "translation_memory": [_idx("key", unique=True)],
+    "llm_budget_limits": [_idx("id", unique=True)],
+    "llm_budget_usage": [
+        _idx("key", unique=True),
+        _idx("expires_at", expireAfterSeconds=0),
+    ],
+}
+
+
+def _normalize_keys(keys: Any) -> List[Tuple[str, Any]]:
+    return [(key, int(direction) if isinstance(direction, (int, float)) else direction) for key, direction in keys]
+
+
+def diff_indexes(specs: List[IndexSpec], existing: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Tanımlı index'leri mevcut index_information() çıktısıyla karşılaştırır."""
+    missing, drifted, ok = [], [], []
+    for spec in specs:
+        current = existing.get(spec.name)
+        if current is None:
+            missing.append(spec.name)
+            continue
+        if spec.text_fields:
+            # Text index'lerde key _fts/_ftsx olarak döner; alanlar weights'ten okunur
+            same_keys = set(current.get("weights") or {}) == spec.text_fields
+        else:
+            same_keys = _normalize_keys(current.get("key", [])) == spec.keys
+        same_options = all(current.get(option) == spec.options.get(option) for option in COMPARED_OPTIONS
+                           if option in spec.options or current.get(option) not in (None, False))
+        (ok if same_keys and same_options else drifted).append(spec.name)
+    managed = {spec.name for spec in specs}
+    unmanaged = [name for name in existing if name != "_id_" and name not in managed]
+    return {"ok": ok, "missing": missing, "drifted": drifted, "unmanaged": unmanaged}
+
+
+async def ensure_collection_indexes(collection_name: str, specs: List[IndexSpec], fix_drift: bool = DB_INDEX_FIX_DRIFT) -> Dict[str, Any]:
+    collection = db[collection_name]
+    diff = diff_indexes(specs, await collection.index_information())
+    by_name = {spec.name: spec for spec in specs}
+    created, failed = [], {}
+
+    if diff["drifted"]:
+        if fix_drift:
+            for name in diff["drifted"]:
+                await collection.drop_index(name)
+        else:
+            logger.warning(f"{collection_name}: tanımdan farklı index'ler (DB_INDEX_FIX_DRIFT kapalı): {diff['drifted']}")
+
+    to_create = diff["missing"] + (diff["drifted"] if fix_drift else [])
+    # Tek tek oluşturulur; ör. mükerrer veri yüzünden unique index kurulamazsa diğerleri etkilenmez
+    for name in to_create:
+        try:
+            await collection.create_indexes([by_name[name].model()])
+            created.append(name)
+        except OperationFailure as exc:
+            failed[name] = str(exc)
+            logger.error(f"{collection_name}.{name} index'i oluşturulamadı: {exc}")
+    return {**diff, "created": created, "failed": failed}
+
+
+async def ensure_indexes(fix_drift: bool = DB_INDEX_FIX_DRIFT) -> Dict[str, Any]:
+    """Kayıttaki tüm koleksiyonların index'lerini tanımla uyumlu hale getirir."""
+    result = {}
+    for collection_name, specs in INDEX_REGISTRY.items():
+        result[collection_name] = await ensure_collection_indexes(collection_name, specs, fix_drift)
+    created = sum(len(item["created"]) for item in result.values())
+    if created:
+        logger.info(f"DB index'leri oluşturuldu: {created} adet")
+    _last_result.clear()
+    _last_result.update(result)
+    return result
+
+
+async def _ensure_indexes_safely() -> None:
+    try:
+        await ensure_indexes()
+    except Exception as exc:
+        logger.error(f"DB index'leri hazırlanamadı: {exc}")
+
+
+def start_index_build() -> None:
+    """Index'leri arka planda hazırlar; mevcut index'ler atlandığı için yeniden başlatmada maliyetsizdir."""
+    global _build_task
+    if _build_task is None or _build_task.done():
+        _build_task = asyncio.create_task(_ensure_indexes_safely())
+
+
+async def _index_usage(collection_name: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    try:
+        stats = await db[collection_name].aggregate([{"$indexStats": {}}]).to_list(None)
+    except Exception as exc:
+        logger.debug(f"$indexStats alınamadı ({collection_name}): {exc}")
+        return None
+    usage: Dict[str, Dict[str, Any]] = {}
+    for item in stats:
+        accesses = item.get("accesses") or {}
+        since = accesses.get("since")
+        usage[item["name"]] = {
+            "ops": int(accesses.get("ops", 0)),
+            "since": since.isoformat() if hasattr(since, "isoformat") else since,
+            "host": item.get("host"),
+        }
+    return usage
+
+
+async def index_report() -> Dict[str, Any]:
+    """Koleksiyon bazında index durumu (ok/missing/drifted/unmanaged) ve $indexStats kullanım sayıları."""
+    collections = {}
+    for collection_name, specs in INDEX_REGISTRY.items():
+        existing = await db[collection_name].index_information()
+        diff = diff_indexes(specs, existing)
+        usage = await _index_usage(collection_name)
+        indexes = []
+        for name, info in existing.items():
+            status = next((key for key in ("ok", "drifted", "unmanaged") if name in diff[key]), "default")
+            indexes.append({
+                "name": name,
+                "key": [[key, direction] for key, direction in info.get("key", [])],
+                "status": status,
+                "usage": usage.get(name) if usage is not None else None,
+            })
+        # Kullanım sayısına göre az kullanılanlar önce
+        indexes.sort(key=lambda item: (item["usage"] or {}).get("ops", 0))
+        collections[collection_name] = {"indexes": indexes, "missing": diff["missing"]}
+    return {
+        "collections": collections,
+        "last_build": {
+            name: {"created": item["created"], "failed": item["failed"]}
+            for name, item in _last_result.items() if item["created"] or item["failed"]
+        },
+    }
@@ -0,0 +1,228 @@
+"""
+Uzun IZE belgeleri için map-reduce analiz yardımcıları.
+
+Tek prompt'a sığmayan belgeler sayfa sınırlarından token bütçeli gruplara
+bölünür. Her grup sınırlı eşzamanlılıkla ayrı bir LLM çağrısında kompakt
+ara bulgulara (AIPageGroupNotes) dönüştürülür (map). Bulgular
+deterministik olarak birleştirilir; çelişen değerler sayfa aralıklarıyla
+birlikte bırakılır ve son analiz çağrısı bu özet üzerinden yapılır (reduce).
+"""
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from models.case import AIPageGroupNotes
+from services.structured_output import parse_analysis_output
+from services.token_counter import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# PDF metni bu token sayısını aşarsa map-reduce kullanılır
+MAP_REDUCE_MIN_TOKENS = int(os.environ.get("MAP_REDUCE_MIN_TOKENS", "2400"))
+MAP_GROUP_MAX_TOKENS = int(os.environ.get("MAP_GROUP_MAX_TOKENS", "2500"))
+MAP_REDUCE_CONCURRENCY = int(os.environ.get("MAP_REDUCE_CONCURRENCY", "3"))
+MAP_MAX_COMPLETION_TOKENS = 450
+# Birleştirilmiş özetteki liste alanı başına en fazla madde
+MAX_MERGED_LIST_ITEMS = 20
+# Map çağrısı başarısız olan grubun özet yerine konan ham metin uzunluğu
+FAILED_GROUP_FALLBACK_TOKENS = 200
+
+MAP_SYSTEM_MESSAGE = (
+    "Sen IZE garanti belgelerinden bilgi çıkaran bir asistansın. "
+    "Yalnızca verilen sayfalarda geçen bilgileri çıkar, tahmin etme. Sadece JSON ver."
+)
+
+SCALAR_FIELDS = (
+    "ize_no", "company", "plate", "vin", "warranty_start_date", "repair_date",
+    "repair_km", "request_type", "failure_complaint", "failure_cause",
+)
+LIST_FIELDS = (
+    "operations_performed", "parts_replaced", "contract_mentions", "damage_evidence", "other_facts",
+)
+
+_PAGE_SPLIT_RE = re.compile(r"\n*--- SAYFA (\d+)(?: \(OCR\))? ---\n")
+
+# (system, prompt, max_tokens, on_delta, fields, model=..., response_model=...) -> (metin, usage)
+ProviderCall = Callable[..., Awaitable[Tuple[str, Dict[str, int]]]]
+
+
+@dataclass
+class PageGroup:
+    first_page: int
+    last_page: int
+    text: str
+
+    @property
+    def label(self) -> str:
+        if self.first_page == self.last_page:
+            return str(self.first_page)
+        return f"{self.first_page}-{self.last_page}"
+
+
+def split_pages(pdf_text: str) -> List[Tuple[int, str]]:
+    """Çıkarılan metni sayfa işaretlerinden (sayfa no, metin) listesine böler."""
+    parts = _PAGE_SPLIT_RE.split(pdf_text)
+    if len(parts) == 1:
+        return [(1, pdf_text)]
+    pages = []
+    # parts: [önsöz, no1, metin1, no2, metin2, ...]
+    for index in range(1, len(parts) - 1, 2):
+        pages.append((int(parts[index]), parts[index + 1].strip()))
+    return pages
+
+
+def needs_map_reduce(pdf_text: str, provider: str = "openai") -> bool:
+    """Belge tek prompt'a sığmayacak kadar uzunsa ve birden çok sayfası varsa True."""
+    if count_tokens(pdf_text, provider) <= MAP_REDUCE_MIN_TOKENS:
+        return False
+    return len(split_pages(pdf_text)) > 1
+
+
+def group_pages(
+    pages: Sequence[Tuple[int, str]],
+    max_tokens: int = MAP_GROUP_MAX_TOKENS,
+    provider: str = "openai",
+) -> List[PageGroup]:
+    """Ardışık sayfaları token bütçesini aşmayacak gruplara toplar."""
+    groups: List[PageGroup] = []
+    current: List[Tuple[int, str]] = []
+    current_tokens = 0
+
+    for page_num, text in pages:
+        page_tokens = count_tokens(text, provider)
+        if page_tokens > max_tokens:
+            text = truncate_to_tokens(text, max_tokens, provider)
+            page_tokens = max_tokens
+        if current and current_tokens + page_tokens > max_tokens:
+            groups.append(_make_group(current))
+            current, current_tokens = [], 0
+        current.append((page_num, text))
+        current_tokens += page_tokens
+
+    if current:
+        groups.append(_make_group(current))
+    return groups
+
+
+def _make_group(pages: List[Tuple[int, str]]) -> PageGroup:
+    text = "\n\n".join(f"--- SAYFA {page_num} ---\n{text}" for page_num, text in pages)
+    return PageGroup(first_page=pages[0][0], last_page=pages[-1][0], text=text)
+
+
+# Statik talimatlar başta: gruplar arasında prompt önbelleği paylaşılır
+MAP_INSTRUCTIONS = """Aşağıdaki IZE belgesi sayfalarından şemadaki bilgileri çıkar.
+- Sayfalarda geçmeyen alanları null veya boş liste bırak.
+- Metinleri orijinal dilinde ve kısa yaz.
+- Hasar, kaza, kullanıcı hatası belirtilerini damage_evidence içine ekle.
+"""
+
+
+def render_map_prompt(group: PageGroup, total_pages: int) -> str:
+    return f"""{MAP_INSTRUCTIONS}
+IZE BELGESİ - SAYFA {group.label} / {total_pages}
+
+{group.text}
+"""
+
+
+def _format_list_item(item: Any) -> str:
+    if isinstance(item, dict):
+        return f"{item.get('partName', '')} - {item.get('description', '')} (x{item.get('qty', 1)})"
+    return str(item)
+
+
+def merge_group_notes(results: Sequence[Tuple[PageGroup, Dict[str, Any]]]) -> str:
+    """Grup bulgularını tek bir kompakt özet metnine birleştirir."""
+    lines: List[str] = []
+
+    for name in SCALAR_FIELDS:
+        seen: Dict[str, List[str]] = {}
+        for group, notes in results:
+            value = notes.get(name)
+            if value in (None, ""):
+                continue
+            seen.setdefault(str(value), []).append(group.label)
+        if len(seen) == 1:
+            lines.append(f"{name}: {next(iter(seen))}")
+        elif seen:
+            # Çelişen değerler sayfa bilgisiyle son analize bırakılır
+            variants = " | ".join(f"{value} (s.{', '.join(labels)})" for value, labels in seen.items())
+            lines.append(f"{name}: {variants}")
+
+    for name in LIST_FIELDS:
+        items: List[str] = []
+        for group, notes in results:
+            for item in notes.get(name) or []:
+                text = _format_list_item(item)
+                if text and text not in items:
+                    items.append(text)
+        if items:
+            # Alan başına tek satır: prompt kırpma satır bazında çalışır
+            lines.append(f"{name}: " + "; ".join(items[:MAX_MERGED_LIST_ITEMS]))
+
+    return "\n".join(lines)
+
+
+async def map_document(
+    pdf_text: str,
+    calls: Sequence[Tuple[str, ProviderCall, str]],
+    provider: str = "openai",
+    on_group_done: Optional[Callable[..., None]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Belgeyi sayfa gruplarına böler ve grupları paralel olarak özetler.
+
+    calls: denenecek (sağlayıcı, çağrı, model) listesi. Yük dağılsın diye her
+    grup listeye sırayla farklı bir uç noktadan başlar.
+    Dönüş: (birleştirilmiş özet metni, map istatistikleri).
+    """
+    pages = split_pages(pdf_text)
+    groups = group_pages(pages, MAP_GROUP_MAX_TOKENS, provider)
+    total_pages = pages[-1][0] if pages else 1
+    slots = asyncio.Semaphore(max(MAP_REDUCE_CONCURRENCY, 1))
+    started = time.perf_counter()
+
+    async def map_group(index: int, group: PageGroup) -> Tuple[PageGroup, Dict[str, Any], Dict[str, Any]]:
+        start = index % len(calls) if calls else 0
+        async with slots:
+            prompt = render_map_prompt(group, total_pages)
+            for provider_name, call, model in [*calls[start:], *calls[:start]]:
+                try:
+                    text, usage = await call(
+                        MAP_SYSTEM_MESSAGE, prompt, MAP_MAX_COMPLETION_TOKENS, None, None,
+                        model=model, response_model=AIPageGroupNotes,
+                    )
+                    notes, _ = parse_analysis_output(text, response_model=AIPageGroupNotes)
+                    stats = {"provider": provider_name, "model": model, **usage}
+                    break
+                except Exception as exc:
+                    logger.warning(f"Sayfa grubu {group.label} özetlenemedi ({provider_name}): {exc}")
+            else:
+                # Özet alınamayan grubun kısa ham metni kaybolmasın
+                notes = {"other_facts": [truncate_to_tokens(group.text, FAILED_GROUP_FALLBACK_TOKENS, provider)]}
+                stats = {"provider": None, "model": None, "prompt_tokens": 0, "completion_tokens": 0}
+
+        if on_group_done is not None:
+            on_group_done(pages=group.label, provider=stats["provider"], model=stats["model"])
+        return group, notes, stats
+
+    mapped = await asyncio.gather(*(map_group(index, group) for index, group in enumerate(groups)))
+
+    merged = merge_group_notes([(group, notes) for group, notes, _ in mapped])
+    calls_stats = [{"pages": group.label, **stats} for group, _, stats in mapped]
+    map_stats = {
+        "groups": len(groups),
+        "pages": len(pages),
+        "failed_groups": sum(1 for item in calls_stats if item["provider"] is None),
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "calls": calls_stats,
+    }
+    logger.info(
+        f"Map-reduce: {len(pages)} sayfa {len(groups)} grupta özetlendi, "
+        f"özet {count_tokens(merged, provider)} token"
+    )
+    return merged, map_stats
@@ -79,7 +79,8 @@ async def get_email_settings():
             "smtp_password": "",
             "sender_name": "IZE Case Resolver",
             "sender_email": "info@visupanel.com",
-            "email_enabled": True
+            "email_enabled": True,
+            "smtp_starttls": True
         }
     
     return settings
@@ -284,8 +285,10 @@ async def send_analysis_email(
         
         with smtplib.SMTP(smtp_host, smtp_port) as server:
             server.ehlo()
-            server.starttls(context=context)
-            server.ehlo()
+            # smtp_starttls=False yalnızca TLS desteklemeyen yerel sunucular (ör. yük testi SMTP sink'i) içindir
+            if settings.get('smtp_starttls', True):
+                server.starttls(context=context)
+                server.ehlo()
             server.login(smtp_user, smtp_password)
             server.sendmail(
                 settings.get('sender_email', smtp_user),
@@ -327,8 +330,9 @@ async def test_smtp_connection() -> dict:
         
         with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as server:
             server.ehlo()
-            server.starttls(context=context)
-            server.ehlo()
+            if settings.get('smtp_starttls', True):
+                server.starttls(context=context)
+                server.ehlo()
             server.login(smtp_user, smtp_password)
         
         return {"success": True, "message": "SMTP bağlantısı başarılı"}
@@ -399,8 +403,9 @@ Renault Trucks Yetkili Servisleri için Garanti Analiz Sistemi
         
         with smtplib.SMTP(smtp_host, smtp_port) as server:
             server.ehlo()
-            server.starttls(context=context)
-            server.ehlo()
+            if settings.get('smtp_starttls', True):
+                server.starttls(context=context)
+                server.ehlo()
             server.login(smtp_user, smtp_password)
             server.sendmail(
                 settings.get('sender_email', smtp_user),
@@ -460,8 +465,9 @@ Mesaj:
 
         with smtplib.SMTP(smtp_host, smtp_port) as server:
             server.ehlo()
-            server.starttls(context=context)
-            server.ehlo()
+            if settings.get('smtp_starttls', True):
+                server.starttls(context=context)
+                server.ehlo()
             server.login(smtp_user, smtp_password)
             server.sendmail(
                 settings.get('sender_email', smtp_user),
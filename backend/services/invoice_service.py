@@ -85,7 +85,6 @@ class InvoiceService:
         
         # Veritabanına kaydet
         invoice_dict = invoice.model_dump()
-        invoice_dict['created_at'] = invoice_dict['created_at'].isoformat() if isinstance(invoice_dict['created_at'], datetime) else invoice_dict['created_at']
         await db.invoices.insert_one(invoice_dict)
         
         logger.info(f"Invoice created: {invoice_number} for {user.get('email')}")
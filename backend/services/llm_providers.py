@@ -0,0 +1,569 @@
+"""
+LLM sağlayıcı adaptörleri ve yük dengeleyen sağlayıcı kaydı.
+
+api_settings'te (veya ortam değişkenlerinde) tanımlı her anahtar bir uç
+nokta (endpoint) olur: openai_key, google_key, anthropic_key, emergent_key
+ve other_keys içindeki ek anahtarlar. other_keys adları sağlayıcı adıyla
+başlamalıdır ("openai_yedek", "gemini:2", "claude-ekip" gibi); tanınmayan
+adlar atlanır.
+
+Her analizde uç noktalar ağırlık / gecikme (EWMA) puanına göre ağırlıklı
+rastgele sıralanır; böylece yük tek bir anahtarın TPM kotasına yığılmaz.
+Rate limit alan uç nokta bir süre soğumaya alınır ve sıranın sonuna düşer.
+Sağlık bilgisi süreç içinde tutulur.
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+import httpx
+from fastapi import HTTPException
+from openai import AsyncOpenAI, RateLimitError
+from pydantic import BaseModel
+
+from models.case import AIAnalysisOutput
+from services.model_router import TIER_FULL, model_for
+from services.structured_output import (
+    gemini_response_schema,
+    openai_response_format,
+    plain_json_schema,
+)
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_OPENAI = "openai"
+PROVIDER_GEMINI = "google_gemini"
+PROVIDER_ANTHROPIC = "anthropic_claude"
+PROVIDER_EMERGENT = "emergent"
+
+# api_settings alanı -> sağlayıcı
+SETTINGS_KEY_FIELDS = {
+    "openai_key": PROVIDER_OPENAI,
+    "google_key": PROVIDER_GEMINI,
+    "anthropic_key": PROVIDER_ANTHROPIC,
+    "emergent_key": PROVIDER_EMERGENT,
+}
+ENV_KEY_NAMES = {
+    PROVIDER_OPENAI: "OPENAI_API_KEY",
+    PROVIDER_GEMINI: "GOOGLE_API_KEY",
+    PROVIDER_ANTHROPIC: "ANTHROPIC_API_KEY",
+    PROVIDER_EMERGENT: "EMERGENT_LLM_KEY",
+}
+# other_keys adlarındaki önekler (uzundan kısaya eşleştirilir)
+PROVIDER_ALIASES = {
+    "google_gemini": PROVIDER_GEMINI,
+    "gemini": PROVIDER_GEMINI,
+    "google": PROVIDER_GEMINI,
+    "openai": PROVIDER_OPENAI,
+    "anthropic_claude": PROVIDER_ANTHROPIC,
+    "anthropic": PROVIDER_ANTHROPIC,
+    "claude": PROVIDER_ANTHROPIC,
+    "emergent": PROVIDER_EMERGENT,
+}
+# Token bütçesi hesabında kullanılan sayaç (token_counter sağlayıcı adı)
+TOKENIZERS = {
+    PROVIDER_OPENAI: "openai",
+    PROVIDER_EMERGENT: "openai",
+    PROVIDER_GEMINI: "gemini",
+    PROVIDER_ANTHROPIC: "anthropic",
+}
+
+# *_BASE_URL ile yerel sahte sağlayıcıya (tools/mock_llm_server.py) yönlendirilebilir
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
+GEMINI_API_URL = f"{os.environ.get('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com').rstrip('/')}/v1beta/models"
+ANTHROPIC_API_URL = f"{os.environ.get('ANTHROPIC_BASE_URL', 'https://api.anthropic.com').rstrip('/')}/v1/messages"
+ANTHROPIC_API_VERSION = "2023-06-01"
+# Anthropic'te yapılandırılmış çıktı zorunlu araç çağrısıyla alınır
+ANTHROPIC_TOOL_NAME = "submit_analysis"
+# prompt_cache_key, prompt'un bu kadar karakterlik (statik) başından türetilir
+PROMPT_CACHE_KEY_PREFIX_CHARS = 1024
+
+# "openai=3,google_gemini=1,openai:yedek=2" biçiminde; verilmeyen uç noktalar 1
+PROVIDER_WEIGHTS_ENV = os.environ.get("AI_PROVIDER_WEIGHTS", "")
+RATE_LIMIT_COOLDOWN_SECONDS = float(os.environ.get("AI_PROVIDER_COOLDOWN_SECONDS", "30"))
+LATENCY_EWMA_ALPHA = 0.3
+# Henüz ölçümü olmayan uç nokta için varsayılan gecikme
+DEFAULT_LATENCY_MS = 4000.0
+
+OnDelta = Optional[Callable[[str], None]]
+# (system, prompt, max_tokens, on_delta, fields, model=..., response_model=...) -> (metin, usage)
+ProviderCall = Callable[..., Awaitable[Tuple[str, Dict[str, int]]]]
+AdapterFactory = Callable[[str], ProviderCall]
+
+
+def _prompt_cache_key(system_message: str, prompt: str) -> str:
+    """Aynı statik prefix'i paylaşan istekleri aynı önbellek sunucusuna yönlendiren anahtar."""
+    prefix = f"{system_message}\n{prompt[:PROMPT_CACHE_KEY_PREFIX_CHARS]}"
+    return f"ize-{hashlib.sha256(prefix.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _gemini_response_text(data: Dict[str, Any]) -> str:
+    candidates = data.get("candidates", [])
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join([part.get("text", "") for part in parts if part.get("text")])
+
+
+async def _analyze_with_gemini(
+    system_message: str,
+    prompt: str,
+    google_api_key: str,
+    max_output_tokens: int,
+    on_delta: OnDelta = None,
+    fields: Optional[List[str]] = None,
+    model: str = model_for(PROVIDER_GEMINI, TIER_FULL),
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Tuple[str, Dict[str, int]]:
+    """Gemini REST API ile şemaya uygun JSON yanıt metni ve usage üret (on_delta verilirse akışlı)."""
+    payload = {
+        "contents": [
+            {
+                "role": "user",
+                "parts": [
+                    {"text": f"{system_message}\n\n{prompt}"}
+                ],
+            }
+        ],
+        "generationConfig": {
+            "temperature": 0.1,
+            "maxOutputTokens": max_output_tokens,
+            "responseMimeType": "application/json",
+            "responseSchema": gemini_response_schema(fields, response_model),
+        },
+    }
+    usage_metadata: Dict[str, Any] = {}
+
+    if on_delta is None:
+        endpoint = f"{GEMINI_API_URL}/{model}:generateContent?key={google_api_key}"
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await client.post(endpoint, json=payload)
+
+        if response.status_code >= 400:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Gemini API hatası: {response.text[:400]}"
+            )
+
+        data = response.json()
+        if not data.get("candidates"):
+            raise HTTPException(status_code=500, detail="Gemini yanıtı boş döndü")
+        text = _gemini_response_text(data).strip()
+        usage_metadata = data.get("usageMetadata") or {}
+    else:
+        endpoint = f"{GEMINI_API_URL}/{model}:streamGenerateContent?alt=sse&key={google_api_key}"
+        chunks: List[str] = []
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            async with client.stream("POST", endpoint, json=payload) as response:
+                if response.status_code >= 400:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    raise HTTPException(
+                        status_code=response.status_code,
+                        detail=f"Gemini API hatası: {body[:400]}"
+                    )
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    chunk = json.loads(line[5:].strip())
+                    usage_metadata = chunk.get("usageMetadata") or usage_metadata
+                    chunk_text = _gemini_response_text(chunk)
+                    if chunk_text:
+                        chunks.append(chunk_text)
+                        on_delta(chunk_text)
+        text = "".join(chunks).strip()
+
+    if not text:
+        raise HTTPException(status_code=500, detail="Gemini metin yanıtı üretmedi")
+
+    usage = {
+        "prompt_tokens": int(usage_metadata.get("promptTokenCount") or 0),
+        "completion_tokens": int(usage_metadata.get("candidatesTokenCount") or 0),
+        "cached_prompt_tokens": int(usage_metadata.get("cachedContentTokenCount") or 0),
+    }
+    return text, usage
+
+
+async def _analyze_with_openai(
+    openai_client: AsyncOpenAI,
+    system_message: str,
+    prompt: str,
+    max_tokens: int,
+    on_delta: OnDelta = None,
+    fields: Optional[List[str]] = None,
+    model: str = model_for(PROVIDER_OPENAI, TIER_FULL),
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Tuple[str, Dict[str, int]]:
+    """OpenAI structured output ile şemaya uygun JSON yanıt metni ve usage üret."""
+    request = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.1,
+        "max_tokens": max_tokens,
+        "response_format": openai_response_format(fields, response_model),
+        # Eski SDK sürümleriyle uyum için extra_body üzerinden gönderilir
+        "extra_body": {"prompt_cache_key": _prompt_cache_key(system_message, prompt)},
+    }
+
+    if on_delta is None:
+        response = await openai_client.chat.completions.create(**request)
+        response_text = (response.choices[0].message.content or "").strip()
+        usage = getattr(response, "usage", None)
+    else:
+        stream = await openai_client.chat.completions.create(
+            **request,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        chunks: List[str] = []
+        usage = None
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices:
+                delta_text = chunk.choices[0].delta.content
+                if delta_text:
+                    chunks.append(delta_text)
+                    on_delta(delta_text)
+        response_text = "".join(chunks).strip()
+
+    prompt_details = getattr(usage, "prompt_tokens_details", None) if usage else None
+    return response_text, {
+        "prompt_tokens": int(getattr(usage, "prompt_tokens", 0) or 0) if usage else 0,
+        "completion_tokens": int(getattr(usage, "completion_tokens", 0) or 0) if usage else 0,
+        "cached_prompt_tokens": int(getattr(prompt_details, "cached_tokens", 0) or 0) if prompt_details else 0,
+    }
+
+
+def _anthropic_usage(raw: Dict[str, Any]) -> Dict[str, int]:
+    # input_tokens önbellekten okunan/yazılan tokenları içermez
+    cached = int(raw.get("cache_read_input_tokens") or 0)
+    prompt_tokens = int(raw.get("input_tokens") or 0) + cached + int(raw.get("cache_creation_input_tokens") or 0)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": int(raw.get("output_tokens") or 0),
+        "cached_prompt_tokens": cached,
+    }
+
+
+async def _analyze_with_anthropic(
+    system_message: str,
+    prompt: str,
+    anthropic_api_key: str,
+    max_tokens: int,
+    on_delta: OnDelta = None,
+    fields: Optional[List[str]] = None,
+    model: str = model_for(PROVIDER_ANTHROPIC, TIER_FULL),
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Tuple[str, Dict[str, int]]:
+    """Anthropic Messages API ile zorunlu araç çağrısı üzerinden şemaya uygun JSON üret."""
+    payload = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "temperature": 0.1,
+        # Araç şeması + system bloğu önbelleğe alınır
+        "system": [{"type": "text", "text": system_message, "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": prompt}],
+        "tools": [{
+            "name": ANTHROPIC_TOOL_NAME,
+            "description": "IZE analiz sonucunu şemaya uygun olarak kaydet.",
+            "input_schema": plain_json_schema(fields, response_model),
+        }],
+        "tool_choice": {"type": "tool", "name": ANTHROPIC_TOOL_NAME},
+    }
+    headers = {
+        "x-api-key": anthropic_api_key,
+        "anthropic-version": ANTHROPIC_API_VERSION,
+        "content-type": "application/json",
+    }
+    usage_raw: Dict[str, Any] = {}
+
+    if on_delta is None:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            response = await client.post(ANTHROPIC_API_URL, json=payload, headers=headers)
+
+        if response.status_code >= 400:
+            raise HTTPException(
+                status_code=response.status_code,
+                detail=f"Anthropic API hatası: {response.text[:400]}"
+            )
+
+        data = response.json()
+        tool_inputs = [block.get("input") for block in data.get("content", []) if block.get("type") == "tool_use"]
+        text = json.dumps(tool_inputs[0], ensure_ascii=False) if tool_inputs else ""
+        usage_raw = data.get("usage") or {}
+    else:
+        chunks: List[str] = []
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            async with client.stream(
+                "POST", ANTHROPIC_API_URL, json={**payload, "stream": True}, headers=headers
+            ) as response:
+                if response.status_code >= 400:
+                    body = (await response.aread()).decode("utf-8", errors="replace")
+                    raise HTTPException(
+                        status_code=response.status_code,
+                        detail=f"Anthropic API hatası: {body[:400]}"
+                    )
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:].strip())
+                    if event.get("type") == "message_start":
+                        usage_raw = dict(event.get("message", {}).get("usage") or {})
+                    elif event.get("type") == "message_delta":
+                        usage_raw.update(event.get("usage") or {})
+                    elif event.get("type") == "content_block_delta":
+                        chunk_text = event.get("delta", {}).get("partial_json")
+                        if chunk_text:
+                            chunks.append(chunk_text)
+                            on_delta(chunk_text)
+        text = "".join(chunks).strip()
+
+    if not text:
+        raise HTTPException(status_code=500, detail="Anthropic yanıtı boş döndü")
+    return text, _anthropic_usage(usage_raw)
+
+
+async def _analyze_with_emergent(
+    system_message: str,
+    prompt: str,
+    emergent_api_key: str,
+    max_tokens: int,
+    on_delta: OnDelta = None,
+    fields: Optional[List[str]] = None,
+    model: str = model_for(PROVIDER_EMERGENT, TIER_FULL),
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Tuple[str, Dict[str, int]]:
+    """Emergent universal anahtarıyla (LlmChat) JSON yanıt üret; şema prompt'a eklenir."""
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+    # LlmChat yapılandırılmış çıktı ve usage desteklemez; şema talimat olarak verilir
+    schema_text = json.dumps(plain_json_schema(fields, response_model), ensure_ascii=False)
+    chat = LlmChat(
+        api_key=emergent_api_key,
+        session_id=str(uuid.uuid4()),
+        system_message=system_message,
+    ).with_model("openai", model)
+    response = await chat.send_message(UserMessage(text=f"{prompt}\nJSON ŞEMASI:\n{schema_text}"))
+    text = (response or "").strip()
+    if not text:
+        raise HTTPException(status_code=500, detail="Emergent yanıtı boş döndü")
+    if on_delta is not None:
+        on_delta(text)
+    return text, {"prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0}
+
+
+def _openai_adapter(api_key: str) -> ProviderCall:
+    client = AsyncOpenAI(api_key=api_key, base_url=OPENAI_BASE_URL)
+
+    def call(system_message, prompt, max_tokens, on_delta, fields, model, response_model=AIAnalysisOutput):
+        return _analyze_with_openai(client, system_message, prompt, max_tokens, on_delta, fields, model, response_model)
+    return call
+
+
+def _key_adapter(analyze: Callable[..., Awaitable[Tuple[str, Dict[str, int]]]]) -> AdapterFactory:
+    """Anahtarı üçüncü parametre olarak alan REST adaptörleri için fabrika."""
+    def factory(api_key: str) -> ProviderCall:
+        def call(system_message, prompt, max_tokens, on_delta, fields, model, response_model=AIAnalysisOutput):
+            return analyze(system_message, prompt, api_key, max_tokens, on_delta, fields, model, response_model)
+        return call
+    return factory
+
+
+ADAPTERS: Dict[str, AdapterFactory] = {
+    PROVIDER_OPENAI: _openai_adapter,
+    PROVIDER_GEMINI: _key_adapter(_analyze_with_gemini),
+    PROVIDER_ANTHROPIC: _key_adapter(_analyze_with_anthropic),
+    PROVIDER_EMERGENT: _key_adapter(_analyze_with_emergent),
+}
+
+
+def register_provider(name: str, factory: AdapterFactory, env_key_name: Optional[str] = None) -> None:
+    """Yeni bir sağlayıcı adaptörü kaydeder (modelleri model_router.MODELS'e eklenmelidir)."""
+    ADAPTERS[name] = factory
+    PROVIDER_ALIASES.setdefault(name, name)
+    if env_key_name:
+        ENV_KEY_NAMES[name] = env_key_name
+
+
+@dataclass
+class EndpointHealth:
+    latency_ms: Optional[float] = None
+    cooldown_until: float = 0.0
+    successes: int = 0
+    failures: int = 0
+    rate_limited: int = 0
+
+
+_health: Dict[str, EndpointHealth] = {}
+
+
+@dataclass
+class ProviderEndpoint:
+    """Tek bir API anahtarıyla erişilen sağlayıcı uç noktası."""
+    provider: str
+    label: str
+    weight: float
+    raw_call: ProviderCall
+
+    @property
+    def tokenizer(self) -> str:
+        return TOKENIZERS.get(self.provider, "openai")
+
+    @property
+    def health(self) -> EndpointHealth:
+        return _health.setdefault(self.label, EndpointHealth())
+
+    async def call(self, *args, **kwargs) -> Tuple[str, Dict[str, int]]:
+        """Adaptörü çağırır; gecikme ve hata bilgisini yük dengeleme için kaydeder."""
+        started = time.perf_counter()
+        try:
+            result = await self.raw_call(*args, **kwargs)
+        except Exception as exc:
+            record_failure(self.label, is_rate_limit_error(exc))
+            raise
+        record_success(self.label, (time.perf_counter() - started) * 1000)
+        return result
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    if isinstance(exc, RateLimitError):
+        return True
+    if isinstance(exc, HTTPException):
+        return exc.status_code == 429
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429
+    return False
+
+
+def record_success(label: str, latency_ms: float) -> None:
+    health = _health.setdefault(label, EndpointHealth())
+    if health.latency_ms is None:
+        health.latency_ms = latency_ms
+    else:
+        health.latency_ms = LATENCY_EWMA_ALPHA * latency_ms + (1 - LATENCY_EWMA_ALPHA) * health.latency_ms
+    health.successes += 1
+
+
+def record_failure(label: str, rate_limited: bool) -> None:
+    health = _health.setdefault(label, EndpointHealth())
+    health.failures += 1
+    if rate_limited:
+        health.rate_limited += 1
+        health.cooldown_until = time.monotonic() + RATE_LIMIT_COOLDOWN_SECONDS
+        logger.warning(f"LLM uç noktası rate limit aldı, {RATE_LIMIT_COOLDOWN_SECONDS:.0f} sn soğumada: {label}")
+
+
+def _parse_weights(raw: str) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for item in raw.split(","):
+        name, _, value = item.partition("=")
+        try:
+            weights[name.strip()] = max(float(value), 0.0)
+        except ValueError:
+            continue
+    return weights
+
+
+def provider_for_key_name(name: str) -> Tuple[Optional[str], str]:
+    """other_keys adından (sağlayıcı, etiket eki) çıkarır: "gemini_yedek" -> (google_gemini, "yedek")."""
+    normalized = name.strip().lower()
+    for alias in sorted(PROVIDER_ALIASES, key=len, reverse=True):
+        if normalized == alias:
+            return PROVIDER_ALIASES[alias], normalized
+        if normalized.startswith(alias) and normalized[len(alias)] in ":_-.":
+            return PROVIDER_ALIASES[alias], normalized[len(alias) + 1:] or normalized
+    return None, normalized
+
+
+def configured_keys(db_settings: Optional[Dict[str, Any]]) -> List[Tuple[str, str, str]]:
+    """Tanımlı anahtarları (sağlayıcı, etiket, anahtar) listesi olarak döndürür."""
+    settings = db_settings or {}
+    keys: List[Tuple[str, str, str]] = []
+    seen = set()
+
+    def add(provider: str, label: str, api_key: Optional[str]) -> None:
+        if not api_key or api_key in seen or provider not in ADAPTERS:
+            return
+        seen.add(api_key)
+        keys.append((provider, label, api_key))
+
+    for field_name, provider in SETTINGS_KEY_FIELDS.items():
+        # Panelde girilen anahtar yoksa ortam değişkenine düşülür
+        add(provider, provider, settings.get(field_name) or os.environ.get(ENV_KEY_NAMES[provider], ""))
+
+    for name, api_key in (settings.get("other_keys") or {}).items():
+        provider, suffix = provider_for_key_name(name)
+        if provider is None:
+            logger.warning(f"other_keys içindeki '{name}' anahtarı bir sağlayıcıyla eşleşmedi, atlandı")
+            continue
+        add(provider, f"{provider}:{suffix}", api_key)
+    return keys
+
+
+def build_provider_endpoints(db_settings: Optional[Dict[str, Any]]) -> List[ProviderEndpoint]:
+    """Tanımlı tüm anahtarlar için adaptörleri kurar."""
+    weights = _parse_weights(PROVIDER_WEIGHTS_ENV)
+    endpoints = []
+    for provider, label, api_key in configured_keys(db_settings):
+        weight = weights.get(label, weights.get(provider, 1.0))
+        if weight <= 0:
+            continue
+        endpoints.append(ProviderEndpoint(provider, label, weight, ADAPTERS[provider](api_key)))
+    return endpoints
+
+
+def _score(endpoint: ProviderEndpoint) -> float:
+    latency = endpoint.health.latency_ms or DEFAULT_LATENCY_MS
+    return endpoint.weight / max(latency, 1.0)
+
+
+def order_endpoints(
+    endpoints: Sequence[ProviderEndpoint],
+    rng: Optional[random.Random] = None,
+) -> List[ProviderEndpoint]:
+    """
+    Deneme sırasını belirler: soğumada olmayanlar ağırlık/gecikme puanıyla
+    ağırlıklı rastgele (yerine koymadan) sıralanır, soğumadakiler sona eklenir.
+    """
+    rng = rng or random
+    now = time.monotonic()
+    ready = [endpoint for endpoint in endpoints if endpoint.health.cooldown_until <= now]
+    cooling = sorted(
+        (endpoint for endpoint in endpoints if endpoint.health.cooldown_until > now),
+        key=lambda endpoint: endpoint.health.cooldown_until,
+    )
+
+    ordered: List[ProviderEndpoint] = []
+    while ready:
+        scores = [_score(endpoint) for endpoint in ready]
+        pick = rng.uniform(0, sum(scores))
+        for index, score in enumerate(scores):
+            pick -= score
+            if pick <= 0:
+                break
+        ordered.append(ready.pop(index))
+    return ordered + cooling
+
+
+def provider_health_snapshot() -> Dict[str, Dict[str, Any]]:
+    """Admin paneli için süreç içi uç nokta sağlık bilgisi."""
+    now = time.monotonic()
+    return {
+        label: {
+            "latency_ms": round(health.latency_ms, 1) if health.latency_ms is not None else None,
+            "cooldown_seconds": round(max(health.cooldown_until - now, 0.0), 1),
+            "successes": health.successes,
+            "failures": health.failures,
+            "rate_limited": health.rate_limited,
+        }
+        for label, health in _health.items()
+    }
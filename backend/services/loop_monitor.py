@@ -0,0 +1,81 @@
+"""
+Event loop gecikmesi (lag) ölçümü.
+
+Arka plandaki görev her aralıkta uyur ve planlanandan ne kadar geç
+uyandığını kaydeder. Gecikme, event loop'u bloklayan senkron işleri (PDF
+işleme, senkron SMTP vb.) gösterir. Son örnekler bellekte tutulur ve admin
+runtime-metrics uç noktası ile yük testi raporlarında kullanılır.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 0 verilirse izleme başlatılmaz
+LOOP_LAG_INTERVAL_MS = float(os.environ.get("EVENT_LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_LAG_MAX_SAMPLES = 6000
+# Bu değerin üstündeki gecikmeler uyarı olarak loglanır
+LOOP_LAG_WARN_MS = float(os.environ.get("EVENT_LOOP_LAG_WARN_MS", "500"))
+
+
+def percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    """En yakın sıra yöntemiyle yüzdelik (boş listede None)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(values: Iterable[float]) -> Dict[str, Optional[float]]:
+    values = list(values)
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 2) if values else None,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+class EventLoopLagMonitor:
+    """Çalıştığı event loop'un zamanlama gecikmesini örnekler."""
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, max_samples: int = LOOP_LAG_MAX_SAMPLES):
+        self.interval = interval_ms / 1000
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = round(max(time.perf_counter() - expected, 0.0) * 1000, 2)
+            self.samples.append(lag_ms)
+            if lag_ms >= LOOP_LAG_WARN_MS:
+                logger.warning(f"Event loop {lag_ms} ms bloklandı")
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def reset(self) -> None:
+        self.samples.clear()
+
+    def snapshot(self) -> Dict[str, Optional[float]]:
+        return {**summarize(self.samples), "interval_ms": self.interval * 1000}
+
+
+loop_monitor = EventLoopLagMonitor()
@@ -0,0 +1,135 @@
+"""
+Maliyet odaklı model yönlendirme.
+
+Belgenin zorluğu çıkarılan metinden puanlanır: sayfa sayısı, OCR'lı sayfa
+oranı, metin uzunluğu ve regex ile önceden bulunabilen alan (VIN, plaka,
+tarih, km) sayısı. Kolay belgeler ucuz/hızlı modele gider; çıktı doğrulamadan
+geçmezse ya da modelin bildirdiği güven düşükse tam modele yükseltilir.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+TIER_FAST = "fast"
+TIER_FULL = "full"
+
+MODEL_ROUTING_ENABLED = os.environ.get("AI_MODEL_ROUTING", "1") != "0"
+# Bu puanın altındaki belgeler hızlı modele gider (0 kolay - 1 zor)
+EASY_DOCUMENT_MAX_SCORE = float(os.environ.get("AI_ROUTER_EASY_MAX_SCORE", "0.35"))
+# Hızlı modelin bildirdiği güven bunun altındaysa tam modele yükseltilir
+MIN_FAST_MODEL_CONFIDENCE = float(os.environ.get("AI_ROUTER_MIN_CONFIDENCE", "0.75"))
+
+MODELS = {
+    "openai": {TIER_FAST: "gpt-4o-mini", TIER_FULL: "gpt-4o"},
+    "google_gemini": {TIER_FAST: "gemini-1.5-flash-8b", TIER_FULL: "gemini-1.5-flash"},
+    "anthropic_claude": {TIER_FAST: "claude-3-5-haiku-latest", TIER_FULL: "claude-3-5-sonnet-latest"},
+    # Emergent universal anahtarı OpenAI modellerine aracılık eder
+    "emergent": {TIER_FAST: "gpt-4o-mini", TIER_FULL: "gpt-4o"},
+}
+
+# USD / token (giriş, çıkış, önbellekten okunan giriş)
+MODEL_PRICING = {
+    "gpt-4o": (0.000005, 0.000015, 0.0000025),
+    "gpt-4o-mini": (0.00000015, 0.0000006, 0.000000075),
+    "gemini-1.5-flash": (0.000000075, 0.0000003, 0.00000001875),
+    "gemini-1.5-flash-8b": (0.0000000375, 0.00000015, 0.00000001),
+    "claude-3-5-sonnet-latest": (0.000003, 0.000015, 0.0000003),
+    "claude-3-5-haiku-latest": (0.0000008, 0.000004, 0.00000008),
+}
+
+# Hızlı model bu alanlardan birini eksik bırakırsa karar güvenilmez sayılır
+CRITICAL_FIELDS = ("warranty_decision", "is_within_2_year_warranty", "contract_decision", "ize_no")
+
+_PAGE_MARKER_RE = re.compile(r"--- SAYFA \d+( \(OCR\))? ---")
+_VIN_RE = re.compile(r"\b[A-HJ-NPR-Z0-9]{17}\b")
+_PLATE_RE = re.compile(r"\b(0[1-9]|[1-7][0-9]|8[01])\s?[A-Z]{1,3}\s?\d{2,4}\b")
+_DATE_RE = re.compile(r"\b(\d{1,2}[./-]\d{1,2}[./-]\d{4}|\d{4}-\d{2}-\d{2})\b")
+_KM_RE = re.compile(r"\b\d{1,3}(?:[.,\s]?\d{3})*\s?km\b", re.IGNORECASE)
+
+
+@dataclass
+class RouteDecision:
+    tier: str
+    score: float
+    features: Dict[str, Any]
+    attempts: List[Dict[str, Any]] = field(default_factory=list)
+    # Bütçe dolduğu için hızlı modele sabitlendi (yükseltme yapılmaz)
+    budget_degraded: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "initial_tier": self.tier,
+            "difficulty_score": self.score,
+            "features": self.features,
+            "escalated": any(attempt.get("escalation_reason") for attempt in self.attempts),
+            "budget_degraded": self.budget_degraded,
+            "attempts": self.attempts,
+        }
+
+
+def document_features(pdf_text: str) -> Dict[str, Any]:
+    """Çıkarılan metinden zorluk puanında kullanılan özellikleri hesaplar."""
+    markers = _PAGE_MARKER_RE.findall(pdf_text)
+    pages = max(len(markers), 1)
+    ocr_pages = sum(1 for ocr_suffix in markers if ocr_suffix)
+    prefilled = {
+        "vin": bool(_VIN_RE.search(pdf_text)),
+        "plate": bool(_PLATE_RE.search(pdf_text)),
+        "date": len(_DATE_RE.findall(pdf_text)) >= 2,
+        "km": bool(_KM_RE.search(pdf_text)),
+    }
+    return {
+        "pages": pages,
+        "ocr_pages": ocr_pages,
+        "ocr_share": round(ocr_pages / pages, 3),
+        "text_chars": len(pdf_text),
+        "prefilled_fields": sum(prefilled.values()),
+    }
+
+
+def score_difficulty(features: Dict[str, Any]) -> float:
+    """0 (kolay) ile 1 (zor) arası belge zorluk puanı."""
+    score = (
+        0.3 * min((features["pages"] - 1) / 5, 1.0)
+        + 0.35 * features["ocr_share"]
+        + 0.2 * min(features["text_chars"] / 12000, 1.0)
+        + 0.15 * (1 - features["prefilled_fields"] / 4)
+    )
+    return round(score, 3)
+
+
+def route_document(pdf_text: str) -> RouteDecision:
+    """Belge için başlangıç model katmanını seçer."""
+    features = document_features(pdf_text)
+    score = score_difficulty(features)
+    tier = TIER_FAST if MODEL_ROUTING_ENABLED and score <= EASY_DOCUMENT_MAX_SCORE else TIER_FULL
+    return RouteDecision(tier=tier, score=score, features=features)
+
+
+def model_for(provider: str, tier: str) -> str:
+    return MODELS[provider][tier]
+
+
+def estimate_cost_usd(
+    model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0
+) -> Optional[float]:
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        return None
+    # Önbellekten gelen giriş tokenları indirimli fiyatlanır (prompt_tokens bunları da içerir)
+    cached = min(cached_prompt_tokens, prompt_tokens)
+    return round((prompt_tokens - cached) * pricing[0] + cached * pricing[2] + completion_tokens * pricing[1], 6)
+
+
+def escalation_reason(payload: Dict[str, Any], missing_fields: List[str]) -> Optional[str]:
+    """Hızlı model çıktısı tam modele yükseltmeyi gerektiriyorsa nedenini döndürür."""
+    missing_critical = [name for name in CRITICAL_FIELDS if name in missing_fields]
+    if missing_critical:
+        return f"validation_failed:{','.join(missing_critical)}"
+    confidence = payload.get("confidence")
+    if confidence is None:
+        return "confidence_missing"
+    if confidence < MIN_FAST_MODEL_CONFIDENCE:
+        return f"low_confidence:{confidence}"
+    return None
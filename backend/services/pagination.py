@@ -0,0 +1,79 @@
+"""
+(created_at, id) üzerinde keyset (cursor) sayfalama yardımcıları.
+
+İmleç, sayfanın son kaydının created_at ve id değerlerinden oluşan opak bir
+base64url dizesidir. Sonraki sayfa skip kullanmadan bu değerlerden "daha
+eski" kayıtlarla başlar; böylece sorgu maliyeti sayfa boyutuyla sınırlı
+kalır ve sayfalar arasında eklenen kayıtlar kaymaya yol açmaz.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from services.timestamps import DATE_DUAL_READ
+
+# Yeni -> eski sıralama; id eşit created_at değerlerinde sırayı sabitler
+KEYSET_SORT = [("created_at", -1), ("id", -1)]
+
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    created_at = doc["created_at"]
+    # "d": değer BSON date (ISO string'e çevrilmiş), aksi halde eski ISO string kayıt
+    payload = {"c": created_at.isoformat(), "d": 1} if isinstance(created_at, datetime) else {"c": created_at}
+    payload["i"] = doc["id"]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Union[str, datetime], str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(payload["c"]) if payload.get("d") else str(payload["c"])
+        return created_at, str(payload["i"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+
+
+def keyset_query(query: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+    """Filtreye imleçten sonraki (daha eski) kayıtlar koşulunu ekler."""
+    if not cursor:
+        return query
+    created_at, case_id = decode_cursor(cursor)
+    conditions = [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": case_id}},
+    ]
+    if DATE_DUAL_READ and isinstance(created_at, datetime):
+        # Azalan sıralamada ISO string kayıtlar tüm date kayıtlardan sonra gelir
+        conditions.append({"created_at": {"$type": "string"}})
+    after = {"$or": conditions}
+    return {"$and": [query, after]} if query else after
+
+
+def split_page(docs: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """limit + 1 kayıt çekilir; fazlası varsa sonraki sayfanın imleci döner."""
+    if len(docs) <= limit:
+        return docs, None
+    page = docs[:limit]
+    return page, encode_cursor(page[-1])
+
+
+def encode_offset_cursor(offset: int) -> str:
+    """Sıralaması puana dayalı (keyset uygulanamayan) sonuçlar için konum imleci."""
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_offset_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = int(json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["o"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+    return offset
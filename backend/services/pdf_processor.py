@@ -1,5 +1,8 @@
 import io
 import logging
+import os
+import time
+from typing import Callable, Optional
 import pdfplumber
 import pytesseract
 from pdf2image import convert_from_bytes
@@ -11,11 +14,21 @@ MIN_PAGE_TEXT_LEN = 50
 MIN_OCR_TEXT_LEN = 20
 OCR_DPI = 200
 MAX_OCR_PAGES = 3
-MAX_ANALYZE_PAGES = 20
+# Uzun belgeler map-reduce ile analiz edildiği için sayfa sınırı yüksek tutulur
+MAX_ANALYZE_PAGES = int(os.environ.get("PDF_MAX_ANALYZE_PAGES", "60"))
 
 
-def extract_text_from_pdf(pdf_file: bytes) -> str:
-    """PDF'den metin çıkarır - OCR destekli geliştirilmiş versiyon"""
+def extract_text_from_pdf(pdf_file: bytes, on_page: Optional[Callable[..., None]] = None) -> str:
+    """
+    PDF'den metin çıkarır - OCR destekli geliştirilmiş versiyon
+
+    on_page verilirse her sayfa işlendiğinde sayfa numarası, yöntem
+    (text/ocr/skipped) ve süre bilgisiyle çağrılır.
+    """
+    def report_page(page_num: int, mode: str, chars: int, started: float) -> None:
+        if on_page is not None:
+            on_page(page=page_num, mode=mode, chars=chars, duration_ms=round((time.perf_counter() - started) * 1000, 1))
+
     try:
         text_chunks = []
         ocr_used_pages = 0
@@ -32,17 +45,20 @@ def extract_text_from_pdf(pdf_file: bytes) -> str:
                 )
             
             for page_num, page in enumerate(pdf.pages[:pages_to_process], 1):
+                page_started = time.perf_counter()
                 page_text = page.extract_text()
                 
                 if page_text and len(page_text.strip()) > MIN_PAGE_TEXT_LEN:
                     # Normal metin çıkarma başarılı
                     text_chunks.append(f"\n\n--- SAYFA {page_num} ---\n{page_text}")
                     logger.info(f"Sayfa {page_num} işlendi (normal): {len(page_text)} karakter")
+                    report_page(page_num, "text", len(page_text), page_started)
                 else:
                     if ocr_used_pages >= MAX_OCR_PAGES:
                         logger.info(
                             f"Sayfa {page_num} için OCR atlandı (OCR limitine ulaşıldı: {MAX_OCR_PAGES})"
                         )
+                        report_page(page_num, "skipped", 0, page_started)
                         continue
 
                     # Sayfa boş veya çok az metin - OCR dene
@@ -69,10 +85,13 @@ def extract_text_from_pdf(pdf_file: bytes) -> str:
                             if ocr_text and len(ocr_text.strip()) > MIN_OCR_TEXT_LEN:
                                 text_chunks.append(f"\n\n--- SAYFA {page_num} (OCR) ---\n{ocr_text}")
                                 logger.info(f"Sayfa {page_num} OCR ile işlendi: {len(ocr_text)} karakter")
+                                report_page(page_num, "ocr", len(ocr_text), page_started)
                             else:
                                 logger.warning(f"Sayfa {page_num} OCR sonuç vermedi")
+                                report_page(page_num, "ocr", 0, page_started)
                     except Exception as ocr_error:
                         logger.error(f"Sayfa {page_num} OCR hatası: {str(ocr_error)}")
+                        report_page(page_num, "ocr_failed", 0, page_started)
 
         text = "".join(text_chunks)
         
@@ -0,0 +1,248 @@
+"""
+İçerik adresli (SHA-256) ve tekilleştirilmiş PDF deposu.
+
+Dosyalar uploads/ize_pdfs/ab/cd/<sha256>.pdf yoluna yazılır; aynı PDF
+tekrar yüklendiğinde mevcut dosya kullanılır. Yazma önce .tmp altındaki
+geçici dosyaya yapılır, ardından os.replace ile yerine taşınır; yarım
+yazılmış dosya hiçbir zaman depolama adıyla görünmez.
+
+pdf_blobs koleksiyonu dosyayı kullanan case sayısını (refs) tutar. Case
+kaydedilirken acquire_pdf, silinirken release_pdfs çağrılır. refs sıfıra
+inen ve PDF_GC_GRACE_SECONDS süresince yeniden yüklenmeyen, bekleyen bir
+job'ın da kullanmadığı dosyalar silinir (collect_unreferenced_pdfs).
+
+Eski düz <uuid>.pdf adları okunmaya devam eder; tools/migrate_pdf_storage
+ile içerik adresli yapıya taşınır.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from database import db
+from models.job import JOB_STATUS_QUEUED, JOB_STATUS_RUNNING
+
+logger = logging.getLogger(__name__)
+
+PDF_UPLOAD_DIR = Path(__file__).parent.parent / "uploads" / "ize_pdfs"
+PDF_TMP_DIR = PDF_UPLOAD_DIR / ".tmp"
+PDF_TMP_DIR.mkdir(parents=True, exist_ok=True)
+PDF_GC_GRACE_SECONDS = int(os.environ.get("PDF_GC_GRACE_SECONDS", "86400"))
+PDF_GC_BATCH_SIZE = 500
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.pdf$")
+
+_gc_task: Optional[asyncio.Task] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def storage_name_for(sha256: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+
+
+def content_hash(pdf_storage_name: str) -> Optional[str]:
+    """İçerik adresli adın SHA-256'sı; eski düz adlar için None."""
+    match = _CONTENT_ADDRESSED.match(pdf_storage_name or "")
+    return match.group(1) if match else None
+
+
+def resolve_pdf_path(pdf_storage_name: str) -> Optional[Path]:
+    """Depolama adının dosya yolu; depo dışına çıkan adlar için None."""
+    root = PDF_UPLOAD_DIR.resolve()
+    pdf_path = (root / pdf_storage_name).resolve()
+    if not pdf_path.is_relative_to(root) or pdf_path.parent == PDF_TMP_DIR.resolve():
+        return None
+    return pdf_path
+
+
+def _commit(temp_path: Path, sha256: str) -> str:
+    pdf_storage_name = storage_name_for(sha256)
+    target = PDF_UPLOAD_DIR / pdf_storage_name
+    if target.exists():
+        try:
+            # Aynı içerik zaten var; mtime yenilenir ki eşzamanlı GC dosyayı silmesin
+            os.utime(target)
+            temp_path.unlink()
+            return pdf_storage_name
+        except FileNotFoundError:
+            pass
+    target.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(temp_path, target)
+    return pdf_storage_name
+
+
+def _write_temp(chunks) -> tuple:
+    digest = hashlib.sha256()
+    handle, temp_name = tempfile.mkstemp(dir=PDF_TMP_DIR, suffix=".part")
+    temp_path = Path(temp_name)
+    try:
+        with os.fdopen(handle, "wb") as temp_file:
+            for chunk in chunks:
+                digest.update(chunk)
+                temp_file.write(chunk)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return temp_path, digest.hexdigest()
+
+
+def store_uploaded_pdf(pdf_content: bytes) -> str:
+    """Yüklenen PDF'i içerik adresli olarak yazar ve depolama adını döndürür."""
+    return _commit(*_write_temp([pdf_content]))
+
+
+def store_pdf_stream(source: BinaryIO) -> str:
+    """Dosya benzeri kaynaktan PDF'i belleğe almadan, hash'leyerek diske yazar."""
+    return _commit(*_write_temp(iter(lambda: source.read(COPY_CHUNK_SIZE), b"")))
+
+
+def read_stored_pdf(pdf_storage_name: str) -> bytes:
+    """Depolanan PDF'in içeriğini okur."""
+    pdf_path = resolve_pdf_path(pdf_storage_name)
+    if pdf_path is None:
+        raise FileNotFoundError(pdf_storage_name)
+    return pdf_path.read_bytes()
+
+
+async def register_upload(pdf_storage_name: str) -> None:
+    """Yüklemeyi pdf_blobs'a işler; GC bekleme süresi bu andan başlar."""
+    sha256 = content_hash(pdf_storage_name)
+    if not sha256:
+        return
+    await db.pdf_blobs.update_one(
+        {"name": pdf_storage_name},
+        {
+            "$set": {"last_uploaded_at": _now()},
+            "$setOnInsert": {"sha256": sha256, "refs": 0, "created_at": _now()},
+        },
+        upsert=True,
+    )
+
+
+async def acquire_pdf(pdf_storage_name: str, size_bytes: int) -> None:
+    """Case kaydı öncesi dosyanın referans sayısını artırır."""
+    sha256 = content_hash(pdf_storage_name)
+    if not sha256:
+        return
+    await db.pdf_blobs.update_one(
+        {"name": pdf_storage_name},
+        {
+            "$inc": {"refs": 1},
+            "$set": {"size_bytes": size_bytes},
+            "$setOnInsert": {"sha256": sha256, "created_at": _now(), "last_uploaded_at": _now()},
+        },
+        upsert=True,
+    )
+
+
+async def release_pdfs(pdf_storage_names: List[str]) -> int:
+    """Silinen case'lerin PDF referanslarını düşer; silinen dosya sayısını döndürür."""
+    removed = 0
+    released = Counter(name for name in pdf_storage_names if content_hash(name))
+    if released:
+        await db.pdf_blobs.bulk_write(
+            [UpdateOne({"name": name}, {"$inc": {"refs": -count}}) for name, count in released.items()],
+            ordered=False,
+        )
+        removed += await collect_unreferenced_pdfs(list(released))
+    for pdf_storage_name in pdf_storage_names:
+        # Eski düz adlı dosyalar case başına tekildir
+        if not content_hash(pdf_storage_name) and await _delete_file(pdf_storage_name):
+            removed += 1
+    return removed
+
+
+async def _delete_file(pdf_storage_name: str, uploaded_before: Optional[datetime] = None) -> bool:
+    pdf_path = resolve_pdf_path(pdf_storage_name)
+    if pdf_path is None:
+        return False
+    if uploaded_before is None:
+        try:
+            await asyncio.to_thread(pdf_path.unlink)
+            return True
+        except FileNotFoundError:
+            return False
+    # Önce geçici ada taşınır: aynı anda gelen yükleme dosyayı bulamaz ve yeniden yazar
+    trash_path = PDF_TMP_DIR / f"{uuid.uuid4().hex}.gc"
+    try:
+        await asyncio.to_thread(os.replace, pdf_path, trash_path)
+    except FileNotFoundError:
+        return False
+    modified = datetime.fromtimestamp(trash_path.stat().st_mtime, timezone.utc)
+    if modified >= uploaded_before:
+        # Taşımadan hemen önce yeniden yüklendi
+        await asyncio.to_thread(os.replace, trash_path, pdf_path)
+        return False
+    await asyncio.to_thread(trash_path.unlink)
+    return True
+
+
+async def collect_unreferenced_pdfs(names: Optional[List[str]] = None) -> int:
+    """refs <= 0 olan, bekleme süresi dolmuş ve bekleyen job'ı olmayan dosyaları siler."""
+    cutoff = _now() - timedelta(seconds=PDF_GC_GRACE_SECONDS)
+    query: Dict[str, Any] = {"refs": {"$lte": 0}, "last_uploaded_at": {"$lt": cutoff}}
+    if names is not None:
+        query["name"] = {"$in": names}
+    removed = 0
+    async for blob in db.pdf_blobs.find(query, {"_id": 0, "name": 1}).batch_size(PDF_GC_BATCH_SIZE):
+        pending_job = await db.analysis_jobs.find_one(
+            {"pdf_storage_name": blob["name"], "status": {"$in": [JOB_STATUS_QUEUED, JOB_STATUS_RUNNING]}},
+            {"_id": 1},
+        )
+        if pending_job:
+            continue
+        # Aynı koşulla silinir: arada acquire/yükleme olduysa kayıt kalır
+        result = await db.pdf_blobs.delete_one({**query, "name": blob["name"]})
+        if result.deleted_count and await _delete_file(blob["name"], uploaded_before=cutoff):
+            removed += 1
+    if removed:
+        logger.info(f"Referanssız PDF dosyaları silindi: {removed}")
+    return removed
+
+
+async def storage_stats() -> Dict[str, Any]:
+    """Depo özeti: tekil dosya, referans ve tekilleştirmeyle kazanılan alan."""
+    rows = await db.pdf_blobs.aggregate([
+        {"$group": {
+            "_id": None,
+            "files": {"$sum": 1},
+            "references": {"$sum": "$refs"},
+            "bytes": {"$sum": {"$ifNull": ["$size_bytes", 0]}},
+            "saved_bytes": {"$sum": {"$multiply": [
+                {"$ifNull": ["$size_bytes", 0]}, {"$max": [{"$subtract": ["$refs", 1]}, 0]},
+            ]}},
+            "unreferenced": {"$sum": {"$cond": [{"$lte": ["$refs", 0]}, 1, 0]}},
+        }},
+    ]).to_list(1)
+    stats = rows[0] if rows else {"files": 0, "references": 0, "bytes": 0, "saved_bytes": 0, "unreferenced": 0}
+    stats.pop("_id", None)
+    return stats
+
+
+async def _collect_on_startup() -> None:
+    try:
+        await collect_unreferenced_pdfs()
+    except Exception as exc:
+        logger.error(f"Referanssız PDF temizliği başarısız: {exc}")
+
+
+def start_pdf_gc() -> None:
+    """Başlangıçta referanssız PDF'leri arka planda temizler."""
+    global _gc_task
+    if _gc_task is None:
+        _gc_task = asyncio.create_task(_collect_on_startup())
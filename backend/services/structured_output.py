@@ -0,0 +1,276 @@
+"""
+LLM yapılandırılmış çıktı yardımcıları: JSON şeması ve artımlı JSON onarımı.
+
+Şemalar yanıt modelinden (varsayılan AIAnalysisOutput) sağlayıcıya özel biçimde (OpenAI strict
+json_schema, Gemini responseSchema) üretilir. max_tokens sınırında yarım
+kalan yanıtlar atılmaz: artımlı ayrıştırıcı tamamlanmış değerleri kurtarır,
+alanlar modele göre tek tek doğrulanır ve yalnızca eksik/geçersiz alanlar
+yeniden istenir.
+"""
+import copy
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from models.case import AIAnalysisOutput
+
+_JSON_SCALAR_RE = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_WHITESPACE = " \t\r\n"
+
+
+def _strip_code_fence(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _parse_partial(text: str) -> Tuple[Any, List[Any]]:
+    """Ayrıştırılan kök değeri ve metin bittiğinde hâlâ açık olan kapsayıcıları döndürür."""
+    text = _strip_code_fence(text)
+    starts = [pos for pos in (text.find("{"), text.find("[")) if pos >= 0]
+    if not starts:
+        raise ValueError("Yanıtta JSON nesnesi bulunamadı")
+
+    index = min(starts)
+    length = len(text)
+    root: Any = None
+    # Her çerçeve: [kapsayıcı, bekleyen anahtar]
+    stack: List[list] = []
+
+    def attach(value: Any) -> None:
+        frame = stack[-1]
+        if isinstance(frame[0], dict):
+            if frame[1] is not None:
+                frame[0][frame[1]] = value
+                frame[1] = None
+        else:
+            frame[0].append(value)
+
+    while index < length:
+        char = text[index]
+        if char in _WHITESPACE or char in ",:":
+            index += 1
+            continue
+
+        if char in "{[":
+            container: Any = {} if char == "{" else []
+            if stack:
+                attach(container)
+            else:
+                root = container
+            stack.append([container, None])
+            index += 1
+            continue
+
+        if char in "}]":
+            stack.pop()
+            index += 1
+            if not stack:
+                return root, []
+            continue
+
+        if not stack:
+            break
+
+        if char == '"':
+            try:
+                value, index = json.decoder.scanstring(text, index + 1)
+            except json.JSONDecodeError:
+                break
+            frame = stack[-1]
+            if isinstance(frame[0], dict) and frame[1] is None:
+                frame[1] = value
+            else:
+                attach(value)
+            continue
+
+        match = _JSON_SCALAR_RE.match(text, index)
+        # Metnin sonuna dayanan sayı kesilmiş olabilir; güvenli değil
+        if not match or match.end() >= length:
+            break
+        attach(json.loads(match.group(0)))
+        index = match.end()
+
+    if root is None:
+        raise ValueError("Yanıtta JSON nesnesi bulunamadı")
+    return root, [frame[0] for frame in stack]
+
+
+def parse_partial_json(text: str) -> Tuple[Any, bool]:
+    """
+    JSON metnini artımlı ayrıştırır; yarım kalmışsa tamamlanmış kısmı döndürür.
+
+    Dönüş: (değer, onarıldı_mı). Yarım kalan string/sayı değerleri ve değeri
+    gelmemiş anahtarlar atılır, açık kalan nesne ve diziler kapatılır.
+    """
+    root, open_containers = _parse_partial(text)
+    return root, bool(open_containers)
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(model: Type[BaseModel], field_name: str) -> TypeAdapter:
+    return TypeAdapter(model.model_fields[field_name].annotation)
+
+
+def validate_partial(
+    raw: Dict[str, Any],
+    model: Type[BaseModel] = AIAnalysisOutput,
+    fields: Optional[Sequence[str]] = None,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Alanları tek tek doğrular; geçerli alanları ve eksik/geçersiz alan adlarını döndürür."""
+    valid: Dict[str, Any] = {}
+    missing: List[str] = []
+    for name in fields or list(model.model_fields):
+        if name not in raw:
+            missing.append(name)
+            continue
+        adapter = _field_adapter(model, name)
+        try:
+            valid[name] = adapter.dump_python(adapter.validate_python(raw[name]), mode="json")
+        except ValidationError:
+            missing.append(name)
+    return valid, missing
+
+
+def parse_analysis_output(
+    text: str,
+    fields: Optional[Sequence[str]] = None,
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Tuple[Dict[str, Any], List[str]]:
+    """LLM yanıtını onararak ayrıştırır ve yanıt modelinin alanlarına göre doğrular."""
+    raw, open_containers = _parse_partial(text)
+    if not isinstance(raw, dict):
+        raise ValueError("Yanıt bir JSON nesnesi değil")
+    if len(open_containers) > 1:
+        # Kesilme anında yazılmakta olan liste/nesne eksik olabilir; yeniden istenir
+        truncated = open_containers[1]
+        raw = {key: value for key, value in raw.items() if value is not truncated}
+    return validate_partial(raw, response_model, fields)
+
+
+def _inline_schema(node: Any, defs: Dict[str, Any]) -> Any:
+    if isinstance(node, list):
+        return [_inline_schema(item, defs) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        return _inline_schema(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+
+    result = {}
+    for key, value in node.items():
+        if key in ("title", "default", "$defs"):
+            continue
+        if key == "properties":
+            result[key] = {name: _inline_schema(prop, defs) for name, prop in value.items()}
+        else:
+            result[key] = _inline_schema(value, defs)
+    return result
+
+
+def _base_schema(response_model: Type[BaseModel], fields: Optional[Tuple[str, ...]]) -> Dict[str, Any]:
+    schema = response_model.model_json_schema()
+    schema = _inline_schema(schema, schema.get("$defs", {}))
+    if fields:
+        schema["properties"] = {name: schema["properties"][name] for name in fields}
+    return schema
+
+
+def _to_openai_strict(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_to_openai_strict(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    result = {key: _to_openai_strict(value) for key, value in node.items()}
+    if result.get("type") == "object":
+        # Strict modda tüm alanlar zorunlu ve ek alan yasak olmalı
+        result["additionalProperties"] = False
+        result["required"] = list(result.get("properties", {}))
+    return result
+
+
+def _to_gemini(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_to_gemini(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+
+    any_of = node.get("anyOf")
+    if any_of:
+        # Gemini anyOf yerine nullable bekler
+        non_null = [option for option in any_of if option.get("type") != "null"]
+        if len(non_null) == 1:
+            merged = {**{k: v for k, v in node.items() if k != "anyOf"}, **non_null[0], "nullable": True}
+            return _to_gemini(merged)
+
+    result = {
+        key: _to_gemini(value)
+        for key, value in node.items()
+        if key != "additionalProperties"
+    }
+    if result.get("type") == "object":
+        result["required"] = list(result.get("properties", {}))
+    return result
+
+
+def _schema_name(response_model: Type[BaseModel]) -> str:
+    return re.sub(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])", "_", response_model.__name__).lower()
+
+
+@lru_cache(maxsize=64)
+def _openai_response_format(
+    response_model: Type[BaseModel], fields: Optional[Tuple[str, ...]]
+) -> Dict[str, Any]:
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": _schema_name(response_model),
+            "strict": True,
+            "schema": _to_openai_strict(_base_schema(response_model, fields)),
+        },
+    }
+
+
+@lru_cache(maxsize=64)
+def _gemini_response_schema(
+    response_model: Type[BaseModel], fields: Optional[Tuple[str, ...]]
+) -> Dict[str, Any]:
+    return _to_gemini(_base_schema(response_model, fields))
+
+
+def openai_response_format(
+    fields: Optional[Sequence[str]] = None,
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Dict[str, Any]:
+    """OpenAI structured output için response_format (fields verilirse yalnızca o alanlar)."""
+    return copy.deepcopy(_openai_response_format(response_model, tuple(fields) if fields else None))
+
+
+def gemini_response_schema(
+    fields: Optional[Sequence[str]] = None,
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Dict[str, Any]:
+    """Gemini generationConfig.responseSchema değeri (fields verilirse yalnızca o alanlar)."""
+    return copy.deepcopy(_gemini_response_schema(response_model, tuple(fields) if fields else None))
+
+
+@lru_cache(maxsize=64)
+def _plain_json_schema(
+    response_model: Type[BaseModel], fields: Optional[Tuple[str, ...]]
+) -> Dict[str, Any]:
+    schema = _base_schema(response_model, fields)
+    schema["required"] = list(schema.get("properties", {}))
+    return schema
+
+
+def plain_json_schema(
+    fields: Optional[Sequence[str]] = None,
+    response_model: Type[BaseModel] = AIAnalysisOutput,
+) -> Dict[str, Any]:
+    """Standart JSON şeması (Anthropic araç input_schema'sı ve prompt içi şema için)."""
+    return copy.deepcopy(_plain_json_schema(response_model, tuple(fields) if fields else None))
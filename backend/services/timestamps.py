@@ -0,0 +1,49 @@
+"""
+Zaman damgası alanları için BSON date geçişi yardımcıları.
+
+Eski kayıtlarda created_at/updated_at/completed_at/archived_at ISO string,
+yeni kayıtlarda BSON date'tir. Geçiş süresince (DATE_DUAL_READ=true) tarih
+aralığı sorguları ve gün gruplamaları iki tipi de kapsar; tools.migrate_dates
+tüm kayıtları çevirdikten sonra DATE_DUAL_READ=false ile yalnızca date
+karşılaştırması yapılır ve sorgular index'i tek aralıkla kullanır.
+
+BSON sıralamasında string'ler date'lerden önce gelir; yeni kayıtlar date
+olduğundan created_at'e göre azalan sıralama geçiş sırasında da doğru kalır.
+"""
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+DATE_DUAL_READ = os.environ.get("DATE_DUAL_READ", "true").lower() == "true"
+
+
+def to_datetime(value: Any) -> Optional[datetime]:
+    """ISO string veya date değerini UTC'li datetime'a çevirir; çevrilemezse None."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+def date_range(field: str, gte: Optional[datetime] = None, lt: Optional[datetime] = None) -> Dict[str, Any]:
+    """field için [gte, lt) aralık filtresi; dual-read açıkken ISO string kayıtları da eşleşir."""
+    bounds = {op: value for op, value in (("$gte", gte), ("$lt", lt)) if value is not None}
+    query = {field: bounds}
+    if not DATE_DUAL_READ:
+        return query
+    legacy = {op: value.isoformat() for op, value in bounds.items()}
+    return {"$or": [query, {field: legacy}]}
+
+
+def day_bucket(field: str) -> Dict[str, Any]:
+    """Kaydı UTC gününün başlangıcına indiren aggregation ifadesi ($dateTrunc)."""
+    truncated = {"$dateTrunc": {"date": f"${field}", "unit": "day"}}
+    if not DATE_DUAL_READ:
+        return truncated
+    legacy = {"$dateFromString": {"dateString": {"$substr": [f"${field}", 0, 10]}, "format": "%Y-%m-%d"}}
+    return {"$cond": [{"$eq": [{"$type": f"${field}"}, "string"]}, legacy, truncated]}
@@ -0,0 +1,155 @@
+"""
+LLM prompt token sayımı ve bütçeye göre metin kırpma yardımcıları.
+
+OpenAI modelleri için tiktoken ile birebir sayım yapılır (encoder süreç içinde
+önbelleklenir). Gemini için kalibre edilmiş bir tahmin kullanılır; tiktoken
+yüklenemezse OpenAI tarafı da aynı tahmine düşer.
+"""
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+OPENAI_ENCODING_MODEL = "gpt-4o"
+# Chat formatının mesaj başına eklediği sabit tokenlar (rol, ayraçlar, yanıt başlangıcı)
+CHAT_MESSAGE_OVERHEAD_TOKENS = 4
+CHAT_REPLY_PRIMING_TOKENS = 3
+
+# Gemini SentencePiece tokenizer'ı için örnek IZE faturalarıyla kalibre edilen oranlar.
+# Rakamlar tek tek tokenlanır; Almanca/Türkçe kelimeler ~3.6 karakter/token.
+GEMINI_CHARS_PER_WORD_TOKEN = 3.6
+GEMINI_SAFETY_FACTOR = 1.08
+# tiktoken yoksa OpenAI için kullanılan kelime oranı (o200k_base ölçümü)
+OPENAI_FALLBACK_CHARS_PER_WORD_TOKEN = 3.9
+OPENAI_FALLBACK_SAFETY_FACTOR = 1.12
+
+_TOKEN_PIECE_RE = re.compile(r"\d|[^\W\d_]+|\s+|[^\w\s]|_")
+
+
+@lru_cache(maxsize=1)
+def _get_openai_encoding():
+    """tiktoken encoder'ını bir kez yükler; yüklenemezse None döner."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken kurulu değil, OpenAI token sayımı tahmini yapılacak")
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(OPENAI_ENCODING_MODEL)
+    except Exception as exc:
+        logger.warning("tiktoken encoder yüklenemedi, tahmini sayım kullanılacak: %s", exc)
+        return None
+
+
+def _estimate_by_pieces(text: str, chars_per_word_token: float, safety_factor: float) -> int:
+    tokens = 0.0
+    for piece in _TOKEN_PIECE_RE.findall(text):
+        if piece.isspace():
+            # Tek boşluk genelde sonraki kelimeye yapışır; satır sonu/uzun boşluklar ayrı token
+            if "\n" in piece or len(piece) > 1:
+                tokens += 1
+        elif piece[0].isalpha():
+            tokens += max(1.0, len(piece) / chars_per_word_token)
+        else:
+            tokens += 1
+    return max(1, int(math.ceil(tokens * safety_factor)))
+
+
+def estimate_gemini_tokens(text: str) -> int:
+    """Gemini için kalibre edilmiş token tahmini."""
+    if not text:
+        return 0
+    return _estimate_by_pieces(text, GEMINI_CHARS_PER_WORD_TOKEN, GEMINI_SAFETY_FACTOR)
+
+
+@lru_cache(maxsize=4096)
+def _count_openai_tokens_cached(text: str) -> int:
+    encoding = _get_openai_encoding()
+    if encoding is None:
+        return _estimate_by_pieces(text, OPENAI_FALLBACK_CHARS_PER_WORD_TOKEN, OPENAI_FALLBACK_SAFETY_FACTOR)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str, provider: str = "openai") -> int:
+    """Metnin verilen sağlayıcıdaki token sayısını döndürür."""
+    if not text:
+        return 0
+    if provider == "openai":
+        return _count_openai_tokens_cached(text)
+    return estimate_gemini_tokens(text)
+
+
+def count_chat_tokens(system_message: str, prompt: str, provider: str = "openai") -> int:
+    """System + user mesajından oluşan sohbetin toplam input token sayısı."""
+    return (
+        count_tokens(system_message, provider)
+        + count_tokens(prompt, provider)
+        + 2 * CHAT_MESSAGE_OVERHEAD_TOKENS
+        + CHAT_REPLY_PRIMING_TOKENS
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int, provider: str = "openai", suffix: str = "") -> str:
+    """Metni (varsa sonek dahil) max_tokens bütçesine sığacak şekilde sondan kırpar."""
+    if not text or max_tokens <= 0:
+        return ""
+    if count_tokens(text, provider) <= max_tokens:
+        return text
+
+    budget = max_tokens - count_tokens(suffix, provider)
+    if budget <= 0:
+        return ""
+
+    encoding = _get_openai_encoding() if provider == "openai" else None
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return encoding.decode(tokens[:budget]) + suffix
+
+    # Tahmini sayımda en uzun sığan öneki ikili arama ile bul
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid], provider) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + suffix
+
+
+def fit_blocks_to_tokens(
+    blocks: List[str],
+    max_tokens: int,
+    provider: str = "openai",
+    separator: str = "\n",
+    max_chars: Optional[int] = None,
+) -> List[str]:
+    """
+    Öncelik sırasıyla verilen blokları bütçe dolana kadar seçer.
+
+    Sığmayan blok atlanır ve daha küçük sonraki bloklar denenmeye devam eder;
+    dönen liste giriş sırasını korur.
+    """
+    if max_tokens <= 0:
+        return []
+
+    separator_tokens = count_tokens(separator, provider) if separator else 0
+    selected: List[str] = []
+    used_tokens = 0
+    used_chars = 0
+
+    for block in blocks:
+        cost = count_tokens(block, provider) + (separator_tokens if selected else 0)
+        block_chars = len(block) + len(separator)
+        if used_tokens + cost > max_tokens:
+            continue
+        if max_chars is not None and used_chars + block_chars > max_chars:
+            continue
+        selected.append(block)
+        used_tokens += cost
+        used_chars += block_chars
+
+    return selected
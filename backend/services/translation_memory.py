@@ -0,0 +1,343 @@
+"""
+"Original: ... | TR: ..." alanları için çeviri belleği.
+
+Model metin alanlarını yalnızca belgedeki orijinal dilde döndürür; Türkçe
+karşılıklar normalize edilmiş kaynak ifade -> Türkçe ifade eşlemesinden
+(translation_memory koleksiyonu) doldurulur. Bellekte olmayan ifadeler tek
+bir toplu çeviri çağrısıyla çevrilir ve belleğe eklenir. Sayılar anahtarda
+"#" ile maskelenir; Türkçe karşılık sayı yer tutucularıyla saklandığı için
+"km 120000" ile "km 95000" aynı kaydı kullanır.
+
+Bellek geçmiş case'lerdeki iki dilli alanlardan da beslenir
+(backfill_translation_memory).
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+
+from database import db
+from models.case import AITranslationBatch
+from services.structured_output import parse_analysis_output
+
+logger = logging.getLogger(__name__)
+
+# Orijinal dilde dönen, Türkçe karşılığı bellekten/çeviriyle eklenen alanlar
+SOURCE_TEXT_FIELDS = ("failure_complaint", "failure_cause")
+SOURCE_LIST_FIELDS = ("operations_performed",)
+SOURCE_PART_FIELDS = ("partName", "description")
+# Model tarafından doğrudan Türkçe yazılan alanlar
+TURKISH_TEXT_FIELDS = ("repair_process_summary",)
+TURKISH_LIST_FIELDS = ("decision_rationale",)
+
+TR_MARKER = "| TR:"
+ORIGINAL_PREFIXES = ("Original:", "Orijinal:")
+MAX_PHRASE_CHARS = 300
+MAX_TRANSLATION_BATCH = 40
+TRANSLATION_MAX_COMPLETION_TOKENS = 600
+BACKFILL_BATCH_SIZE = 500
+TRANSLATION_MEMORY_BACKFILL = os.environ.get("TRANSLATION_MEMORY_BACKFILL", "1") != "0"
+
+TRANSLATION_SYSTEM_MESSAGE = (
+    "Sen kamyon servis ve garanti belgeleri için teknik çevirmensin. "
+    "Verilen ifadeleri aynı sırayla kısa ve teknik Türkçeye çevir; parça kodlarını ve sayıları aynen koru. "
+    "Sadece JSON ver."
+)
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+_PLACEHOLDER_RE = re.compile(r"⟦(\d+)⟧")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# (system, prompt, max_tokens, on_delta, fields, model=..., response_model=...) -> (metin, usage)
+TranslateCall = Callable[..., Awaitable[Tuple[str, Dict[str, int]]]]
+
+_backfill_task: Optional[asyncio.Task] = None
+
+
+def normalize_phrase(text: str) -> str:
+    """Bellek anahtarı: büyük/küçük harf, boşluk ve sayı farklarından bağımsız."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _NUMBER_RE.sub("#", text)
+    return _WHITESPACE_RE.sub(" ", text).strip(" .,:;-")
+
+
+def split_bilingual(text: str) -> Tuple[str, Optional[str]]:
+    """"Original: X | TR: Y" metnini (X, Y) olarak ayırır; iki dilli değilse (metin, None)."""
+    text = str(text or "").strip()
+    if TR_MARKER not in text:
+        return text, None
+    original, turkish = text.split(TR_MARKER, 1)
+    original = original.strip()
+    for prefix in ORIGINAL_PREFIXES:
+        if original.startswith(prefix):
+            original = original[len(prefix):].strip()
+    return original, turkish.strip()
+
+
+def format_bilingual(original: str, turkish: str) -> str:
+    return f"Original: {original} {TR_MARKER} {turkish}"
+
+
+def _to_template(source: str, turkish: str) -> Optional[str]:
+    """Türkçe metindeki sayıları kaynaktaki sıralarına göre yer tutucuya çevirir."""
+    numbers = _NUMBER_RE.findall(source)
+    if not numbers:
+        return turkish
+    missing = False
+
+    def replace(match: re.Match) -> str:
+        nonlocal missing
+        if match.group(0) not in numbers:
+            missing = True
+            return match.group(0)
+        return f"⟦{numbers.index(match.group(0))}⟧"
+
+    template = _NUMBER_RE.sub(replace, turkish)
+    # Kaynakta olmayan sayı içeren çeviri başka ifadelere uygulanamaz
+    return None if missing else template
+
+
+def _fill_template(template: str, source: str) -> Optional[str]:
+    numbers = _NUMBER_RE.findall(source)
+    try:
+        return _PLACEHOLDER_RE.sub(lambda match: numbers[int(match.group(1))], template)
+    except IndexError:
+        return None
+
+
+def _iter_source_phrases(payload: Dict[str, Any]):
+    """(okuyucu, yazıcı) çiftleri: kaynak dildeki her metin alanı için."""
+    for name in SOURCE_TEXT_FIELDS:
+        if isinstance(payload.get(name), str):
+            yield payload[name], (lambda value, name=name: payload.__setitem__(name, value))
+    for name in SOURCE_LIST_FIELDS:
+        items = payload.get(name) or []
+        for index, item in enumerate(items):
+            if isinstance(item, str):
+                yield item, (lambda value, items=items, index=index: items.__setitem__(index, value))
+    for part in payload.get("parts_replaced") or []:
+        if not isinstance(part, dict):
+            continue
+        for name in SOURCE_PART_FIELDS:
+            if isinstance(part.get(name), str):
+                yield part[name], (lambda value, part=part, name=name: part.__setitem__(name, value))
+
+
+def _learn_entry(original: str, turkish: str, origin: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    if not original or not turkish or len(original) > MAX_PHRASE_CHARS:
+        return None
+    template = _to_template(original, turkish)
+    key = normalize_phrase(original)
+    if template is None or not key:
+        return None
+    return key, {"key": key, "source": original, "tr": template, "origin": origin}
+
+
+async def _store_entries(entries: Dict[str, Dict[str, Any]]) -> None:
+    if not entries:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    # Var olan kayıtların üzerine yazılmaz; ilk öğrenilen çeviri korunur
+    await db.translation_memory.bulk_write(
+        [
+            UpdateOne(
+                {"key": key},
+                {"$setOnInsert": {**entry, "hits": 0, "created_at": now}},
+                upsert=True,
+            )
+            for key, entry in entries.items()
+        ],
+        ordered=False,
+    )
+
+
+async def lookup_translations(keys: Sequence[str]) -> Dict[str, str]:
+    """Anahtar -> Türkçe şablon eşlemesini döndürür ve isabet sayaçlarını artırır."""
+    if not keys:
+        return {}
+    docs = await db.translation_memory.find(
+        {"key": {"$in": list(keys)}}, {"_id": 0, "key": 1, "tr": 1}
+    ).to_list(len(keys))
+    found = {doc["key"]: doc["tr"] for doc in docs}
+    if found:
+        await db.translation_memory.update_many(
+            {"key": {"$in": list(found)}},
+            {"$inc": {"hits": 1}, "$set": {"last_used_at": datetime.now(timezone.utc).isoformat()}},
+        )
+    return found
+
+
+def _render_translation_prompt(phrases: Sequence[str]) -> str:
+    return f"""İFADELER (JSON dizisi):
+{json.dumps(list(phrases), ensure_ascii=False)}
+
+translations alanına her ifadenin Türkçe çevirisini aynı sırayla yaz.
+"""
+
+
+async def translate_phrases(
+    phrases: Sequence[str],
+    call: TranslateCall,
+    model: str,
+) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Bellekte olmayan ifadeleri toplu çeviri çağrısıyla çevirir."""
+    translations: Dict[str, str] = {}
+    calls: List[Dict[str, Any]] = []
+    for start in range(0, len(phrases), MAX_TRANSLATION_BATCH):
+        batch = list(phrases[start:start + MAX_TRANSLATION_BATCH])
+        text, usage = await call(
+            TRANSLATION_SYSTEM_MESSAGE, _render_translation_prompt(batch),
+            TRANSLATION_MAX_COMPLETION_TOKENS, None, None,
+            model=model, response_model=AITranslationBatch,
+        )
+        calls.append({"model": model, "phrases": len(batch), **usage})
+        result, _ = parse_analysis_output(text, response_model=AITranslationBatch)
+        translated = result.get("translations") or []
+        if len(translated) != len(batch):
+            # Sıra kaymış olabilir; yanlış eşleşme belleğe yazılmasın
+            logger.warning(f"Çeviri yanıtı {len(batch)} ifade yerine {len(translated)} ifade döndürdü, atlandı")
+            continue
+        for phrase, turkish in zip(batch, translated):
+            if turkish and turkish.strip():
+                translations[phrase] = turkish.strip()
+    return translations, {"calls": calls}
+
+
+async def apply_translation_memory(
+    payload: Dict[str, Any],
+    call: Optional[TranslateCall] = None,
+    model: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Orijinal dildeki alanlara Türkçe karşılıkları ekleyerek "Original | TR"
+    biçimine getirir. Dönüş: bellek/çeviri istatistikleri.
+    """
+    learned: Dict[str, Dict[str, Any]] = {}
+    pending: List[Tuple[str, Callable[[str], None]]] = []
+
+    for value, assign in list(_iter_source_phrases(payload)):
+        original, turkish = split_bilingual(value)
+        if not original:
+            continue
+        if turkish is not None:
+            # Model iki dilli döndürdüyse çeviri belleğe öğretilir
+            entry = _learn_entry(original, turkish, "model")
+            if entry:
+                learned.setdefault(*entry)
+            assign(format_bilingual(original, turkish))
+            continue
+        pending.append((original, assign))
+
+    try:
+        memory = await lookup_translations(sorted({normalize_phrase(original) for original, _ in pending}))
+    except Exception as exc:
+        logger.warning(f"Çeviri belleği okunamadı: {exc}")
+        memory = {}
+
+    misses: List[Tuple[str, Callable[[str], None]]] = []
+    hits = 0
+    for original, assign in pending:
+        template = memory.get(normalize_phrase(original))
+        turkish = _fill_template(template, original) if template else None
+        if turkish is None:
+            misses.append((original, assign))
+            continue
+        hits += 1
+        assign(format_bilingual(original, turkish))
+
+    stats: Dict[str, Any] = {"hits": hits, "misses": len(misses), "calls": []}
+    translations: Dict[str, str] = {}
+    unseen = list(dict.fromkeys(original for original, _ in misses))
+    if unseen and call is not None and model:
+        try:
+            translations, call_stats = await translate_phrases(unseen, call, model)
+            stats["calls"] = call_stats["calls"]
+        except Exception as exc:
+            logger.warning(f"Toplu çeviri başarısız, orijinal metin kullanılacak: {exc}")
+
+    for original, assign in misses:
+        turkish = translations.get(original)
+        if turkish is None:
+            # Çevrilemeyen ifade TR kısmında orijinal haliyle kalır
+            assign(format_bilingual(original, original))
+            continue
+        entry = _learn_entry(original, turkish, "llm")
+        if entry:
+            learned.setdefault(*entry)
+        assign(format_bilingual(original, turkish))
+    stats["translated"] = len(translations)
+
+    for name in TURKISH_TEXT_FIELDS:
+        if isinstance(payload.get(name), str) and TR_MARKER not in payload[name]:
+            payload[name] = format_bilingual(payload[name], payload[name])
+    for name in TURKISH_LIST_FIELDS:
+        if not isinstance(payload.get(name), list):
+            continue
+        payload[name] = [
+            item if not isinstance(item, str) or TR_MARKER in item else format_bilingual(item, item)
+            for item in payload[name]
+        ]
+
+    try:
+        await _store_entries(learned)
+    except Exception as exc:
+        logger.warning(f"Çeviri belleği güncellenemedi: {exc}")
+    stats["learned"] = len(learned)
+    return stats
+
+
+def _case_bilingual_values(case_doc: Dict[str, Any]) -> List[str]:
+    values = [case_doc.get(name) for name in SOURCE_TEXT_FIELDS]
+    for name in SOURCE_LIST_FIELDS:
+        values.extend(case_doc.get(name) or [])
+    for part in case_doc.get("parts_replaced") or []:
+        if isinstance(part, dict):
+            values.extend(part.get(name) for name in SOURCE_PART_FIELDS)
+    return [value for value in values if isinstance(value, str) and TR_MARKER in value]
+
+
+async def backfill_translation_memory(max_cases: Optional[int] = None) -> int:
+    """Geçmiş case'lerdeki iki dilli alanlardan çeviri belleğini doldurur; öğrenilen kayıt sayısı."""
+    projection = {"_id": 0, **{name: 1 for name in SOURCE_TEXT_FIELDS + SOURCE_LIST_FIELDS}, "parts_replaced": 1}
+    cursor = db.ize_cases.find({}, projection).sort("created_at", -1)
+    if max_cases:
+        cursor = cursor.limit(max_cases)
+
+    learned: Dict[str, Dict[str, Any]] = {}
+    total = 0
+    async for case_doc in cursor:
+        for value in _case_bilingual_values(case_doc):
+            original, turkish = split_bilingual(value)
+            entry = _learn_entry(original, turkish, "case")
+            # Daha yeni case'ler önce geldiği için güncel çeviri tercih edilir
+            if entry:
+                learned.setdefault(*entry)
+        if len(learned) >= BACKFILL_BATCH_SIZE:
+            await _store_entries(learned)
+            total += len(learned)
+            learned = {}
+    await _store_entries(learned)
+    total += len(learned)
+    logger.info(f"Çeviri belleği geçmiş case'lerden dolduruldu: {total} ifade işlendi")
+    return total
+
+
+async def _backfill_if_empty() -> None:
+    try:
+        if await db.translation_memory.find_one({}, {"_id": 1}) is None:
+            await backfill_translation_memory()
+    except Exception as exc:
+        logger.error(f"Çeviri belleği doldurulamadı: {exc}")
+
+
+def start_backfill_if_empty() -> None:
+    """Çeviri belleği boşsa geçmiş case'lerden arka planda doldurmayı başlatır."""
+    global _backfill_task
+    if TRANSLATION_MEMORY_BACKFILL and _backfill_task is None:
+        _backfill_task = asyncio.create_task(_backfill_if_empty())
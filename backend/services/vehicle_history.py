@@ -0,0 +1,201 @@
+"""
+Araç (VIN / plaka) bazında IZE geçmişi.
+
+vehicles koleksiyonunda her araç için bir kayıt tutulur: case'ler
+timeline'a eklenir, km ilerlemesi ve tekrar eden parçalar bu timeline'dan
+hesaplanıp aynı kayda yazılır. Okuma tarafı yalnızca bu kaydı döndürür;
+ize_cases üzerinde tarama yapılmaz.
+
+Anahtar normalize VIN'dir (VIN:...); VIN yoksa veya çok kısaysa plaka
+(PLATE:...) kullanılır.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from services.case_search import normalize_key
+from services.timestamps import to_datetime
+
+logger = logging.getLogger(__name__)
+
+# Bu uzunluğun altındaki VIN'ler (kısmi okuma) anahtar olarak kullanılmaz
+MIN_VIN_KEY_LENGTH = 8
+MAX_COMPLAINT_CHARS = 300
+VEHICLE_HISTORY_BACKFILL = os.environ.get("VEHICLE_HISTORY_BACKFILL", "true").lower() == "true"
+CASE_PROJECTION = {
+    "_id": 0, "id": 1, "ize_no": 1, "vin": 1, "plate": 1, "company": 1, "branch": 1,
+    "created_at": 1, "repair_date": 1, "repair_km": 1, "warranty_decision": 1,
+    "failure_complaint": 1, "parts_replaced": 1,
+}
+
+_backfill_task: Optional[asyncio.Task] = None
+
+
+def vehicle_key(case_doc: Dict[str, Any]) -> Optional[str]:
+    vin = normalize_key(case_doc.get("vin"))
+    if len(vin) >= MIN_VIN_KEY_LENGTH:
+        return f"VIN:{vin}"
+    plate = normalize_key(case_doc.get("plate"))
+    return f"PLATE:{plate}" if plate else None
+
+
+def _part_names(case_doc: Dict[str, Any]) -> List[str]:
+    names = []
+    for part in case_doc.get("parts_replaced") or []:
+        name = part.get("part_name") if isinstance(part, dict) else None
+        if isinstance(name, str) and name.strip():
+            names.append(name.strip())
+    return names
+
+
+def timeline_entry(case_doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "case_id": case_doc["id"],
+        "ize_no": case_doc.get("ize_no") or "",
+        "created_at": to_datetime(case_doc.get("created_at")),
+        "repair_date": case_doc.get("repair_date"),
+        "repair_km": int(case_doc.get("repair_km") or 0),
+        "warranty_decision": case_doc.get("warranty_decision") or "",
+        "branch": case_doc.get("branch") or "",
+        "failure_complaint": (case_doc.get("failure_complaint") or "")[:MAX_COMPLAINT_CHARS],
+        "parts": _part_names(case_doc),
+    }
+
+
+def _entry_order(entry: Dict[str, Any]) -> tuple:
+    # Onarım tarihi yoksa case tarihi; aynı gündeki kayıtlar km'ye göre
+    created = entry.get("created_at")
+    day = entry.get("repair_date") or (created.strftime("%Y-%m-%d") if created else "")
+    return day, entry.get("repair_km") or 0
+
+
+def summarize_timeline(timeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Timeline'ı sıralar, km farklarını ve tekrar eden parçaları hesaplar."""
+    ordered = sorted(timeline, key=_entry_order)
+    previous_km = None
+    for entry in ordered:
+        km = entry.get("repair_km") or 0
+        entry["km_since_previous"] = km - previous_km if km and previous_km is not None else None
+        if km:
+            previous_km = km
+
+    part_cases: Dict[str, List[str]] = defaultdict(list)
+    part_labels: Dict[str, str] = {}
+    for entry in ordered:
+        for name in entry.get("parts") or []:
+            part_key = normalize_key(name)
+            if part_key and entry["case_id"] not in part_cases[part_key]:
+                part_cases[part_key].append(entry["case_id"])
+                part_labels.setdefault(part_key, name)
+    repeated = [
+        {"part_name": part_labels[part_key], "count": len(case_ids), "case_ids": case_ids}
+        for part_key, case_ids in part_cases.items() if len(case_ids) > 1
+    ]
+    repeated.sort(key=lambda item: item["count"], reverse=True)
+
+    kms = [entry["repair_km"] for entry in ordered if entry.get("repair_km")]
+    created = [entry["created_at"] for entry in ordered if entry.get("created_at")]
+    return {
+        "timeline": ordered,
+        "case_count": len(ordered),
+        "first_seen_at": min(created) if created else None,
+        "last_seen_at": max(created) if created else None,
+        "latest_km": kms[-1] if kms else 0,
+        "km_covered": max(kms) - min(kms) if kms else 0,
+        "repeated_parts": repeated,
+        "has_repeat_failure": bool(repeated),
+    }
+
+
+async def _store_summary(vehicle: Dict[str, Any]) -> None:
+    summary = summarize_timeline(vehicle.get("timeline") or [])
+    # Araya başka bir ekleme/silme girdiyse o işlemin özeti geçerlidir
+    await db.vehicles.update_one(
+        {"key": vehicle["key"], "revision": vehicle.get("revision", 0)},
+        {"$set": summary},
+    )
+
+
+async def record_case(case_doc: Dict[str, Any]) -> Optional[str]:
+    """Case'i aracının timeline'ına ekler ve özetini günceller; araç anahtarını döndürür."""
+    key = vehicle_key(case_doc)
+    if not key:
+        return None
+    update = {
+        "$push": {"timeline": timeline_entry(case_doc)},
+        "$inc": {"revision": 1},
+        "$setOnInsert": {"key": key},
+    }
+    vin = normalize_key(case_doc.get("vin"))
+    add_to_set = {
+        name: value for name, value in (
+            ("plates", normalize_key(case_doc.get("plate"))),
+            ("companies", (case_doc.get("company") or "").strip()),
+        ) if value
+    }
+    if add_to_set:
+        update["$addToSet"] = add_to_set
+    if key.startswith("VIN:"):
+        update["$set"] = {"vin": vin}
+    try:
+        vehicle = await db.vehicles.find_one_and_update(
+            {"key": key, "timeline.case_id": {"$ne": case_doc["id"]}},
+            update,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # Case zaten bu araçta kayıtlı (upsert yeni belge açmaya çalıştı)
+        return key
+    await _store_summary(vehicle)
+    return key
+
+
+async def remove_cases(case_ids: List[str]) -> None:
+    """Silinen case'leri araç timeline'larından çıkarır; boş kalan araç kaydını siler."""
+    if not case_ids:
+        return
+    async for vehicle in db.vehicles.find({"timeline.case_id": {"$in": case_ids}}, {"_id": 0, "key": 1}):
+        updated = await db.vehicles.find_one_and_update(
+            {"key": vehicle["key"]},
+            {"$pull": {"timeline": {"case_id": {"$in": case_ids}}}, "$inc": {"revision": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated is None:
+            continue
+        if not updated.get("timeline"):
+            await db.vehicles.delete_one({"key": vehicle["key"], "revision": updated["revision"]})
+        else:
+            await _store_summary(updated)
+
+
+async def rebuild_vehicle_history() -> int:
+    """vehicles koleksiyonunu ize_cases'ten yeniden kurar; işlenen case sayısı."""
+    await db.vehicles.delete_many({})
+    processed = 0
+    async for case_doc in db.ize_cases.find({}, CASE_PROJECTION).sort("created_at", 1):
+        if await record_case(case_doc):
+            processed += 1
+    logger.info(f"Araç geçmişi yeniden kuruldu: {processed} case")
+    return processed
+
+
+async def _backfill_if_empty() -> None:
+    try:
+        if await db.vehicles.find_one({}, {"_id": 1}) is None and await db.ize_cases.find_one({}, {"_id": 1}):
+            await rebuild_vehicle_history()
+    except Exception as exc:
+        logger.error(f"Araç geçmişi doldurulamadı: {exc}")
+
+
+def start_backfill_if_empty() -> None:
+    """vehicles koleksiyonu boşsa geçmiş case'lerden arka planda doldurur."""
+    global _backfill_task
+    if VEHICLE_HISTORY_BACKFILL and _backfill_task is None:
+        _backfill_task = asyncio.create_task(_backfill_if_empty())
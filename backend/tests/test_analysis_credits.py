@@ -0,0 +1,126 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services import analysis_batches, analysis_jobs, case_analysis
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if isinstance(condition, dict) and "$gte" in condition:
+            if doc.get(field, 0) < condition["$gte"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+class _Collection:
+    """update_one / find_one için basit koşul eşleyen bellek içi koleksiyon."""
+
+    def __init__(self, docs=()):
+        self.docs = [dict(doc) for doc in docs]
+
+    async def find_one(self, query, projection=None):
+        return next((doc for doc in self.docs if _matches(doc, query)), None)
+
+    async def update_one(self, query, update):
+        doc = next((doc for doc in self.docs if _matches(doc, query)), None)
+        if doc is None:
+            return SimpleNamespace(modified_count=0)
+        for field, amount in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + amount
+        doc.update(update.get("$set", {}))
+        return SimpleNamespace(modified_count=1)
+
+
+USER = {"id": "u1", "role": "user", "email": "user@example.com", "free_analyses_remaining": 1}
+
+
+def test_concurrent_reservations_cannot_spend_more_than_the_balance(monkeypatch):
+    users = _Collection([USER])
+    monkeypatch.setattr(case_analysis, "db", SimpleNamespace(users=users))
+
+    async def reserve_twice():
+        return await asyncio.gather(
+            case_analysis.reserve_analysis_credits(USER),
+            case_analysis.reserve_analysis_credits(USER),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(reserve_twice())
+
+    # Biri krediyi ayırır (1), diğeri 403 alır
+    assert sorted(getattr(result, "status_code", result) for result in results) == [1, 403]
+    assert users.docs[0]["free_analyses_remaining"] == 0
+
+
+def test_admin_reservation_does_not_touch_the_balance(monkeypatch):
+    monkeypatch.setattr(case_analysis, "db", SimpleNamespace(users=_Collection()))
+
+    assert asyncio.run(case_analysis.reserve_analysis_credits({"id": "a1", "role": "admin"})) == 0
+    with pytest.raises(HTTPException):
+        asyncio.run(case_analysis.reserve_analysis_credits({"id": "missing", "role": "user"}, 2))
+
+
+def test_failed_job_credit_is_refunded_once_and_only_without_a_case(monkeypatch):
+    users = _Collection([{**USER, "free_analyses_remaining": 0}])
+    jobs = _Collection([
+        {"id": "j1", "user_id": "u1", "case_id": "c1", "credit_reserved": True},
+        {"id": "j2", "user_id": "u1", "case_id": "c2", "credit_reserved": True},
+    ])
+    fake_db = SimpleNamespace(users=users, analysis_jobs=jobs, ize_cases=_Collection([{"id": "c2"}]))
+    monkeypatch.setattr(case_analysis, "db", fake_db)
+    monkeypatch.setattr(analysis_jobs, "db", fake_db)
+
+    async def refund_all():
+        for job in list(jobs.docs) + list(jobs.docs):
+            await analysis_jobs._refund_job_credit(job)
+
+    asyncio.run(refund_all())
+
+    # j1 iki kez iade edilmeye çalışıldı, j2'nin case'i kaydedilmiş
+    assert users.docs[0]["free_analyses_remaining"] == 1
+
+
+def test_batch_reserves_all_credits_at_once_and_refunds_unqueued_files(monkeypatch):
+    users = _Collection([{**USER, "free_analyses_remaining": 3}])
+    monkeypatch.setattr(case_analysis, "db", SimpleNamespace(users=users))
+    pdfs = [analysis_batches._PendingPdf(file_name=f"{index}.pdf", open_stream=None) for index in range(3)]
+    enqueued = []
+
+    def fake_store(item):
+        if item.file_name == "2.pdf":
+            raise OSError("disk dolu")
+        return f"ab/cd/{item.file_name}"
+
+    async def fake_register(name):
+        return None
+
+    async def fake_enqueue(user, file_name, pdf_storage_name, branch=None, batch_id=None, credit_reserved=False):
+        enqueued.append((file_name, credit_reserved))
+        return SimpleNamespace(id=f"job-{file_name}")
+
+    monkeypatch.setattr(analysis_batches, "_collect_pending_pdfs", lambda uploads, skipped: pdfs)
+    monkeypatch.setattr(analysis_batches, "_store_pending_pdf", fake_store)
+    monkeypatch.setattr(analysis_batches, "register_upload", fake_register)
+    monkeypatch.setattr(analysis_batches, "enqueue_analysis_job", fake_enqueue)
+
+    with pytest.raises(OSError):
+        asyncio.run(analysis_batches.create_analysis_batch(USER, []))
+
+    assert enqueued == [("0.pdf", True), ("1.pdf", True)]
+    # Üç kredi ayrıldı, kuyruğa alınamayan dosyanın kredisi iade edildi
+    assert users.docs[0]["free_analyses_remaining"] == 1
+
+    # İkinci parti aynı bakiyeyi tekrar kullanamaz
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(analysis_batches.create_analysis_batch(USER, []))
+    assert exc.value.status_code == 403
+    assert len(enqueued) == 2
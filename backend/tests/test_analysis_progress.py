@@ -0,0 +1,60 @@
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from routes import cases
+from services.analysis_progress import ProgressReporter, has_channel, stream_channel
+
+
+def test_budget_deferral_closes_subscribers_and_frees_the_channel():
+    async def scenario():
+        reporter = ProgressReporter("progress-deferred", "u1")
+        reporter.emit("upload_stored", file_name="ize.pdf")
+
+        async def subscribe():
+            return [chunk async for chunk in stream_channel("progress-deferred")]
+
+        subscriber = asyncio.create_task(subscribe())
+        await asyncio.sleep(0)
+        reporter.emit("budget_deferred", job_id="job-1", retry_at="2024-06-01T00:00:00+00:00")
+        chunks = await asyncio.wait_for(subscriber, timeout=1)
+        return chunks, has_channel("progress-deferred")
+
+    chunks, still_open = asyncio.run(scenario())
+
+    assert "event: budget_deferred" in chunks[-1]
+    assert not still_open
+
+
+def test_cancelled_analysis_request_closes_its_progress_channel(monkeypatch):
+    user = {"id": "u1", "role": "admin", "email": "admin@example.com"}
+
+    async def never_finishes(file, branch, current_user, progress):
+        progress.emit("upload_stored", file_name=file.filename)
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(cases, "_analyze_upload", never_finishes)
+
+    async def scenario():
+        request = asyncio.create_task(cases.analyze_ize_pdf(
+            file=SimpleNamespace(filename="ize.pdf"), branch=None,
+            progress_id="progress-cancelled", current_user=user,
+        ))
+        await asyncio.sleep(0)
+
+        async def subscribe():
+            return [chunk async for chunk in stream_channel("progress-cancelled")]
+
+        subscriber = asyncio.create_task(subscribe())
+        await asyncio.sleep(0)
+        # İstemci bağlantısı koptuğunda istek görevi iptal edilir
+        request.cancel()
+        await asyncio.gather(request, return_exceptions=True)
+        return await asyncio.wait_for(subscriber, timeout=1)
+
+    chunks = asyncio.run(scenario())
+
+    assert "event: failed" in chunks[-1]
@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.inputs import pdf_text, warranty_rules
+from benchmarks.run import compare, measure_alloc
+
+
+def _result(normalized: float, peak_bytes: int) -> dict:
+    return {"ops_per_sec": normalized * 1000, "normalized": normalized, "peak_bytes": peak_bytes, "retained_bytes": 0}
+
+
+def test_compare_flags_only_regressions_over_threshold():
+    baseline = {"results": {
+        "fast": _result(1.0, 100_000),
+        "slow": _result(1.0, 100_000),
+        "hungry": _result(1.0, 100_000),
+    }}
+    current = {"results": {
+        "fast": _result(0.9, 100_000),
+        "slow": _result(0.6, 100_000),
+        "hungry": _result(1.0, 400_000),
+        "new_case": _result(0.1, 10_000_000),
+    }}
+
+    failures = compare(baseline, current, max_regression=25, max_alloc_regression=50)
+
+    assert len(failures) == 2
+    assert failures[0].startswith("slow:")
+    assert failures[1].startswith("hungry:")
+
+
+def test_synthetic_inputs_are_sized_and_deterministic():
+    text = pdf_text(10 * 1024)
+
+    assert abs(len(text.encode("utf-8")) - 10 * 1024) < 1024
+    assert text == pdf_text(10 * 1024)
+    assert len(warranty_rules(100)) == 100
+    assert measure_alloc(lambda: "x" * 200_000)["peak_bytes"] >= 200_000
@@ -0,0 +1,34 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.budget_governor import _is_exhausted, _subjects, period_end, usage_key
+
+
+def test_period_end_and_usage_key():
+    moment = datetime(2024, 12, 31, 15, 30, tzinfo=timezone.utc)
+
+    assert period_end("daily", moment) == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert period_end("monthly", moment) == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert usage_key("branch", "Bursa", "monthly", moment) == "branch:Bursa:monthly:2024-12"
+
+
+def test_limit_applies_to_matching_subjects():
+    user = {"id": "u1"}
+    any_user = {"scope": "user", "scope_id": "*", "period": "daily"}
+    other_branch = {"scope": "branch", "scope_id": "İzmit", "period": "daily"}
+    providers = {"scope": "provider", "scope_id": "*", "period": "daily"}
+
+    assert _subjects(any_user, user, "Bursa", ["openai"]) == ["u1"]
+    assert _subjects(other_branch, user, "Bursa", ["openai"]) == []
+    assert _subjects(providers, user, None, ["openai", "google_gemini"]) == ["openai", "google_gemini"]
+
+
+def test_exhausted_on_either_cap():
+    limit = {"max_tokens": 1000, "max_cost_usd": 0.5}
+
+    assert not _is_exhausted(limit, {"tokens": 999, "cost_usd": 0.1})
+    assert _is_exhausted(limit, {"tokens": 1000, "cost_usd": 0.1})
+    assert _is_exhausted({"max_cost_usd": 0.5}, {"tokens": 0, "cost_usd": 0.5})
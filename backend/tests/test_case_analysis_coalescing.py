@@ -0,0 +1,58 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from models.case import IZECase
+from services import case_analysis
+
+LEADER = {"id": "u1", "role": "user", "email": "leader@example.com", "branch": "Bursa"}
+FOLLOWER = {"id": "u2", "role": "user", "email": "follower@example.com", "branch": "Bursa"}
+
+
+def _leader_case():
+    return IZECase(
+        id="case-leader", user_id=LEADER["id"], branch="Bursa", case_title="IZE-1 - ACME - 34 ABC 123",
+        ize_no="IZE-1", company="ACME", plate="34 ABC 123", vin="WDB9634031L123456",
+        request_type="WARRANTY SUPPORT", is_within_2_year_warranty=True, warranty_decision="COVERED",
+        failure_complaint="", failure_cause="", repair_process_summary="", email_subject="", email_body="",
+        pdf_file_name="leader.pdf", pdf_storage_name="ab/cd/leader.pdf", extracted_text="",
+        ai_total_tokens=1200, duplicate_candidates=[{"case_id": "older"}],
+    )
+
+
+def _run(monkeypatch, user):
+    stored = []
+
+    async def fake_run_coalesced(key, case_id, analyze):
+        return _leader_case(), False
+
+    async def fake_store_case(current_user, ize_case, email_data, pdf_content, progress=None,
+                              record_llm_usage=True, credit_reserved=False):
+        stored.append((current_user, ize_case, record_llm_usage))
+        return ize_case
+
+    monkeypatch.setattr(case_analysis, "run_coalesced", fake_run_coalesced)
+    monkeypatch.setattr(case_analysis, "_store_case", fake_store_case)
+    ize_case = asyncio.run(case_analysis.run_case_analysis(
+        user, b"%PDF-1.4", "follower.pdf", "ab/cd/follower.pdf", case_id="case-follower",
+    ))
+    return ize_case, stored
+
+
+def test_follower_from_another_user_gets_own_case_without_llm_usage(monkeypatch):
+    ize_case, stored = _run(monkeypatch, FOLLOWER)
+
+    assert (ize_case.id, ize_case.user_id, ize_case.pdf_file_name) == ("case-follower", "u2", "follower.pdf")
+    assert ize_case.ize_no == "IZE-1" and ize_case.ai_total_tokens == 1200
+    assert ize_case.duplicate_candidates == []
+    # Kopya kaydedilir (kredi, e-posta); LLM bütçe sayaçları tekrar artırılmaz
+    assert [(user["id"], record_llm_usage) for user, _, record_llm_usage in stored] == [("u2", False)]
+
+
+def test_same_user_follower_gets_leader_case_without_charge(monkeypatch):
+    ize_case, stored = _run(monkeypatch, LEADER)
+
+    assert (ize_case.id, ize_case.user_id) == ("case-leader", "u1")
+    assert stored == []
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from models.case import CaseBulkRequest
+from services import case_bulk
+from services.case_bulk import bulk_query
+
+ADMIN = {"id": "a1", "role": "admin", "email": "admin@example.com"}
+USER = {"id": "u1", "role": "user", "email": "user@example.com"}
+
+
+def test_bulk_query_scopes_users_to_their_own_cases():
+    request = CaseBulkRequest(action="archive", branch="Bursa", year=2024, month=5)
+
+    assert bulk_query(ADMIN, request) == {"branch": "Bursa", "year": 2024, "month": 5, "is_archived": {"$ne": True}}
+    assert bulk_query(USER, request)["user_id"] == "u1"
+
+
+def test_bulk_query_targets_only_cases_whose_state_changes():
+    unarchive = bulk_query(ADMIN, CaseBulkRequest(action="unarchive", ids=["c1", "c2"]))
+    delete = bulk_query(ADMIN, CaseBulkRequest(action="delete", warranty_decision="OUT_OF_COVERAGE"))
+
+    assert unarchive == {"id": {"$in": ["c1", "c2"]}, "is_archived": True}
+    assert "is_archived" not in delete
+
+
+def test_bulk_query_requires_a_filter():
+    with pytest.raises(HTTPException) as exc:
+        bulk_query(ADMIN, CaseBulkRequest(action="delete"))
+    assert exc.value.status_code == 400
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def limit(self, count):
+        return _Cursor(self._docs[:count])
+
+    async def to_list(self, length):
+        return self._docs[:length]
+
+
+class _RacingCases:
+    """İlk okumadan hemen sonra bir case'i başka bir silme isteği siliyormuş gibi davranır."""
+
+    def __init__(self, docs, deleted_elsewhere):
+        self.docs = {doc["id"]: doc for doc in docs}
+        self.deleted_elsewhere = deleted_elsewhere
+
+    async def count_documents(self, query):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        snapshot = list(self.docs.values())
+        self.docs.pop(self.deleted_elsewhere, None)
+        return _Cursor(snapshot)
+
+    async def find_one_and_delete(self, query, projection=None):
+        return self.docs.pop(query["id"], None)
+
+
+def test_bulk_delete_releases_only_pdfs_of_cases_it_deleted(monkeypatch):
+    cases = _RacingCases(
+        [{"id": "c1", "pdf_storage_name": "ab/cd/shared.pdf"}, {"id": "c2", "pdf_storage_name": "ab/cd/shared.pdf"}],
+        deleted_elsewhere="c2",
+    )
+    released, removed = [], []
+
+    async def fake_release(names):
+        released.extend(names)
+        return 0
+
+    async def fake_remove(case_ids):
+        removed.append(case_ids)
+
+    monkeypatch.setattr(case_bulk, "db", type("Db", (), {"ize_cases": cases}))
+    monkeypatch.setattr(case_bulk, "release_pdfs", fake_release)
+    monkeypatch.setattr(case_bulk, "remove_vehicle_cases", fake_remove)
+    monkeypatch.setattr(case_bulk, "remove_fingerprints", fake_remove)
+
+    summary = asyncio.run(case_bulk.run_bulk_operation(ADMIN, CaseBulkRequest(action="delete", ids=["c1", "c2"])))
+
+    assert summary["processed"] == 1
+    assert released == ["ab/cd/shared.pdf"]
+    assert removed == [["c1"], ["c1"]]
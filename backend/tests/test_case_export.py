@@ -0,0 +1,42 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.case_export import DEFAULT_EXPORT_COLUMNS, _xlsx_cell, cell_text, csv_cell, parse_columns
+
+
+def test_parse_columns_defaults_dedupes_and_rejects_internal_fields():
+    assert parse_columns(None) == DEFAULT_EXPORT_COLUMNS
+    assert parse_columns(" ize_no, vin ,ize_no") == ["ize_no", "vin"]
+    with pytest.raises(HTTPException):
+        parse_columns("ize_no,search_keys")
+
+
+def test_cell_text_flattens_lists_parts_and_dates():
+    parts = [{"part_name": "Turbo", "description": "", "qty": 2}, {"part_name": "Conta", "description": "", "qty": 1}]
+
+    assert cell_text(parts) == "Turbo (x2); Conta"
+    assert cell_text(["a", "b"]) == "a; b"
+    assert cell_text(datetime(2024, 5, 1, tzinfo=timezone.utc)) == "2024-05-01T00:00:00+00:00"
+    assert cell_text(None) == ""
+
+
+def test_csv_cell_neutralises_formula_like_text():
+    assert csv_cell("=HYPERLINK(\"http://x\")") == "'=HYPERLINK(\"http://x\")"
+    for text in ("+90 212", "-Conta", "@SUM(A1)", "\tTab", "\rCR"):
+        assert csv_cell(text) == "'" + text
+    assert csv_cell([{"part_name": "=1+1"}]) == "'=1+1"
+    # Sayılar ve olağan metin değişmez
+    assert csv_cell(-150) == "-150"
+    assert csv_cell("Turbo arızası") == "Turbo arızası"
+
+
+def test_xlsx_cell_escapes_markup_and_drops_control_characters():
+    assert _xlsx_cell(1200) == '<c t="n"><v>1200</v></c>'
+    assert "&lt;Ltd&gt; &amp; Co" in _xlsx_cell("<Ltd> & Co\x01")
+    assert "\x01" not in _xlsx_cell("<Ltd> & Co\x01")
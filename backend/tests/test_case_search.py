@@ -0,0 +1,23 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.case_search import normalize_key, resolve_mode, search_fields, similarity, trigrams
+
+
+def test_search_fields_normalize_identifiers_and_build_trigrams():
+    fields = search_fields({"ize_no": "ize-2024/001", "vin": "VF6 12345 678", "plate": "34 ŞİK 99"})
+
+    assert fields["search_keys"] == ["IZE2024001", "VF612345678", "34SIK99"]
+    assert "VF6" in fields["search_trigrams"] and "SIK" in fields["search_trigrams"]
+    assert normalize_key("ısparta") == "ISPARTA"
+
+
+def test_resolve_mode_and_fuzzy_similarity():
+    assert resolve_mode("VF6123", "auto") == "prefix"
+    assert resolve_mode("motor arızası", "auto") == "text"
+    assert resolve_mode("VF6123", "fuzzy") == "fuzzy"
+
+    query = trigrams("VF612354678")
+    assert similarity(query, "VF612345678") > similarity(query, "WDB98765432")
@@ -0,0 +1,91 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services import claim_fingerprints
+from services.claim_fingerprints import MAX_BUCKET_READ, build_fingerprint, estimate_similarity
+
+
+def _case(case_id, vin, parts, operations, km=125400, repair_date="2024-05-10"):
+    return {
+        "id": case_id, "ize_no": f"IZE-{case_id}", "vin": vin, "plate": "34 ABC 123",
+        "repair_date": repair_date, "repair_km": km,
+        "parts_replaced": [{"part_name": name} for name in parts],
+        "operations_performed": operations,
+    }
+
+
+def test_signature_ignores_part_order_spelling_and_nearby_km():
+    first = build_fingerprint(_case("1", "WDB9634031L123456", ["Turbo şarj", "Conta"], ["Turbo değiştirildi"]))
+    second = build_fingerprint(_case("2", "wdb 9634031l123456", ["CONTA", "turbo sarj"], ["Turbo değiştirildi"], km=125900))
+
+    assert first["signature"] == second["signature"]
+    assert estimate_similarity(first["minhash"], second["minhash"]) == 1.0
+    assert set(first["lsh_bands"]) == set(second["lsh_bands"])
+
+
+def test_minhash_separates_unrelated_repairs_and_keeps_buckets_scoped():
+    turbo = build_fingerprint(_case("1", "WDB9634031L123456", ["Turbo şarj", "Conta"], ["Turbo değiştirildi"]))
+    brake = build_fingerprint(_case("2", "WDB9634031L123456", ["Fren balatası", "Fren diski"], ["Fren sistemi yenilendi"]))
+    other_vehicle = build_fingerprint(_case("3", "WDB9634031L999999", ["Turbo şarj", "Conta"], ["Turbo değiştirildi"], repair_date="2024-07-01"))
+
+    assert turbo["signature"] != brake["signature"]
+    assert estimate_similarity(turbo["minhash"], brake["minhash"]) < 0.3
+    # Aynı parçalar ama farklı araç ve tarih: ortak LSH kovası yok
+    assert not set(turbo["lsh_bands"]) & set(other_vehicle["lsh_bands"])
+
+
+def test_case_without_vehicle_or_parts_has_no_signature():
+    fingerprint = build_fingerprint({"id": "1", "parts_replaced": [], "operations_performed": []})
+
+    assert fingerprint["signature"] is None
+    assert fingerprint["lsh_bands"] == []
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def limit(self, count):
+        return _Cursor(self._docs[:count])
+
+    async def __aiter__(self):
+        for doc in self._docs:
+            yield doc
+
+
+class _Fingerprints:
+    """Sorguları kaydeden, imza ve LSH koşullarını basitçe uygulayan koleksiyon."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        docs = [doc for doc in self.docs if doc["case_id"] != query["case_id"]["$ne"]]
+        if "signature" in query:
+            docs = [doc for doc in docs if doc["signature"] == query["signature"]]
+        if "lsh_bands" in query:
+            docs = [doc for doc in docs if set(doc["lsh_bands"]) & set(query["lsh_bands"]["$in"])]
+        return _Cursor(docs)
+
+
+def test_exact_match_is_found_even_when_lsh_bucket_is_full(monkeypatch):
+    new = build_fingerprint(_case("new", "WDB9634031L123456", ["Turbo şarj", "Conta"], ["Turbo değiştirildi"]))
+    exact = build_fingerprint(_case("old", "WDB9634031L123456", ["Conta", "Turbo şarj"], ["Turbo değiştirildi"]))
+    # Aynı araç kovasını dolduran, benzemeyen eski kayıtlar; birebir eşleşme en sonda
+    noise = [
+        dict(build_fingerprint(_case(f"n{index}", "WDB9634031L123456", [f"Parça {index}"], [f"İşlem {index}"])),
+             lsh_bands=new["lsh_bands"][:1])
+        for index in range(MAX_BUCKET_READ)
+    ]
+    collection = _Fingerprints(noise + [exact])
+    monkeypatch.setattr(claim_fingerprints, "db", type("Db", (), {"claim_fingerprints": collection}))
+
+    matches = asyncio.run(claim_fingerprints.find_duplicate_candidates(new))
+
+    assert matches[0]["case_id"] == "old" and matches[0]["exact"]
+    assert [query.get("signature") for query in collection.queries] == [new["signature"], None]
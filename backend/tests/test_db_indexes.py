@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.db_indexes import INDEX_REGISTRY, _idx, diff_indexes
+
+
+def test_diff_indexes_classifies_missing_drifted_and_unmanaged():
+    specs = [
+        _idx("email", unique=True),
+        _idx("user_id", ("created_at", -1)),
+        _idx("expires_at", expireAfterSeconds=0),
+    ]
+    existing = {
+        "_id_": {"key": [("_id", 1)]},
+        "email_1": {"key": [("email", 1)]},
+        "user_id_1_created_at_-1": {"key": [("user_id", 1.0), ("created_at", -1.0)]},
+        "legacy_1": {"key": [("legacy", 1)]},
+    }
+
+    diff = diff_indexes(specs, existing)
+
+    assert diff == {
+        "ok": ["user_id_1_created_at_-1"],
+        "missing": ["expires_at_1"],
+        "drifted": ["email_1"],
+        "unmanaged": ["legacy_1"],
+    }
+
+
+def test_registry_index_names_are_unique_per_collection():
+    for specs in INDEX_REGISTRY.values():
+        names = [spec.name for spec in specs]
+        assert len(names) == len(set(names))
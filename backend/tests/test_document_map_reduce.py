@@ -0,0 +1,53 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.document_map_reduce import (
+    PageGroup,
+    group_pages,
+    merge_group_notes,
+    needs_map_reduce,
+    split_pages,
+)
+
+
+def _pdf_text(page_count: int, words_per_page: int) -> str:
+    return "".join(
+        f"\n\n--- SAYFA {page}{' (OCR)' if page % 3 == 0 else ''} ---\n" + "onarım kaydı " * words_per_page
+        for page in range(1, page_count + 1)
+    )
+
+
+def test_split_pages_reads_page_markers():
+    pages = split_pages(_pdf_text(4, 5))
+
+    assert [page_num for page_num, _ in pages] == [1, 2, 3, 4]
+    assert all(text.startswith("onarım") for _, text in pages)
+
+
+def test_short_document_skips_map_reduce():
+    assert needs_map_reduce(_pdf_text(2, 20)) is False
+    assert needs_map_reduce(_pdf_text(30, 200)) is True
+
+
+def test_group_pages_respects_token_budget():
+    groups = group_pages(split_pages(_pdf_text(10, 200)), max_tokens=1200)
+
+    assert groups[0].first_page == 1
+    assert groups[-1].last_page == 10
+    assert all(later.first_page == earlier.last_page + 1 for earlier, later in zip(groups, groups[1:]))
+    assert len(groups) > 1
+
+
+def test_merge_keeps_conflicts_with_page_ranges_and_dedupes_lists():
+    merged = merge_group_notes([
+        (PageGroup(1, 3, ""), {"vin": "VIN-A", "ize_no": "IZE-1", "operations_performed": ["Pump replaced"]}),
+        (PageGroup(4, 6, ""), {"vin": "VIN-B", "ize_no": "IZE-1", "operations_performed": ["Pump replaced", "Test drive"],
+                               "parts_replaced": [{"partName": "Pump", "description": "Water", "qty": 1}]}),
+    ])
+
+    assert "ize_no: IZE-1" in merged
+    assert "vin: VIN-A (s.1-3) | VIN-B (s.4-6)" in merged
+    assert "operations_performed: Pump replaced; Test drive" in merged
+    assert "parts_replaced: Pump - Water (x1)" in merged
@@ -0,0 +1,66 @@
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services import llm_providers
+from services.llm_providers import (
+    ProviderEndpoint,
+    configured_keys,
+    order_endpoints,
+    record_failure,
+    record_success,
+)
+
+
+async def _noop_call(*args, **kwargs):
+    return "{}", {}
+
+
+def _endpoint(label: str, weight: float = 1.0) -> ProviderEndpoint:
+    return ProviderEndpoint(label.split(":")[0], label, weight, _noop_call)
+
+
+def test_configured_keys_maps_settings_and_other_keys(monkeypatch):
+    for env_name in llm_providers.ENV_KEY_NAMES.values():
+        monkeypatch.delenv(env_name, raising=False)
+
+    keys = configured_keys({
+        "openai_key": "sk-1",
+        "anthropic_key": "ant-1",
+        "other_keys": {"gemini_yedek": "g-2", "openai:ekip": "sk-2", "bilinmeyen": "x", "openai_kopya": "sk-1"},
+    })
+
+    assert [(provider, label) for provider, label, _ in keys] == [
+        ("openai", "openai"),
+        ("anthropic_claude", "anthropic_claude"),
+        ("google_gemini", "google_gemini:yedek"),
+        ("openai", "openai:ekip"),
+    ]
+
+
+def test_rate_limited_endpoint_moves_to_end(monkeypatch):
+    monkeypatch.setattr(llm_providers, "_health", {})
+    endpoints = [_endpoint("openai"), _endpoint("google_gemini"), _endpoint("anthropic_claude")]
+
+    record_failure("openai", rate_limited=True)
+
+    for seed in range(10):
+        ordered = order_endpoints(endpoints, random.Random(seed))
+        assert ordered[-1].label == "openai"
+        assert len(ordered) == 3
+
+
+def test_faster_and_heavier_endpoints_are_preferred(monkeypatch):
+    monkeypatch.setattr(llm_providers, "_health", {})
+    endpoints = [_endpoint("openai"), _endpoint("google_gemini", weight=3.0), _endpoint("openai:yavas")]
+    record_success("openai", 1000)
+    record_success("google_gemini", 1000)
+    record_success("openai:yavas", 20000)
+
+    rng = random.Random(7)
+    firsts = [order_endpoints(endpoints, rng)[0].label for _ in range(400)]
+
+    assert firsts.count("google_gemini") > firsts.count("openai") > firsts.count("openai:yavas")
+    assert firsts.count("openai") > 0
@@ -0,0 +1,77 @@
+import json
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from models.case import AITranslationBatch
+from services.structured_output import (
+    gemini_response_schema,
+    openai_response_format,
+    parse_analysis_output,
+)
+from tools.mock_llm_server import MockConfig, create_app, sample_latency_ms
+
+PDF_TEXT = (
+    "IZE 12345678 Araç: WMA06XZZ7KP123456 Plaka 34 ABC 123\n"
+    "Garanti başlangıç 10.01.2023, onarım 2024-03-05, 85.000 km, motor arızası"
+)
+
+
+def _client(**config) -> TestClient:
+    return TestClient(create_app(MockConfig(**config)))
+
+
+def test_openai_answer_follows_schema_and_input():
+    response = _client().post("/v1/chat/completions", json={
+        "model": "gpt-4o",
+        "messages": [{"role": "system", "content": "sys"}, {"role": "user", "content": PDF_TEXT}],
+        "response_format": openai_response_format(),
+    })
+
+    body = response.json()
+    assert body["choices"][0]["finish_reason"] == "stop"
+    payload, missing = parse_analysis_output(body["choices"][0]["message"]["content"])
+    assert missing == []
+    assert payload["ize_no"] == "IZE12345678"
+    assert payload["vin"] == "WMA06XZZ7KP123456"
+    assert payload["warranty_start_date"] == "2023-01-10"
+    assert payload["repair_km"] == 85000
+
+
+def test_gemini_stream_reassembles_and_translations_match_count():
+    phrases = ["engine noise", "oil leak", "brake wear"]
+    response = _client().post("/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse", json={
+        "contents": [{"role": "user", "parts": [{"text": json.dumps(phrases)}]}],
+        "generationConfig": {"responseSchema": gemini_response_schema(response_model=AITranslationBatch)},
+    })
+
+    chunks = [json.loads(line[5:]) for line in response.text.splitlines() if line.startswith("data:")]
+    text = "".join(part["text"] for chunk in chunks for part in chunk["candidates"][0]["content"]["parts"])
+    assert len(json.loads(text)["translations"]) == len(phrases)
+    assert chunks[-1]["usageMetadata"]["candidatesTokenCount"] > 0
+
+
+def test_fault_injection():
+    client = _client(truncate=1.0, seed=7)
+    request = {
+        "model": "gpt-4o",
+        "messages": [{"role": "user", "content": PDF_TEXT}],
+        "response_format": openai_response_format(),
+    }
+
+    truncated = client.post("/v1/chat/completions", json=request).json()
+    assert truncated["choices"][0]["finish_reason"] == "length"
+    assert client.post("/v1/chat/completions", json=request, headers={"X-Mock-Fault": "429"}).status_code == 429
+    assert client.get("/_mock/stats").json() == {"openai.truncated": 1, "openai.429": 1, "requests": 2}
+
+
+def test_latency_distributions():
+    import random
+
+    rng = random.Random(1)
+    assert sample_latency_ms("fixed:250", rng) == 250
+    assert 100 <= sample_latency_ms("uniform:100:200", rng) <= 200
+    assert sample_latency_ms("lognormal:800:0.5", rng) > 0
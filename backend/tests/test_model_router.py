@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.model_router import (
+    TIER_FAST,
+    TIER_FULL,
+    escalation_reason,
+    estimate_cost_usd,
+    route_document,
+)
+
+
+def _native_invoice() -> str:
+    return (
+        "\n\n--- SAYFA 1 ---\n"
+        "IZE NO 4711 Firma ACME Plaka 34 ABC 123 VIN WMA06XZZ9KM123456\n"
+        "Garanti başlangıç 12.03.2023 Onarım tarihi 05.02.2024 Kilometre 85.000 km\n"
+        "Şikayet: motor sesi. Değişen parça: rulman."
+    )
+
+
+def _scanned_bundle() -> str:
+    pages = [f"\n\n--- SAYFA {page} (OCR) ---\n" + "okunaksız metin " * 400 for page in range(1, 7)]
+    return "".join(pages)
+
+
+def test_simple_native_document_goes_to_fast_tier():
+    route = route_document(_native_invoice())
+
+    assert route.features["pages"] == 1
+    assert route.features["ocr_share"] == 0
+    assert route.features["prefilled_fields"] == 4
+    assert route.tier == TIER_FAST
+
+
+def test_long_scanned_document_goes_to_full_tier():
+    route = route_document(_scanned_bundle())
+
+    assert route.features["ocr_share"] == 1.0
+    assert route.tier == TIER_FULL
+
+
+def test_escalation_on_missing_critical_field_or_low_confidence():
+    assert escalation_reason({"confidence": 0.95}, ["failure_cause"]) is None
+    assert escalation_reason({"confidence": 0.95}, ["warranty_decision"]).startswith("validation_failed")
+    assert escalation_reason({"confidence": 0.4}, []).startswith("low_confidence")
+    assert escalation_reason({}, []) == "confidence_missing"
+
+
+def test_fast_model_is_cheaper():
+    assert estimate_cost_usd("gpt-4o-mini", 3000, 700) < estimate_cost_usd("gpt-4o", 3000, 700) / 10
+    assert estimate_cost_usd("unknown-model", 10, 10) is None
+
+
+def test_cached_prompt_tokens_are_discounted():
+    assert estimate_cost_usd("gpt-4o", 3000, 700, cached_prompt_tokens=2048) < estimate_cost_usd("gpt-4o", 3000, 700)
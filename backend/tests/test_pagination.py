@@ -0,0 +1,43 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.pagination import decode_cursor, encode_cursor, keyset_query, split_page
+
+
+def test_split_page_returns_cursor_of_last_row_only_when_more_exist():
+    docs = [{"id": f"c{idx}", "created_at": f"2024-01-0{9 - idx}T00:00:00"} for idx in range(3)]
+
+    page, cursor = split_page(docs, 2)
+    assert [doc["id"] for doc in page] == ["c0", "c1"]
+    assert decode_cursor(cursor) == ("2024-01-08T00:00:00", "c1")
+
+    page, cursor = split_page(docs, 3)
+    assert len(page) == 3 and cursor is None
+
+
+def test_keyset_query_combines_filter_and_rejects_bad_cursor():
+    cursor = encode_cursor({"id": "abc", "created_at": "2024-05-01T10:00:00"})
+
+    query = keyset_query({"user_id": "u1"}, cursor)
+    assert query["$and"][0] == {"user_id": "u1"}
+    assert query["$and"][1]["$or"][1] == {"created_at": "2024-05-01T10:00:00", "id": {"$lt": "abc"}}
+    assert keyset_query({}, None) == {}
+
+    with pytest.raises(HTTPException) as exc:
+        keyset_query({}, "bozuk!")
+    assert exc.value.status_code == 400
+
+
+def test_date_cursor_keeps_type_and_includes_legacy_string_rows():
+    created_at = datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc)
+    cursor = encode_cursor({"id": "abc", "created_at": created_at})
+
+    assert decode_cursor(cursor) == (created_at, "abc")
+    conditions = keyset_query({}, cursor)["$or"]
+    assert {"created_at": {"$type": "string"}} in conditions
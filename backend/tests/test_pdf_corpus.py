@@ -0,0 +1,27 @@
+import io
+import sys
+from pathlib import Path
+
+import pdfplumber
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from benchmarks.extraction import score_fields
+from benchmarks.pdf_corpus import build_document
+from services.pdf_processor import extract_text_from_pdf
+
+
+def test_native_invoice_fields_are_extractable():
+    content, truth = build_document("native_de", 0, seed=1)
+
+    assert truth["page_kinds"][0] == "text"
+    assert all(score_fields(extract_text_from_pdf(content), truth).values())
+
+
+def test_scanned_pages_have_no_text_layer_and_generation_is_deterministic():
+    content, truth = build_document("scanned", 2, seed=1)
+
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        assert len(pdf.pages) == truth["pages"]
+        assert not (pdf.pages[0].extract_text() or "").strip()
+    assert build_document("scanned", 2, seed=1)[1] == truth
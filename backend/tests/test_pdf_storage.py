@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import io
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services import pdf_storage
+
+
+@pytest.fixture
+def storage_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_storage, "PDF_UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(pdf_storage, "PDF_TMP_DIR", tmp_path / ".tmp")
+    (tmp_path / ".tmp").mkdir()
+    return tmp_path
+
+
+def test_identical_uploads_share_one_sharded_file(storage_dir):
+    content = b"%PDF-1.7 ize"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    first = pdf_storage.store_uploaded_pdf(content)
+    second = pdf_storage.store_pdf_stream(io.BytesIO(content))
+
+    assert first == second == f"{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+    assert pdf_storage.content_hash(first) == sha256
+    assert pdf_storage.read_stored_pdf(first) == content
+    assert [path for path in storage_dir.rglob("*") if path.is_file()] == [storage_dir / first]
+
+
+def test_legacy_names_are_readable_but_not_content_addressed(storage_dir):
+    (storage_dir / "0f1e.pdf").write_bytes(b"%PDF legacy")
+
+    assert pdf_storage.content_hash("0f1e.pdf") is None
+    assert pdf_storage.read_stored_pdf("0f1e.pdf") == b"%PDF legacy"
+
+
+def test_resolve_rejects_paths_outside_storage_and_temp_files(storage_dir):
+    assert pdf_storage.resolve_pdf_path("../server.py") is None
+    assert pdf_storage.resolve_pdf_path(".tmp/upload.part") is None
+
+
+def test_failed_case_insert_releases_the_acquired_reference(monkeypatch):
+    from models.case import IZECase
+    from services import case_analysis
+
+    name = pdf_storage.storage_name_for("ab" * 32)
+    calls = []
+
+    async def fake_acquire(pdf_storage_name, size_bytes):
+        calls.append(("acquire", pdf_storage_name))
+
+    async def fake_release(names):
+        calls.append(("release", names[0]))
+        return 0
+
+    async def no_duplicates(fingerprint):
+        return []
+
+    async def failing_insert(doc):
+        raise RuntimeError("yazma hatası")
+
+    monkeypatch.setattr(case_analysis, "acquire_pdf", fake_acquire)
+    monkeypatch.setattr(case_analysis, "release_pdfs", fake_release)
+    monkeypatch.setattr(case_analysis, "find_duplicate_candidates", no_duplicates)
+    monkeypatch.setattr(case_analysis, "db", SimpleNamespace(ize_cases=SimpleNamespace(insert_one=failing_insert)))
+    ize_case = IZECase(
+        user_id="u1", case_title="IZE-1", ize_no="IZE-1", company="ACME", plate="34 ABC 123", vin="",
+        request_type="WARRANTY SUPPORT", is_within_2_year_warranty=True, warranty_decision="COVERED",
+        failure_complaint="", failure_cause="", repair_process_summary="", email_subject="", email_body="",
+        pdf_file_name="ize.pdf", pdf_storage_name=name, extracted_text="",
+    )
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(case_analysis._store_case({"id": "u1", "role": "user"}, ize_case, {}, b"%PDF", None))
+
+    assert calls == [("acquire", name), ("release", name)]
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.ai_analyzer import _complete_structured_analysis
+from services.structured_output import (
+    gemini_response_schema,
+    openai_response_format,
+    parse_analysis_output,
+    parse_partial_json,
+)
+
+
+FULL_PAYLOAD = {
+    "ize_no": "IZE-1",
+    "company": "ACME",
+    "plate": "34ABC12",
+    "vin": "WMA123",
+    "warranty_start_date": "2023-01-10",
+    "repair_date": None,
+    "vehicle_age_months": 14,
+    "repair_km": 85000,
+    "request_type": "WARRANTY SUPPORT",
+    "is_within_2_year_warranty": True,
+    "warranty_decision": "COVERED",
+    "decision_rationale": ["Original: ok | TR: uygun"],
+    "has_active_contract": False,
+    "contract_package_name": None,
+    "contract_decision": "NO_CONTRACT_COVERAGE",
+    "contract_covered_parts": [],
+    "failure_complaint": "Original: noise | TR: ses",
+    "failure_cause": "Original: bearing | TR: rulman",
+    "operations_performed": ["Original: replaced | TR: değiştirildi"],
+    "parts_replaced": [{"partName": "Bearing", "description": "Front", "qty": 2}],
+    "repair_process_summary": "Original: done | TR: tamamlandı",
+    "confidence": 0.9,
+}
+
+
+def test_parse_partial_json_closes_truncated_object():
+    value, repaired = parse_partial_json('```json\n{"a": 1, "b": [1, 2], "c": {"d": "x"}, "e": "yar')
+
+    assert repaired is True
+    assert value == {"a": 1, "b": [1, 2], "c": {"d": "x"}}
+
+
+def test_truncated_output_reports_missing_fields():
+    text = json.dumps(FULL_PAYLOAD, ensure_ascii=False)
+    cut = text[:text.index('"parts_replaced"') + len('"parts_replaced": [{"partName": "Bearing"')]
+
+    payload, missing = parse_analysis_output(cut)
+
+    assert payload["ize_no"] == "IZE-1"
+    assert payload["operations_performed"] == FULL_PAYLOAD["operations_performed"]
+    # Kesilme anında açık olan liste güvenilmez sayılır
+    assert missing == ["parts_replaced", "repair_process_summary", "confidence"]
+
+
+def test_invalid_enum_value_is_treated_as_missing():
+    payload, missing = parse_analysis_output(json.dumps({**FULL_PAYLOAD, "warranty_decision": "MAYBE"}))
+
+    assert "warranty_decision" not in payload
+    assert missing == ["warranty_decision"]
+
+
+def test_only_missing_fields_are_requested_again():
+    text = json.dumps(FULL_PAYLOAD, ensure_ascii=False)
+    truncated = text[:text.index('"repair_process_summary"')] + '"confidence": 0.8}'
+    calls = []
+
+    async def fake_call(system_message, prompt, max_tokens, on_delta, fields):
+        calls.append(fields)
+        if fields is None:
+            return truncated, {"prompt_tokens": 100, "completion_tokens": 50}
+        return json.dumps({"repair_process_summary": "Original: x | TR: y"}), {"prompt_tokens": 120, "completion_tokens": 10}
+
+    payload, usage, repaired, missing = asyncio.run(_complete_structured_analysis(fake_call, "sys", "prompt", 400))
+
+    assert calls == [None, ["repair_process_summary"]]
+    assert repaired == ["repair_process_summary"]
+    assert missing == []
+    assert payload["repair_process_summary"] == "Original: x | TR: y"
+    assert usage == {"prompt_tokens": 220, "completion_tokens": 60}
+
+
+def test_provider_schemas_follow_provider_rules():
+    strict = openai_response_format()["json_schema"]["schema"]
+    assert strict["additionalProperties"] is False
+    assert set(strict["required"]) == set(FULL_PAYLOAD)
+    assert strict["properties"]["parts_replaced"]["items"]["additionalProperties"] is False
+
+    gemini = gemini_response_schema(["repair_date", "parts_replaced"])
+    assert list(gemini["properties"]) == ["repair_date", "parts_replaced"]
+    assert gemini["properties"]["repair_date"] == {"description": "YYYY-MM-DD veya null", "type": "string", "nullable": True}
+    assert "additionalProperties" not in json.dumps(gemini)
@@ -0,0 +1,25 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.timestamps import date_range, to_datetime
+
+
+def test_to_datetime_accepts_iso_strings_and_naive_dates():
+    assert to_datetime("2024-03-01T08:30:00Z") == datetime(2024, 3, 1, 8, 30, tzinfo=timezone.utc)
+    assert to_datetime(datetime(2024, 3, 1)).tzinfo == timezone.utc
+    assert to_datetime("bozuk") is None
+    assert to_datetime(None) is None
+
+
+def test_date_range_matches_legacy_strings_during_dual_read():
+    start = datetime(2024, 3, 1, tzinfo=timezone.utc)
+
+    query = date_range("created_at", gte=start)
+
+    assert query == {"$or": [
+        {"created_at": {"$gte": start}},
+        {"created_at": {"$gte": "2024-03-01T00:00:00+00:00"}},
+    ]}
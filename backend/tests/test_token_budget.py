@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.ai_analyzer import _build_messages, _prioritize_pdf_lines, MAX_PROMPT_CHARS
+from services.token_counter import (
+    count_chat_tokens,
+    count_tokens,
+    estimate_gemini_tokens,
+    fit_blocks_to_tokens,
+    truncate_to_tokens,
+)
+
+
+def _long_pdf_text(line_count: int = 400) -> str:
+    lines = []
+    for idx in range(line_count):
+        lines.append(f"Position {idx} Werkstattrechnung RT-{idx:05d} Turbolader ersetzt km 12{idx:04d}")
+        lines.append(f"Beschreibung der Arbeiten an Fahrzeug Nummer {idx} ohne Besonderheiten")
+    return "\n".join(lines)
+
+
+def test_truncate_to_tokens_respects_budget():
+    text = _long_pdf_text(50)
+
+    trimmed = truncate_to_tokens(text, 120, "openai", suffix="\n[...]")
+
+    assert count_tokens(trimmed, "openai") <= 120
+    assert trimmed.endswith("\n[...]")
+
+
+def test_gemini_estimate_counts_digits_individually():
+    assert estimate_gemini_tokens("1234567890") >= 10
+    assert estimate_gemini_tokens("") == 0
+
+
+def test_fit_blocks_skips_oversized_and_keeps_order():
+    blocks = ["kısa blok", "çok uzun blok " * 200, "ikinci kısa blok"]
+
+    selected = fit_blocks_to_tokens(blocks, 40, "openai", separator="\n\n")
+
+    assert selected == ["kısa blok", "ikinci kısa blok"]
+
+
+def test_prioritize_pdf_lines_token_mode_stays_within_budget():
+    compact = _prioritize_pdf_lines(_long_pdf_text(), max_chars=None, max_tokens=500, provider="openai")
+
+    assert count_tokens(compact, "openai") <= 500
+    assert "Werkstattrechnung" in compact
+
+
+def test_build_messages_fills_token_budget():
+    rules = [{"rule_version": "1.0", "rule_text": "24 ay garanti MHDV", "keywords": ["garanti"]}]
+    contracts = [{"package_name": "PERFORMANCE REFERENCE", "items": ["Turbo"], "keywords": ["turbo"]}]
+
+    system_message, prompt = _build_messages(
+        warranty_rules=rules,
+        contract_rules=contracts,
+        pdf_text=_long_pdf_text(),
+        rules_limit=900,
+        pdf_limit=None,
+        token_budget=3000,
+        provider="openai",
+    )
+
+    used = count_chat_tokens(system_message, prompt, "openai")
+    _, char_prompt = _build_messages(rules, contracts, _long_pdf_text(), 900, MAX_PROMPT_CHARS)
+
+    assert used <= 3000
+    assert used >= 2700
+    assert "24 ay garanti MHDV" in prompt
+    assert "PERFORMANCE REFERENCE" in prompt
+    assert len(prompt) > len(char_prompt)
+
+
+def test_prompt_prefix_is_identical_across_documents():
+    rules = [{"rule_version": "1.0", "rule_text": "24 ay garanti MHDV", "keywords": ["garanti"]}]
+    contracts = [{"package_name": "PERFORMANCE REFERENCE", "items": ["Turbo"], "keywords": ["turbo"]}]
+
+    system_a, prompt_a = _build_messages(rules, contracts, _long_pdf_text(40), 900, MAX_PROMPT_CHARS)
+    system_b, prompt_b = _build_messages(rules, contracts, "Rechnung Kupplung getauscht km 98000", 900, MAX_PROMPT_CHARS)
+
+    assert system_a == system_b
+    assert prompt_a.split("KURALLAR:")[0] == prompt_b.split("KURALLAR:")[0]
+    assert prompt_a.index("PDF") > prompt_a.index("KURALLAR:")
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.translation_memory import (
+    _fill_template,
+    _learn_entry,
+    normalize_phrase,
+    split_bilingual,
+)
+
+
+def test_normalize_phrase_ignores_case_spacing_and_numbers():
+    assert normalize_phrase("Turbolader  ERSETZT km 120.000.") == normalize_phrase("turbolader ersetzt km 95000")
+
+
+def test_split_bilingual():
+    assert split_bilingual("Original: Lager defekt | TR: Rulman arızalı") == ("Lager defekt", "Rulman arızalı")
+    assert split_bilingual("Lager defekt") == ("Lager defekt", None)
+
+
+def test_learned_translation_is_reused_with_new_numbers():
+    key, entry = _learn_entry("Kupplung RT-20145 ersetzt", "Debriyaj RT-20145 değiştirildi", "case")
+
+    assert key == normalize_phrase("Kupplung RT-33310 ersetzt")
+    assert _fill_template(entry["tr"], "Kupplung RT-33310 ersetzt") == "Debriyaj RT-33310 değiştirildi"
+
+
+def test_translation_with_foreign_numbers_is_not_learned():
+    assert _learn_entry("Ölwechsel nach 30000 km", "30000 km sonra 2 kez yağ değişimi", "llm") is None
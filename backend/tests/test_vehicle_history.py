@@ -0,0 +1,34 @@
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from services.vehicle_history import summarize_timeline, timeline_entry, vehicle_key
+
+
+def _case(case_id, km, parts, repair_date):
+    return timeline_entry({
+        "id": case_id, "repair_km": km, "repair_date": repair_date,
+        "created_at": datetime(2024, 6, 1, tzinfo=timezone.utc),
+        "parts_replaced": [{"part_name": name} for name in parts],
+    })
+
+
+def test_vehicle_key_prefers_full_vin_and_falls_back_to_plate():
+    assert vehicle_key({"vin": "vf6 1234-5678", "plate": "34 AB 12"}) == "VIN:VF612345678"
+    assert vehicle_key({"vin": "VF6", "plate": "34 ab 12"}) == "PLATE:34AB12"
+    assert vehicle_key({"vin": "", "plate": ""}) is None
+
+
+def test_summarize_timeline_orders_repairs_and_finds_repeated_parts():
+    summary = summarize_timeline([
+        _case("c2", 150000, ["Turbo", "Filter"], "2024-03-01"),
+        _case("c1", 100000, ["TURBO"], "2024-01-01"),
+        _case("c3", 0, ["EGR valve"], None),
+    ])
+
+    assert [entry["case_id"] for entry in summary["timeline"]] == ["c1", "c2", "c3"]
+    assert summary["timeline"][1]["km_since_previous"] == 50000
+    assert summary["latest_km"] == 150000 and summary["km_covered"] == 50000
+    assert summary["repeated_parts"] == [{"part_name": "TURBO", "count": 2, "case_ids": ["c1", "c2"]}]
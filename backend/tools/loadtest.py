@@ -0,0 +1,345 @@
+"""
+IZE analiz hattı için uçtan uca yük testi sürücüsü (asyncio + httpx).
+
+POST /api/cases/analyze, GET /api/cases ve GET /api/cases/{id} isteklerini
+verilen eşzamanlılık ve karışımla gönderir; uç nokta başına throughput ve
+p50/p95/p99, analiz aşamalarının (SSE ilerleme olaylarından) süreleri,
+sunucu ve sürücü event loop gecikmesi raporlanır. Sonuç JSON olarak yazılır,
+böylece commit'ler arası karşılaştırılabilir.
+
+Yerel yığın (ayrı terminallerde, backend dizininde):
+    mongod --dbpath /tmp/ize-mongo --port 27017
+    python -m tools.smtp_sink --port 2525
+    MOCK_LLM_LATENCY=lognormal:1500:0.4 uvicorn tools.mock_llm_server:app --port 8010
+    MONGO_URL=mongodb://127.0.0.1:27017 DB_NAME=ize_loadtest OPENAI_API_KEY=mock \\
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1 GEMINI_BASE_URL=http://127.0.0.1:8010 \\
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8010 uvicorn server:app --port 8001
+
+Çalıştırma (kullanıcı admin olmalı; --configure-smtp e-posta ayarlarını sink'e yönlendirir):
+    python -m tools.loadtest --email admin@example.com --password ... \\
+        --concurrency 16 --duration 120 --mix analyze=1,list=4,get=4 \\
+        --mock-llm-url http://127.0.0.1:8010 --smtp-sink 127.0.0.1:2525 --configure-smtp \\
+        --output loadtest-results/$(git rev-parse --short HEAD).json
+    python -m tools.loadtest --compare eski.json yeni.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from services.loop_monitor import EventLoopLagMonitor, summarize
+from tools.smtp_sink import read_sink_stats
+
+OP_ANALYZE = "analyze"
+OP_LIST = "list"
+OP_GET = "get"
+OPERATIONS = (OP_ANALYZE, OP_LIST, OP_GET)
+MAX_ERROR_SAMPLES = 20
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    """"analyze=1,list=4,get=4" -> işlem ağırlıkları."""
+    mix = {}
+    for item in raw.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Bilinmeyen işlem: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def synthetic_pdf(index: int, rng: random.Random) -> bytes:
+    """Her istekte farklı (birleştirilmeyen) küçük bir IZE PDF'i üretir."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    vin = "WMA" + "".join(rng.choice("ABCDEFGHJKLMNPRSTUVWXYZ0123456789") for _ in range(14))
+    lines = [
+        f"IZE {40000000 + index}",
+        f"Company: Loadtest Lojistik {index % 17}",
+        f"VIN: {vin}  Plate: 34 LT {1000 + index % 9000}",
+        f"Warranty start: 2023-0{1 + index % 9}-15  Repair date: 2024-0{1 + index % 9}-20",
+        f"Mileage: {50000 + rng.randint(0, 400000)} km",
+        "Complaint: engine warning lamp, loss of power",
+        "Cause: EGR valve stuck, replaced EGR valve and gasket",
+    ]
+    for offset, line in enumerate(lines):
+        pdf.drawString(60, 780 - offset * 18, line)
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        self.rng = random.Random(args.seed)
+        self.pdfs = [path.read_bytes() for path in sorted(Path(args.pdf_dir).glob("*.pdf"))] if args.pdf_dir else []
+        self.client = httpx.AsyncClient(base_url=args.base_url.rstrip("/"), timeout=args.timeout)
+        self.headers: Dict[str, str] = {}
+        self.case_ids: List[str] = []
+        self.lag = EventLoopLagMonitor(interval_ms=50)
+        self._reset_results()
+
+    def _reset_results(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+        self.errors: List[Dict[str, Any]] = []
+        self.lag.reset()
+
+    async def login(self) -> None:
+        response = await self.client.post("/api/auth/login", json={
+            "email": self.args.email, "password": self.args.password,
+        })
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        cases = await self.client.get("/api/cases", headers=self.headers)
+        if cases.status_code == 200:
+            self.case_ids = [case["id"] for case in cases.json()][:1000]
+
+    async def configure_smtp(self) -> None:
+        host, _, port = self.args.smtp_sink.partition(":")
+        response = await self.client.put("/api/admin/email-settings", headers=self.headers, json={
+            "smtp_host": host, "smtp_port": int(port or 2525), "smtp_starttls": False,
+            "smtp_password": "sink", "email_enabled": True,
+        })
+        response.raise_for_status()
+
+    def _pdf(self, index: int) -> bytes:
+        if self.pdfs and not self.args.unique_pdfs:
+            return self.pdfs[index % len(self.pdfs)]
+        return synthetic_pdf(index, self.rng)
+
+    def _record(self, op: str, started: float, status: Any, error: Optional[str] = None) -> None:
+        self.latencies[op].append(round((time.perf_counter() - started) * 1000, 1))
+        self.statuses[op][str(status)] += 1
+        if error and len(self.errors) < MAX_ERROR_SAMPLES:
+            self.errors.append({"op": op, "status": status, "error": error[:300]})
+
+    async def _collect_stages(self, progress_id: str) -> None:
+        """Tamamlanan analizin SSE geçmişinden aşama sürelerini toplar."""
+        url = f"/api/cases/progress/{progress_id}"
+        async with self.client.stream("GET", url, headers=self.headers, params={"after": 0}) as response:
+            if response.status_code != 200:
+                return
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[5:])
+                if "since_previous_ms" in event:
+                    self.stages[event["stage"]].append(event["since_previous_ms"])
+                for name, value in (event.get("timings") or {}).items():
+                    self.stages[name].append(value)
+                if event["stage"] in ("completed", "failed"):
+                    return
+
+    async def analyze(self, index: int) -> None:
+        progress_id = uuid.uuid4().hex
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                "/api/cases/analyze",
+                headers=self.headers,
+                params={"progress_id": progress_id},
+                files={"file": (f"loadtest-{index}.pdf", self._pdf(index), "application/pdf")},
+            )
+        except httpx.HTTPError as exc:
+            self._record(OP_ANALYZE, started, type(exc).__name__, str(exc))
+            return
+        self._record(OP_ANALYZE, started, response.status_code, None if response.status_code < 400 else response.text)
+        if response.status_code == 200:
+            self.case_ids.append(response.json()["id"])
+            if self.args.stage_timings:
+                await self._collect_stages(progress_id)
+
+    async def _get(self, op: str, url: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(url, headers=self.headers)
+        except httpx.HTTPError as exc:
+            self._record(op, started, type(exc).__name__, str(exc))
+            return
+        self._record(op, started, response.status_code, None if response.status_code < 400 else response.text)
+
+    async def _worker(self, deadline: float, counter: List[int]) -> None:
+        ops, weights = list(self.mix), list(self.mix.values())
+        while time.perf_counter() < deadline:
+            if self.args.requests and counter[0] >= self.args.requests:
+                return
+            counter[0] += 1
+            op = self.rng.choices(ops, weights)[0]
+            if op == OP_GET and not self.case_ids:
+                op = OP_LIST
+            if op == OP_ANALYZE:
+                await self.analyze(counter[0])
+            elif op == OP_LIST:
+                await self._get(OP_LIST, "/api/cases")
+            else:
+                await self._get(OP_GET, f"/api/cases/{self.rng.choice(self.case_ids)}")
+
+    async def _phase(self, seconds: float) -> float:
+        counter = [0]
+        started = time.perf_counter()
+        deadline = started + seconds
+        await asyncio.gather(*(self._worker(deadline, counter) for _ in range(self.args.concurrency)))
+        return time.perf_counter() - started
+
+    async def _side_stats(self, reset: bool) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {}
+        metrics = await self.client.get(
+            "/api/admin/runtime-metrics", headers=self.headers, params={"reset": str(reset).lower()}
+        )
+        if metrics.status_code == 200:
+            stats["server"] = metrics.json()
+        if self.args.mock_llm_url:
+            mock_url = self.args.mock_llm_url.rstrip("/")
+            if reset:
+                await self.client.post(f"{mock_url}/_mock/reset")
+            stats["mock_llm"] = (await self.client.get(f"{mock_url}/_mock/stats")).json()
+        if self.args.smtp_sink:
+            host, _, port = self.args.smtp_sink.partition(":")
+            stats["smtp_sink"] = await read_sink_stats(host, int(port or 2525))
+        return stats
+
+    async def run(self) -> Dict[str, Any]:
+        await self.login()
+        if self.args.configure_smtp and self.args.smtp_sink:
+            await self.configure_smtp()
+        self.lag.start()
+        try:
+            if self.args.warmup:
+                await self._phase(self.args.warmup)
+                self._reset_results()
+            before = await self._side_stats(reset=True)
+            duration = await self._phase(self.args.duration)
+            after = await self._side_stats(reset=False)
+        finally:
+            await self.lag.stop()
+            await self.client.aclose()
+        return self._report(duration, before, after)
+
+    def _report(self, duration: float, before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+        endpoints = {}
+        for op, values in self.latencies.items():
+            ok = sum(count for status, count in self.statuses[op].items() if status.isdigit() and int(status) < 400)
+            endpoints[op] = {
+                **summarize(values),
+                "ok": ok,
+                "throughput_rps": round(ok / duration, 3) if duration else None,
+                "statuses": dict(self.statuses[op]),
+            }
+        total_ok = sum(item["ok"] for item in endpoints.values())
+        emails = None
+        if "smtp_sink" in after:
+            emails = after["smtp_sink"]["messages"] - before.get("smtp_sink", {}).get("messages", 0)
+
+        return {
+            "meta": {
+                "commit": _git_commit(),
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "config": {
+                    key: str(value) if isinstance(value, Path) else value
+                    for key, value in vars(self.args).items() if key != "password"
+                },
+            },
+            "duration_s": round(duration, 2),
+            "throughput_rps": round(total_ok / duration, 3) if duration else None,
+            "endpoints": endpoints,
+            "stages_ms": {stage: summarize(values) for stage, values in sorted(self.stages.items())},
+            "server_event_loop_lag_ms": (after.get("server") or {}).get("event_loop_lag_ms"),
+            "client_event_loop_lag_ms": self.lag.snapshot(),
+            "mock_llm": after.get("mock_llm"),
+            "emails_sent": emails,
+            "errors": self.errors,
+        }
+
+
+def _compare(old_path: Path, new_path: Path) -> None:
+    old, new = json.loads(old_path.read_text()), json.loads(new_path.read_text())
+
+    def row(label: str, old_value: Optional[float], new_value: Optional[float]) -> str:
+        delta = ""
+        if old_value and new_value is not None:
+            delta = f"{(new_value - old_value) / old_value * 100:+.1f}%"
+        return f"{label:<40}{str(old_value):>14}{str(new_value):>14}{delta:>10}"
+
+    print(f"{'':<40}{old['meta'].get('commit') or old_path.name:>14}{new['meta'].get('commit') or new_path.name:>14}")
+    print(row("throughput_rps", old.get("throughput_rps"), new.get("throughput_rps")))
+    for section in ("endpoints", "stages_ms"):
+        for name in sorted(set(old.get(section, {})) | set(new.get(section, {}))):
+            for metric in ("p50", "p95", "p99"):
+                print(row(
+                    f"{section}.{name}.{metric}",
+                    old.get(section, {}).get(name, {}).get(metric),
+                    new.get(section, {}).get(name, {}).get(metric),
+                ))
+    for section in ("server_event_loop_lag_ms", "client_event_loop_lag_ms"):
+        for metric in ("p99", "max"):
+            print(row(f"{section}.{metric}", (old.get(section) or {}).get(metric), (new.get(section) or {}).get(metric)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="IZE analiz hattı yük testi")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=60, help="Ölçüm süresi (sn)")
+    parser.add_argument("--warmup", type=float, default=0, help="Sonuçlara katılmayan ısınma süresi (sn)")
+    parser.add_argument("--requests", type=int, default=0, help="Toplam istek sınırı (0 = yalnızca süre)")
+    parser.add_argument("--mix", default="analyze=1,list=4,get=4")
+    parser.add_argument("--pdf-dir", help="Yüklenecek örnek PDF'ler (yoksa sentetik PDF üretilir)")
+    parser.add_argument("--unique-pdfs", action="store_true", help="--pdf-dir olsa da her istekte yeni PDF üret")
+    parser.add_argument("--no-stage-timings", dest="stage_timings", action="store_false")
+    parser.add_argument("--mock-llm-url")
+    parser.add_argument("--smtp-sink", help="host:port")
+    parser.add_argument("--configure-smtp", action="store_true")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("ESKI", "YENI"))
+    args = parser.parse_args()
+
+    if args.compare:
+        _compare(*args.compare)
+        return
+    if not args.email or not args.password:
+        parser.error("--email ve --password gerekli")
+
+    report = asyncio.run(LoadTest(args).run())
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text)
+    print(text if not args.output else f"Sonuç yazıldı: {args.output}", file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+ISO string zaman damgalarını BSON date'e çeviren geçiş aracı.
+
+Yalnızca hâlâ string olan alanlara dokunur; tekrar çalıştırılabilir ve
+uygulama çalışırken kullanılabilir (güncelleme filtresi eski string değeri de
+içerdiği için arada değişen kayıtların üzerine yazılmaz). Çözümlenemeyen
+değerler olduğu gibi bırakılıp raporlanır.
+
+Kullanım (backend dizininde):
+    python -m tools.migrate_dates --status          # çevrilecek kayıt sayıları
+    python -m tools.migrate_dates --dry-run
+    python -m tools.migrate_dates [--collection ize_cases] [--batch-size 500]
+
+Tüm sayılar sıfırlandığında API ve worker DATE_DUAL_READ=false ile
+başlatılabilir.
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+load_dotenv(Path(__file__).resolve().parents[1] / '.env')
+
+from database import client, db
+from services.timestamps import to_datetime
+
+DATE_FIELDS: Dict[str, List[str]] = {
+    "ize_cases": ["created_at", "archived_at", "updated_at"],
+    "payment_transactions": ["created_at", "updated_at", "completed_at"],
+    "system_logs": ["created_at"],
+    "users": ["created_at"],
+    "warranty_rules": ["created_at"],
+    "contract_rules": ["created_at"],
+    "invoices": ["created_at", "updated_at"],
+}
+DEFAULT_BATCH_SIZE = 500
+
+
+async def pending_counts(collections: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+    """Koleksiyon/alan bazında hâlâ string olan kayıt sayıları."""
+    counts = {}
+    for name in collections or DATE_FIELDS:
+        counts[name] = {
+            field: await db[name].count_documents({field: {"$type": "string"}})
+            for field in DATE_FIELDS[name]
+        }
+    return counts
+
+
+async def migrate_field(collection: str, field: str, batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False) -> Dict[str, int]:
+    stats = {"scanned": 0, "converted": 0, "invalid": 0}
+    operations: List[UpdateOne] = []
+
+    async def flush() -> None:
+        if operations and not dry_run:
+            result = await db[collection].bulk_write(operations, ordered=False)
+            stats["converted"] += result.modified_count
+        elif operations:
+            stats["converted"] += len(operations)
+        operations.clear()
+
+    cursor = db[collection].find({field: {"$type": "string"}}, {"_id": 1, field: 1}).batch_size(batch_size)
+    async for doc in cursor:
+        stats["scanned"] += 1
+        value = doc[field]
+        parsed = to_datetime(value)
+        if parsed is None:
+            stats["invalid"] += 1
+            continue
+        operations.append(UpdateOne({"_id": doc["_id"], field: value}, {"$set": {field: parsed}}))
+        if len(operations) >= batch_size:
+            await flush()
+    await flush()
+    return stats
+
+
+async def migrate(collections: Optional[List[str]] = None, batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False) -> Dict[str, Any]:
+    report: Dict[str, Any] = {}
+    for name in collections or DATE_FIELDS:
+        report[name] = {}
+        for field in DATE_FIELDS[name]:
+            stats = await migrate_field(name, field, batch_size, dry_run)
+            report[name][field] = stats
+            if stats["scanned"]:
+                print(f"{name}.{field}: {stats['converted']}/{stats['scanned']} çevrildi, {stats['invalid']} çözümlenemedi")
+    return report
+
+
+async def _main(args: argparse.Namespace) -> None:
+    collections = [args.collection] if args.collection else None
+    try:
+        if args.status:
+            result = await pending_counts(collections)
+        else:
+            result = await migrate(collections, args.batch_size, args.dry_run)
+            remaining = await pending_counts(collections)
+            if not any(any(fields.values()) for fields in remaining.values()):
+                print("Tüm alanlar BSON date; DATE_DUAL_READ=false kullanılabilir.")
+        print(json.dumps(result, indent=2))
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ISO string zaman damgalarını BSON date'e çevirir")
+    parser.add_argument("--collection", choices=sorted(DATE_FIELDS))
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Yazmadan çevrilecek kayıtları say")
+    parser.add_argument("--status", action="store_true", help="Yalnızca kalan string alan sayılarını göster")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Eski düz uploads/ize_pdfs/<uuid>.pdf dosyalarını içerik adresli depoya
+(ab/cd/<sha256>.pdf) taşıyan ve pdf_blobs referans sayılarını yeniden
+hesaplayan araç.
+
+Her case için dosya hash'lenerek depoya yazılır (aynı içerik zaten varsa
+tekrar yazılmaz), case'in pdf_storage_name / pdf_sha256 alanları eski adla
+filtrelenerek güncellenir ve referans alınır. Bekleyen bir job'ın kullandığı
+eski dosyalara dokunulmaz. Tekrar çalıştırılabilir.
+
+Kullanım (backend dizininde):
+    python -m tools.migrate_pdf_storage --status
+    python -m tools.migrate_pdf_storage --dry-run
+    python -m tools.migrate_pdf_storage
+    python -m tools.migrate_pdf_storage --rebuild-refs   # refs'i ize_cases'ten yeniden say
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+load_dotenv(Path(__file__).resolve().parents[1] / '.env')
+
+from database import client, db
+from models.job import JOB_STATUS_QUEUED, JOB_STATUS_RUNNING
+from services.pdf_storage import (
+    acquire_pdf, content_hash, resolve_pdf_path, storage_stats, store_pdf_stream
+)
+
+LEGACY_QUERY = {"pdf_storage_name": {"$not": {"$regex": r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$"}, "$type": "string"}}
+
+
+async def status() -> Dict[str, Any]:
+    return {
+        "legacy_cases": await db.ize_cases.count_documents(LEGACY_QUERY),
+        "blobs": await storage_stats(),
+    }
+
+
+async def migrate(dry_run: bool = False) -> Dict[str, int]:
+    stats = {"scanned": 0, "migrated": 0, "missing": 0, "skipped_active_job": 0, "deduplicated": 0}
+    cursor = db.ize_cases.find(LEGACY_QUERY, {"_id": 0, "id": 1, "pdf_storage_name": 1})
+    async for case in cursor:
+        stats["scanned"] += 1
+        legacy_name = case["pdf_storage_name"]
+        legacy_path = resolve_pdf_path(legacy_name)
+        if legacy_path is None or not legacy_path.exists():
+            stats["missing"] += 1
+            continue
+        active_job = await db.analysis_jobs.find_one(
+            {"pdf_storage_name": legacy_name, "status": {"$in": [JOB_STATUS_QUEUED, JOB_STATUS_RUNNING]}},
+            {"_id": 1},
+        )
+        if active_job:
+            stats["skipped_active_job"] += 1
+            continue
+        if dry_run:
+            continue
+
+        with open(legacy_path, "rb") as source:
+            new_name = await asyncio.to_thread(store_pdf_stream, source)
+        if await db.pdf_blobs.find_one({"name": new_name}, {"_id": 1}):
+            stats["deduplicated"] += 1
+        result = await db.ize_cases.update_one(
+            {"id": case["id"], "pdf_storage_name": legacy_name},
+            {"$set": {"pdf_storage_name": new_name, "pdf_sha256": content_hash(new_name)}},
+        )
+        if result.modified_count:
+            await acquire_pdf(new_name, legacy_path.stat().st_size)
+            await db.analysis_jobs.update_many({"pdf_storage_name": legacy_name}, {"$set": {"pdf_storage_name": new_name}})
+            legacy_path.unlink(missing_ok=True)
+            stats["migrated"] += 1
+    return stats
+
+
+async def rebuild_refs() -> Dict[str, int]:
+    """refs alanını case sayılarından yeniden yazar; case'i kalmayan blob'lar 0 olur."""
+    counts = {
+        row["_id"]: row["refs"]
+        async for row in db.ize_cases.aggregate([
+            {"$match": {"pdf_storage_name": {"$type": "string"}}},
+            {"$group": {"_id": "$pdf_storage_name", "refs": {"$sum": 1}}},
+        ])
+        if content_hash(row["_id"])
+    }
+    await db.pdf_blobs.update_many({"name": {"$nin": list(counts)}}, {"$set": {"refs": 0}})
+    operations = []
+    for name, refs in counts.items():
+        pdf_path = resolve_pdf_path(name)
+        size = pdf_path.stat().st_size if pdf_path and pdf_path.exists() else 0
+        operations.append(UpdateOne(
+            {"name": name},
+            {"$set": {"refs": refs, "size_bytes": size}, "$setOnInsert": {"sha256": content_hash(name), "last_uploaded_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        ))
+    if operations:
+        await db.pdf_blobs.bulk_write(operations, ordered=False)
+    return {"blobs_with_cases": len(counts)}
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        if args.status:
+            result = await status()
+        elif args.rebuild_refs:
+            result = await rebuild_refs()
+        else:
+            result = await migrate(args.dry_run)
+        print(json.dumps(result, indent=2, default=str))
+    finally:
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="PDF'leri içerik adresli depoya taşır")
+    parser.add_argument("--dry-run", action="store_true", help="Dosyaları taşımadan taranacak case'leri say")
+    parser.add_argument("--status", action="store_true", help="Eski adlı case sayısı ve depo özeti")
+    parser.add_argument("--rebuild-refs", action="store_true", help="pdf_blobs.refs'i ize_cases'ten yeniden hesapla")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,498 @@
+"""
+Yük testi ve CI için yerel sahte LLM sağlayıcısı (ASGI uygulaması).
+
+OpenAI chat.completions, Gemini generateContent / streamGenerateContent ve
+Anthropic messages biçimlerini (akışlı ve akışsız) konuşur. Yanıtlar istekteki
+JSON şemasından ve prompt'taki metinden deterministik olarak üretilir; aynı
+prompt her zaman aynı cevabı alır.
+
+Kullanım (backend dizininde):
+    uvicorn tools.mock_llm_server:app --port 8010
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1 \\
+    GEMINI_BASE_URL=http://127.0.0.1:8010 \\
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8010 uvicorn server:app
+
+Davranış ortam değişkenleriyle veya çalışırken PUT /_mock/config ile ayarlanır:
+    MOCK_LLM_LATENCY            "fixed:300", "uniform:200:1500", "lognormal:800:0.6" (ms)
+    MOCK_LLM_TOKENS_PER_SECOND  akışlı yanıtlarda parça hızı (0 = beklemesiz)
+    MOCK_LLM_ERROR_429          rate limit döndürme oranı (0-1)
+    MOCK_LLM_ERROR_5XX          503 döndürme oranı (0-1)
+    MOCK_LLM_TRUNCATE           JSON'u yarıda kesip max token bitişi bildirme oranı (0-1)
+    MOCK_LLM_SEED               rastgelelik tohumu
+İstek başına "X-Mock-Fault: 429 | 500 | truncate" başlığı hata zorlar.
+İstatistikler GET /_mock/stats, sıfırlama POST /_mock/reset ile alınır.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, fields
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STREAM_CHUNK_CHARS = 24
+# Yaklaşık token sayımı (sahte usage için yeterli)
+CHARS_PER_TOKEN = 4
+
+FAULT_RATE_LIMIT = "429"
+FAULT_SERVER_ERROR = "500"
+FAULT_TRUNCATE = "truncate"
+
+_VIN_RE = re.compile(r"\b[A-HJ-NPR-Z0-9]{17}\b")
+_PLATE_RE = re.compile(r"\b\d{2}\s?[A-Z]{1,3}\s?\d{2,4}\b")
+_IZE_RE = re.compile(r"\bIZE[\s\-_:]*\d{4,}\b", re.IGNORECASE)
+_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b|\b(\d{2})[./](\d{2})[./](\d{4})\b")
+_KM_RE = re.compile(r"\b(\d{1,3}(?:[.,]?\d{3})*)\s?km\b", re.IGNORECASE)
+_JSON_LIST_RE = re.compile(r"\[\s*\".*?\"\s*\]", re.DOTALL)
+
+
+@dataclass
+class MockConfig:
+    latency: str = "fixed:0"
+    tokens_per_second: float = 0.0
+    error_429: float = 0.0
+    error_5xx: float = 0.0
+    truncate: float = 0.0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        seed = os.environ.get("MOCK_LLM_SEED")
+        return cls(
+            latency=os.environ.get("MOCK_LLM_LATENCY", "fixed:0"),
+            tokens_per_second=float(os.environ.get("MOCK_LLM_TOKENS_PER_SECOND", "0")),
+            error_429=float(os.environ.get("MOCK_LLM_ERROR_429", "0")),
+            error_5xx=float(os.environ.get("MOCK_LLM_ERROR_5XX", "0")),
+            truncate=float(os.environ.get("MOCK_LLM_TRUNCATE", "0")),
+            seed=int(seed) if seed else None,
+        )
+
+
+def sample_latency_ms(spec: str, rng: random.Random) -> float:
+    """"fixed:ms", "uniform:min:max" veya "lognormal:medyan:sigma" dağılımından gecikme örnekler."""
+    kind, *params = spec.split(":")
+    values = [float(param) for param in params]
+    if kind == "uniform":
+        return rng.uniform(values[0], values[1])
+    if kind == "lognormal":
+        return rng.lognormvariate(math.log(max(values[0], 1.0)), values[1] if len(values) > 1 else 0.5)
+    return values[0] if values else 0.0
+
+
+def estimate_tokens(text: str) -> int:
+    return max(len(text) // CHARS_PER_TOKEN, 1)
+
+
+# ---------------------------------------------------------------------------
+# Şemadan cevap üretimi
+# ---------------------------------------------------------------------------
+
+def _digest(*parts: str) -> int:
+    return int(hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:12], 16)
+
+
+def _schema_type(schema: Dict[str, Any]) -> Tuple[str, bool]:
+    """(tip, null olabilir mi); OpenAI anyOf, liste tip ve Gemini nullable biçimlerini kapsar."""
+    nullable = bool(schema.get("nullable"))
+    for option in schema.get("anyOf", []):
+        if option.get("type") == "null":
+            nullable = True
+        else:
+            return _schema_type(option)[0], True
+    kind = schema.get("type", "string")
+    if isinstance(kind, list):
+        nullable = nullable or "null" in kind
+        kind = next((item for item in kind if item != "null"), "string")
+    return str(kind).lower(), nullable
+
+
+def _non_null(schema: Dict[str, Any]) -> Dict[str, Any]:
+    return next((option for option in schema.get("anyOf", []) if option.get("type") != "null"), schema)
+
+
+def _find_date(text: str, index: int) -> Optional[str]:
+    dates = []
+    for match in _DATE_RE.finditer(text):
+        if match.group(1):
+            dates.append(f"{match.group(1)}-{match.group(2)}-{match.group(3)}")
+        else:
+            dates.append(f"{match.group(6)}-{match.group(5)}-{match.group(4)}")
+    return dates[min(index, len(dates) - 1)] if dates else None
+
+
+def _snippet(name: str, text: str) -> str:
+    words = re.findall(r"[^\W\d_]{3,}", text)
+    if not words:
+        return f"mock {name}"
+    start = _digest(name, text) % len(words)
+    return " ".join(words[start:start + 6])
+
+
+def _string_value(name: str, schema: Dict[str, Any], text: str, nullable: bool) -> Optional[str]:
+    if schema.get("enum"):
+        return schema["enum"][_digest(name, text) % len(schema["enum"])]
+    if name == "ize_no":
+        match = _IZE_RE.search(text)
+        return re.sub(r"[\s\-_:]+", "", match.group(0)).upper() if match else f"IZE{_digest(text) % 10**8:08d}"
+    if name == "vin":
+        match = _VIN_RE.search(text)
+        return match.group(0) if match else f"WMA{_digest(name, text) % 10**14:014d}"
+    if name == "plate":
+        match = _PLATE_RE.search(text)
+        return match.group(0) if match else None if nullable else "34 ABC 123"
+    if name.endswith("_date"):
+        value = _find_date(text, 0 if name.startswith("warranty") else 1)
+        return value if value or nullable else "2024-01-01"
+    if name == "request_type":
+        return "BREAKDOWN ASSISTANCE" if "breakdown" in text.lower() else "WARRANTY SUPPORT"
+    return _snippet(name, text)
+
+
+def _integer_value(name: str, text: str) -> int:
+    if name.endswith("km"):
+        match = _KM_RE.search(text)
+        if match:
+            return int(re.sub(r"[.,]", "", match.group(1)))
+    if name.endswith("months"):
+        return _digest(name, text) % 48
+    return _digest(name, text) % 1000
+
+
+def canned_value(name: str, schema: Dict[str, Any], text: str) -> Any:
+    """Şemaya uyan, prompt metninden türetilmiş deterministik değer."""
+    kind, nullable = _schema_type(schema)
+    schema = _non_null(schema)
+
+    if kind == "object":
+        return {
+            key: canned_value(key, prop, text)
+            for key, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        if name == "translations":
+            # Çeviri isteği: prompt'taki JSON listesiyle aynı sayıda öğe
+            match = _JSON_LIST_RE.search(text)
+            phrases = json.loads(match.group(0)) if match else []
+            return [f"TR: {phrase}" for phrase in phrases]
+        count = 1 + _digest(name, text) % 2
+        return [canned_value(f"{name}[{idx}]", schema.get("items", {}), text) for idx in range(count)]
+    if kind == "boolean":
+        return _digest(name, text) % 2 == 0
+    if kind == "integer":
+        return _integer_value(name, text)
+    if kind == "number":
+        # confidence gibi 0-1 skorlar
+        return round(0.55 + (_digest(name, text) % 41) / 100, 2)
+    return _string_value(name, schema, text, nullable)
+
+
+def canned_answer(schema: Optional[Dict[str, Any]], text: str) -> str:
+    """İstek şemasına uygun JSON cevabı (şema yoksa basit bir nesne)."""
+    if not schema:
+        return json.dumps({"answer": _snippet("answer", text)}, ensure_ascii=False)
+    return json.dumps(canned_value("root", schema, text), ensure_ascii=False)
+
+
+def truncate_answer(answer: str, rng: random.Random) -> str:
+    """max token sınırına takılmış gibi JSON'u yarıda keser."""
+    return answer[: max(int(len(answer) * rng.uniform(0.3, 0.9)), 1)]
+
+
+def _chunks(text: str) -> List[str]:
+    return [text[idx: idx + STREAM_CHUNK_CHARS] for idx in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+
+
+# ---------------------------------------------------------------------------
+# ASGI uygulaması
+# ---------------------------------------------------------------------------
+
+class MockLLM:
+    """Yapılandırma, rastgelelik ve istatistikleri tutan sahte sağlayıcı durumu."""
+
+    def __init__(self, config: Optional[MockConfig] = None):
+        self.config = config or MockConfig.from_env()
+        self.rng = random.Random(self.config.seed)
+        self.stats: Counter = Counter()
+
+    def reset(self) -> None:
+        self.rng = random.Random(self.config.seed)
+        self.stats.clear()
+
+    def pick_fault(self, request: Request) -> Optional[str]:
+        forced = request.headers.get("x-mock-fault")
+        if forced:
+            return forced
+        roll = self.rng.random()
+        if roll < self.config.error_429:
+            return FAULT_RATE_LIMIT
+        if roll < self.config.error_429 + self.config.error_5xx:
+            return FAULT_SERVER_ERROR
+        if self.rng.random() < self.config.truncate:
+            return FAULT_TRUNCATE
+        return None
+
+    async def wait_latency(self) -> None:
+        delay_ms = sample_latency_ms(self.config.latency, self.rng)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    async def wait_chunk(self, chunk: str) -> None:
+        if self.config.tokens_per_second > 0:
+            await asyncio.sleep(estimate_tokens(chunk) / self.config.tokens_per_second)
+
+    def record(self, provider: str, outcome: str) -> None:
+        self.stats[f"{provider}.{outcome}"] += 1
+        self.stats["requests"] += 1
+
+
+def _sse(payload: Any, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    body = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+    return f"{prefix}data: {body}\n\n"
+
+
+def _stream(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream")
+
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    mock = MockLLM(config)
+    app = FastAPI(title="IZE Mock LLM")
+    app.state.mock = mock
+
+    def error_response(provider: str, fault: str) -> JSONResponse:
+        status_code = 429 if fault == FAULT_RATE_LIMIT else 503
+        mock.record(provider, str(status_code))
+        if provider == "gemini":
+            body = {"error": {
+                "code": status_code,
+                "message": "mock fault",
+                "status": "RESOURCE_EXHAUSTED" if status_code == 429 else "UNAVAILABLE",
+            }}
+        elif provider == "anthropic":
+            body = {"type": "error", "error": {
+                "type": "rate_limit_error" if status_code == 429 else "overloaded_error",
+                "message": "mock fault",
+            }}
+        else:
+            body = {"error": {
+                "message": "mock fault",
+                "type": "requests" if status_code == 429 else "server_error",
+                "code": "rate_limit_exceeded" if status_code == 429 else None,
+            }}
+        return JSONResponse(body, status_code=status_code, headers={"retry-after": "1"})
+
+    async def prepare(provider: str, request: Request, schema: Optional[Dict[str, Any]], text: str):
+        await mock.wait_latency()
+        fault = mock.pick_fault(request)
+        if fault in (FAULT_RATE_LIMIT, FAULT_SERVER_ERROR):
+            return error_response(provider, fault), None, False
+        answer = canned_answer(schema, text)
+        truncated = fault == FAULT_TRUNCATE
+        if truncated:
+            answer = truncate_answer(answer, mock.rng)
+        mock.record(provider, "truncated" if truncated else "ok")
+        return None, answer, truncated
+
+    @app.get("/_mock/config")
+    async def get_config():
+        return asdict(mock.config)
+
+    @app.put("/_mock/config")
+    async def update_config(update: Dict[str, Any]):
+        known = {item.name for item in fields(MockConfig)}
+        for key, value in update.items():
+            if key in known:
+                setattr(mock.config, key, value)
+        mock.reset()
+        return asdict(mock.config)
+
+    @app.get("/_mock/stats")
+    async def get_stats():
+        return dict(mock.stats)
+
+    @app.post("/_mock/reset")
+    async def reset_stats():
+        mock.reset()
+        return {"ok": True}
+
+    @app.post("/v1/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        text = "\n".join(str(message.get("content") or "") for message in body.get("messages", []))
+        schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema")
+        error, answer, truncated = await prepare("openai", request, schema, text)
+        if error:
+            return error
+
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+        usage = {
+            "prompt_tokens": estimate_tokens(text),
+            "completion_tokens": estimate_tokens(answer),
+            "total_tokens": estimate_tokens(text) + estimate_tokens(answer),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        finish_reason = "length" if truncated else "stop"
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": finish_reason,
+                    "logprobs": None,
+                }],
+                "usage": usage,
+            }
+
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        def chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> Dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish, "logprobs": None}],
+            }
+
+        async def events():
+            yield _sse(chunk({"role": "assistant", "content": ""}))
+            for piece in _chunks(answer):
+                await mock.wait_chunk(piece)
+                yield _sse(chunk({"content": piece}))
+            yield _sse(chunk({}, finish_reason))
+            if include_usage:
+                yield _sse({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [], "usage": usage,
+                })
+            yield _sse("[DONE]")
+
+        return _stream(events())
+
+    @app.post("/v1beta/models/{target}")
+    async def gemini_generate(target: str, request: Request):
+        model, _, method = target.partition(":")
+        body = await request.json()
+        text = "\n".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        schema = (body.get("generationConfig") or {}).get("responseSchema")
+        error, answer, truncated = await prepare("gemini", request, schema, text)
+        if error:
+            return error
+
+        finish_reason = "MAX_TOKENS" if truncated else "STOP"
+        usage = {
+            "promptTokenCount": estimate_tokens(text),
+            "candidatesTokenCount": estimate_tokens(answer),
+            "totalTokenCount": estimate_tokens(text) + estimate_tokens(answer),
+        }
+
+        def candidate(piece: str, finish: Optional[str]) -> Dict[str, Any]:
+            item: Dict[str, Any] = {"content": {"role": "model", "parts": [{"text": piece}]}, "index": 0}
+            if finish:
+                item["finishReason"] = finish
+            return item
+
+        if method != "streamGenerateContent":
+            return {"candidates": [candidate(answer, finish_reason)], "usageMetadata": usage, "modelVersion": model}
+
+        async def events():
+            pieces = _chunks(answer)
+            for idx, piece in enumerate(pieces):
+                await mock.wait_chunk(piece)
+                last = idx == len(pieces) - 1
+                payload: Dict[str, Any] = {"candidates": [candidate(piece, finish_reason if last else None)]}
+                if last:
+                    payload["usageMetadata"] = usage
+                yield _sse(payload)
+
+        return _stream(events())
+
+    @app.post("/v1/messages")
+    async def anthropic_messages(request: Request):
+        body = await request.json()
+        text = "\n".join(
+            message["content"] if isinstance(message.get("content"), str)
+            else "".join(block.get("text", "") for block in message.get("content", []))
+            for message in body.get("messages", [])
+        )
+        tools = body.get("tools") or []
+        schema = tools[0].get("input_schema") if tools else None
+        error, answer, truncated = await prepare("anthropic", request, schema, text)
+        if error:
+            return error
+
+        message_id = f"msg_mock_{uuid.uuid4().hex[:12]}"
+        tool_name = tools[0]["name"] if tools else "answer"
+        stop_reason = "max_tokens" if truncated else "tool_use"
+        usage = {"input_tokens": estimate_tokens(text), "output_tokens": estimate_tokens(answer)}
+
+        if not body.get("stream"):
+            return {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model", "mock"),
+                "content": [{
+                    "type": "tool_use",
+                    "id": f"toolu_mock_{uuid.uuid4().hex[:12]}",
+                    "name": tool_name,
+                    # Kesilen araç girdisi ayrıştırılamaz; gerçek API gibi boş döner
+                    "input": {} if truncated else json.loads(answer),
+                }],
+                "stop_reason": stop_reason,
+                "usage": usage,
+            }
+
+        async def events():
+            yield _sse({"type": "message_start", "message": {
+                "id": message_id, "type": "message", "role": "assistant", "model": body.get("model", "mock"),
+                "content": [], "usage": {"input_tokens": usage["input_tokens"], "output_tokens": 0},
+            }}, "message_start")
+            yield _sse({"type": "content_block_start", "index": 0, "content_block": {
+                "type": "tool_use", "id": f"toolu_mock_{uuid.uuid4().hex[:12]}", "name": tool_name, "input": {},
+            }}, "content_block_start")
+            for piece in _chunks(answer):
+                await mock.wait_chunk(piece)
+                yield _sse({"type": "content_block_delta", "index": 0, "delta": {
+                    "type": "input_json_delta", "partial_json": piece,
+                }}, "content_block_delta")
+            yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+            yield _sse({
+                "type": "message_delta",
+                "delta": {"stop_reason": stop_reason},
+                "usage": {"output_tokens": usage["output_tokens"]},
+            }, "message_delta")
+            yield _sse({"type": "message_stop"}, "message_stop")
+
+        return _stream(events())
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("MOCK_LLM_PORT", "8010")))
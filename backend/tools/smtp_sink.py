@@ -0,0 +1,134 @@
+"""
+Yük testi için yerel SMTP sink'i.
+
+Gelen her e-postayı kabul eder, sayar ve isteğe bağlı olarak .eml dosyası
+olarak yazar; hiçbir e-postayı iletmez. AUTH PLAIN/LOGIN her kimliği kabul
+eder. STARTTLS desteklenmez; e-posta ayarlarında smtp_starttls=false ve boş
+olmayan bir smtp_password verilmelidir.
+
+Kullanım (backend dizininde):
+    python -m tools.smtp_sink --port 2525 [--out-dir /tmp/ize-mail]
+
+Sayaçlar her bağlantıda "STATS" komutuyla da okunabilir (yük testi raporu için).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPSink:
+    """E-postaları kabul edip sayan minimal SMTP sunucusu."""
+
+    def __init__(self, out_dir: Optional[Path] = None, hostname: str = "ize-smtp-sink"):
+        self.out_dir = out_dir
+        self.hostname = hostname
+        self.stats: Dict[str, int] = {"connections": 0, "messages": 0, "bytes": 0}
+        if out_dir:
+            out_dir.mkdir(parents=True, exist_ok=True)
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        writer.write(f"{line}\r\n".encode("utf-8"))
+        await writer.drain()
+
+    async def _read_data(self, reader: asyncio.StreamReader) -> bytes:
+        lines = []
+        while True:
+            line = await reader.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                break
+            # Nokta ile başlayan satırlar istemci tarafından çiftlenir (RFC 5321 4.5.2)
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+    def _store(self, data: bytes) -> None:
+        self.stats["messages"] += 1
+        self.stats["bytes"] += len(data)
+        if self.out_dir:
+            path = self.out_dir / f"{time.time_ns()}-{self.stats['messages']}.eml"
+            path.write_bytes(data)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        await self._reply(writer, f"220 {self.hostname} ESMTP")
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                command = raw.decode("utf-8", errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    writer.write(f"250-{self.hostname}\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n".encode())
+                    await self._reply(writer, "250 SIZE 52428800")
+                elif verb == "HELO":
+                    await self._reply(writer, f"250 {self.hostname}")
+                elif verb == "AUTH":
+                    mechanism = command.split(" ")[1].upper() if " " in command else ""
+                    if mechanism == "LOGIN":
+                        for prompt in ("VXNlcm5hbWU6", "UGFzc3dvcmQ6"):
+                            await self._reply(writer, f"334 {prompt}")
+                            await reader.readline()
+                    elif len(command.split(" ")) < 3:
+                        await self._reply(writer, "334 ")
+                        await reader.readline()
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    self._store(await self._read_data(reader))
+                    await self._reply(writer, "250 2.0.0 OK: queued")
+                elif verb == "STATS":
+                    await self._reply(writer, f"250 {json.dumps(self.stats)}")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 2.0.0 Bye")
+                    break
+                elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    await self._reply(writer, "250 2.0.0 OK")
+                else:
+                    await self._reply(writer, "502 5.5.2 Command not implemented")
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        logger.info(f"SMTP sink dinleniyor: {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+async def read_sink_stats(host: str, port: int) -> Dict[str, int]:
+    """Çalışan sink'in sayaçlarını STATS komutuyla okur."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await reader.readline()
+        writer.write(b"STATS\r\n")
+        await writer.drain()
+        line = (await reader.readline()).decode("utf-8").strip()
+        writer.write(b"QUIT\r\n")
+        await writer.drain()
+        return json.loads(line[4:])
+    finally:
+        writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Yük testi için yerel SMTP sink'i")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--out-dir", type=Path, default=None, help="E-postalar .eml olarak buraya yazılır")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(SMTPSink(args.out_dir).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
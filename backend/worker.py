@@ -0,0 +1,42 @@
+"""
+Ayrı süreçte çalışan IZE analiz job worker'ı.
+
+Kullanım:
+    ANALYSIS_WORKERS=4 python worker.py
+
+API süreçlerinde ANALYSIS_WORKERS=0 verilerek analizler yalnızca bu
+süreçlerde çalıştırılabilir.
+"""
+import asyncio
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+from database import client, db
+from services.analysis_jobs import AnalysisWorkerPool, ANALYSIS_WORKER_COUNT
+from services.db_indexes import ensure_indexes
+
+
+async def main():
+    await ensure_indexes()
+
+    pool = AnalysisWorkerPool(max(ANALYSIS_WORKER_COUNT, 1))
+    try:
+        await pool.run_forever()
+    finally:
+        await pool.stop()
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,7 +5,7 @@ import {
   Upload, FileText, CheckCircle, XCircle, AlertCircle, List, Settings, Home, 
   Moon, Sun, Users, Key, LogOut, CreditCard, Zap, Shield, ShieldAlert, Clock, Menu, X,
   BarChart3, Archive, ChevronDown, ChevronRight, Plus, Trash2, Edit, Eye, EyeOff,
-  Phone, Building, Mail, User, Lock, Globe, Search as SearchIcon, LayoutDashboard,
+  Phone, Building, Mail, User, Lock, Globe, Search as SearchIcon, Download, LayoutDashboard,
   Banknote, Infinity, UserPlus, MapPin, DollarSign, Image, Bot, MessageCircle
 } from "lucide-react";
 import { Button } from "@/components/ui/button";
@@ -2237,7 +2237,8 @@ const AdminAllCases = () => {
   const [branches, setBranches] = useState(DEFAULT_BRANCHES);
   const [loading, setLoading] = useState(true);
   const [errorMessage, setErrorMessage] = useState("");
-  const [filter, setFilter] = useState({ branch: "", archived: "" });
+  const [filter, setFilter] = useState({ branch: "", archived: "", q: "" });
+  const [searchInput, setSearchInput] = useState("");
   const { token } = useAuth();
   const { t } = useLanguage();
   const navigate = useNavigate();
@@ -2265,8 +2266,10 @@ const AdminAllCases = () => {
     try {
       setLoading(true);
       setErrorMessage("");
-      let url = `${API}/admin/cases`;
+      // Arama varsa index'li /cases/search, yoksa tam liste
+      let url = filter.q ? `${API}/cases/search` : `${API}/admin/cases`;
       const params = new URLSearchParams();
+      if (filter.q) params.append("q", filter.q);
       if (filter.branch) params.append("branch", filter.branch);
       if (filter.archived !== "") params.append("archived", filter.archived);
       if (params.toString()) url += `?${params.toString()}`;
@@ -2275,7 +2278,9 @@ const AdminAllCases = () => {
         ? response.data
         : Array.isArray(response.data?.cases)
           ? response.data.cases
-          : null;
+          : Array.isArray(response.data?.items)
+            ? response.data.items
+            : null;
 
       if (normalizedCases) {
         setCases(normalizedCases);
@@ -2294,6 +2299,31 @@ const AdminAllCases = () => {
     }
   };
 
+  const handleCaseSearch = (e) => {
+    e.preventDefault();
+    const q = searchInput.trim();
+    setFilter({ ...filter, q: q.length >= 2 ? q : "" });
+  };
+
+  // Liste filtreleriyle akış halinde dışa aktarım (/admin/cases/export)
+  const exportCases = async (format) => {
+    try {
+      const params = new URLSearchParams({ format });
+      if (filter.branch) params.append("branch", filter.branch);
+      if (filter.archived !== "") params.append("archived", filter.archived);
+      const response = await axios.get(`${API}/admin/cases/export?${params.toString()}`, { headers: { Authorization: `Bearer ${token}` }, responseType: "blob" });
+      const fileName = /filename="([^"]+)"/.exec(response.headers["content-disposition"] || "")?.[1] || `ize_cases.${format}`;
+      const link = document.createElement("a");
+      link.href = URL.createObjectURL(response.data);
+      link.download = fileName;
+      link.click();
+      URL.revokeObjectURL(link.href);
+    } catch (error) {
+      setErrorMessage(t("error"));
+      console.error("Error exporting cases:", error);
+    }
+  };
+
   const archiveCase = async (caseId) => { await axios.patch(`${API}/admin/cases/${caseId}/archive`, {}, { headers: { Authorization: `Bearer ${token}` } }); fetchCases(); };
   const deleteCase = async (caseId) => { if (!window.confirm(t("deleteCaseConfirm"))) return; await axios.delete(`${API}/admin/cases/${caseId}`, { headers: { Authorization: `Bearer ${token}` } }); fetchCases(); };
 
@@ -2325,7 +2355,11 @@ const AdminAllCases = () => {
     <AdminLayout>
       <div className="flex flex-col sm:flex-row sm:items-center justify-between gap-4 mb-6">
         <h1 className="text-2xl sm:text-3xl font-bold" data-testid="admin-cases-title">{t("allIzeCases")}</h1>
-        <div className="flex gap-2">
+        <div className="flex flex-wrap gap-2">
+          <form className="flex gap-2" onSubmit={handleCaseSearch}>
+            <Input className="w-[260px]" value={searchInput} onChange={(e) => setSearchInput(e.target.value)} placeholder={t("searchCases")} data-testid="admin-cases-search" />
+            <Button type="submit" variant="outline"><SearchIcon className="w-4 h-4" /></Button>
+          </form>
           <Select value={filter.branch || "all"} onValueChange={(v) => setFilter({...filter, branch: v === "all" ? "" : v})}>
             <SelectTrigger className="w-[140px]"><SelectValue placeholder={t("allBranches")} /></SelectTrigger>
             <SelectContent><SelectItem value="all">{t("allBranches")}</SelectItem>{BRANCHES.map((b) => <SelectItem key={b} value={b}>{b}</SelectItem>)}</SelectContent>
@@ -2334,6 +2368,8 @@ const AdminAllCases = () => {
             <SelectTrigger className="w-[120px]"><SelectValue placeholder={t("all")} /></SelectTrigger>
             <SelectContent><SelectItem value="all">{t("all")}</SelectItem><SelectItem value="false">{t("active")}</SelectItem><SelectItem value="true">{t("archive")}</SelectItem></SelectContent>
           </Select>
+          <Button variant="outline" onClick={() => exportCases("csv")} data-testid="admin-cases-export-csv"><Download className="w-4 h-4 mr-1" />{t("exportCases")} CSV</Button>
+          <Button variant="outline" onClick={() => exportCases("xlsx")} data-testid="admin-cases-export-xlsx"><Download className="w-4 h-4 mr-1" />{t("exportCases")} XLSX</Button>
         </div>
       </div>
 
@@ -3861,15 +3897,22 @@ const UserUpload = () => {
 
 const UserCases = () => {
   const [cases, setCases] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { token } = useAuth();
   const { t } = useLanguage();
   const navigate = useNavigate();
 
   useEffect(() => { fetchCases(); }, []);
 
-  const fetchCases = async () => {
-    try { const response = await axios.get(`${API}/cases`, { headers: { Authorization: `Bearer ${token}` } }); setCases(response.data); } catch (error) { console.error("Error:", error); } finally { setLoading(false); }
+  const fetchCases = async (cursor = null) => {
+    if (cursor) setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API}/cases`, { headers: { Authorization: `Bearer ${token}` }, params: cursor ? { cursor } : {} });
+      setCases(prev => cursor ? [...prev, ...response.data] : response.data);
+      setNextCursor(response.headers["x-next-cursor"] || null);
+    } catch (error) { console.error("Error:", error); } finally { setLoading(false); setLoadingMore(false); }
   };
 
   const getDecisionBadge = (decision) => {
@@ -3906,6 +3949,11 @@ const UserCases = () => {
               <Button className="mt-4" onClick={() => navigate("/user/upload")}>{t("firstAnalysis")}</Button>
             </CardContent></Card>
           )}
+          {nextCursor && (
+            <div className="flex justify-center">
+              <Button variant="outline" disabled={loadingMore} onClick={() => fetchCases(nextCursor)} data-testid="user-cases-load-more">{loadingMore ? t("loading") : t("loadMore")}</Button>
+            </div>
+          )}
         </div>
       )}
     </UserLayout>
@@ -172,6 +172,8 @@ export const translations = {
     
     // Cases
     allIzeCases: "Tüm IZE Dosyaları",
+    searchCases: "IZE no, VIN, plaka, firma veya arıza ara",
+    exportCases: "Dışa aktar",
     caseNotFound: "Case bulunamadı",
     deleteCaseConfirm: "Bu case'i silmek istediğinize emin misiniz?",
     archiveCase: "Arşivle",
@@ -355,6 +357,7 @@ export const translations = {
     noCases: "Case bulunamadı",
     noRules: "Henüz kural eklenmemiş",
     noAnalyses: "Henüz analiz yapmadınız",
+    loadMore: "Daha fazla yükle",
     firstAnalysis: "İlk Analizinizi Yapın",
     
     // New features
@@ -575,6 +578,8 @@ export const translations = {
     
     // Cases
     allIzeCases: "All IZE Cases",
+    searchCases: "Search IZE no, VIN, plate, company or failure",
+    exportCases: "Export",
     caseNotFound: "Case not found",
     deleteCaseConfirm: "Are you sure you want to delete this case?",
     archiveCase: "Archive",
@@ -758,6 +763,7 @@ export const translations = {
     noCases: "No cases found",
     noRules: "No rules added yet",
     noAnalyses: "You haven't made any analyses yet",
+    loadMore: "Load more",
     firstAnalysis: "Make Your First Analysis",
     
     // New features